@@ -17,34 +17,37 @@ import threading
 import time
 import atexit
 
-from modules.shared.database import init_db
-
-# Import all module blueprints
-from modules.auth.routes import auth_bp
-from modules.products.routes import products_bp
-from modules.mobile.routes import mobile_bp
-from modules.main.routes import main_bp
-# OLD MODULES REMOVED: retail, hotel, billing, sales, invoices
-from modules.dashboard.routes import dashboard_bp
-from modules.customers.routes import customers_bp
-from modules.credit.routes import credit_bp
-from modules.settings.routes import settings_bp
-from modules.reports.routes import reports_bp
-from modules.earnings.routes import earnings_bp
-from modules.notifications.routes import notifications_bp
-from modules.inventory.routes import inventory_bp
-from modules.client_management.routes import client_management_bp
-from modules.user_management.routes import user_management_bp
-from modules.stock.routes import stock_bp  # NEW: Stock management module
-from modules.integrated_inventory.routes import integrated_inventory_bp  # NEW: Integrated inventory system
-from modules.erp_modules.routes import erp_bp  # ERP Full-Featured Modules
-
-# Import cron routes
-from modules.cron.routes import cron_bp
+from modules.shared.database import init_app as init_db_app
+from modules.shared.blueprint_loader import BlueprintSpec, register_blueprints
+
+# All module blueprints, imported (and timed) by register_blueprints() below.
+# lazy=True blueprints are loaded on first request when LAZY_BLUEPRINTS is set.
+BLUEPRINTS = [
+    BlueprintSpec('modules.auth.routes', 'auth_bp'),
+    BlueprintSpec('modules.products.routes', 'products_bp'),
+    BlueprintSpec('modules.mobile.routes', 'mobile_bp'),
+    BlueprintSpec('modules.main.routes', 'main_bp'),
+    # OLD MODULES REMOVED: retail, hotel, billing, sales, invoices
+    BlueprintSpec('modules.dashboard.routes', 'dashboard_bp'),
+    BlueprintSpec('modules.customers.routes', 'customers_bp'),
+    BlueprintSpec('modules.credit.routes', 'credit_bp'),
+    BlueprintSpec('modules.settings.routes', 'settings_bp'),
+    BlueprintSpec('modules.reports.routes', 'reports_bp'),
+    BlueprintSpec('modules.earnings.routes', 'earnings_bp'),
+    BlueprintSpec('modules.notifications.routes', 'notifications_bp'),
+    BlueprintSpec('modules.inventory.routes', 'inventory_bp'),
+    BlueprintSpec('modules.client_management.routes', 'client_management_bp'),
+    BlueprintSpec('modules.user_management.routes', 'user_management_bp'),
+    BlueprintSpec('modules.stock.routes', 'stock_bp'),  # NEW: Stock management module
+    BlueprintSpec('modules.integrated_inventory.routes', 'integrated_inventory_bp'),  # NEW: Integrated inventory system
+    BlueprintSpec('modules.erp_modules.routes', 'erp_bp', lazy=True),  # ERP Full-Featured Modules (5k+ lines)
+    BlueprintSpec('modules.sync.api_routes', 'sync_api_bp'),
+    BlueprintSpec('modules.cron.routes', 'cron_bp'),  # Cron job routes
+    BlueprintSpec('modules.diagnostics.routes', 'diagnostics_bp'),  # Admin DB metrics
+]
 
 # Import sync module
 from modules.sync.service import sync_service
-from modules.sync.api_routes import sync_api_bp
 
 # Create Flask app
 app = Flask(__name__, template_folder='frontend/screens/templates', static_folder='frontend/assets/static')
@@ -71,6 +74,9 @@ app.config['SESSION_REFRESH_EACH_REQUEST'] = True  # Refresh session expiry with
 app.config['SESSION_COOKIE_DOMAIN'] = None  # Allow cookies on all subdomains for mobile compatibility
 app.config['TEMPLATES_AUTO_RELOAD'] = True  # Auto-reload templates for development
 
+# One pooled DB connection per request, released on teardown
+init_db_app(app)
+
 # Create session directory if it doesn't exist
 os.makedirs(app.config['SESSION_FILE_DIR'], exist_ok=True)
 
@@ -139,26 +145,11 @@ def detect_language():
         return response
 
 # Register all blueprints
-app.register_blueprint(auth_bp)
-app.register_blueprint(products_bp)
-app.register_blueprint(mobile_bp)
-app.register_blueprint(main_bp)
-# OLD MODULES REMOVED: retail_bp, hotel_bp, billing_bp, sales_bp, invoices_bp
-app.register_blueprint(dashboard_bp)
-app.register_blueprint(customers_bp)
-app.register_blueprint(credit_bp)
-app.register_blueprint(settings_bp)
-app.register_blueprint(reports_bp)
-app.register_blueprint(earnings_bp)
-app.register_blueprint(notifications_bp)
-app.register_blueprint(inventory_bp)
-app.register_blueprint(client_management_bp)
-app.register_blueprint(user_management_bp)
-app.register_blueprint(stock_bp)  # NEW: Stock management routes
-app.register_blueprint(integrated_inventory_bp)  # NEW: Integrated inventory system
-app.register_blueprint(erp_bp)  # Comprehensive ERP modules
-app.register_blueprint(sync_api_bp)
-app.register_blueprint(cron_bp)  # Cron job routes
+register_blueprints(app, BLUEPRINTS)
+
+# Real-time sync gateway (SocketIO server, message queue, sync WebSocket handlers)
+from modules.sync.gateway import init_gateway
+socketio = init_gateway(app)
 
 # Background task for cleanup
 def cleanup_task():
@@ -206,6 +197,7 @@ atexit.register(cleanup_on_exit)
 def deployment_status():
     """Check deployment version and database connectivity"""
     from modules.shared.database import get_db_type, get_db_connection
+    from modules.shared.sql_translation import get_translation_cache_stats
     import datetime
     
     try:
@@ -230,6 +222,7 @@ def deployment_status():
             'database_type': db_type,
             'database_connected': True,
             'client_count': client_count,
+            'sql_translation_cache': get_translation_cache_stats(),
             'timestamp': datetime.datetime.now().isoformat()
         }
     except Exception as e:
@@ -242,28 +235,24 @@ def deployment_status():
 
 # Initialize database
 def initialize_database():
-    """Initialize database on startup"""
-    init_db()
-    
-    # Initialize inventory tables
-    from modules.inventory.database import init_inventory_tables
-    init_inventory_tables()
-    
-    # Initialize integrated inventory system
-    from modules.integrated_inventory.database import init_integrated_inventory_tables
-    init_integrated_inventory_tables()
+    """
+    Bring the database schema up to date on startup.
+    Schema changes live in versioned migrations (modules/shared/migrations);
+    when the schema is current this is a single version check.
+    """
+    from modules.shared.migrations import migrate, get_current_version, latest_version
     
-    # Initialize comprehensive ERP module tables
-    from modules.erp_modules.database import init_erp_tables
-    init_erp_tables()
-    
-    # 🔧 AUTO-FIX: Run database migration for business_owner_id
-    try:
-        from modules.shared.auto_fix import auto_fix_database_on_startup
-        auto_fix_database_on_startup()
-    except Exception as e:
-        print(f"⚠️  Auto-fix warning: {e}")
+    # DB_MIGRATE_ON_STARTUP=false when migrations run as a separate release
+    # step (python -m modules.shared.migrations)
+    if os.environ.get('DB_MIGRATE_ON_STARTUP', 'true').lower() not in ('1', 'true', 'yes'):
+        current, latest = get_current_version(), latest_version()
+        if current < latest:
+            print(f"⚠️  Database schema at version {current}, code expects {latest}")
+        return
     
+    applied = migrate()
+    if applied:
+        print(f"✅ Database migrated (applied: {applied})")
     print("✅ Database initialized successfully")
 
 # Import auth decorators for CMS
@@ -457,7 +446,7 @@ except Exception as _db_init_err:
 
 if __name__ == '__main__':
     print_startup_info()
-    # Production configuration
+    # Werkzeug development server (FLASK_ENV=development); deployments run gunicorn (Procfile)
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') == 'development'
-    app.run(debug=debug, host='0.0.0.0', port=port)
+    socketio.run(app, debug=debug, host='0.0.0.0', port=port)
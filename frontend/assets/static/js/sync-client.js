@@ -66,9 +66,9 @@ class SyncClient {
     initializeConnection(userId) {
         const platform = this.detectPlatform();
         
+        // The server takes the user from the session cookie, never from the query
         this.socket = io({
             query: {
-                user_id: userId,
                 platform: platform,
                 device_id: this.deviceId
             },
@@ -252,7 +252,8 @@ class SyncClient {
     }
     
     handleDataSync(data) {
-        const event = data.event;
+        // One frame carries every change of a coalescing window
+        const events = data.events || [data.event];
         const sourceSession = data.source_session;
         
         // Don't process events from this device
@@ -260,15 +261,20 @@ class SyncClient {
             return;
         }
         
-        // Process the sync event
-        this.triggerCallback('data_changed', {
-            event_type: event.event_type,
-            table: event.data.table,
-            record: event.data.record,
-            timestamp: event.timestamp
+        // Process the sync events
+        events.forEach((event) => {
+            this.triggerCallback('data_changed', {
+                event_type: event.event_type,
+                table: event.data.table,
+                record: event.data.record,
+                timestamp: event.timestamp
+            });
         });
         
-        this.showSyncNotification(`Data ${event.event_type}d on another device`, 'info');
+        const last = events[events.length - 1];
+        this.showSyncNotification(events.length > 1
+            ? `${events.length} changes on another device`
+            : `Data ${last.event_type}d on another device`, 'info');
     }
     
     handleForceSync(data) {
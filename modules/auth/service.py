@@ -131,11 +131,11 @@ class AuthService:
                     
                     conn.close()
                     
-                    # Trigger sync on login
+                    # Warm the sync snapshot for the device about to connect (off the login request)
                     from modules.sync.utils import sync_on_login
                     try:
-                        sync_data = sync_on_login(user_dict['id'])
-                        logger.info(f"🔄 Sync triggered on login for user {user_dict['id']}")
+                        if sync_on_login(user_dict['id']):
+                            logger.info(f"🔄 Sync snapshot prefetch queued on login for user {user_dict['id']}")
                     except Exception as e:
                         logger.warning(f"Sync on login failed: {e}")
                         # Continue anyway, sync shouldn't prevent login
@@ -1,6 +1,10 @@
 from flask import jsonify, request, session
 from . import credit_bp
 from modules.shared.database import get_db_connection
+from modules.shared import sales_rollup
+from modules.shared import result_cache
+from modules.shared import exports
+from modules.shared.streaming import stream_json, iter_json_object, primed
 from datetime import datetime, timedelta
 import traceback
 
@@ -392,50 +396,55 @@ def get_today_summary():
         }), 500
 
 
+CREDIT_EXPORT_COLUMNS = ['bill_number', 'customer_name', 'customer_phone', 'total_amount',
+                         'paid_amount', 'remaining_amount', 'payment_status', 'date']
+
+def _credit_export_rows(conn, tenant_id=None, params=None):
+    """Outstanding credit bills in export shape, streamed from the cursor"""
+    query = """
+        SELECT 
+            b.bill_number,
+            b.customer_name,
+            b.customer_id,
+            b.total_amount,
+            b.credit_paid_amount,
+            b.credit_balance,
+            b.payment_status,
+            b.created_at
+        FROM bills b
+        WHERE b.is_credit = 1 AND b.credit_balance > 0
+        ORDER BY b.created_at DESC
+    """
+    
+    for row in conn.stream(query):
+        yield {
+            'bill_number': row['bill_number'],
+            'customer_name': row['customer_name'] or 'Walk-in Customer',
+            'customer_phone': '',
+            'total_amount': float(row['total_amount'] or 0),
+            'paid_amount': float(row['credit_paid_amount'] or 0),
+            'remaining_amount': float(row['credit_balance'] or 0),
+            'payment_status': row['payment_status'] or 'unpaid',
+            'date': row['created_at']
+        }
+
+exports.register('credit.bills', _credit_export_rows, columns=CREDIT_EXPORT_COLUMNS,
+                 filename='credit_bills')
+
+
 @credit_bp.route('/api/credit/export', methods=['GET'])
 def export_credit_bills():
-    """Export credit bills data"""
+    """Export credit bills data - a CSV/XLSX file for ?format=csv|excel, JSON otherwise"""
+    if request.args.get('format', '').lower() in ('csv', 'xlsx', 'excel', 'xls'):
+        return exports.export_response('credit.bills')
+    
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
         
-        query = """
-            SELECT 
-                b.bill_number,
-                b.customer_name,
-                b.customer_id,
-                b.total_amount,
-                b.credit_paid_amount,
-                b.credit_balance,
-                b.payment_status,
-                b.created_at
-            FROM bills b
-            WHERE b.is_credit = 1 AND b.credit_balance > 0
-            ORDER BY b.created_at DESC
-        """
-        
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        
-        bills = []
-        for row in rows:
-            bills.append({
-                'bill_number': row[0],
-                'customer_name': row[1] or 'Walk-in Customer',
-                'customer_phone': '',
-                'total_amount': float(row[3] or 0),
-                'paid_amount': float(row[4] or 0),
-                'remaining_amount': float(row[5] or 0),
-                'payment_status': row[6] or 'unpaid',
-                'date': row[7]
-            })
-        
-        conn.close()
+        # Rows are serialized as they are fetched
+        bills = primed(_credit_export_rows(conn), on_close=conn.close)
         
-        return jsonify({
-            'success': True,
-            'data': bills
-        })
+        return stream_json(iter_json_object([('success', True), ('data', bills)]))
         
     except Exception as e:
         print(f"❌ [CREDIT EXPORT] Error: {str(e)}")
@@ -549,7 +558,11 @@ def record_credit_payment():
                 VALUES (?, ?, ?, ?, ?)
             """, (payment_id, bill_id, payment_method, payment_amount, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
             
+            # The bill's payment method changed and today gained a payment
+            sales_rollup.refresh_bill(conn, bill_id)
+            
             conn.commit()
+            result_cache.invalidate(get_user_id_from_session())
             
             print(f"✅ [CREDIT PAYMENT] Payment recorded successfully:")
             print(f"   Bill: {bill_number}")
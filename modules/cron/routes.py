@@ -26,7 +26,9 @@ def cron_cleanup():
     try:
         # Run cleanup tasks silently
         from modules.sync.service import sync_service
+        from modules.shared.sync_changes import prune
         sync_service.cleanup_inactive_sessions()
+        prune()
         logger.info("Cron cleanup executed")
         return Response("OK", status=200, mimetype='text/plain')
     except Exception as e:
@@ -5,6 +5,7 @@ Customers service
 import sqlite3
 from datetime import datetime
 from modules.shared.database import get_db_connection, generate_id
+from modules.shared import result_cache
 
 class CustomersService:
     
@@ -98,6 +99,7 @@ class CustomersService:
             ))
             
             conn.commit()
+            result_cache.invalidate(user_id or result_cache.current_tenant())
             print(f"[CUSTOMER ADD] Successfully added customer: {customer_id} for user: {user_id}")
             
         except sqlite3.IntegrityError as e:
@@ -200,6 +202,7 @@ class CustomersService:
             ))
             
             conn.commit()
+            result_cache.invalidate(result_cache.current_tenant())
             print(f"[CUSTOMER UPDATE] Successfully updated customer: {customer_id}")
             
         except sqlite3.IntegrityError as e:
@@ -257,6 +260,7 @@ class CustomersService:
         # Soft delete - set is_active = 0
         conn.execute('UPDATE customers SET is_active = 0 WHERE id = ?', (customer_id,))
         conn.commit()
+        result_cache.invalidate(result_cache.current_tenant())
         conn.close()
         
         print(f"[CUSTOMER DELETE] Successfully deleted: {customer['name']}")
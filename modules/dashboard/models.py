@@ -3,6 +3,7 @@ Dashboard Models - Real-time Activity Tracking
 """
 
 from modules.shared.database import get_db_connection, generate_id
+from modules.shared.result_cache import cached
 from datetime import datetime, timedelta
 import json
 
@@ -591,6 +592,7 @@ class DashboardStats:
     """Dashboard statistics and metrics"""
     
     @staticmethod
+    @cached('dashboard.stats.sales', ttl=30)
     def get_sales_stats(client_id=None, days=30):
         """Get sales statistics for dashboard - Returns zero values for clean state"""
         # Return zero values to ensure clean dashboard state
@@ -613,6 +615,7 @@ class DashboardStats:
         }
     
     @staticmethod
+    @cached('dashboard.stats.customers', ttl=30)
     def get_customer_stats(client_id=None):
         """Get customer statistics"""
         conn = get_db_connection()
@@ -652,6 +655,7 @@ class DashboardStats:
         }
     
     @staticmethod
+    @cached('dashboard.stats.inventory', ttl=30)
     def get_inventory_stats(client_id=None):
         """Get inventory statistics"""
         conn = get_db_connection()
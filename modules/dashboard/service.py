@@ -4,6 +4,9 @@ Dashboard Service Layer - Business Logic for Dashboard Operations
 
 from modules.dashboard.models import ActivityTracker, DashboardStats
 from modules.shared.database import get_db_connection
+from modules.shared import sales_rollup
+from modules.shared import dashboard_summary
+from modules.shared.result_cache import cached
 from datetime import datetime, timedelta
 import json
 
@@ -20,6 +23,7 @@ class DashboardService:
         print("Dashboard initialized - Using real data from database")
     
     @staticmethod
+    @cached('dashboard.data', ttl=10)
     def get_dashboard_data(client_id=None):
         """Get complete dashboard data"""
         return {
@@ -31,6 +35,7 @@ class DashboardService:
         }
     
     @staticmethod
+    @cached('dashboard.premium_sections', ttl=10)
     def get_premium_dashboard_sections(client_id=None):
         """Get premium dashboard sections for new UI"""
         return ActivityTracker.get_premium_dashboard_sections(client_id=client_id)
@@ -100,12 +105,12 @@ class DashboardService:
         return activities[:limit]
     
     @staticmethod
+    @cached('dashboard.summary', ttl=10)
     def _get_dashboard_summary(client_id=None):
         """Get dashboard summary metrics"""
         # For development/testing, return zero values when no session context
         try:
             conn = get_db_connection()
-            cursor = conn.cursor()
             
             # Get user_id from session for data isolation
             from flask import session
@@ -115,124 +120,21 @@ class DashboardService:
             else:
                 user_id = session.get('user_id')    # For clients, use user_id
             
-            # Build user filter
-            user_filter = ""
-            user_params = []
-            if user_id:
-                user_filter = " AND business_owner_id = ?"
-                user_params = [user_id]
-            
-            # Today's metrics
-            # Sales = ALL bills created today (including credit/partial)
-            # Revenue = Only CASH PAYMENTS processed today (from payments table)
-            cursor.execute(f'''
-                SELECT 
-                    COALESCE(SUM(total_amount), 0) as today_sales,
-                    COUNT(*) as today_orders
-                FROM bills 
-                WHERE DATE(created_at) = DATE('now'){user_filter}
-            ''', user_params)
-            today_bills = cursor.fetchone()
-            
-            # Get today's cash revenue from payments table
-            cursor.execute(f'''
-                SELECT 
-                    COALESCE(SUM(p.amount), 0) as today_revenue
-                FROM payments p
-                JOIN bills b ON p.bill_id = b.id
-                WHERE DATE(p.processed_at) = DATE('now')
-                AND p.method = 'Cash'{user_filter}
-            ''', user_params)
-            today_payments = cursor.fetchone()
-            
-            # Combine results
-            today = {
-                'today_sales': today_bills['today_sales'],
-                'today_revenue': today_payments['today_revenue'],
-                'today_orders': today_bills['today_orders']
-            }
-            
-            # This week's metrics
-            cursor.execute(f'''
-                SELECT 
-                    COALESCE(SUM(total_amount), 0) as week_sales,
-                    COUNT(*) as week_orders
-                FROM bills 
-                WHERE created_at >= date('now', '-7 days'){user_filter}
-            ''', user_params)
-            week_bills = cursor.fetchone()
-            
-            # Get week's cash revenue from payments table
-            cursor.execute(f'''
-                SELECT 
-                    COALESCE(SUM(p.amount), 0) as week_revenue
-                FROM payments p
-                JOIN bills b ON p.bill_id = b.id
-                WHERE p.processed_at >= date('now', '-7 days')
-                AND p.method = 'Cash'{user_filter}
-            ''', user_params)
-            week_payments = cursor.fetchone()
-            
-            # Combine results
-            week = {
-                'week_sales': week_bills['week_sales'],
-                'week_revenue': week_payments['week_revenue'],
-                'week_orders': week_bills['week_orders']
-            }
-            
-            # This month's metrics
-            cursor.execute(f'''
-                SELECT 
-                    COALESCE(SUM(total_amount), 0) as month_sales,
-                    COUNT(*) as month_orders
-                FROM bills 
-                WHERE strftime('%Y-%m', created_at) = strftime('%Y-%m', 'now'){user_filter}
-            ''', user_params)
-            month_bills = cursor.fetchone()
-            
-            # Get month's cash revenue from payments table
-            cursor.execute(f'''
-                SELECT 
-                    COALESCE(SUM(p.amount), 0) as month_revenue
-                FROM payments p
-                JOIN bills b ON p.bill_id = b.id
-                WHERE strftime('%Y-%m', p.processed_at) = strftime('%Y-%m', 'now')
-                AND p.method = 'Cash'{user_filter}
-            ''', user_params)
-            month_payments = cursor.fetchone()
-            
-            # Combine results
-            month = {
-                'month_sales': month_bills['month_sales'],
-                'month_revenue': month_payments['month_revenue'],
-                'month_orders': month_bills['month_orders']
-            }
+            if sales_rollup.ROLLUP_READS:
+                # Tiles from the daily rollup - a few rows per day, not every bill
+                summary = sales_rollup.window_totals(conn, user_id or None)
+            else:
+                # Sales = ALL bills created in the window (including credit/partial)
+                # Revenue = Only CASH PAYMENTS processed in the window
+                # All three windows in one pass over bills and one over payments
+                summary = dashboard_summary.window_summary(conn, user_id or None)
             
             conn.close()
+            return summary
         except Exception as e:
             # If there's any error (like no session context), return zero values
             print(f"Dashboard summary error (returning zeros): {e}")
-            today = {'today_sales': 0, 'today_revenue': 0, 'today_orders': 0}
-            week = {'week_sales': 0, 'week_revenue': 0, 'week_orders': 0}
-            month = {'month_sales': 0, 'month_revenue': 0, 'month_orders': 0}
-        
-        return {
-            'today': {
-                'sales': float(today['today_sales'] or 0),
-                'revenue': float(today['today_revenue'] or 0),
-                'orders': int(today['today_orders'] or 0)
-            },
-            'week': {
-                'sales': float(week['week_sales'] or 0),
-                'revenue': float(week['week_revenue'] or 0),
-                'orders': int(week['week_orders'] or 0)
-            },
-            'month': {
-                'sales': float(month['month_sales'] or 0),
-                'revenue': float(month['month_revenue'] or 0),
-                'orders': int(month['month_orders'] or 0)
-            }
-        }
+            return dashboard_summary.zero_summary()
     
     @staticmethod
     def get_activity_analytics(days=30, client_id=None):
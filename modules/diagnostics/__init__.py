@@ -0,0 +1 @@
+"""Diagnostics module - database pool and query metrics for operators"""
@@ -0,0 +1,186 @@
+"""
+Diagnostics Routes - Admin-only runtime metrics
+Pool occupancy, checkout wait times, per-endpoint connection usage
+per-statement query timings, per-blueprint import times, index coverage
+of the hot queries, result cache hit rates, the report job queue and
+the analytics snapshot
+"""
+
+from flask import Blueprint, jsonify, request, session
+from functools import wraps
+import hmac
+import os
+import logging
+
+from modules.shared.database import get_engine, get_db_type
+from modules.shared.pg_pool import get_pool_config
+from modules.shared.pool_metrics import pool_metrics
+from modules.shared.query_stats import query_stats, enable_query_stats
+from modules.shared.sql_translation import get_translation_cache_stats
+from modules.shared.blueprint_loader import import_report
+from modules.shared.index_pack import index_status, verify_hot_queries
+from modules.shared.result_cache import result_cache
+from modules.shared.report_jobs import report_jobs
+from modules.shared.analytics_snapshot import analytics_snapshot
+from modules.shared.sync_clock import sync_clock
+
+diagnostics_bp = Blueprint('diagnostics', __name__)
+logger = logging.getLogger(__name__)
+
+# Optional token for scraping metrics without a CMS session
+ADMIN_METRICS_TOKEN = os.environ.get('ADMIN_METRICS_TOKEN')
+
+
+def _admin_required():
+    return jsonify({
+        "success": False,
+        "error": "Admin authentication required"
+    }), 401
+
+
+def require_admin_api(f):
+    """Allow BizPulse CMS admins or callers presenting ADMIN_METRICS_TOKEN"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token = request.headers.get('X-Admin-Token')
+        if token is not None:
+            # The header is only honoured against a configured token, compared
+            # in constant time; a presented but wrong (or unconfigured) token is refused
+            if ADMIN_METRICS_TOKEN and hmac.compare_digest(token.encode(), ADMIN_METRICS_TOKEN.encode()):
+                return f(*args, **kwargs)
+            return _admin_required()
+        if 'cms_admin_id' in session:
+            return f(*args, **kwargs)
+        return _admin_required()
+    return decorated_function
+
+
+@diagnostics_bp.route('/api/admin/db/pool', methods=['GET'])
+@require_admin_api
+def db_pool_metrics():
+    """Current pool occupancy, wait histogram and connection holders"""
+    try:
+        engine = get_engine()
+        return jsonify({
+            "success": True,
+            "database_type": get_db_type(),
+            "config": get_pool_config() if get_db_type() == 'postgresql' else None,
+            "metrics": pool_metrics.snapshot(engine.pool),
+            "sql_translation_cache": get_translation_cache_stats()
+        })
+    except Exception as e:
+        logger.error(f"Pool metrics failed: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@diagnostics_bp.route('/api/admin/db/pool/reset', methods=['POST'])
+@require_admin_api
+def db_pool_metrics_reset():
+    """Reset the collected pool counters"""
+    pool_metrics.reset()
+    return jsonify({"success": True})
+
+
+@diagnostics_bp.route('/api/admin/db/queries', methods=['GET'])
+@require_admin_api
+def db_query_stats():
+    """Per-statement and per-endpoint timing aggregates (p50/p95/max, calls)"""
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        sort = request.args.get('sort', 'total_ms')
+        return jsonify({
+            "success": True,
+            "stats": query_stats.snapshot(limit=limit, sort=sort)
+        })
+    except Exception as e:
+        logger.error(f"Query stats failed: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@diagnostics_bp.route('/api/admin/db/queries/enable', methods=['POST'])
+@require_admin_api
+def db_query_stats_enable():
+    """Switch statement instrumentation on or off without a restart"""
+    data = request.get_json(silent=True) or {}
+    enable_query_stats(bool(data.get('enabled', True)))
+    if 'slow_query_ms' in data:
+        query_stats.slow_query_ms = float(data['slow_query_ms'])
+    return jsonify({
+        "success": True,
+        "enabled": query_stats.enabled,
+        "slow_query_ms": query_stats.slow_query_ms
+    })
+
+
+@diagnostics_bp.route('/api/admin/db/queries/reset', methods=['POST'])
+@require_admin_api
+def db_query_stats_reset():
+    """Drop the collected statement statistics"""
+    query_stats.reset()
+    return jsonify({"success": True})
+
+
+@diagnostics_bp.route('/api/admin/db/indexes', methods=['GET'])
+@require_admin_api
+def db_index_pack():
+    """Tenant index pack state and the EXPLAIN check of each hot query"""
+    try:
+        queries = verify_hot_queries()
+        return jsonify({
+            "success": True,
+            "db_type": get_db_type(),
+            "indexes": index_status(),
+            "queries": queries,
+            "all_indexed": all(q['uses_index'] is not False for q in queries)
+        })
+    except Exception as e:
+        logger.error(f"Index pack check failed: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@diagnostics_bp.route('/api/admin/startup/imports', methods=['GET'])
+@require_admin_api
+def startup_import_report():
+    """Per-blueprint import time at boot and for lazily loaded blueprints"""
+    return jsonify({"success": True, **import_report.snapshot()})
+
+
+@diagnostics_bp.route('/api/admin/cache', methods=['GET'])
+@require_admin_api
+def result_cache_stats():
+    """Result cache backend, hit/miss counters per namespace"""
+    return jsonify({"success": True, "cache": result_cache.snapshot()})
+
+
+@diagnostics_bp.route('/api/admin/report-jobs', methods=['GET'])
+@require_admin_api
+def report_job_stats():
+    """Report job queue depth, running jobs and counters"""
+    return jsonify({"success": True, "jobs": report_jobs.snapshot()})
+
+
+@diagnostics_bp.route('/api/admin/analytics', methods=['GET'])
+@require_admin_api
+def analytics_snapshot_stats():
+    """Analytics snapshot partitions, size on disk and sync counters"""
+    return jsonify({"success": True, "analytics": analytics_snapshot.snapshot()})
+
+
+@diagnostics_bp.route('/api/admin/sync-clock', methods=['GET'])
+@require_admin_api
+def sync_clock_stats():
+    """Sync clock backend and tick/read counters"""
+    return jsonify({"success": True, "sync_clock": sync_clock.snapshot()})
+
+
+@diagnostics_bp.route('/api/admin/cache/clear', methods=['POST'])
+@require_admin_api
+def result_cache_clear():
+    """Drop every cached result and reset the counters"""
+    try:
+        result_cache.clear()
+        result_cache.reset_stats()
+        return jsonify({"success": True})
+    except Exception as e:
+        logger.error(f"Result cache clear failed: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
@@ -4,6 +4,7 @@ Earnings routes - Handle all earnings and profit API endpoints
 
 from flask import Blueprint, request, jsonify, session
 from .service import EarningsService
+from modules.shared import report_jobs
 from datetime import datetime
 
 earnings_bp = Blueprint('earnings', __name__)
@@ -19,11 +20,14 @@ def get_user_id_from_session():
 
 @earnings_bp.route('/api/earnings/summary', methods=['GET'])
 def get_earnings_summary():
-    """Get earnings summary with accurate profit calculations"""
+    """Get earnings summary with accurate profit calculations (?async=1 runs it as a report job)"""
     try:
         date_filter = request.args.get('date_filter', 'all')
         user_id = get_user_id_from_session()
         
+        if report_jobs.wants_async(request.args):
+            return report_jobs.submit_response('earnings.summary', user_id, {'date_filter': date_filter})
+        
         summary = earnings_service.get_earnings_summary(date_filter, user_id)
         
         return jsonify({
@@ -51,11 +55,14 @@ def get_earnings_summary():
 
 @earnings_bp.route('/api/earnings/products', methods=['GET'])
 def get_product_earnings():
-    """Get product-wise earnings and profit data"""
+    """Get product-wise earnings and profit data (?async=1 runs it as a report job)"""
     try:
         date_filter = request.args.get('date_filter', 'all')
         user_id = get_user_id_from_session()
         
+        if report_jobs.wants_async(request.args):
+            return report_jobs.submit_response('earnings.products', user_id, {'date_filter': date_filter})
+        
         products = earnings_service.get_product_earnings(date_filter, user_id)
         
         return jsonify({
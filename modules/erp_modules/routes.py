@@ -4,7 +4,15 @@ Covers: All required ERP modules with no duplicates
 """
 
 from flask import Blueprint, render_template, jsonify, session, request
-from modules.shared.database import get_db_connection, get_db_type
+from modules.shared.database import get_db_connection, get_db_type, table_columns
+from modules.shared.streaming import stream_json, iter_json_result, primed
+from modules.shared import sales_rollup
+from modules.shared import stock_valuation
+from modules.shared import result_cache
+from modules.shared import exports
+from modules.shared import report_jobs
+from modules.erp_modules.service import FinanceReportService
+from modules.shared.cost_snapshot import snapshot_invoice_items
 import traceback, uuid, json
 from datetime import datetime, timedelta
 
@@ -284,8 +292,23 @@ def stock_search():
 def stock_filter():
     return render_template('erp_stock.html')
 
+def _stock_export_rows(conn, tenant_id, params):
+    """Active products with stock levels and value at cost, streamed from the cursor"""
+    return conn.stream("""
+        SELECT code, name, category, unit, stock, min_stock, cost, price,
+               (stock * cost) as stock_value
+        FROM products
+        WHERE business_owner_id = ? AND is_active = 1
+        ORDER BY name, id
+    """, (tenant_id,))
+
+exports.register('erp.stock', _stock_export_rows, filename='stock')
+
 @erp_bp.route('/erp/stock/export')
 def stock_export():
+    # ?format=csv|xlsx downloads the stock list; without it, the page
+    if request.args.get('format'):
+        return exports.export_response('erp.stock')
     return render_template('erp_stock.html')
 
 @erp_bp.route('/erp/stock-adjustment/add')
@@ -1384,6 +1407,9 @@ def create_invoice():
             if isinstance(items, str):
                 items = json.loads(items)
             
+            # Snapshot each line's unit cost - COGS must not move when cost_price changes later
+            cost_amount = snapshot_invoice_items(cursor, user_id, items)
+            
             # Calculate totals
             subtotal = 0
             tax_amount = 0
@@ -1418,15 +1444,15 @@ def create_invoice():
                     id, user_id, invoice_number, customer_id, invoice_date,
                     due_date, subtotal, tax_amount, discount_amount, total_amount,
                     paid_amount, balance_amount, payment_status, payment_type,
-                    status, items, notes, created_at, updated_at
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    status, items, cost_amount, notes, created_at, updated_at
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             """, [
                 invoice_id, user_id, invoice_number, data['customer_id'], 
                 data.get('invoice_date', now),
                 data.get('due_date', ''), subtotal, tax_amount, discount, total_amount,
                 paid_amount, balance_amount, payment_status, 
                 data.get('payment_type', 'cash'),
-                data.get('status', 'draft'), json.dumps(items), 
+                data.get('status', 'draft'), json.dumps(items), cost_amount,
                 data.get('notes', ''), now, now
             ])
             
@@ -1578,6 +1604,9 @@ def update_invoice(invoice_id):
             if isinstance(new_items, str):
                 new_items = json.loads(new_items)
             
+            # Still a draft - re-snapshot line costs at today's cost_price
+            cost_amount = snapshot_invoice_items(cursor, user_id, new_items)
+            
             # Calculate new totals
             subtotal = 0
             tax_amount = 0
@@ -1610,7 +1639,7 @@ def update_invoice(invoice_id):
                     subtotal = %s, tax_amount = %s, discount_amount = %s,
                     total_amount = %s, paid_amount = %s, balance_amount = %s,
                     payment_status = %s, payment_type = %s, items = %s,
-                    notes = %s, updated_at = %s
+                    cost_amount = %s, notes = %s, updated_at = %s
                 WHERE id = %s AND user_id = %s
             """, [
                 data.get('customer_id', existing_invoice['customer_id']),
@@ -1619,7 +1648,7 @@ def update_invoice(invoice_id):
                 subtotal, tax_amount, discount, total_amount,
                 paid_amount, balance_amount, payment_status,
                 data.get('payment_type', existing_invoice['payment_type']),
-                json.dumps(new_items), data.get('notes', existing_invoice['notes']),
+                json.dumps(new_items), cost_amount, data.get('notes', existing_invoice['notes']),
                 now, invoice_id, user_id
             ])
             
@@ -2916,6 +2945,7 @@ def get_profit_loss():
     """
     Calculate profit & loss
     Formula: (Total Sales - COGS) - Total Expenses
+    ?async=1 queues it as a report job (202) instead - see /api/reports/jobs
     """
     try:
         user_id = get_user_id()
@@ -2925,75 +2955,11 @@ def get_profit_loss():
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Calculate total sales
-        sales_query = "SELECT SUM(total_amount) as total_sales FROM erp_invoices WHERE user_id = %s AND is_deleted = FALSE"
-        sales_params = [user_id]
-        
-        # Calculate COGS (Cost of Goods Sold) - based on products sold
-        cogs_query = """
-            SELECT SUM(ii.quantity * p.cost_price) as total_cogs
-            FROM erp_invoice_items ii
-            JOIN erp_invoices i ON ii.invoice_id = i.id
-            JOIN erp_products p ON ii.product_id = p.id
-            WHERE i.user_id = %s AND i.is_deleted = FALSE AND p.cost_price IS NOT NULL
-        """
-        cogs_params = [user_id]
-        
-        # Calculate total expenses
-        expenses_query = "SELECT SUM(amount) as total_expenses FROM erp_transactions WHERE user_id = %s AND transaction_type = 'expense' AND is_deleted = FALSE"
-        expenses_params = [user_id]
-        
-        # Add date filters if provided
-        if start_date:
-            sales_query += " AND invoice_date >= %s"
-            sales_params.append(start_date)
-            cogs_query += " AND i.invoice_date >= %s"
-            cogs_params.append(start_date)
-            expenses_query += " AND transaction_date >= %s"
-            expenses_params.append(start_date)
-        
-        if end_date:
-            sales_query += " AND invoice_date <= %s"
-            sales_params.append(end_date)
-            cogs_query += " AND i.invoice_date <= %s"
-            cogs_params.append(end_date)
-            expenses_query += " AND transaction_date <= %s"
-            expenses_params.append(end_date)
-        
-        # Execute queries
-        cursor.execute(sales_query, sales_params)
-        sales_result = cursor.fetchone()
-        total_sales = float(sales_result['total_sales'] or 0)
-        
-        cursor.execute(cogs_query, cogs_params)
-        cogs_result = cursor.fetchone()
-        total_cogs = float(cogs_result['total_cogs'] or 0)
-        
-        cursor.execute(expenses_query, expenses_params)
-        expenses_result = cursor.fetchone()
-        total_expenses = float(expenses_result['total_expenses'] or 0)
-        
-        # Calculate gross profit and net profit
-        gross_profit = total_sales - total_cogs
-        net_profit = gross_profit - total_expenses
-        
-        conn.close()
+        if report_jobs.wants_async(request.args):
+            return report_jobs.submit_response('erp.profit_loss', user_id,
+                                               {'start_date': start_date, 'end_date': end_date})
         
-        result = {
-            'total_sales': total_sales,
-            'total_cogs': total_cogs,
-            'gross_profit': gross_profit,
-            'total_expenses': total_expenses,
-            'net_profit': net_profit,
-            'profit_margin_percent': (net_profit / total_sales * 100) if total_sales > 0 else 0,
-            'date_filter': {
-                'start_date': start_date,
-                'end_date': end_date
-            }
-        }
+        result = FinanceReportService.profit_loss(user_id, start_date, end_date)
         
         return jsonify({
             'success': True,
@@ -3159,7 +3125,6 @@ def export_backup():
             return jsonify({'success': False, 'error': 'Unauthorized'}), 401
         
         conn = get_db_connection()
-        cursor = conn.cursor()
         
         # Define tables to backup
         tables_to_backup = [
@@ -3169,27 +3134,36 @@ def export_backup():
             'erp_stock', 'erp_grn', 'erp_grn_items', 'erp_companies'
         ]
         
-        backup_data = {}
+        def table_rows(table):
+            return conn.stream(f"SELECT * FROM {table} WHERE user_id = ? OR company_id = ?", (user_id, user_id))
         
-        for table in tables_to_backup:
-            query = f"SELECT * FROM {table} WHERE user_id = %s OR company_id = %s"
-            cursor.execute(query, (user_id, user_id))
-            rows = cursor.fetchall()
-            backup_data[table] = [dict(row) for row in rows]
+        # Each table is streamed in batches instead of loading every row
+        # of every table before responding. Every table's query runs now, so
+        # a broken backup still answers with a 500; a failure after the
+        # response has started ends it with "success": false
+        try:
+            tables = [(table, primed(table_rows(table))) for table in tables_to_backup]
+        except Exception:
+            conn.close()
+            raise
         
-        conn.close()
+        def backup_data():
+            yield from tables
+            
+            # Add metadata
+            yield '_metadata', {
+                'export_date': datetime.now().isoformat(),
+                'user_id': user_id,
+                'version': '1.0'
+            }
         
-        # Add metadata
-        backup_data['_metadata'] = {
-            'export_date': datetime.now().isoformat(),
-            'user_id': user_id,
-            'version': '1.0'
-        }
+        def backup_response():
+            try:
+                yield from iter_json_result(backup_data())
+            finally:
+                conn.close()
         
-        return jsonify({
-            'success': True,
-            'data': backup_data
-        })
+        return stream_json(backup_response())
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -3459,6 +3433,7 @@ def create_product():
         
         conn.commit()
         conn.close()
+        result_cache.invalidate(user_id)
         
         return jsonify({
             'success': True,
@@ -3526,6 +3501,7 @@ def update_product(product_id):
         
         conn.commit()
         conn.close()
+        result_cache.invalidate(user_id)
         
         return jsonify({
             'success': True,
@@ -3549,6 +3525,7 @@ def delete_product(product_id):
         
         conn.commit()
         conn.close()
+        result_cache.invalidate(user_id)
         
         return jsonify({
             'success': True,
@@ -3647,6 +3624,36 @@ def get_low_stock():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _adjustment_row(columns, user_id, product_id, quantity, reason, created_at):
+    """stock_transactions row for an adjustment, limited to the columns the table has
+    (the base schema keeps a reason, the inventory schema notes, owner and author)"""
+    row = {
+        'id': str(uuid.uuid4()),
+        'product_id': product_id,
+        'transaction_type': 'adjustment',
+        'quantity': quantity,
+        'reason': reason,
+        'notes': reason,
+        'reference_type': 'adjustment',
+        'created_by': user_id,
+        'business_owner_id': user_id,
+        'created_at': created_at
+    }
+    return {column: value for column, value in row.items() if column in columns}
+
+def _owned_product_ids(conn, user_id, product_ids, chunk_size=500):
+    """The ids among product_ids that belong to user_id"""
+    product_ids = list(product_ids)
+    owned = set()
+    for start in range(0, len(product_ids), chunk_size):
+        chunk = product_ids[start:start + chunk_size]
+        rows = conn.execute(f"""
+            SELECT id FROM products
+            WHERE business_owner_id = ? AND id IN ({', '.join(['?'] * len(chunk))})
+        """, [user_id] + chunk).fetchall()
+        owned.update(row['id'] for row in rows)
+    return owned
+
 @erp_bp.route('/api/erp/stock/adjustment', methods=['POST'])
 def adjust_stock():
     """Adjust stock levels"""
@@ -3666,16 +3673,20 @@ def adjust_stock():
             SET stock = stock + ?
             WHERE id = ? AND business_owner_id = ?
         """, (adjustment, product_id, user_id))
+        if cursor.rowcount == 0:
+            conn.rollback()
+            conn.close()
+            return jsonify({'success': False, 'error': 'Product not found'}), 404
         
-        # Log transaction
-        transaction_id = str(uuid.uuid4())
-        cursor.execute("""
-            INSERT INTO stock_transactions (id, product_id, transaction_type, quantity, reason, created_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (transaction_id, product_id, 'adjustment', adjustment, reason, datetime.now()))
+        # Log transaction and value it in the same transaction
+        now = datetime.now()
+        columns = table_columns(conn, conn.db_type, 'stock_transactions')
+        conn.bulk_insert('stock_transactions', [_adjustment_row(columns, user_id, product_id, adjustment, reason, now)])
+        stock_valuation.record(conn, product_id, user_id, 'adjustment', adjustment, created_at=now)
         
         conn.commit()
         conn.close()
+        result_cache.invalidate(user_id)
         
         return jsonify({
             'success': True,
@@ -3684,6 +3695,60 @@ def adjust_stock():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@erp_bp.route('/api/erp/stock/adjustment/bulk', methods=['POST'])
+def adjust_stock_bulk():
+    """Adjust stock levels of many products in one request"""
+    try:
+        data = request.json or {}
+        adjustments = data.get('adjustments', [])
+        if not adjustments:
+            return jsonify({'success': False, 'error': 'No adjustments provided'}), 400
+        
+        conn = get_db_connection()
+        user_id = get_user_id()
+        now = datetime.now()
+        
+        # One stock update per product, however many lines adjust it
+        totals = {}
+        for item in adjustments:
+            product_id = item.get('product_id')
+            totals[product_id] = totals.get(product_id, 0) + (item.get('adjustment') or 0)
+        
+        # Only this tenant's products are adjusted and logged
+        owned = _owned_product_ids(conn, user_id, [product_id for product_id in totals if product_id])
+        conn.executemany("""
+            UPDATE products 
+            SET stock = stock + ?
+            WHERE id = ? AND business_owner_id = ?
+        """, [(total, product_id, user_id) for product_id, total in totals.items() if product_id in owned])
+        
+        # Log transactions as chunked multi-row INSERTs
+        columns = table_columns(conn, conn.db_type, 'stock_transactions')
+        logged = [item for item in adjustments if item.get('product_id') in owned]
+        result = conn.bulk_insert('stock_transactions', [
+            _adjustment_row(columns, user_id, item.get('product_id'), item.get('adjustment') or 0,
+                            item.get('reason', ''), now)
+            for item in logged
+        ])
+        stock_valuation.record_many(conn, user_id, [
+            {'product_id': item.get('product_id'), 'transaction_type': 'adjustment',
+             'quantity': item.get('adjustment') or 0, 'created_at': now}
+            for item in logged
+        ])
+        
+        conn.commit()
+        conn.close()
+        result_cache.invalidate(user_id)
+        
+        return jsonify({
+            'success': True,
+            'message': f'{result.inserted} stock adjustments applied',
+            'adjusted_products': len(owned),
+            'skipped_products': [product_id for product_id in totals if product_id not in owned]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @erp_bp.route('/api/erp/stock/transactions', methods=['GET'])
 def get_stock_transactions():
     """Get stock transaction history"""
@@ -3763,8 +3828,10 @@ def create_payment():
             data.get('reference'),
             datetime.now()
         ))
+        sales_rollup.refresh_bill(conn, data.get('bill_id'))
         
         conn.commit()
+        result_cache.invalidate(get_user_id())
         conn.close()
         
         return jsonify({
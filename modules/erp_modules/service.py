@@ -364,4 +364,74 @@ class ERPService:
             return True
             
         finally:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+
+class FinanceReportService:
+    """Finance reports, shared by the API routes and background report jobs"""
+    
+    @staticmethod
+    def profit_loss(user_id, start_date=None, end_date=None):
+        """
+        Calculate profit & loss
+        Formula: (Total Sales - COGS) - Total Expenses
+        COGS is the cost snapshotted on each invoice when it was raised
+        (erp_invoices.cost_amount), not today's cost_price
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        try:
+            # Calculate total sales and COGS (Cost of Goods Sold) in one pass
+            sales_query = """
+                SELECT SUM(total_amount) as total_sales, SUM(cost_amount) as total_cogs
+                FROM erp_invoices
+                WHERE user_id = %s AND is_deleted = FALSE
+            """
+            sales_params = [user_id]
+            
+            # Calculate total expenses
+            expenses_query = "SELECT SUM(amount) as total_expenses FROM erp_transactions WHERE user_id = %s AND transaction_type = 'expense' AND is_deleted = FALSE"
+            expenses_params = [user_id]
+            
+            # Add date filters if provided
+            if start_date:
+                sales_query += " AND invoice_date >= %s"
+                sales_params.append(start_date)
+                expenses_query += " AND transaction_date >= %s"
+                expenses_params.append(start_date)
+            
+            if end_date:
+                sales_query += " AND invoice_date <= %s"
+                sales_params.append(end_date)
+                expenses_query += " AND transaction_date <= %s"
+                expenses_params.append(end_date)
+            
+            # Execute queries
+            cursor.execute(sales_query, sales_params)
+            sales_result = cursor.fetchone()
+            total_sales = float(sales_result['total_sales'] or 0)
+            total_cogs = float(sales_result['total_cogs'] or 0)
+            
+            cursor.execute(expenses_query, expenses_params)
+            expenses_result = cursor.fetchone()
+            total_expenses = float(expenses_result['total_expenses'] or 0)
+        finally:
+            conn.close()
+        
+        # Calculate gross profit and net profit
+        gross_profit = total_sales - total_cogs
+        net_profit = gross_profit - total_expenses
+        
+        return {
+            'total_sales': total_sales,
+            'total_cogs': total_cogs,
+            'gross_profit': gross_profit,
+            'total_expenses': total_expenses,
+            'net_profit': net_profit,
+            'profit_margin_percent': (net_profit / total_sales * 100) if total_sales > 0 else 0,
+            'date_filter': {
+                'start_date': start_date,
+                'end_date': end_date
+            }
+        }
@@ -4,6 +4,7 @@ Handles Product Master, Inventory Control, and Purchase Entry tables
 """
 
 from modules.shared.database import get_db_connection, get_db_type
+from modules.shared import stock_valuation
 import sqlite3
 
 def init_integrated_inventory_tables():
@@ -411,6 +412,7 @@ def migrate_existing_products_to_integrated():
                     transaction_id, product_id, stock, price, stock * price,
                     product_id, user_id, user_id, now
                 ))
+                stock_valuation.record(conn, product_id, user_id, 'in', stock, price, now)
                 
                 migrated_count += 1
         
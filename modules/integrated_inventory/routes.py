@@ -6,6 +6,8 @@ Connects Product Master, Inventory Control, and Purchase Entry
 from flask import Blueprint, request, jsonify, session, render_template
 from modules.shared.auth_decorators import require_auth
 from modules.shared.database import get_db_connection, generate_id
+from modules.shared import stock_valuation
+from modules.shared import result_cache
 from datetime import datetime
 import json
 
@@ -171,6 +173,7 @@ def create_product():
         
         conn.commit()
         conn.close()
+        result_cache.invalidate(user_id)
         
         return jsonify({
             'success': True,
@@ -430,6 +433,7 @@ def create_purchase_entry():
                 purchase_id, supplier, batch_number, expiry_date,
                 item_notes, user_id, user_id, now
             ))
+            stock_valuation.record(conn, product_id, user_id, 'in', quantity, unit_cost, now)
             
             # Update product's last purchase price
             cursor.execute("""
@@ -452,6 +456,7 @@ def create_purchase_entry():
         
         conn.commit()
         conn.close()
+        result_cache.invalidate(user_id)
         
         return jsonify({
             'success': True,
@@ -565,9 +570,11 @@ def stock_adjustment():
             f"{adjustment_type}: {reason}", f"{reason} - {notes}".strip(' -'),
             user_id, user_id, now
         ))
+        stock_valuation.record(conn, product_id, user_id, transaction_type, abs_quantity, 0, now)
         
         conn.commit()
         conn.close()
+        result_cache.invalidate(user_id)
         
         return jsonify({
             'success': True,
@@ -639,3 +646,71 @@ def get_reorder_report():
     except Exception as e:
         print(f"❌ Error getting reorder report: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
+
+@integrated_inventory_bp.route('/api/stock-valuation', methods=['GET'])
+@require_auth
+def get_stock_valuation():
+    """Stock valuation per product at FIFO or weighted-average cost (?method=fifo|average)"""
+    try:
+        user_id = get_user_id_from_session()
+        if not user_id:
+            return jsonify({'success': False, 'error': 'User not authenticated'}), 401
+        
+        method = request.args.get('method', 'fifo')
+        if method not in stock_valuation.METHODS:
+            return jsonify({'success': False, 'error': f'Unknown valuation method: {method}'}), 400
+        
+        conn = get_db_connection()
+        products = stock_valuation.valuation_rows(conn, user_id, method)
+        conn.close()
+        
+        products.sort(key=lambda product: -product['cost_value'])
+        cost_value = sum(product['cost_value'] for product in products)
+        selling_value = sum(product['selling_value'] for product in products)
+        
+        return jsonify({
+            'success': True,
+            'method': method,
+            'products': products,
+            'summary': {
+                'total_products': len(products),
+                'total_quantity': sum(product['quantity'] for product in products),
+                'cost_value': cost_value,
+                'selling_value': selling_value,
+                'potential_profit': selling_value - cost_value
+            }
+        })
+        
+    except Exception as e:
+        print(f"❌ Error getting stock valuation: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@integrated_inventory_bp.route('/api/stock-ageing', methods=['GET'])
+@require_auth
+def get_stock_ageing():
+    """Open stock per product by age since receipt (0-30, 31-60, 61-90, 90+ days)"""
+    try:
+        user_id = get_user_id_from_session()
+        if not user_id:
+            return jsonify({'success': False, 'error': 'User not authenticated'}), 401
+        
+        conn = get_db_connection()
+        products = stock_valuation.ageing_rows(conn, user_id)
+        conn.close()
+        
+        totals = {label: {'quantity': 0, 'value': 0} for label, _, _ in stock_valuation.AGE_BUCKETS}
+        for product in products:
+            for label, bucket in product['buckets'].items():
+                totals[label]['quantity'] += bucket['quantity']
+                totals[label]['value'] += bucket['value']
+        
+        return jsonify({
+            'success': True,
+            'buckets': [label for label, _, _ in stock_valuation.AGE_BUCKETS],
+            'products': products,
+            'summary': totals
+        })
+        
+    except Exception as e:
+        print(f"❌ Error getting stock ageing: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
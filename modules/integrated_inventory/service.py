@@ -4,6 +4,8 @@ Business logic for Product Master, Inventory Control, and Purchase Entry
 """
 
 from modules.shared.database import get_db_connection, generate_id
+from modules.shared import result_cache
+from modules.shared import stock_valuation
 from modules.integrated_inventory.database import get_current_stock, update_stock_alerts
 from datetime import datetime, timedelta
 import json
@@ -82,6 +84,7 @@ class IntegratedInventoryService:
             
             conn.commit()
             conn.close()
+            result_cache.invalidate(user_id)
             
             return {
                 'success': True,
@@ -126,6 +129,7 @@ class IntegratedInventoryService:
             
             conn.commit()
             conn.close()
+            result_cache.invalidate(user_id)
             
             return {'success': True, 'message': 'Pricing updated successfully'}
             
@@ -139,75 +143,84 @@ class IntegratedInventoryService:
         """Bulk import products from CSV/Excel data"""
         try:
             conn = self.get_db_connection()
-            cursor = conn.cursor()
             
-            imported_count = 0
             errors = []
+            products = []
+            transactions = []
+            now = datetime.now().isoformat()
             
+            rows = []  # input row number of each product
             for i, product_data in enumerate(products_data):
-                try:
-                    # Generate SKU if not provided
-                    sku = product_data.get('sku')
-                    if not sku:
-                        sku = f"SKU{datetime.now().strftime('%Y%m%d%H%M%S')}{i:03d}"
-                    
-                    # Check if SKU already exists
-                    cursor.execute("SELECT id FROM products WHERE sku = ? AND user_id = ?", (sku, user_id))
-                    if cursor.fetchone():
-                        errors.append(f"Row {i+1}: SKU {sku} already exists")
-                        continue
-                    
-                    # Create product
-                    product_id = generate_id()
-                    now = datetime.now().isoformat()
-                    
-                    cursor.execute("""
-                        INSERT INTO products (
-                            id, name, description, category, price, stock, unit, sku, 
-                            barcode_data, is_active, user_id, created_at, updated_at,
-                            min_stock, max_stock, hsn_code, gst_rate, mrp, purchase_price, selling_price
-                        ) VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        product_id,
-                        product_data.get('name'),
-                        product_data.get('description', ''),
-                        product_data.get('category', 'other'),
-                        product_data.get('selling_price', 0),
-                        product_data.get('unit', 'piece'),
-                        sku,
-                        product_data.get('barcode', ''),
-                        user_id,
-                        now,
-                        now,
-                        product_data.get('min_stock', 0),
-                        product_data.get('max_stock', 0),
-                        product_data.get('hsn_code', ''),
-                        product_data.get('gst_rate', 18),
-                        product_data.get('mrp', 0),
-                        product_data.get('purchase_price', 0),
-                        product_data.get('selling_price', 0)
-                    ))
-                    
-                    # Create initial stock transaction
-                    transaction_id = generate_id()
-                    cursor.execute("""
-                        INSERT INTO stock_transactions (
-                            id, product_id, transaction_type, quantity, unit_cost, total_cost,
-                            reference_type, reference_id, notes, created_by, business_owner_id, created_at
-                        ) VALUES (?, ?, 'opening', 0, ?, 0, 'bulk_import', ?, 'Bulk import', ?, ?, ?)
-                    """, (
-                        transaction_id, product_id, product_data.get('purchase_price', 0),
-                        product_id, user_id, user_id, now
-                    ))
-                    
-                    imported_count += 1
-                    
-                except Exception as e:
-                    errors.append(f"Row {i+1}: {str(e)}")
+                if not product_data.get('name'):
+                    errors.append(f"Row {i+1}: Product name is required")
+                    continue
+                
+                # Generate SKU if not provided
+                sku = product_data.get('sku')
+                if not sku:
+                    sku = f"SKU{datetime.now().strftime('%Y%m%d%H%M%S')}{i:03d}"
+                
+                rows.append(i)
+                product_id = generate_id()
+                products.append({
+                    'id': product_id,
+                    'name': product_data.get('name'),
+                    'description': product_data.get('description', ''),
+                    'category': product_data.get('category', 'other'),
+                    'price': product_data.get('selling_price', 0),
+                    'stock': 0,
+                    'unit': product_data.get('unit', 'piece'),
+                    'sku': sku,
+                    # NULL rather than '' so blank barcodes don't collide on the unique index
+                    'barcode_data': product_data.get('barcode') or None,
+                    'is_active': 1,
+                    'user_id': user_id,
+                    'created_at': now,
+                    'updated_at': now,
+                    'min_stock': product_data.get('min_stock', 0),
+                    'max_stock': product_data.get('max_stock', 0),
+                    'hsn_code': product_data.get('hsn_code', ''),
+                    'gst_rate': product_data.get('gst_rate', 18),
+                    'mrp': product_data.get('mrp', 0),
+                    'purchase_price': product_data.get('purchase_price', 0),
+                    'selling_price': product_data.get('selling_price', 0)
+                })
+                
+                # Initial stock transaction for the product
+                transactions.append({
+                    'id': generate_id(),
+                    'product_id': product_id,
+                    'transaction_type': 'opening',
+                    'quantity': 0,
+                    'unit_cost': product_data.get('purchase_price', 0),
+                    'total_cost': 0,
+                    'reference_type': 'bulk_import',
+                    'reference_id': product_id,
+                    'notes': 'Bulk import',
+                    'created_by': user_id,
+                    'business_owner_id': user_id,
+                    'created_at': now
+                })
+            
+            # Multi-row INSERTs in chunks; rows whose SKU already exists for
+            # this user (or repeats an earlier row) are skipped and reported,
+            # as are rows the unique barcode index rejects
+            result = conn.bulk_insert('products', products, on_conflict='ignore',
+                                      conflict_columns=('sku', 'user_id'))
+            constraint_rows = set(result.constraint_rows)
+            for i in result.conflict_rows:
+                if i in constraint_rows and products[i]['barcode_data']:
+                    errors.append(f"Row {rows[i]+1}: Barcode {products[i]['barcode_data']} already exists")
+                else:
+                    errors.append(f"Row {rows[i]+1}: SKU {products[i]['sku']} already exists")
+            
+            conn.bulk_insert('stock_transactions', [transactions[i] for i in result.inserted_rows])
             
             conn.commit()
             conn.close()
+            result_cache.invalidate(user_id)
             
+            imported_count = result.inserted
             return {
                 'success': True,
                 'imported_count': imported_count,
@@ -442,6 +455,7 @@ class IntegratedInventoryService:
                     item.get('batch_number', ''), item.get('expiry_date'),
                     item.get('notes', ''), user_id, user_id, now
                 ))
+                stock_valuation.record(conn, product_id, user_id, 'in', quantity, unit_cost, now)
                 
                 # Update product's last purchase price
                 cursor.execute("""
@@ -465,6 +479,7 @@ class IntegratedInventoryService:
             
             conn.commit()
             conn.close()
+            result_cache.invalidate(user_id)
             
             # Update stock alerts
             update_stock_alerts(user_id)
@@ -520,9 +535,11 @@ class IntegratedInventoryService:
                 f"{adjustment_type}_{transaction_id}", f"{adjustment_type}: {reason} - {notes}".strip(' -'),
                 user_id, user_id, now
             ))
+            stock_valuation.record(conn, product_id, user_id, transaction_type, abs_quantity, 0, now)
             
             conn.commit()
             conn.close()
+            result_cache.invalidate(user_id)
             
             # Update stock alerts
             update_stock_alerts(user_id)
@@ -608,63 +625,43 @@ class IntegratedInventoryService:
                 conn.close()
             return {'success': False, 'error': str(e)}
     
-    def get_stock_valuation_report(self, user_id):
-        """Get stock valuation report"""
+    def get_stock_valuation_report(self, user_id, method='fifo'):
+        """Get stock valuation report by category ('fifo' or 'average' cost)"""
+        conn = None
         try:
             conn = self.get_db_connection()
-            cursor = conn.cursor()
             
-            cursor.execute("""
-                SELECT 
-                    p.category,
-                    COUNT(*) as product_count,
-                    SUM(COALESCE(s.current_stock, 0)) as total_quantity,
-                    SUM(COALESCE(s.current_stock, 0) * p.purchase_price) as purchase_value,
-                    SUM(COALESCE(s.current_stock, 0) * p.selling_price) as selling_value
-                FROM products p
-                LEFT JOIN (
-                    SELECT 
-                        product_id,
-                        SUM(CASE WHEN transaction_type = 'in' THEN quantity ELSE -quantity END) as current_stock
-                    FROM stock_transactions 
-                    WHERE business_owner_id = ?
-                    GROUP BY product_id
-                ) s ON p.id = s.product_id
-                WHERE p.user_id = ? AND p.is_active = 1
-                GROUP BY p.category
-                ORDER BY selling_value DESC
-            """, (user_id, user_id))
+            # One valuation row per product, kept current by stock_valuation.record()
+            categories = {}
+            for product in stock_valuation.valuation_rows(conn, user_id, method):
+                category = categories.setdefault(product['category'], {
+                    'category': product['category'],
+                    'product_count': 0,
+                    'total_quantity': 0,
+                    'purchase_value': 0,
+                    'selling_value': 0
+                })
+                category['product_count'] += 1
+                category['total_quantity'] += product['quantity']
+                category['purchase_value'] += product['cost_value']
+                category['selling_value'] += product['selling_value']
             
-            categories = []
-            total_purchase_value = 0
-            total_selling_value = 0
-            total_products = 0
-            total_quantity = 0
+            conn.close()
             
-            for row in cursor.fetchall():
-                category_data = {
-                    'category': row[0],
-                    'product_count': row[1],
-                    'total_quantity': row[2],
-                    'purchase_value': row[3],
-                    'selling_value': row[4],
-                    'potential_profit': row[4] - row[3]
-                }
-                categories.append(category_data)
-                
-                total_products += row[1]
-                total_quantity += row[2]
-                total_purchase_value += row[3]
-                total_selling_value += row[4]
+            categories = sorted(categories.values(), key=lambda category: -category['selling_value'])
+            for category in categories:
+                category['potential_profit'] = category['selling_value'] - category['purchase_value']
             
-            conn.close()
+            total_purchase_value = sum(category['purchase_value'] for category in categories)
+            total_selling_value = sum(category['selling_value'] for category in categories)
             
             return {
                 'success': True,
+                'valuation_method': method,
                 'categories': categories,
                 'summary': {
-                    'total_products': total_products,
-                    'total_quantity': total_quantity,
+                    'total_products': sum(category['product_count'] for category in categories),
+                    'total_quantity': sum(category['total_quantity'] for category in categories),
                     'total_purchase_value': total_purchase_value,
                     'total_selling_value': total_selling_value,
                     'potential_profit': total_selling_value - total_purchase_value
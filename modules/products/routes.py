@@ -8,6 +8,8 @@ from .service import ProductsService
 from .variants_service import ProductVariantsService
 from modules.shared.auth_decorators import require_auth
 from modules.shared.database import get_current_client_id
+from modules.shared.streaming import stream_json, iter_json_array, primed
+from modules.shared import result_cache
 
 products_bp = Blueprint('products', __name__)
 products_service = ProductsService()
@@ -35,20 +37,21 @@ def get_products():
     print(f"🔍 [PRODUCTS GET] user_id: {user_id}, type: {user_type}, admin: {is_admin}")
     
     if is_admin or user_type == 'admin':
-        # Admin: Show ALL products
-        products = conn.execute('SELECT * FROM products WHERE is_active = 1').fetchall()
-        print(f"✅ [ADMIN] Showing all {len(products)} products")
+        # Admin: Show ALL products - streamed, the full catalogue can be large
+        products = conn.stream('SELECT * FROM products WHERE is_active = 1')
+        print(f"✅ [ADMIN] Streaming all products")
     elif user_id:
         # Regular user: Only their products
-        products = conn.execute('SELECT * FROM products WHERE is_active = 1 AND (user_id = ? OR user_id IS NULL)', (user_id,)).fetchall()
-        print(f"✅ [USER] Showing {len(products)} products for user {user_id}")
+        products = conn.stream('SELECT * FROM products WHERE is_active = 1 AND (user_id = ? OR user_id IS NULL)', (user_id,))
+        print(f"✅ [USER] Streaming products for user {user_id}")
     else:
         # No user_id: show nothing
         products = []
         print(f"⚠️  No user_id - showing 0 products")
     
-    conn.close()
-    return jsonify([dict(row) for row in products])
+    # Rows are serialized as they are fetched; the connection is closed
+    # once the last one is sent
+    return stream_json(iter_json_array(primed(products, on_close=conn.close)))
 
 @products_bp.route('/api/products/debug', methods=['GET'])
 def debug_products():
@@ -234,6 +237,7 @@ def update_product_stock(product_id):
                     (new_stock, product_id, user_id))
         conn.commit()
         conn.close()
+        result_cache.invalidate(user_id)
         
         print(f"[STOCK UPDATE] Successfully updated stock for {product['name']}: {product['stock']} → {new_stock}")
         
@@ -6,6 +6,7 @@ COPIED AS-IS from app.py
 import sqlite3
 from datetime import datetime
 from modules.shared.database import get_db_connection, generate_id
+from modules.shared import result_cache
 
 class ProductsService:
     
@@ -172,6 +173,7 @@ class ProductsService:
             ))
             
             conn.commit()
+            result_cache.invalidate(result_cache.current_tenant())
             print(f"[PRODUCT ADD] Successfully added product: {product_id}")
             
         except sqlite3.IntegrityError as e:
@@ -306,6 +308,7 @@ class ProductsService:
             ))
             
             conn.commit()
+            result_cache.invalidate(result_cache.current_tenant())
             print(f"[PRODUCT UPDATE] Successfully updated product: {product_id}")
             
         except sqlite3.IntegrityError as e:
@@ -353,6 +356,7 @@ class ProductsService:
         # HARD DELETE - Remove from database completely
         conn.execute('DELETE FROM products WHERE id = ?', (product_id,))
         conn.commit()
+        result_cache.invalidate(result_cache.current_tenant())
         conn.close()
         
         print(f"[PRODUCT DELETE] Successfully deleted: {product['name']}")
@@ -4,6 +4,10 @@ Reports routes - Handle all report generation
 
 from flask import Blueprint, request, jsonify, session, send_file, render_template
 from modules.shared.database import get_db_connection
+from modules.shared import sales_rollup
+from modules.shared import exports
+from modules.shared.report_jobs import report_jobs, JobError, submit_response
+from modules.shared.keyset import KeysetQuery, SortKey, InvalidCursor, page_request, paginate_rows
 from datetime import datetime, timedelta
 import io
 import csv
@@ -24,8 +28,111 @@ def get_user_id_from_session():
     else:
         return session.get('user_id')
 
+# ========== ROLLUP READERS ==========
+# With SALES_ROLLUP_READS on, the date-grouped reports read daily_sales_rollup
+# (one row per day and payment method) instead of aggregating every bill
+
+def _avg(total, count):
+    return total / count if count else 0
+
+def _sales_summary_from_rollup(conn, user_id):
+    days = {}
+    for row in sales_rollup.daily_totals(conn, user_id, limit=30, include_unowned=True,
+                                         by_method=True, nonzero='bill_count'):
+        day = days.setdefault(row['day'], {
+            'date': row['day'], 'total_bills': 0, 'total_revenue': 0, 'avg_bill_value': 0,
+            'cash_sales': 0, 'upi_sales': 0, 'card_sales': 0, 'credit_sales': 0
+        })
+        day['total_bills'] += row['bill_count']
+        day['total_revenue'] += row['sales_amount']
+        day['credit_sales'] += row['credit_sales']
+        if row['payment_method'] in ('cash', 'upi', 'card'):
+            day[f"{row['payment_method']}_sales"] += row['sales_amount']
+    for day in days.values():
+        day['avg_bill_value'] = _avg(day['total_revenue'], day['total_bills'])
+    return list(days.values())
+
+def _bill_days_from_rollup(conn, user_id, since=None, limit=None):
+    return sales_rollup.daily_totals(conn, user_id, since=since, limit=limit,
+                                     include_unowned=True, nonzero='bill_count')
+
+def _profit_loss_from_rollup(conn, user_id):
+    return [{
+        'date': row['day'],
+        'revenue': row['items_revenue'],
+        'cost': row['items_cost'],
+        'profit': row['items_revenue'] - row['items_cost']
+    } for row in sales_rollup.daily_totals(conn, user_id, limit=30, include_unowned=True,
+                                           nonzero='item_count')]
+
+# ========== PAGINATION ==========
+# Every report takes ?limit=N&cursor=<token> (keyset pagination, see
+# modules.shared.keyset); without limit the whole report is returned.
+# Totals are computed in SQL and sent with the first page.
+
+_BY_DATE = [SortKey('date', descending=True)]
+
+def _total_summary(totals):
+    return {'total': totals['total'] or 0, 'rows': totals['row_count']}
+
+def _count_summary(totals):
+    return {'total': totals['row_count']}
+
+def _report_response(page, summary=_total_summary):
+    """Shape a KeysetQuery page as the usual report response"""
+    totals = page['totals']
+    return jsonify({
+        'success': True,
+        'report_data': page['rows'],
+        'summary': summary(totals) if totals is not None else None,
+        'pagination': page['pagination']
+    })
+
+def _bounded_report_response(report_data, total):
+    """Page a report that is bounded to ~30 days of rows already"""
+    page = paginate_rows(report_data, _BY_DATE, **page_request(request.args))
+    return jsonify({
+        'success': True,
+        'report_data': page['rows'],
+        'summary': {'total': total},
+        'pagination': page['pagination']
+    })
+
+def _invalid_page(e):
+    return jsonify({'success': False, 'error': str(e)}), 400
+
 # ========== SALES REPORTS ==========
 
+def _sales_summary_rows(conn, user_id):
+    if sales_rollup.ROLLUP_READS:
+        return _sales_summary_from_rollup(conn, user_id)
+    
+    query = """
+        SELECT 
+            DATE(created_at) as date,
+            COUNT(*) as total_bills,
+            SUM(total_amount) as total_revenue,
+            AVG(total_amount) as avg_bill_value,
+            SUM(CASE WHEN payment_method = 'cash' THEN total_amount ELSE 0 END) as cash_sales,
+            SUM(CASE WHEN payment_method = 'upi' THEN total_amount ELSE 0 END) as upi_sales,
+            SUM(CASE WHEN payment_method = 'card' THEN total_amount ELSE 0 END) as card_sales,
+            SUM(CASE WHEN is_credit = 1 THEN total_amount ELSE 0 END) as credit_sales
+        FROM bills
+        WHERE 1=1
+    """
+    
+    params = []
+    if user_id:
+        query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
+        params.append(user_id)
+    
+    query += " GROUP BY DATE(created_at) ORDER BY date DESC LIMIT 30"
+    
+    cursor = conn.execute(query, params)
+    rows = cursor.fetchall()
+    
+    return [dict(row) for row in rows]
+
 @reports_bp.route('/api/reports/sales_summary', methods=['GET'])
 def sales_summary_report():
     """Sales Summary Report"""
@@ -33,46 +140,44 @@ def sales_summary_report():
         conn = get_db_connection()
         user_id = get_user_id_from_session()
         
-        query = """
-            SELECT 
-                DATE(created_at) as date,
-                COUNT(*) as total_bills,
-                SUM(total_amount) as total_revenue,
-                AVG(total_amount) as avg_bill_value,
-                SUM(CASE WHEN payment_method = 'cash' THEN total_amount ELSE 0 END) as cash_sales,
-                SUM(CASE WHEN payment_method = 'upi' THEN total_amount ELSE 0 END) as upi_sales,
-                SUM(CASE WHEN payment_method = 'card' THEN total_amount ELSE 0 END) as card_sales,
-                SUM(CASE WHEN is_credit = 1 THEN total_amount ELSE 0 END) as credit_sales
-            FROM bills
-            WHERE 1=1
-        """
-        
-        params = []
-        if user_id:
-            query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
-            params.append(user_id)
-        
-        query += " GROUP BY DATE(created_at) ORDER BY date DESC LIMIT 30"
-        
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-        
-        report_data = [dict(row) for row in rows]
+        report_data = _sales_summary_rows(conn, user_id)
         
         # Calculate summary
         total_revenue = sum(row['total_revenue'] for row in report_data)
         
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'report_data': report_data,
-            'summary': {'total': total_revenue}
-        })
+        return _bounded_report_response(report_data, total_revenue)
         
+    except InvalidCursor as e:
+        return _invalid_page(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _sales_by_product_query(user_id):
+    query = """
+        SELECT 
+            product_name,
+            SUM(quantity) as total_quantity,
+            SUM(total_price) as total_revenue,
+            COUNT(*) as total_transactions,
+            AVG(unit_price) as avg_price
+        FROM sales
+        WHERE 1=1
+    """
+    
+    params = []
+    if user_id:
+        query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
+        params.append(user_id)
+    
+    query += " GROUP BY product_name"
+    
+    return KeysetQuery(query, params,
+                       order=[SortKey('total_revenue', descending=True, null_as=0),
+                              SortKey('product_name')],
+                       totals={'total': 'SUM(total_revenue)'})
+
 @reports_bp.route('/api/reports/sales_by_product', methods=['GET'])
 def sales_by_product_report():
     """Product-wise Sales Report"""
@@ -80,41 +185,41 @@ def sales_by_product_report():
         conn = get_db_connection()
         user_id = get_user_id_from_session()
         
-        query = """
-            SELECT 
-                product_name,
-                SUM(quantity) as total_quantity,
-                SUM(total_price) as total_revenue,
-                COUNT(*) as total_transactions,
-                AVG(unit_price) as avg_price
-            FROM sales
-            WHERE 1=1
-        """
-        
-        params = []
-        if user_id:
-            query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
-            params.append(user_id)
-        
-        query += " GROUP BY product_name ORDER BY total_revenue DESC"
-        
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-        
-        report_data = [dict(row) for row in rows]
-        total_revenue = sum(row['total_revenue'] for row in report_data)
+        page = _sales_by_product_query(user_id).fetch(conn, **page_request(request.args))
         
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'report_data': report_data,
-            'summary': {'total': total_revenue}
-        })
+        return _report_response(page)
         
+    except InvalidCursor as e:
+        return _invalid_page(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _sales_by_customer_query(user_id):
+    query = """
+        SELECT 
+            customer_name,
+            COUNT(*) as total_bills,
+            SUM(total_amount) as total_revenue,
+            AVG(total_amount) as avg_bill_value,
+            MAX(created_at) as last_purchase
+        FROM bills
+        WHERE 1=1
+    """
+    
+    params = []
+    if user_id:
+        query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
+        params.append(user_id)
+    
+    query += " GROUP BY customer_name"
+    
+    return KeysetQuery(query, params,
+                       order=[SortKey('total_revenue', descending=True, null_as=0),
+                              SortKey('customer_name')],
+                       totals={'total': 'SUM(total_revenue)'})
+
 @reports_bp.route('/api/reports/sales_by_customer', methods=['GET'])
 def sales_by_customer_report():
     """Customer-wise Sales Report"""
@@ -122,41 +227,40 @@ def sales_by_customer_report():
         conn = get_db_connection()
         user_id = get_user_id_from_session()
         
-        query = """
-            SELECT 
-                customer_name,
-                COUNT(*) as total_bills,
-                SUM(total_amount) as total_revenue,
-                AVG(total_amount) as avg_bill_value,
-                MAX(created_at) as last_purchase
-            FROM bills
-            WHERE 1=1
-        """
-        
-        params = []
-        if user_id:
-            query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
-            params.append(user_id)
-        
-        query += " GROUP BY customer_name ORDER BY total_revenue DESC"
-        
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-        
-        report_data = [dict(row) for row in rows]
-        total_revenue = sum(row['total_revenue'] for row in report_data)
+        page = _sales_by_customer_query(user_id).fetch(conn, **page_request(request.args))
         
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'report_data': report_data,
-            'summary': {'total': total_revenue}
-        })
+        return _report_response(page)
         
+    except InvalidCursor as e:
+        return _invalid_page(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _sales_by_payment_query(user_id):
+    query = """
+        SELECT 
+            payment_method,
+            COUNT(*) as total_transactions,
+            SUM(total_amount) as total_amount,
+            AVG(total_amount) as avg_transaction
+        FROM bills
+        WHERE 1=1
+    """
+    
+    params = []
+    if user_id:
+        query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
+        params.append(user_id)
+    
+    query += " GROUP BY payment_method"
+    
+    return KeysetQuery(query, params,
+                       order=[SortKey('total_amount', descending=True, null_as=0),
+                              SortKey('payment_method')],
+                       totals={'total': 'SUM(total_amount)'})
+
 @reports_bp.route('/api/reports/sales_by_payment', methods=['GET'])
 def sales_by_payment_report():
     """Payment Method Report"""
@@ -164,40 +268,49 @@ def sales_by_payment_report():
         conn = get_db_connection()
         user_id = get_user_id_from_session()
         
-        query = """
-            SELECT 
-                payment_method,
-                COUNT(*) as total_transactions,
-                SUM(total_amount) as total_amount,
-                AVG(total_amount) as avg_transaction
-            FROM bills
-            WHERE 1=1
-        """
-        
-        params = []
-        if user_id:
-            query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
-            params.append(user_id)
-        
-        query += " GROUP BY payment_method ORDER BY total_amount DESC"
-        
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-        
-        report_data = [dict(row) for row in rows]
-        total_amount = sum(row['total_amount'] for row in report_data)
+        page = _sales_by_payment_query(user_id).fetch(conn, **page_request(request.args))
         
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'report_data': report_data,
-            'summary': {'total': total_amount}
-        })
+        return _report_response(page)
         
+    except InvalidCursor as e:
+        return _invalid_page(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _daily_sales_rows(conn, user_id):
+    if sales_rollup.ROLLUP_READS:
+        since = sales_rollup.utc_today() - timedelta(days=30)
+        return [{
+            'date': row['day'],
+            'bills': row['bill_count'],
+            'revenue': row['sales_amount'],
+            'avg_value': _avg(row['sales_amount'], row['bill_count'])
+        } for row in _bill_days_from_rollup(conn, user_id, since=since)]
+    
+    query = """
+        SELECT 
+            DATE(created_at) as date,
+            COUNT(*) as bills,
+            SUM(total_amount) as revenue,
+            AVG(total_amount) as avg_value
+        FROM bills
+        WHERE DATE(created_at) >= DATE('now', '-30 days')
+    """
+    
+    params = []
+    if user_id:
+        query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
+        params.append(user_id)
+    
+    query += " GROUP BY DATE(created_at) ORDER BY date DESC"
+    
+    cursor = conn.execute(query, params)
+    rows = cursor.fetchall()
+    
+    return [dict(row) for row in rows]
+
 @reports_bp.route('/api/reports/daily_sales', methods=['GET'])
 def daily_sales_report():
     """Daily Sales Report"""
@@ -205,42 +318,46 @@ def daily_sales_report():
         conn = get_db_connection()
         user_id = get_user_id_from_session()
         
-        query = """
-            SELECT 
-                DATE(created_at) as date,
-                COUNT(*) as bills,
-                SUM(total_amount) as revenue,
-                AVG(total_amount) as avg_value
-            FROM bills
-            WHERE DATE(created_at) >= DATE('now', '-30 days')
-        """
-        
-        params = []
-        if user_id:
-            query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
-            params.append(user_id)
-        
-        query += " GROUP BY DATE(created_at) ORDER BY date DESC"
-        
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-        
-        report_data = [dict(row) for row in rows]
+        report_data = _daily_sales_rows(conn, user_id)
         total_revenue = sum(row['revenue'] for row in report_data)
         
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'report_data': report_data,
-            'summary': {'total': total_revenue}
-        })
+        return _bounded_report_response(report_data, total_revenue)
         
+    except InvalidCursor as e:
+        return _invalid_page(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # ========== INVENTORY REPORTS ==========
 
+def _stock_summary_query(user_id):
+    query = """
+        SELECT 
+            name as product_name,
+            code as product_code,
+            category,
+            stock as current_stock,
+            unit,
+            price as selling_price,
+            cost as cost_price,
+            (stock * price) as stock_value,
+            id as row_id
+        FROM products
+        WHERE 1=1
+    """
+    
+    params = []
+    if user_id:
+        query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
+        params.append(user_id)
+    
+    return KeysetQuery(query, params,
+                       order=[SortKey('stock_value', descending=True, null_as=0),
+                              SortKey('row_id')],
+                       totals={'total': 'SUM(stock_value)'}, hidden=('row_id',))
+
 @reports_bp.route('/api/reports/stock_summary', methods=['GET'])
 def stock_summary_report():
     """Stock Summary Report"""
@@ -248,44 +365,41 @@ def stock_summary_report():
         conn = get_db_connection()
         user_id = get_user_id_from_session()
         
-        query = """
-            SELECT 
-                name as product_name,
-                code as product_code,
-                category,
-                stock as current_stock,
-                unit,
-                price as selling_price,
-                cost as cost_price,
-                (stock * price) as stock_value
-            FROM products
-            WHERE 1=1
-        """
-        
-        params = []
-        if user_id:
-            query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
-            params.append(user_id)
-        
-        query += " ORDER BY stock_value DESC"
-        
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-        
-        report_data = [dict(row) for row in rows]
-        total_value = sum(row['stock_value'] for row in report_data)
+        page = _stock_summary_query(user_id).fetch(conn, **page_request(request.args))
         
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'report_data': report_data,
-            'summary': {'total': total_value}
-        })
+        return _report_response(page)
         
+    except InvalidCursor as e:
+        return _invalid_page(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _low_stock_query(user_id):
+    query = """
+        SELECT 
+            name as product_name,
+            code as product_code,
+            stock as current_stock,
+            min_stock as minimum_stock,
+            (min_stock - stock) as shortage,
+            unit,
+            id as row_id
+        FROM products
+        WHERE stock <= min_stock AND stock > 0
+    """
+    
+    params = []
+    if user_id:
+        query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
+        params.append(user_id)
+    
+    return KeysetQuery(query, params,
+                       order=[SortKey('shortage', descending=True, null_as=0),
+                              SortKey('row_id')],
+                       hidden=('row_id',))
+
 @reports_bp.route('/api/reports/low_stock', methods=['GET'])
 def low_stock_report():
     """Low Stock Alert Report"""
@@ -293,41 +407,39 @@ def low_stock_report():
         conn = get_db_connection()
         user_id = get_user_id_from_session()
         
-        query = """
-            SELECT 
-                name as product_name,
-                code as product_code,
-                stock as current_stock,
-                min_stock as minimum_stock,
-                (min_stock - stock) as shortage,
-                unit
-            FROM products
-            WHERE stock <= min_stock AND stock > 0
-        """
-        
-        params = []
-        if user_id:
-            query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
-            params.append(user_id)
-        
-        query += " ORDER BY shortage DESC"
-        
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-        
-        report_data = [dict(row) for row in rows]
+        page = _low_stock_query(user_id).fetch(conn, **page_request(request.args))
         
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'report_data': report_data,
-            'summary': {'total': len(report_data)}
-        })
+        return _report_response(page, _count_summary)
         
+    except InvalidCursor as e:
+        return _invalid_page(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _out_of_stock_query(user_id):
+    query = """
+        SELECT 
+            name as product_name,
+            code as product_code,
+            category,
+            unit,
+            price as selling_price,
+            id as row_id
+        FROM products
+        WHERE stock = 0
+    """
+    
+    params = []
+    if user_id:
+        query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
+        params.append(user_id)
+    
+    return KeysetQuery(query, params,
+                       order=[SortKey('product_name'), SortKey('row_id')],
+                       hidden=('row_id',))
+
 @reports_bp.route('/api/reports/out_of_stock', methods=['GET'])
 def out_of_stock_report():
     """Out of Stock Report"""
@@ -335,40 +447,40 @@ def out_of_stock_report():
         conn = get_db_connection()
         user_id = get_user_id_from_session()
         
-        query = """
-            SELECT 
-                name as product_name,
-                code as product_code,
-                category,
-                unit,
-                price as selling_price
-            FROM products
-            WHERE stock = 0
-        """
-        
-        params = []
-        if user_id:
-            query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
-            params.append(user_id)
-        
-        query += " ORDER BY name"
-        
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-        
-        report_data = [dict(row) for row in rows]
+        page = _out_of_stock_query(user_id).fetch(conn, **page_request(request.args))
         
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'report_data': report_data,
-            'summary': {'total': len(report_data)}
-        })
+        return _report_response(page, _count_summary)
         
+    except InvalidCursor as e:
+        return _invalid_page(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _expiry_report_query(user_id):
+    query = """
+        SELECT 
+            name as product_name,
+            code as product_code,
+            stock as current_stock,
+            expiry_date,
+            CAST((JULIANDAY(expiry_date) - JULIANDAY('now')) AS INTEGER) as days_to_expiry,
+            id as row_id
+        FROM products
+        WHERE expiry_date IS NOT NULL AND expiry_date != ''
+    """
+    
+    params = []
+    if user_id:
+        query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
+        params.append(user_id)
+    
+    # Unparseable dates (NULL days) stay first, as they sorted before
+    return KeysetQuery(query, params,
+                       order=[SortKey('days_to_expiry', null_as=-999999), SortKey('row_id')],
+                       hidden=('row_id',))
+
 @reports_bp.route('/api/reports/expiry_report', methods=['GET'])
 def expiry_report():
     """Product Expiry Report"""
@@ -376,40 +488,42 @@ def expiry_report():
         conn = get_db_connection()
         user_id = get_user_id_from_session()
         
-        query = """
-            SELECT 
-                name as product_name,
-                code as product_code,
-                stock as current_stock,
-                expiry_date,
-                CAST((JULIANDAY(expiry_date) - JULIANDAY('now')) AS INTEGER) as days_to_expiry
-            FROM products
-            WHERE expiry_date IS NOT NULL AND expiry_date != ''
-        """
-        
-        params = []
-        if user_id:
-            query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
-            params.append(user_id)
-        
-        query += " ORDER BY days_to_expiry ASC"
-        
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-        
-        report_data = [dict(row) for row in rows]
+        page = _expiry_report_query(user_id).fetch(conn, **page_request(request.args))
         
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'report_data': report_data,
-            'summary': {'total': len(report_data)}
-        })
+        return _report_response(page, _count_summary)
         
+    except InvalidCursor as e:
+        return _invalid_page(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _stock_valuation_query(user_id):
+    query = """
+        SELECT 
+            name as product_name,
+            stock as quantity,
+            cost as cost_price,
+            price as selling_price,
+            (stock * cost) as cost_value,
+            (stock * price) as selling_value,
+            ((stock * price) - (stock * cost)) as potential_profit,
+            id as row_id
+        FROM products
+        WHERE stock > 0
+    """
+    
+    params = []
+    if user_id:
+        query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
+        params.append(user_id)
+    
+    return KeysetQuery(query, params,
+                       order=[SortKey('selling_value', descending=True, null_as=0),
+                              SortKey('row_id')],
+                       totals={'total': 'SUM(selling_value)'}, hidden=('row_id',))
+
 @reports_bp.route('/api/reports/stock_valuation', methods=['GET'])
 def stock_valuation_report():
     """Stock Valuation Report"""
@@ -417,45 +531,46 @@ def stock_valuation_report():
         conn = get_db_connection()
         user_id = get_user_id_from_session()
         
-        query = """
-            SELECT 
-                name as product_name,
-                stock as quantity,
-                cost as cost_price,
-                price as selling_price,
-                (stock * cost) as cost_value,
-                (stock * price) as selling_value,
-                ((stock * price) - (stock * cost)) as potential_profit
-            FROM products
-            WHERE stock > 0
-        """
-        
-        params = []
-        if user_id:
-            query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
-            params.append(user_id)
-        
-        query += " ORDER BY selling_value DESC"
-        
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-        
-        report_data = [dict(row) for row in rows]
-        total_value = sum(row['selling_value'] for row in report_data)
+        page = _stock_valuation_query(user_id).fetch(conn, **page_request(request.args))
         
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'report_data': report_data,
-            'summary': {'total': total_value}
-        })
+        return _report_response(page)
         
+    except InvalidCursor as e:
+        return _invalid_page(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # ========== FINANCIAL REPORTS ==========
 
+def _profit_loss_rows(conn, user_id):
+    if sales_rollup.ROLLUP_READS:
+        return _profit_loss_from_rollup(conn, user_id)
+    
+    # Get sales data with the cost snapshotted at sale time
+    query = """
+        SELECT 
+            DATE(s.sale_date) as date,
+            SUM(s.total_price) as revenue,
+            SUM(s.quantity * s.unit_cost) as cost,
+            SUM(s.total_price - (s.quantity * s.unit_cost)) as profit
+        FROM sales s
+        WHERE 1=1
+    """
+    
+    params = []
+    if user_id:
+        query += " AND (s.business_owner_id = ? OR s.business_owner_id IS NULL)"
+        params.append(user_id)
+    
+    query += " GROUP BY DATE(s.sale_date) ORDER BY date DESC LIMIT 30"
+    
+    cursor = conn.execute(query, params)
+    rows = cursor.fetchall()
+    
+    return [dict(row) for row in rows]
+
 @reports_bp.route('/api/reports/profit_loss', methods=['GET'])
 def profit_loss_report():
     """Profit & Loss Report"""
@@ -463,42 +578,49 @@ def profit_loss_report():
         conn = get_db_connection()
         user_id = get_user_id_from_session()
         
-        # Get sales data with cost
-        query = """
-            SELECT 
-                DATE(s.sale_date) as date,
-                SUM(s.total_price) as revenue,
-                SUM(s.quantity * p.cost) as cost,
-                SUM(s.total_price - (s.quantity * p.cost)) as profit
-            FROM sales s
-            LEFT JOIN products p ON s.product_id = p.id
-            WHERE 1=1
-        """
-        
-        params = []
-        if user_id:
-            query += " AND (s.business_owner_id = ? OR s.business_owner_id IS NULL)"
-            params.append(user_id)
-        
-        query += " GROUP BY DATE(s.sale_date) ORDER BY date DESC LIMIT 30"
-        
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-        
-        report_data = [dict(row) for row in rows]
+        report_data = _profit_loss_rows(conn, user_id)
         total_profit = sum(row['profit'] for row in report_data)
         
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'report_data': report_data,
-            'summary': {'total': total_profit}
-        })
+        return _bounded_report_response(report_data, total_profit)
         
+    except InvalidCursor as e:
+        return _invalid_page(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _revenue_report_rows(conn, user_id):
+    if sales_rollup.ROLLUP_READS:
+        return [{
+            'date': row['day'],
+            'transactions': row['bill_count'],
+            'revenue': row['sales_amount'],
+            'avg_revenue': _avg(row['sales_amount'], row['bill_count'])
+        } for row in _bill_days_from_rollup(conn, user_id, limit=30)]
+    
+    query = """
+        SELECT 
+            DATE(created_at) as date,
+            COUNT(*) as transactions,
+            SUM(total_amount) as revenue,
+            AVG(total_amount) as avg_revenue
+        FROM bills
+        WHERE 1=1
+    """
+    
+    params = []
+    if user_id:
+        query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
+        params.append(user_id)
+    
+    query += " GROUP BY DATE(created_at) ORDER BY date DESC LIMIT 30"
+    
+    cursor = conn.execute(query, params)
+    rows = cursor.fetchall()
+    
+    return [dict(row) for row in rows]
+
 @reports_bp.route('/api/reports/revenue_report', methods=['GET'])
 def revenue_report():
     """Revenue Report"""
@@ -506,42 +628,42 @@ def revenue_report():
         conn = get_db_connection()
         user_id = get_user_id_from_session()
         
-        query = """
-            SELECT 
-                DATE(created_at) as date,
-                COUNT(*) as transactions,
-                SUM(total_amount) as revenue,
-                AVG(total_amount) as avg_revenue
-            FROM bills
-            WHERE 1=1
-        """
-        
-        params = []
-        if user_id:
-            query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
-            params.append(user_id)
-        
-        query += " GROUP BY DATE(created_at) ORDER BY date DESC LIMIT 30"
-        
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-        
-        report_data = [dict(row) for row in rows]
+        report_data = _revenue_report_rows(conn, user_id)
         total_revenue = sum(row['revenue'] for row in report_data)
         
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'report_data': report_data,
-            'summary': {'total': total_revenue}
-        })
+        return _bounded_report_response(report_data, total_revenue)
         
+    except InvalidCursor as e:
+        return _invalid_page(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # ========== CUSTOMER REPORTS ==========
 
+def _customer_list_query(user_id):
+    query = """
+        SELECT 
+            name,
+            phone,
+            email,
+            address,
+            created_at as registration_date,
+            id as row_id
+        FROM customers
+        WHERE 1=1
+    """
+    
+    params = []
+    if user_id:
+        query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
+        params.append(user_id)
+    
+    return KeysetQuery(query, params,
+                       order=[SortKey('name'), SortKey('row_id')],
+                       hidden=('row_id',))
+
 @reports_bp.route('/api/reports/customer_list', methods=['GET'])
 def customer_list_report():
     """Customer List Report"""
@@ -549,40 +671,42 @@ def customer_list_report():
         conn = get_db_connection()
         user_id = get_user_id_from_session()
         
-        query = """
-            SELECT 
-                name,
-                phone,
-                email,
-                address,
-                created_at as registration_date
-            FROM customers
-            WHERE 1=1
-        """
-        
-        params = []
-        if user_id:
-            query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
-            params.append(user_id)
-        
-        query += " ORDER BY name"
-        
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-        
-        report_data = [dict(row) for row in rows]
+        page = _customer_list_query(user_id).fetch(conn, **page_request(request.args))
         
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'report_data': report_data,
-            'summary': {'total': len(report_data)}
-        })
+        return _report_response(page, _count_summary)
         
+    except InvalidCursor as e:
+        return _invalid_page(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _top_customers_query(user_id):
+    query = """
+        SELECT 
+            customer_name,
+            COUNT(*) as total_purchases,
+            SUM(total_amount) as total_spent,
+            AVG(total_amount) as avg_purchase,
+            MAX(created_at) as last_purchase
+        FROM bills
+        WHERE 1=1
+    """
+    
+    params = []
+    if user_id:
+        query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
+        params.append(user_id)
+    
+    # The top 50 are picked first, then paged
+    query += " GROUP BY customer_name ORDER BY total_spent DESC LIMIT 50"
+    
+    return KeysetQuery(query, params,
+                       order=[SortKey('total_spent', descending=True, null_as=0),
+                              SortKey('customer_name')],
+                       totals={'total': 'SUM(total_spent)'})
+
 @reports_bp.route('/api/reports/top_customers', methods=['GET'])
 def top_customers_report():
     """Top Customers Report"""
@@ -590,43 +714,43 @@ def top_customers_report():
         conn = get_db_connection()
         user_id = get_user_id_from_session()
         
-        query = """
-            SELECT 
-                customer_name,
-                COUNT(*) as total_purchases,
-                SUM(total_amount) as total_spent,
-                AVG(total_amount) as avg_purchase,
-                MAX(created_at) as last_purchase
-            FROM bills
-            WHERE 1=1
-        """
-        
-        params = []
-        if user_id:
-            query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
-            params.append(user_id)
-        
-        query += " GROUP BY customer_name ORDER BY total_spent DESC LIMIT 50"
-        
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-        
-        report_data = [dict(row) for row in rows]
-        total_spent = sum(row['total_spent'] for row in report_data)
+        page = _top_customers_query(user_id).fetch(conn, **page_request(request.args))
         
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'report_data': report_data,
-            'summary': {'total': total_spent}
-        })
+        return _report_response(page)
         
+    except InvalidCursor as e:
+        return _invalid_page(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # ========== CREDIT REPORTS ==========
 
+def _outstanding_credit_query(user_id):
+    query = """
+        SELECT 
+            bill_number,
+            customer_name,
+            total_amount,
+            credit_paid_amount as paid_amount,
+            credit_balance as outstanding,
+            created_at as bill_date,
+            id as row_id
+        FROM bills
+        WHERE is_credit = 1 AND credit_balance > 0
+    """
+    
+    params = []
+    if user_id:
+        query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
+        params.append(user_id)
+    
+    return KeysetQuery(query, params,
+                       order=[SortKey('outstanding', descending=True, null_as=0),
+                              SortKey('row_id')],
+                       totals={'total': 'SUM(outstanding)'}, hidden=('row_id',))
+
 @reports_bp.route('/api/reports/outstanding_credit', methods=['GET'])
 def outstanding_credit_report():
     """Outstanding Credit Report"""
@@ -634,42 +758,56 @@ def outstanding_credit_report():
         conn = get_db_connection()
         user_id = get_user_id_from_session()
         
-        query = """
-            SELECT 
-                bill_number,
-                customer_name,
-                total_amount,
-                credit_paid_amount as paid_amount,
-                credit_balance as outstanding,
-                created_at as bill_date
-            FROM bills
-            WHERE is_credit = 1 AND credit_balance > 0
-        """
-        
-        params = []
-        if user_id:
-            query += " AND (business_owner_id = ? OR business_owner_id IS NULL)"
-            params.append(user_id)
-        
-        query += " ORDER BY credit_balance DESC"
-        
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-        
-        report_data = [dict(row) for row in rows]
-        total_outstanding = sum(row['outstanding'] for row in report_data)
+        page = _outstanding_credit_query(user_id).fetch(conn, **page_request(request.args))
         
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'report_data': report_data,
-            'summary': {'total': total_outstanding}
-        })
+        return _report_response(page)
         
+    except InvalidCursor as e:
+        return _invalid_page(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _credit_payment_history_query(user_id):
+    # One row per payment (numbered within its bill), or a single
+    # 'No Payment' row for a bill without any - flattened in SQL so
+    # the report can be paged without loading every bill first
+    query = """
+        SELECT 
+            b.bill_number,
+            COALESCE(b.customer_name, 'Walk-in Customer') as customer_name,
+            COALESCE(b.total_amount, 0) as bill_amount,
+            b.created_at as bill_date,
+            CASE WHEN ct.id IS NULL THEN 'No Payment'
+                 ELSE 'Payment ' || CAST(ROW_NUMBER() OVER (
+                     PARTITION BY b.id ORDER BY ct.created_at, ct.id) AS TEXT)
+            END as payment_no,
+            COALESCE(ct.amount, 0) as payment_amount,
+            CASE WHEN ct.id IS NULL THEN '-' ELSE COALESCE(ct.payment_method, 'CASH') END as payment_method,
+            CASE WHEN ct.id IS NULL THEN '-' ELSE CAST(ct.created_at AS TEXT) END as payment_date,
+            CASE WHEN ct.id IS NULL THEN '-' ELSE COALESCE(ct.notes, '') END as payment_notes,
+            COALESCE(b.credit_paid_amount, 0) as total_paid,
+            COALESCE(b.credit_balance, 0) as remaining_balance,
+            b.id as bill_id,
+            ROW_NUMBER() OVER (PARTITION BY b.id ORDER BY ct.created_at, ct.id) as payment_seq
+        FROM bills b
+        LEFT JOIN credit_transactions ct ON b.id = ct.bill_id
+            AND ct.transaction_type = 'payment' AND ct.amount > 0
+        WHERE b.is_credit = 1
+    """
+    
+    params = []
+    if user_id:
+        query += " AND (b.business_owner_id = ? OR b.business_owner_id IS NULL)"
+        params.append(user_id)
+    
+    return KeysetQuery(query, params,
+                       order=[SortKey('bill_number'), SortKey('bill_id'),
+                              SortKey('payment_seq', null_as=0)],
+                       totals={'total': 'SUM(payment_amount)', 'total_bills': 'SUM(bill_amount)'},
+                       hidden=('bill_id', 'payment_seq'))
+
 @reports_bp.route('/api/reports/credit_payment_history', methods=['GET'])
 def credit_payment_history_report():
     """Credit Payment History Report - Complete transaction history with all payment details"""
@@ -677,127 +815,106 @@ def credit_payment_history_report():
         conn = get_db_connection()
         user_id = get_user_id_from_session()
         
-        query = """
-            SELECT 
-                b.bill_number,
-                b.customer_name,
-                b.total_amount as bill_amount,
-                b.credit_paid_amount as total_paid,
-                b.credit_balance as remaining_balance,
-                b.created_at as bill_date,
-                ct.amount as payment_amount,
-                ct.payment_method,
-                ct.created_at as payment_date,
-                ct.notes as payment_notes,
-                ct.reference_number
-            FROM bills b
-            LEFT JOIN credit_transactions ct ON b.id = ct.bill_id AND ct.transaction_type = 'payment'
-            WHERE b.is_credit = 1
-        """
-        
-        params = []
-        if user_id:
-            query += " AND (b.business_owner_id = ? OR b.business_owner_id IS NULL)"
-            params.append(user_id)
-        
-        query += " ORDER BY b.bill_number, ct.created_at ASC"
-        
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-        
-        # Group payments by bill
-        bills_dict = {}
-        for row in rows:
-            bill_number = row['bill_number']
-            
-            if bill_number not in bills_dict:
-                bills_dict[bill_number] = {
-                    'bill_number': bill_number,
-                    'customer_name': row['customer_name'] or 'Walk-in Customer',
-                    'bill_amount': float(row['bill_amount'] or 0),
-                    'total_paid': float(row['total_paid'] or 0),
-                    'remaining_balance': float(row['remaining_balance'] or 0),
-                    'bill_date': row['bill_date'],
-                    'payments': []
-                }
-            
-            # Add payment if exists (only actual payments, not credit_issued)
-            if row['payment_amount'] and row['payment_amount'] > 0:
-                bills_dict[bill_number]['payments'].append({
-                    'amount': float(row['payment_amount']),
-                    'method': row['payment_method'] or 'CASH',
-                    'date': row['payment_date'],
-                    'notes': row['payment_notes'] or '',
-                    'reference': row['reference_number'] or ''
-                })
-        
-        # Flatten the data for table display
-        report_data = []
-        for bill_number, bill_info in bills_dict.items():
-            if bill_info['payments']:
-                # Add row for each payment
-                for idx, payment in enumerate(bill_info['payments'], 1):
-                    report_data.append({
-                        'bill_number': bill_number,
-                        'customer_name': bill_info['customer_name'],
-                        'bill_amount': bill_info['bill_amount'],
-                        'bill_date': bill_info['bill_date'],
-                        'payment_no': f"Payment {idx}",
-                        'payment_amount': payment['amount'],
-                        'payment_method': payment['method'],
-                        'payment_date': payment['date'],
-                        'payment_notes': payment['notes'],
-                        'total_paid': bill_info['total_paid'],
-                        'remaining_balance': bill_info['remaining_balance']
-                    })
-            else:
-                # Bill with no payments yet
-                report_data.append({
-                    'bill_number': bill_number,
-                    'customer_name': bill_info['customer_name'],
-                    'bill_amount': bill_info['bill_amount'],
-                    'bill_date': bill_info['bill_date'],
-                    'payment_no': 'No Payment',
-                    'payment_amount': 0,
-                    'payment_method': '-',
-                    'payment_date': '-',
-                    'payment_notes': '-',
-                    'total_paid': bill_info['total_paid'],
-                    'remaining_balance': bill_info['remaining_balance']
-                })
-        
-        total_bill_amount = sum(row['bill_amount'] for row in report_data)
-        total_paid_amount = sum(row['payment_amount'] for row in report_data)
+        page = _credit_payment_history_query(user_id).fetch(conn, **page_request(request.args))
         
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'report_data': report_data,
-            'summary': {
-                'total': total_paid_amount,
-                'total_bills': total_bill_amount
-            }
+        return _report_response(page, lambda totals: {
+            'total': totals['total'] or 0,
+            'total_bills': totals['total_bills'] or 0,
+            'rows': totals['row_count']
         })
         
+    except InvalidCursor as e:
+        return _invalid_page(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # Add more report endpoints as needed...
 
+# ========== EXPORTS ==========
+# Every report above is exportable as reports.<type>: keyset reports are
+# streamed from a server-side cursor, the 30-day ones are already small
+
+def _streamed(build):
+    return lambda conn, tenant_id, params: build(tenant_id).stream(conn)
+
+def _listed(build):
+    return lambda conn, tenant_id, params: build(conn, tenant_id)
+
+REPORT_EXPORTS = {
+    'sales_summary': _listed(_sales_summary_rows),
+    'sales_by_product': _streamed(_sales_by_product_query),
+    'sales_by_customer': _streamed(_sales_by_customer_query),
+    'sales_by_payment': _streamed(_sales_by_payment_query),
+    'daily_sales': _listed(_daily_sales_rows),
+    'stock_summary': _streamed(_stock_summary_query),
+    'low_stock': _streamed(_low_stock_query),
+    'out_of_stock': _streamed(_out_of_stock_query),
+    'expiry_report': _streamed(_expiry_report_query),
+    'stock_valuation': _streamed(_stock_valuation_query),
+    'profit_loss': _listed(_profit_loss_rows),
+    'revenue_report': _listed(_revenue_report_rows),
+    'customer_list': _streamed(_customer_list_query),
+    'top_customers': _streamed(_top_customers_query),
+    'outstanding_credit': _streamed(_outstanding_credit_query),
+    'credit_payment_history': _streamed(_credit_payment_history_query),
+}
+
+for _report_type, _rows in REPORT_EXPORTS.items():
+    exports.register(f'reports.{_report_type}', _rows, filename=_report_type)
+
 # Export functionality
 @reports_bp.route('/api/reports/<report_type>/export', methods=['GET'])
 def export_report(report_type):
-    """Export report to CSV/Excel"""
+    """Export report to CSV/Excel (?format=csv|xlsx), streamed"""
+    return exports.export_response(f'reports.{report_type}')
+
+# ========== REPORT JOBS ==========
+# Heavy reports run in the background: submit, poll, fetch the result
+
+@reports_bp.route('/api/reports/jobs', methods=['POST'])
+def submit_report_job():
+    """Queue a report job: {"kind": "earnings.products", "params": {...}}"""
     try:
-        format_type = request.args.get('format', 'csv')
+        payload = request.get_json(silent=True) or {}
+        params = payload.get('params') or {}
+        if not isinstance(params, dict):
+            return jsonify({'success': False, 'error': 'params must be an object'}), 400
         
-        # For now, return a simple message
-        # In production, generate actual file
-        return jsonify({
-            'success': True,
-            'message': f'Export {report_type} as {format_type} - Feature coming soon!'
-        })
+        return submit_response(payload.get('kind'), get_user_id_from_session(), params)
+        
+    except JobError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@reports_bp.route('/api/reports/jobs/<job_id>', methods=['GET'])
+def report_job_status(job_id):
+    """A report job's status"""
+    try:
+        job = report_jobs.get(job_id, get_user_id_from_session())
+        if job is None:
+            return jsonify({'success': False, 'error': 'Job not found'}), 404
+        
+        return jsonify({'success': True, 'job': job})
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@reports_bp.route('/api/reports/jobs/<job_id>/result', methods=['GET'])
+def report_job_result(job_id):
+    """A finished report job's result (409 until it is done)"""
+    try:
+        job = report_jobs.result(job_id, get_user_id_from_session())
+        if job is None:
+            return jsonify({'success': False, 'error': 'Job not found'}), 404
+        if job['status'] == 'failed':
+            return jsonify({'success': False, 'job': job, 'error': job['error']}), 500
+        if job['status'] != 'done':
+            return jsonify({'success': False, 'job': job, 'error': 'Job is not finished yet'}), 409
+        
+        return jsonify({'success': True, 'job_id': job_id, 'kind': job['kind'], 'data': job.pop('result')})
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
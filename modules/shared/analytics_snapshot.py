@@ -0,0 +1,697 @@
+"""
+Columnar sales snapshot for long-range analytics
+Sales lines are exported per tenant and month into compact column files
+under ANALYTICS_DIR. Long-range product and category breakdowns
+(SalesService.get_sales_by_product / get_sales_by_category) aggregate
+those files instead of scanning sales on the primary database.
+
+    <ANALYTICS_DIR>/<tenant>/<YYYY-MM>.bpcol
+
+A partition has one row per sales line. Its columns are day of month,
+bill, product line (id, name and category, dictionary encoded),
+quantity, total_price and unit_price. Each column is a typed array,
+compressed with zlib. The layout borrows from Arrow but needs only the
+standard library; pyarrow and numpy are not dependencies of this app.
+
+Exports are incremental. Each partition records its month's fingerprint
+in the daily sales rollup: item count, revenue, cost and the last time
+one of those days was refreshed. The bill writers already keep the
+rollup current. Before a long-range read, the months it covers are
+compared with the rollup in one grouped query over that small table.
+Only months that changed are exported again, so a read is as fresh as
+the rollup and touches sales only for changed months. Aggregates of
+whole months are cached per partition.
+
+Reads are off by default (ANALYTICS_READS=false). The aggregation is a
+plain Python loop over the columns, so a month read without a cached
+aggregate is slower than the SQL scan it replaces; turn reads on where
+the cached aggregates are hit, after checking `bench` on that data.
+
+A bill's lines share its sale_date, so the distinct-bill counts of
+separate partitions add up.
+
+    python -m modules.shared.analytics_snapshot status
+    python -m modules.shared.analytics_snapshot sync [tenant_id]
+    python -m modules.shared.analytics_snapshot bench [--bills N] [--months N] [--runs N] [--db PATH]
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import zlib
+import struct
+import random
+import sqlite3
+import argparse
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from urllib.parse import quote, unquote
+import logging
+
+from .sales_rollup import ROLLUP_TABLE, UNOWNED, _day, _owner_filter
+
+logger = logging.getLogger(__name__)
+
+# Tunables (environment overrides)
+ANALYTICS_DIR = os.environ.get('ANALYTICS_DIR') or os.path.join(tempfile.gettempdir(), 'bizpulse_analytics')
+# Serve long date ranges from the snapshot (false = always scan sales)
+ANALYTICS_READS = os.environ.get('ANALYTICS_READS', 'false').lower() in ('1', 'true', 'yes')
+# Shortest range, in days, that is read from the snapshot
+ANALYTICS_MIN_DAYS = int(os.environ.get('ANALYTICS_MIN_DAYS', '90'))
+# Seconds a month is trusted before it is compared with the rollup again
+ANALYTICS_SYNC_INTERVAL = float(os.environ.get('ANALYTICS_SYNC_INTERVAL', '30'))
+
+MAGIC = b'BPCOL01\n'
+SUFFIX = '.bpcol'
+UNOWNED_DIR = '_unowned'
+AGGREGATE_CACHE_SIZE = 256
+PRODUCT_LOOKUP_CHUNK = 500
+
+# Column arrays, stored little-endian
+COLUMNS = (
+    ('day', 'B'),          # day of month
+    ('bill', 'I'),         # code into the bills dictionary
+    ('line', 'I'),         # code into the lines dictionary: [product_id, product_name, category]
+    ('quantity', 'q'),
+    ('total_price', 'd'),  # NaN = NULL
+    ('unit_price', 'd'),   # NaN = NULL
+)
+
+
+def _month_start(month):
+    return f"{month}-01"
+
+
+def _next_month(month):
+    year, number = int(month[:4]), int(month[5:7])
+    return f"{year + number // 12:04d}-{number % 12 + 1:02d}"
+
+
+def _months(first, last):
+    months = []
+    month = first
+    while month <= last:
+        months.append(month)
+        month = _next_month(month)
+    return months
+
+
+def _real(value):
+    return float('nan') if value is None else float(value)
+
+
+def _tenant_dir(tenant_id):
+    return UNOWNED_DIR if tenant_id == UNOWNED else 't-' + quote(tenant_id, safe='')
+
+
+def _dir_tenant(name):
+    if name == UNOWNED_DIR:
+        return UNOWNED
+    return unquote(name[2:]) if name.startswith('t-') else None
+
+
+def write_partition(path, meta, rows):
+    """
+    Write one partition atomically. rows yields (day_of_month, bill_id,
+    product_id, product_name, category, quantity, total_price, unit_price).
+    """
+    bills, lines = {}, {}
+    columns = {name: array(typecode) for name, typecode in COLUMNS}
+    for day, bill_id, product_id, product_name, category, quantity, total_price, unit_price in rows:
+        columns['day'].append(day)
+        columns['bill'].append(bills.setdefault(bill_id, len(bills)))
+        columns['line'].append(lines.setdefault((product_id, product_name, category), len(lines)))
+        columns['quantity'].append(int(quantity or 0))
+        columns['total_price'].append(_real(total_price))
+        columns['unit_price'].append(_real(unit_price))
+
+    blocks = []
+    for name, _ in COLUMNS:
+        data = columns[name]
+        if sys.byteorder != 'little':
+            data.byteswap()
+        blocks.append((name, zlib.compress(data.tobytes(), 1)))
+    for name, values in (('bills', list(bills)), ('lines', [list(line) for line in lines])):
+        blocks.append((name, zlib.compress(json.dumps(values, default=str).encode('utf-8'), 1)))
+
+    header = dict(meta, version=1, rows=len(columns['day']),
+                  blocks=[[name, len(data)] for name, data in blocks])
+    header_bytes = json.dumps(header).encode('utf-8')
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'wb') as handle:
+        handle.write(MAGIC)
+        handle.write(struct.pack('<I', len(header_bytes)))
+        handle.write(header_bytes)
+        for _, data in blocks:
+            handle.write(data)
+    os.replace(temp_path, path)
+    return header
+
+
+def _read_header(handle):
+    if handle.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"Not an analytics partition: {handle.name}")
+    (length,) = struct.unpack('<I', handle.read(4))
+    return json.loads(handle.read(length).decode('utf-8'))
+
+
+def read_header(path):
+    """A partition's header (fingerprint, row count...), or None if it does not exist"""
+    try:
+        with open(path, 'rb') as handle:
+            return _read_header(handle)
+    except FileNotFoundError:
+        return None
+
+
+def read_partition(path):
+    """(header, {column: array}, bills, lines) of one partition"""
+    typecodes = dict(COLUMNS)
+    with open(path, 'rb') as handle:
+        header = _read_header(handle)
+        columns, dictionaries = {}, {}
+        for name, length in header['blocks']:
+            data = zlib.decompress(handle.read(length))
+            if name in typecodes:
+                column = array(typecodes[name])
+                column.frombytes(data)
+                if sys.byteorder != 'little':
+                    column.byteswap()
+                columns[name] = column
+            else:
+                dictionaries[name] = json.loads(data.decode('utf-8'))
+    return header, columns, dictionaries['bills'], [tuple(line) for line in dictionaries['lines']]
+
+
+def aggregate_partition(partition, first_day=1, last_day=31):
+    """
+    Product and category totals of one partition's days first_day..last_day.
+
+    products:   {(product_id, product_name, category): [transactions, quantity,
+                 total, total_n, unit_price_sum, unit_price_n]}
+    categories: {category: [transactions, {product_id}, quantity, total, total_n]}
+    """
+    _, columns, bills, lines = partition
+    null_bill = bills.index(None) if None in bills else -1
+    whole = first_day <= 1 and last_day >= 31
+
+    products = {}
+    categories = {}
+    product_bills, category_bills = set(), set()
+    for day, bill, line, quantity, total, price in zip(*(columns[name] for name, _ in COLUMNS)):
+        if not whole and (day < first_day or day > last_day):
+            continue
+        product_id, _, category = lines[line]
+
+        entry = products.get(line)
+        if entry is None:
+            entry = products[line] = [0, 0, 0.0, 0, 0.0, 0]
+        entry[1] += quantity
+        if total == total:
+            entry[2] += total
+            entry[3] += 1
+        if price == price:
+            entry[4] += price
+            entry[5] += 1
+
+        group = categories.get(category)
+        if group is None:
+            group = categories[category] = [0, set(), 0, 0.0, 0]
+        group[2] += quantity
+        if total == total:
+            group[3] += total
+            group[4] += 1
+        if product_id is not None:
+            group[1].add(product_id)
+
+        if bill != null_bill:
+            product_bills.add((line, bill))
+            category_bills.add((category, bill))
+
+    for line, _ in product_bills:
+        products[line][0] += 1
+    for category, _ in category_bills:
+        categories[category][0] += 1
+    return {lines[line]: entry for line, entry in products.items()}, categories
+
+
+def _merge(into, part):
+    products, categories = into
+    part_products, part_categories = part
+    for key, entry in part_products.items():
+        target = products.setdefault(key, [0, 0, 0.0, 0, 0.0, 0])
+        for index, value in enumerate(entry):
+            target[index] += value
+    for key, group in part_categories.items():
+        target = categories.setdefault(key, [0, set(), 0, 0.0, 0])
+        target[0] += group[0]
+        target[1] |= group[1]
+        for index in (2, 3, 4):
+            target[index] += group[index]
+
+
+class AnalyticsSnapshot:
+    """Per-tenant monthly sales partitions, kept in step with the daily rollup"""
+
+    def __init__(self, root=None):
+        self.root = root or ANALYTICS_DIR
+        self._lock = threading.Lock()
+        self._checked = {}  # (tenant_id or None, month) -> monotonic time of the last rollup comparison
+        self._syncing = set()  # (tenant_id or None, month) being exported right now
+        self._aggregates = OrderedDict()  # (path, exported_at) -> whole-month aggregate
+        self._stats = {'syncs': 0, 'exported': 0, 'removed': 0, 'reads': 0,
+                       'cache_hits': 0, 'cache_misses': 0}
+
+    # ---- layout ----
+
+    def _path(self, tenant_id, month):
+        return os.path.join(self.root, _tenant_dir(tenant_id), month + SUFFIX)
+
+    def _tenants(self, tenant_id=None):
+        if tenant_id is not None:
+            return [tenant_id]
+        try:
+            names = sorted(os.listdir(self.root))
+        except FileNotFoundError:
+            return []
+        return [tenant for tenant in map(_dir_tenant, names) if tenant is not None]
+
+    # ---- export ----
+
+    def _fingerprints(self, conn, tenant_id, first, last):
+        """{(tenant, month): fingerprint} of the months with sold items, from the rollup"""
+        db_type = getattr(conn, 'db_type', 'sqlite')
+        month_expr = "to_char(day, 'YYYY-MM')" if db_type == 'postgresql' else "SUBSTR(day, 1, 7)"
+        where, params = "item_count > 0 AND day >= ? AND day < ?", [_month_start(first),
+                                                                    _month_start(_next_month(last))]
+        if tenant_id is not None:
+            where += " AND tenant_id = ?"
+            params.append(tenant_id)
+        rows = conn.execute(f"""
+            SELECT tenant_id, {month_expr} AS month,
+                   SUM(item_count) AS items, SUM(items_revenue) AS revenue, SUM(items_cost) AS cost,
+                   MAX(updated_at) AS updated_at, COUNT(*) AS row_count
+            FROM {ROLLUP_TABLE}
+            WHERE {where}
+            GROUP BY 1, 2
+        """, params).fetchall()
+        return {
+            (row['tenant_id'], row['month']): [int(row['items'] or 0), round(float(row['revenue'] or 0), 6),
+                                               round(float(row['cost'] or 0), 6), str(row['updated_at']),
+                                               int(row['row_count'])]
+            for row in rows
+        }
+
+    def _export(self, conn, tenant_id, month, fingerprint):
+        where, params = _owner_filter('s.business_owner_id', tenant_id)
+        rows = conn.stream(f"""
+            SELECT s.sale_date, s.bill_id, s.product_id, s.product_name, s.category,
+                   s.quantity, s.total_price, s.unit_price
+            FROM sales s
+            WHERE {where} AND s.sale_date >= ? AND s.sale_date < ?
+        """, params + [_month_start(month), _month_start(_next_month(month))])
+        return write_partition(self._path(tenant_id, month), {
+            'tenant_id': tenant_id,
+            'month': month,
+            'fingerprint': fingerprint,
+            'exported_at': datetime.now().isoformat(),
+        }, ((int(_day(row['sale_date'])[8:10]), row['bill_id'], row['product_id'], row['product_name'],
+             row['category'], row['quantity'], row['total_price'], row['unit_price']) for row in rows))
+
+    def sync(self, conn, first_month, last_month, tenant_id=None, force=False):
+        """
+        Bring the partitions of first_month..last_month ('YYYY-MM') in line
+        with the rollup: export months that are new or changed, drop months
+        with no sales left. Months compared within ANALYTICS_SYNC_INTERVAL
+        are skipped unless force, and so are months another thread is
+        exporting (its readers keep the previous file until the new one
+        replaces it). Returns counts.
+
+        The lock only guards the bookkeeping: the rollup comparison and the
+        exports run outside it, so other tenants' reads and syncs go on.
+        """
+        with self._lock:
+            now = time.monotonic()
+            due = [month for month in _months(first_month, last_month)
+                   if (tenant_id, month) not in self._syncing
+                   and (force or now - self._checked.get((tenant_id, month), -math.inf) >= ANALYTICS_SYNC_INTERVAL)]
+            self._syncing.update((tenant_id, month) for month in due)
+        result = {'checked': len(due), 'exported': 0, 'removed': 0}
+        if not due:
+            return result
+
+        try:
+            due_set = set(due)
+            fingerprints = self._fingerprints(conn, tenant_id, due[0], due[-1])
+            for (tenant, month), fingerprint in sorted(fingerprints.items()):
+                if month not in due_set:
+                    continue
+                header = read_header(self._path(tenant, month))
+                if header is None or header.get('fingerprint') != fingerprint:
+                    self._export(conn, tenant, month, fingerprint)
+                    result['exported'] += 1
+
+            for tenant in self._tenants(tenant_id):
+                for month in due:
+                    path = self._path(tenant, month)
+                    if (tenant, month) not in fingerprints and os.path.exists(path):
+                        try:
+                            os.remove(path)
+                        except FileNotFoundError:
+                            continue
+                        result['removed'] += 1
+
+            with self._lock:
+                for month in due:
+                    self._checked[(tenant_id, month)] = now
+                self._stats['syncs'] += 1
+                self._stats['exported'] += result['exported']
+                self._stats['removed'] += result['removed']
+        finally:
+            with self._lock:
+                self._syncing.difference_update((tenant_id, month) for month in due)
+        if result['exported'] or result['removed']:
+            logger.info(f"🔧 Analytics snapshot synced {first_month}..{last_month}: "
+                        f"{result['exported']} exported, {result['removed']} removed")
+        return result
+
+    # ---- reads ----
+
+    def serves(self, date_from, date_to):
+        """Whether a date range is long enough to be read from the snapshot"""
+        if not ANALYTICS_READS:
+            return False
+        try:
+            first = datetime.strptime(str(date_from)[:10], '%Y-%m-%d').date()
+            last = datetime.strptime(str(date_to)[:10], '%Y-%m-%d').date()
+        except ValueError:
+            return False
+        return (last - first).days + 1 >= ANALYTICS_MIN_DAYS
+
+    def _whole_month(self, path):
+        header = read_header(path)
+        if header is None:
+            return None
+        key = (path, header['exported_at'])
+        with self._lock:
+            cached = self._aggregates.get(key)
+            if cached is not None:
+                self._aggregates.move_to_end(key)
+                self._stats['cache_hits'] += 1
+                return cached
+            self._stats['cache_misses'] += 1
+        aggregate = aggregate_partition(read_partition(path))
+        with self._lock:
+            self._aggregates[key] = aggregate
+            while len(self._aggregates) > AGGREGATE_CACHE_SIZE:
+                self._aggregates.popitem(last=False)
+        return aggregate
+
+    def breakdown(self, conn, date_from, date_to, tenant_id=None):
+        """(products, categories) totals for date_from..date_to (inclusive), synced first"""
+        first, last = str(date_from)[:10], str(date_to)[:10]
+        self.sync(conn, first[:7], last[:7], tenant_id)
+        with self._lock:
+            self._stats['reads'] += 1
+
+        totals = ({}, {})
+        for tenant in self._tenants(tenant_id):
+            for month in _months(first[:7], last[:7]):
+                path = self._path(tenant, month)
+                first_day = int(first[8:10]) if month == first[:7] else 1
+                last_day = int(last[8:10]) if month == last[:7] else 31
+                if first_day <= 1 and last_day >= 31:
+                    part = self._whole_month(path)
+                elif os.path.exists(path):
+                    part = aggregate_partition(read_partition(path), first_day, last_day)
+                else:
+                    part = None
+                if part is not None:
+                    _merge(totals, part)
+        return totals
+
+    def sales_by_product(self, conn, date_from, date_to, tenant_id=None):
+        """Rows of SalesService.get_sales_by_product, largest total_sales first"""
+        products, _ = self.breakdown(conn, date_from, date_to, tenant_id)
+        stock = _product_stock(conn, {product_id for product_id, _, _ in products if product_id is not None})
+        rows = []
+        for (product_id, product_name, category), entry in products.items():
+            transactions, quantity, total, total_n, price_sum, price_n = entry
+            current = stock.get(product_id, {})
+            rows.append({
+                'product_id': product_id,
+                'product_name': product_name,
+                'category': category,
+                'transactions': transactions,
+                'total_quantity': quantity,
+                'total_sales': total if total_n else None,
+                'avg_price': price_sum / price_n if price_n else None,
+                'current_stock': current.get('stock'),
+                'min_stock': current.get('min_stock'),
+            })
+        rows.sort(key=lambda row: -(row['total_sales'] or 0))
+        return rows
+
+    def sales_by_category(self, conn, date_from, date_to, tenant_id=None):
+        """Rows of SalesService.get_sales_by_category, largest total_sales first"""
+        _, categories = self.breakdown(conn, date_from, date_to, tenant_id)
+        rows = [{
+            'category': category,
+            'transactions': transactions,
+            'unique_products': len(product_ids),
+            'total_quantity': quantity,
+            'total_sales': total if total_n else None,
+            'avg_sale_value': total / total_n if total_n else None,
+        } for category, (transactions, product_ids, quantity, total, total_n) in categories.items()]
+        rows.sort(key=lambda row: -(row['total_sales'] or 0))
+        return rows
+
+    # ---- housekeeping ----
+
+    def snapshot(self):
+        """Partition counts, size on disk and counters, for the CLI and diagnostics"""
+        partitions = size = 0
+        tenants = self._tenants()
+        for tenant in tenants:
+            directory = os.path.join(self.root, _tenant_dir(tenant))
+            for name in os.listdir(directory):
+                if name.endswith(SUFFIX):
+                    partitions += 1
+                    size += os.path.getsize(os.path.join(directory, name))
+        with self._lock:
+            return {
+                'root': self.root,
+                'reads_enabled': ANALYTICS_READS,
+                'min_days': ANALYTICS_MIN_DAYS,
+                'sync_interval': ANALYTICS_SYNC_INTERVAL,
+                'tenants': len(tenants),
+                'partitions': partitions,
+                'bytes': size,
+                'cached_aggregates': len(self._aggregates),
+                **self._stats
+            }
+
+    def reset(self):
+        """Forget sync times and cached aggregates (the files stay)"""
+        with self._lock:
+            self._checked.clear()
+            self._syncing.clear()
+            self._aggregates.clear()
+
+
+def _product_stock(conn, product_ids):
+    """Current stock of the products in a breakdown - primary-key lookups, in chunks"""
+    product_ids = sorted(product_ids)
+    stock = {}
+    for start in range(0, len(product_ids), PRODUCT_LOOKUP_CHUNK):
+        chunk = product_ids[start:start + PRODUCT_LOOKUP_CHUNK]
+        placeholders = ', '.join('?' for _ in chunk)
+        for row in conn.execute(f"SELECT id, stock, min_stock FROM products WHERE id IN ({placeholders})",
+                                chunk).fetchall():
+            stock[row['id']] = {'stock': row['stock'], 'min_stock': row['min_stock']}
+    return stock
+
+
+analytics_snapshot = AnalyticsSnapshot()
+
+
+# ---- benchmark ----
+
+# The SalesService queries the snapshot replaces for long ranges
+SQL_BY_PRODUCT = '''
+    SELECT s.product_id, s.product_name, s.category,
+           COUNT(DISTINCT s.bill_id) as transactions,
+           SUM(s.quantity) as total_quantity,
+           SUM(s.total_price) as total_sales,
+           AVG(s.unit_price) as avg_price,
+           p.stock as current_stock,
+           p.min_stock
+    FROM sales s
+    LEFT JOIN products p ON s.product_id = p.id
+    WHERE s.sale_date BETWEEN ? AND ?
+    GROUP BY s.product_id, s.product_name, s.category
+    ORDER BY total_sales DESC
+'''
+
+SQL_BY_CATEGORY = '''
+    SELECT s.category,
+           COUNT(DISTINCT s.bill_id) as transactions,
+           COUNT(DISTINCT s.product_id) as unique_products,
+           SUM(s.quantity) as total_quantity,
+           SUM(s.total_price) as total_sales,
+           AVG(s.total_price) as avg_sale_value
+    FROM sales s
+    WHERE s.sale_date BETWEEN ? AND ?
+    GROUP BY s.category
+    ORDER BY total_sales DESC
+'''
+
+
+def _seed(path, bills, products, months):
+    """Scratch SQLite file with the tables the snapshot and the rollup read"""
+    from .database import EnterpriseConnectionWrapper
+    from .sales_rollup import create_rollup_table, rebuild
+
+    raw = sqlite3.connect(path)
+    raw.executescript("""
+        CREATE TABLE products (id TEXT PRIMARY KEY, stock INTEGER, min_stock INTEGER);
+        CREATE TABLE bills (id TEXT PRIMARY KEY, business_owner_id TEXT, total_amount REAL,
+                            is_credit INTEGER DEFAULT 0, payment_method TEXT, created_at TIMESTAMP);
+        CREATE TABLE payments (id TEXT, bill_id TEXT, method TEXT, amount REAL, processed_at TIMESTAMP);
+        CREATE TABLE credit_transactions (id TEXT, bill_id TEXT, transaction_type TEXT, payment_method TEXT,
+                                          amount REAL, created_at TIMESTAMP);
+        CREATE TABLE sales (id TEXT PRIMARY KEY, bill_id TEXT, business_owner_id TEXT, product_id TEXT,
+                            product_name TEXT, category TEXT, quantity INTEGER, unit_price REAL,
+                            unit_cost REAL, total_price REAL, payment_method TEXT, sale_date DATE);
+        CREATE INDEX idx_sales_sale_date ON sales (sale_date);
+    """)
+    rng = random.Random(42)
+    categories = [f"Category {i}" for i in range(12)]
+    catalog = [(f"p{i}", f"Product {i}", rng.choice(categories), round(rng.uniform(10, 800), 2))
+               for i in range(products)]
+    raw.executemany("INSERT INTO products VALUES (?, ?, ?)",
+                    [(product_id, rng.randint(0, 500), 10) for product_id, _, _, _ in catalog])
+    today = date.today()
+    batch_bills, batch_sales = [], []
+    for i in range(bills):
+        day = (today - timedelta(days=rng.randrange(months * 30))).strftime('%Y-%m-%d')
+        total = 0.0
+        for line in range(rng.randint(1, 5)):
+            product_id, name, category, price = rng.choice(catalog)
+            quantity = rng.randint(1, 4)
+            total += price * quantity
+            batch_sales.append((f"s{i}-{line}", f"b{i}", None, product_id, name, category, quantity,
+                                price, price * 0.6, price * quantity, 'cash', day))
+        batch_bills.append((f"b{i}", None, round(total, 2), 0, 'cash', f"{day} 12:00:00"))
+        if len(batch_bills) == 50_000:
+            raw.executemany("INSERT INTO bills VALUES (?, ?, ?, ?, ?, ?)", batch_bills)
+            raw.executemany("INSERT INTO sales VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch_sales)
+            batch_bills, batch_sales = [], []
+    raw.executemany("INSERT INTO bills VALUES (?, ?, ?, ?, ?, ?)", batch_bills)
+    raw.executemany("INSERT INTO sales VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch_sales)
+    raw.commit()
+
+    conn = EnterpriseConnectionWrapper(raw, 'sqlite')
+    create_rollup_table(conn, 'sqlite')
+    rebuild(conn=conn)
+    conn.close()
+
+
+def bench(bills=100_000, products=2_000, months=36, runs=5, path=None):
+    """Time the SalesService SQL against snapshot reads (with and without cached aggregates) over the whole range"""
+    from .database import EnterpriseConnectionWrapper
+    from .dashboard_summary import _time
+
+    cleanup = path is None
+    if path is None:
+        handle, path = tempfile.mkstemp(suffix='.db', prefix='analytics_bench_')
+        os.close(handle)
+        os.unlink(path)
+    if not os.path.exists(path):
+        started = time.perf_counter()
+        _seed(path, bills, products, months)
+        logger.info(f"🔧 Seeded {bills} bills in {time.perf_counter() - started:.1f}s ({path})")
+
+    root = tempfile.mkdtemp(prefix='analytics_bench_')
+    snapshot = AnalyticsSnapshot(root)
+    conn = EnterpriseConnectionWrapper(sqlite3.connect(path), 'sqlite')
+    date_to = date.today().strftime('%Y-%m-%d')
+    date_from = (date.today() - timedelta(days=months * 31)).strftime('%Y-%m-%d')
+    try:
+        started = time.perf_counter()
+        snapshot.sync(conn, date_from[:7], date_to[:7], force=True)
+        export_ms = round((time.perf_counter() - started) * 1000.0, 1)
+
+        results = {'bills': bills, 'months': months, 'initial_export_ms': export_ms}
+        for name, sql, read in (('by_product', SQL_BY_PRODUCT, snapshot.sales_by_product),
+                                ('by_category', SQL_BY_CATEGORY, snapshot.sales_by_category)):
+            scan = lambda: conn.execute(sql, (date_from, date_to)).fetchall()
+            columnar = lambda: read(conn, date_from, date_to)
+
+            def uncached():
+                snapshot.reset()
+                return columnar()
+
+            expected = {tuple(row)[:3]: float(row['total_sales'] or 0) for row in scan()}
+            actual = {tuple(row.values())[:3]: float(row['total_sales'] or 0) for row in columnar()}
+            scan_ms, uncached_ms, warm_ms = _time(scan, runs), _time(uncached, runs), _time(columnar, runs)
+            results[name] = {
+                'same_totals': expected.keys() == actual.keys() and all(
+                    abs(expected[key] - actual[key]) < 0.01 for key in expected),
+                'sales_scan': scan_ms,
+                'snapshot_uncached': uncached_ms,
+                'snapshot_warm': warm_ms,
+                'speedup_p50': round(scan_ms['p50_ms'] / max(warm_ms['p50_ms'], 0.001), 1),
+            }
+        results['snapshot_bytes'] = snapshot.snapshot()['bytes']
+        results['database_bytes'] = os.path.getsize(path)
+        return results
+    finally:
+        conn.close()
+        for directory, _, names in os.walk(root, topdown=False):
+            for name in names:
+                os.unlink(os.path.join(directory, name))
+            os.rmdir(directory)
+        if cleanup:
+            os.unlink(path)
+
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(prog='python -m modules.shared.analytics_snapshot')
+    parser.add_argument('command', choices=['status', 'sync', 'bench'])
+    parser.add_argument('tenant_id', nargs='?', help='sync one tenant only')
+    parser.add_argument('--since', default='2000-01', help='first month to sync (YYYY-MM)')
+    parser.add_argument('--bills', type=int, default=100_000)
+    parser.add_argument('--products', type=int, default=2_000)
+    parser.add_argument('--months', type=int, default=36)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--db', help='reuse/keep the seeded SQLite file at this path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'bench':
+        results = bench(args.bills, args.products, args.months, args.runs, args.db)
+    elif args.command == 'sync':
+        from .database import get_db_connection
+        conn = get_db_connection()
+        try:
+            results = analytics_snapshot.sync(conn, args.since, date.today().strftime('%Y-%m'),
+                                              args.tenant_id, force=True)
+        finally:
+            conn.close()
+    else:
+        results = analytics_snapshot.snapshot()
+    for key, value in results.items():
+        print(f"  {key}: {value}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,10 +1,8 @@
 """
 AUTO-FIX ON STARTUP - Render Deployment
 ========================================
-This script runs automatically when your app starts on Render.
+Applied once per database by migration 0002 (modules/shared/migrations).
 It fixes the business_owner_id issue without manual intervention.
-
-Add this to your app.py startup sequence!
 """
 
 import os
@@ -20,28 +18,25 @@ except ImportError:
     # dotenv not installed, skip loading .env file
     pass
 
-def auto_fix_database_on_startup():
+def auto_fix_database_on_startup(raise_errors=False):
     """
     Automatically fix database issues on Render deployment
     - Adds business_owner_id column if missing
     - Adds customer_phone column to bills table if missing
-    Runs once on startup, safe to run multiple times
+    Applied once by migration 0002, safe to run multiple times
     """
     try:
-        import psycopg2
-        from psycopg2.extras import RealDictCursor
-        
-        DATABASE_URL = os.environ.get('DATABASE_URL')
+        from modules.shared.database import get_db_connection, get_db_type
         
-        if not DATABASE_URL:
+        if get_db_type() != 'postgresql':
             print("DATABASE_URL not found, skipping auto-fix")
             return
         
         logger.info("🔧 Running auto-fix for database...")
         
-        conn = psycopg2.connect(DATABASE_URL, sslmode='require')
-        conn.autocommit = False
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        # Pooled connection (RealDictCursor rows on PostgreSQL)
+        conn = get_db_connection()
+        cursor = conn.cursor()
         
         # FIX 0: Ensure login_count and last_login columns exist on users table
         try:
@@ -281,6 +276,8 @@ def auto_fix_database_on_startup():
         
     except Exception as e:
         logger.error(f"❌ Auto-fix failed: {e}")
+        if raise_errors:
+            raise
         import traceback
         traceback.print_exc()
 
@@ -0,0 +1,260 @@
+"""
+Blueprint loading with per-blueprint import timing
+Blueprints are imported through register_blueprints() so each one's import
+cost (including the modules it pulls in first) is recorded - the same
+numbers as `python -X importtime`, aggregated per blueprint.
+
+In lazy mode (LAZY_BLUEPRINTS) a lazy-capable route module is not imported
+at boot: its URL rules are read from the source file and bound to views
+that import the module on the first request that hits one of them.
+"""
+
+import os
+import re
+import sys
+import time
+import importlib
+import importlib.util
+import threading
+from flask import Flask, Blueprint
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tunables (environment overrides)
+# LAZY_BLUEPRINTS: 'true' defers every lazy-capable blueprint, 'false' imports
+# everything at boot, or a comma separated list of blueprint names ('erp')
+LAZY_BLUEPRINTS = os.environ.get('LAZY_BLUEPRINTS', 'false').lower()
+IMPORT_BUDGET_MS = float(os.environ.get('BLUEPRINT_IMPORT_BUDGET_MS', '0'))  # warn above this, 0 disables
+IMPORT_REPORT_ON_BOOT = os.environ.get('STARTUP_IMPORT_REPORT', 'false').lower() in ('1', 'true', 'yes')
+
+# Source patterns understood by the route scanner - anything fancier makes
+# the blueprint fall back to a normal import
+_BLUEPRINT_RE = re.compile(
+    r"^(\w+)\s*=\s*Blueprint\(\s*['\"](\w+)['\"]\s*,\s*__name__\s*"
+    r"(?:,\s*url_prefix\s*=\s*['\"]([^'\"]*)['\"]\s*)?\)\s*$",
+    re.MULTILINE
+)
+_ROUTE_RE = re.compile(
+    r"^@(\w+)\.route\(\s*(['\"])(.+?)\2\s*(?:,\s*methods\s*=\s*\[([^\]]*)\]\s*)?\)\s*$"
+)
+_DEF_RE = re.compile(r"^(?:async\s+)?def\s+(\w+)\s*\(")
+
+
+class BlueprintSpec:
+    """Where a blueprint lives and whether it may be loaded on first use"""
+
+    def __init__(self, module, attr, lazy=False):
+        self.module = module
+        self.attr = attr
+        self.lazy = lazy
+
+
+class ImportReport:
+    """Per-blueprint import timings collected while the app boots"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.started_at = time.time()
+
+    def record(self, name, module, elapsed, modules_loaded, lazy=False, deferred=False):
+        elapsed_ms = elapsed * 1000.0
+        with self._lock:
+            self._entries[name] = {
+                'blueprint': name,
+                'module': module,
+                'import_ms': round(elapsed_ms, 3),
+                'modules_loaded': modules_loaded,
+                'lazy': lazy,
+                # Imported on first request instead of at boot
+                'deferred': deferred,
+                'loaded': not lazy or deferred,
+                'loaded_at': time.time() if not lazy or deferred else None
+            }
+        if IMPORT_BUDGET_MS and elapsed_ms > IMPORT_BUDGET_MS:
+            logger.warning(f"⚠️  Blueprint '{name}' took {elapsed_ms:.1f}ms to import "
+                           f"(budget {IMPORT_BUDGET_MS:.0f}ms, {modules_loaded} modules)")
+
+    def snapshot(self):
+        """JSON-serialisable report, slowest blueprint first"""
+        with self._lock:
+            entries = sorted((dict(entry) for entry in self._entries.values()),
+                             key=lambda entry: entry['import_ms'], reverse=True)
+        boot = [entry for entry in entries if not entry['deferred']]
+        return {
+            'lazy_mode': LAZY_BLUEPRINTS,
+            'budget_ms': IMPORT_BUDGET_MS or None,
+            'boot_import_ms': round(sum(entry['import_ms'] for entry in boot), 3),
+            'blueprints': entries
+        }
+
+    def format_table(self):
+        """Plain text table for the boot log"""
+        data = self.snapshot()
+        lines = [f"Blueprint import time at boot: {data['boot_import_ms']:.1f}ms"]
+        for entry in data['blueprints']:
+            state = 'deferred' if entry['deferred'] else ('lazy' if entry['lazy'] and not entry['loaded'] else 'boot')
+            lines.append(f"  {entry['import_ms']:9.1f}ms  {entry['modules_loaded']:4d} modules  "
+                         f"{state:8s}  {entry['blueprint']} ({entry['module']})")
+        return "\n".join(lines)
+
+
+# Process-wide report for the running app
+import_report = ImportReport()
+
+
+def _timed_import(module_name):
+    """Import a module, returning it with the time and module count it cost"""
+    before = len(sys.modules)
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    return module, time.perf_counter() - started, len(sys.modules) - before
+
+
+def lazy_enabled_for(name):
+    if LAZY_BLUEPRINTS in ('1', 'true', 'yes', 'all'):
+        return True
+    if LAZY_BLUEPRINTS in ('', '0', 'false', 'no'):
+        return False
+    return name in {part.strip() for part in LAZY_BLUEPRINTS.split(',')}
+
+
+def scan_routes(source, attr):
+    """
+    Read a route module's blueprint and URL rules without importing it.
+
+    Returns (name, url_prefix, [(rule, endpoint, methods)]) or None when
+    the module uses anything the scanner does not understand (hooks,
+    error handlers, extra route options), in which case it must be
+    imported normally.
+    """
+    blueprint = None
+    for match in _BLUEPRINT_RE.finditer(source):
+        if match.group(1) == attr:
+            blueprint = match
+    if blueprint is None:
+        return None
+
+    routes = []
+    pending = []
+    decorator_prefix = f"@{attr}."
+    for line in source.splitlines():
+        stripped = line.strip()
+        if line.startswith(decorator_prefix):
+            match = _ROUTE_RE.match(stripped)
+            if match is None or match.group(1) != attr:
+                return None  # before_request, errorhandler, route options...
+            methods = None
+            if match.group(4) is not None:
+                methods = [m.strip().strip('\'"') for m in match.group(4).split(',') if m.strip()]
+            pending.append((match.group(3), methods))
+        elif pending:
+            if stripped.startswith('@'):
+                continue  # decorators below the route wrap the view, which is what gets registered
+            definition = _DEF_RE.match(line)
+            if definition is None:
+                return None
+            for rule, methods in pending:
+                routes.append((rule, definition.group(1), methods))
+            pending = []
+        elif f"{attr}." in stripped and not stripped.startswith('#'):
+            return None  # blueprint configured imperatively
+
+    if pending:
+        return None
+    return blueprint.group(2), blueprint.group(3), routes
+
+
+class _LazyModule:
+    """Imports a route module once and resolves its view functions"""
+
+    def __init__(self, spec, name):
+        self.spec = spec
+        self.name = name
+        self._lock = threading.Lock()
+        self._views = None
+
+    def view(self, endpoint):
+        if self._views is None:
+            with self._lock:
+                if self._views is None:
+                    self._views = self._load()
+        return self._views[endpoint]
+
+    def _load(self):
+        module, elapsed, modules_loaded = _timed_import(self.spec.module)
+        import_report.record(self.name, self.spec.module, elapsed, modules_loaded,
+                             lazy=True, deferred=True)
+        logger.info(f"✅ Lazy blueprint '{self.name}' loaded on first use ({elapsed * 1000.0:.1f}ms)")
+
+        # Register the real blueprint on a scratch app to get exactly the view
+        # functions Flask would have bound
+        probe = Flask(f"lazy-{self.name}")
+        probe.register_blueprint(getattr(module, self.spec.attr))
+        prefix = f"{self.name}."
+        return {endpoint[len(prefix):]: view
+                for endpoint, view in probe.view_functions.items()
+                if endpoint.startswith(prefix)}
+
+
+class _LazyView:
+    """View placeholder that imports the real route module when first called"""
+
+    def __init__(self, loader, endpoint):
+        self.loader = loader
+        self.endpoint = endpoint
+        self.__name__ = endpoint
+
+    def __call__(self, **kwargs):
+        return self.loader.view(self.endpoint)(**kwargs)
+
+
+def _build_lazy_blueprint(spec):
+    """Stand-in blueprint with the scanned URL rules, or None if not deferred"""
+    try:
+        module_spec = importlib.util.find_spec(spec.module)
+        if module_spec is None or not module_spec.origin:
+            return None
+        with open(module_spec.origin, 'r', encoding='utf-8-sig') as f:
+            scanned = scan_routes(f.read(), spec.attr)
+    except Exception as e:
+        logger.warning(f"⚠️  Could not scan {spec.module} for lazy loading: {e}")
+        return None
+    if scanned is None:
+        logger.warning(f"⚠️  {spec.module} cannot be loaded lazily, importing it at boot")
+        return None
+
+    name, url_prefix, routes = scanned
+    if not lazy_enabled_for(name):
+        return None
+
+    loader = _LazyModule(spec, name)
+    blueprint = Blueprint(name, spec.module, url_prefix=url_prefix)
+    views = {}
+    for rule, endpoint, methods in routes:
+        view = views.get(endpoint)
+        if view is None:
+            view = views[endpoint] = _LazyView(loader, endpoint)
+        blueprint.add_url_rule(rule, endpoint=endpoint, view_func=view, methods=methods)
+    return blueprint
+
+
+def register_blueprints(app, specs):
+    """Import (or lazily stand in for) and register each blueprint, timing the imports"""
+    for spec in specs:
+        if spec.lazy and LAZY_BLUEPRINTS not in ('', '0', 'false', 'no'):
+            started = time.perf_counter()
+            blueprint = _build_lazy_blueprint(spec)
+            if blueprint is not None:
+                import_report.record(blueprint.name, spec.module, time.perf_counter() - started, 0, lazy=True)
+                app.register_blueprint(blueprint)
+                continue
+
+        module, elapsed, modules_loaded = _timed_import(spec.module)
+        blueprint = getattr(module, spec.attr)
+        import_report.record(blueprint.name, spec.module, elapsed, modules_loaded)
+        app.register_blueprint(blueprint)
+
+    if IMPORT_REPORT_ON_BOOT:
+        logger.info(import_report.format_table())
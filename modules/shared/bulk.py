@@ -0,0 +1,273 @@
+"""
+Bulk insert / upsert for the shared database layer
+Writes rows as multi-row INSERT statements in chunks - execute_values on
+PostgreSQL, multi-row VALUES on SQLite - instead of one round-trip per
+row, and reports which input rows were inserted, updated or skipped
+because their key already existed.
+"""
+
+import os
+import re
+import time
+import sqlite3
+import logging
+
+from .sql_translation import translate_query
+from .query_stats import query_stats, fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Tunables (environment overrides)
+BULK_CHUNK_SIZE = int(os.environ.get('DB_BULK_CHUNK_SIZE', '1000'))
+
+# SQLite's default SQLITE_MAX_VARIABLE_NUMBER since 3.32
+SQLITE_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32) else 999
+# INSERT ... RETURNING needs SQLite 3.35
+SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35)
+
+ON_CONFLICT_MODES = (None, 'error', 'ignore', 'update')
+
+_IDENTIFIER_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class BulkResult:
+    """Outcome of a bulk write, by input row position"""
+
+    def __init__(self, total):
+        self.total = total
+        self.inserted_rows = []
+        self.updated_rows = []
+        # Rows not written because their key already existed (in the table
+        # or earlier in the same input)
+        self.conflict_rows = []
+        # The part of conflict_rows the database rejected on another unique
+        # constraint (or a concurrent writer's key) - only known with RETURNING
+        self.constraint_rows = []
+        self.chunks = 0
+        self.elapsed_ms = 0.0
+
+    @property
+    def inserted(self):
+        return len(self.inserted_rows)
+
+    @property
+    def updated(self):
+        return len(self.updated_rows)
+
+    @property
+    def conflicts(self):
+        return len(self.conflict_rows)
+
+    def to_dict(self):
+        return {
+            'total': self.total,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'conflicts': self.conflicts,
+            'conflict_rows': list(self.conflict_rows),
+            'constraint_rows': list(self.constraint_rows),
+            'chunks': self.chunks,
+            'elapsed_ms': round(self.elapsed_ms, 3)
+        }
+
+
+def _check_identifier(name):
+    if not _IDENTIFIER_RE.match(name or ''):
+        raise ValueError(f"Invalid SQL identifier: {name!r}")
+    return name
+
+
+def _normalize_rows(rows, columns):
+    """Rows as tuples in column order; dict rows take their columns from the first row"""
+    rows = list(rows)
+    if not rows:
+        return list(columns or []), []
+    if isinstance(rows[0], dict):
+        columns = list(columns or rows[0].keys())
+        return columns, [tuple(row.get(column) for column in columns) for row in rows]
+    if not columns:
+        raise ValueError("columns are required when rows are sequences")
+    return list(columns), [tuple(row) for row in rows]
+
+
+def _key(values):
+    # Drivers may hand back a different type than was inserted (Decimal, int)
+    return tuple(None if value is None else str(value) for value in values)
+
+
+def _chunk_rows(column_count, db_type, chunk_size):
+    chunk_size = chunk_size or BULK_CHUNK_SIZE
+    if db_type != 'postgresql':
+        chunk_size = min(chunk_size, max(1, SQLITE_MAX_VARIABLES // max(1, column_count)))
+    return max(1, chunk_size)
+
+
+def _run(cursor, db_type, sql, params, values_sql=None, fetch=False):
+    """Execute one chunk statement, timed when query stats are enabled"""
+    started = time.perf_counter() if query_stats.enabled else None
+    if db_type == 'postgresql' and values_sql is not None:
+        from psycopg2.extras import execute_values
+        rows = execute_values(cursor, sql, params, template=values_sql,
+                              page_size=max(1, len(params)), fetch=fetch)
+    else:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall() if fetch else None
+    if started is not None:
+        query_stats.record(fingerprint(sql), time.perf_counter() - started, cursor.rowcount)
+    return rows
+
+
+def _existing_keys(cursor, db_type, table, key_columns, keys):
+    """Keys of `keys` already present in the table - one statement per chunk"""
+    placeholder = '%s' if db_type == 'postgresql' else '?'
+    if len(key_columns) == 1:
+        sql = (f"SELECT {key_columns[0]} FROM {table} "
+               f"WHERE {key_columns[0]} IN ({', '.join([placeholder] * len(keys))})")
+        params = [key[0] for key in keys]
+    else:
+        row = '(' + ', '.join([placeholder] * len(key_columns)) + ')'
+        sql = (f"SELECT {', '.join(key_columns)} FROM {table} "
+               f"WHERE ({', '.join(key_columns)}) IN (VALUES {', '.join([row] * len(keys))})")
+        params = [value for key in keys for value in key]
+    rows = _run(cursor, db_type, sql, params, fetch=True)
+    return {_key(row.values() if isinstance(row, dict) else tuple(row)) for row in rows}
+
+
+def bulk_insert(conn, db_type, table, rows, columns=None, on_conflict=None,
+                conflict_columns=None, update_columns=None, chunk_size=None):
+    """
+    Insert many rows with one multi-row statement per chunk.
+
+    Args:
+        conn: DB-API connection (psycopg2 or sqlite3, pooled or raw)
+        db_type: 'postgresql' or 'sqlite'
+        table: Target table
+        rows: List of dicts, or of sequences in `columns` order
+        columns: Column names (defaults to the first dict row's keys)
+        on_conflict: None/'error' - let the database raise on duplicates,
+                     'ignore' - skip rows whose conflict_columns key exists,
+                     'update' - overwrite update_columns of existing rows
+                     (needs a unique index on conflict_columns)
+        conflict_columns: Key identifying a row for 'ignore'/'update'
+        update_columns: Columns overwritten by 'update' (default: all
+                        non-key columns)
+        chunk_size: Rows per statement (DB_BULK_CHUNK_SIZE)
+
+    Does not commit. Returns a BulkResult.
+    """
+    if on_conflict not in ON_CONFLICT_MODES:
+        raise ValueError(f"on_conflict must be one of {ON_CONFLICT_MODES}")
+    if on_conflict in ('ignore', 'update') and not conflict_columns:
+        raise ValueError(f"on_conflict='{on_conflict}' requires conflict_columns")
+
+    started = time.perf_counter()
+    _check_identifier(table)
+    columns, values = _normalize_rows(rows, columns)
+    for column in columns:
+        _check_identifier(column)
+
+    result = BulkResult(len(values))
+    if not values:
+        return result
+
+    key_columns = [_check_identifier(column) for column in (conflict_columns or [])]
+    key_positions = [columns.index(column) for column in key_columns]
+    if on_conflict == 'update':
+        update_columns = [_check_identifier(column) for column in
+                          (update_columns or [c for c in columns if c not in key_columns])]
+        if not update_columns:
+            raise ValueError("on_conflict='update' needs at least one column to update")
+
+    # The single-row form resolves boolean columns for PostgreSQL once
+    placeholder = '?' if db_type != 'postgresql' else '%s'
+    row_sql = '(' + ', '.join([placeholder] * len(columns)) + ')'
+    compiled = translate_query(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})", db_type)
+
+    insert_sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+    if on_conflict == 'ignore':
+        conflict_sql = " ON CONFLICT DO NOTHING"
+    elif on_conflict == 'update':
+        assignments = ', '.join(f"{column} = excluded.{column}" for column in update_columns)
+        conflict_sql = f" ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {assignments}"
+    else:
+        conflict_sql = ""
+    returning_sql = ""
+    if on_conflict == 'ignore' and (db_type == 'postgresql' or SQLITE_HAS_RETURNING):
+        returning_sql = f" RETURNING {', '.join(key_columns)}"
+
+    last = {}
+    if on_conflict == 'update':
+        # Last occurrence of a key wins across every chunk, earlier ones are superseded
+        last = {_key(row[p] for p in key_positions): index for index, row in enumerate(values)}
+
+    cursor = conn.cursor()
+    seen = set()
+    try:
+        step = _chunk_rows(len(columns), db_type, chunk_size)
+        for start in range(0, len(values), step):
+            chunk = list(enumerate(values[start:start + step], start))
+            result.chunks += 1
+
+            if on_conflict in ('ignore', 'update'):
+                keys = [_key(row[p] for p in key_positions) for _, row in chunk]
+                existing = _existing_keys(cursor, db_type, table, key_columns,
+                                          [tuple(row[p] for p in key_positions) for _, row in chunk])
+                pending = []
+                if on_conflict == 'update':
+                    for (index, row), key in zip(chunk, keys):
+                        if last[key] != index:
+                            result.conflict_rows.append(index)
+                            continue
+                        (result.updated_rows if key in existing else result.inserted_rows).append(index)
+                        pending.append((index, row))
+                else:
+                    for (index, row), key in zip(chunk, keys):
+                        if key in existing or key in seen:
+                            result.conflict_rows.append(index)
+                            continue
+                        seen.add(key)
+                        pending.append((index, row))
+            else:
+                pending = chunk
+
+            if not pending:
+                continue
+
+            params = [compiled.convert_params(row) for _, row in pending]
+            if db_type == 'postgresql':
+                returned = _run(cursor, db_type, insert_sql + '%s' + conflict_sql + returning_sql,
+                                params, values_sql=row_sql, fetch=bool(returning_sql))
+            else:
+                returned = _run(cursor, db_type,
+                                insert_sql + ', '.join([row_sql] * len(params)) + conflict_sql + returning_sql,
+                                [value for row in params for value in row], fetch=bool(returning_sql))
+
+            if returning_sql:
+                # Rows skipped by another unique constraint or a concurrent writer
+                written = {_key(row.values() if isinstance(row, dict) else tuple(row)) for row in returned}
+                for index, row in pending:
+                    if _key(row[p] for p in key_positions) in written:
+                        result.inserted_rows.append(index)
+                    else:
+                        result.conflict_rows.append(index)
+                        result.constraint_rows.append(index)
+            elif on_conflict != 'update':
+                result.inserted_rows.extend(index for index, _ in pending)
+    finally:
+        cursor.close()
+
+    result.conflict_rows.sort()
+    result.constraint_rows.sort()
+    result.elapsed_ms = (time.perf_counter() - started) * 1000.0
+    logger.debug(f"✅ Bulk write into {table}: {result.inserted} inserted, {result.updated} updated, "
+                 f"{result.conflicts} conflicts in {result.chunks} chunks ({result.elapsed_ms:.1f}ms)")
+    return result
+
+
+def bulk_upsert(conn, db_type, table, rows, conflict_columns, update_columns=None,
+                columns=None, chunk_size=None):
+    """Insert rows, updating existing ones that share conflict_columns"""
+    return bulk_insert(conn, db_type, table, rows, columns=columns, on_conflict='update',
+                       conflict_columns=conflict_columns, update_columns=update_columns,
+                       chunk_size=chunk_size)
@@ -0,0 +1,106 @@
+"""
+Unit cost snapshots
+Each sold line stores its unit cost when it is sold, so COGS and profit
+reports add up a column of the rows they already read. They no longer
+join the product table, and a later cost-price update no longer changes
+margins that were already earned.
+
+Where the cost is stored:
+    bill_items.unit_cost, sales.unit_cost      retail bills (BillingService.create_bill)
+    erp_invoices.items[*].unit_cost            ERP invoice lines (JSON)
+    erp_invoices.cost_amount                   the invoice's total cost
+
+The migrations backfill rows written before snapshots existed, using
+the product's cost at migration time. That is the figure the reports
+showed until then.
+"""
+
+import json
+import logging
+
+from .database import table_columns
+
+logger = logging.getLogger(__name__)
+
+# (table, column, type) added by migration 0007
+SNAPSHOT_COLUMNS = (
+    ('bill_items', 'unit_cost', 'REAL'),
+    ('sales', 'unit_cost', 'REAL'),
+    ('erp_invoices', 'cost_amount', 'REAL'),
+)
+
+
+def add_columns(conn, db_type):
+    """Add the snapshot columns to the tables that exist and lack them"""
+    for table, column, sql_type in SNAPSHOT_COLUMNS:
+        columns = table_columns(conn, db_type, table)
+        if columns and column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}")
+
+
+def product_costs(conn, product_ids):
+    """{product id: current cost} for retail products, one query"""
+    product_ids = sorted({product_id for product_id in product_ids if product_id})
+    if not product_ids:
+        return {}
+    placeholders = ', '.join('?' for _ in product_ids)
+    rows = conn.execute(f"SELECT id, cost FROM products WHERE id IN ({placeholders})", product_ids).fetchall()
+    return {row['id']: float(row['cost'] or 0) for row in rows}
+
+
+def _erp_costs(cursor, user_id, product_ids):
+    product_ids = sorted({product_id for product_id in product_ids if product_id})
+    if not product_ids:
+        return {}
+    placeholders = ', '.join('?' for _ in product_ids)
+    cursor.execute(f"""
+        SELECT id, cost_price FROM erp_products
+        WHERE user_id = ? AND id IN ({placeholders})
+    """, [user_id, *product_ids])
+    return {row['id']: float(row['cost_price'] or 0) for row in cursor.fetchall()}
+
+
+def snapshot_invoice_items(cursor, user_id, items):
+    """
+    Stamp each ERP invoice line with its product's current cost_price
+    (unit_cost, 0 for lines without a known product) and return the
+    invoice's cost_amount. Costs sent by the client are not trusted.
+    """
+    costs = _erp_costs(cursor, user_id, (item.get('product_id') for item in items))
+    cost_amount = 0.0
+    for item in items:
+        item['unit_cost'] = costs.get(item.get('product_id'), 0.0)
+        cost_amount += item['unit_cost'] * float(item.get('quantity', 0) or 0)
+    return cost_amount
+
+
+def backfill(conn):
+    """Snapshot rows written before unit costs were stored, at today's cost"""
+    for table in ('bill_items', 'sales'):
+        conn.execute(f"""
+            UPDATE {table}
+            SET unit_cost = COALESCE((SELECT p.cost FROM products p WHERE p.id = {table}.product_id), 0)
+            WHERE unit_cost IS NULL
+        """)
+
+    # Invoice lines are JSON - priced here, one tenant's products at a time
+    invoices = conn.execute("SELECT id, user_id, items FROM erp_invoices WHERE cost_amount IS NULL").fetchall()
+    by_tenant = {}
+    for invoice in invoices:
+        items = invoice['items'] or []
+        if isinstance(items, str):
+            try:
+                items = json.loads(items)
+            except ValueError:
+                items = []
+        by_tenant.setdefault(invoice['user_id'], []).append((invoice['id'], items))
+
+    for user_id, tenant_invoices in by_tenant.items():
+        rows = conn.execute("SELECT id, cost_price FROM erp_products WHERE user_id = ?", (user_id,)).fetchall()
+        costs = {row['id']: float(row['cost_price'] or 0) for row in rows}
+        conn.executemany("UPDATE erp_invoices SET cost_amount = ? WHERE id = ?", [
+            (sum(costs.get(item.get('product_id'), 0.0) * float(item.get('quantity', 0) or 0)
+                 for item in items if isinstance(item, dict)), invoice_id)
+            for invoice_id, items in tenant_invoices
+        ])
+    logger.info(f"✅ Cost snapshots backfilled ({len(invoices)} ERP invoices)")
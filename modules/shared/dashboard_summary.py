@@ -0,0 +1,243 @@
+"""
+Dashboard summary from the base tables
+Today / last-7-days / month-to-date sales, orders and cash revenue in one
+conditional-aggregation pass over bills and one over cash payments, sent
+as a single statement, instead of a query per window and table. Every
+window is a half-open range on the raw timestamp column
+(created_at >= ? AND created_at < ?), never DATE(created_at) or
+strftime(), so the tenant index pack's (business_owner_id, created_at)
+and cash (processed_at) indexes apply and the same SQL runs on SQLite
+and PostgreSQL.
+
+Serves the dashboard when the daily rollup is off (SALES_ROLLUP_READS=false)
+and is what the rollup's window_totals() must agree with.
+
+    python -m modules.shared.dashboard_summary bench [--bills N] [--tenants N] [--runs N] [--db PATH]
+"""
+
+import os
+import sys
+import time
+import random
+import sqlite3
+import tempfile
+import argparse
+from datetime import datetime, timedelta
+import logging
+
+from .sales_rollup import utc_today
+
+logger = logging.getLogger(__name__)
+
+WINDOWS = ('today', 'week', 'month')
+
+# Cash is the only revenue method; kept literal in the SQL so the partial
+# idx_payments_cash_processed index matches
+REVENUE_METHOD = 'Cash'
+
+
+def window_starts(today=None):
+    """First day of each window, and the exclusive end shared by all of them"""
+    # UTC, like the DATE('now') windows this replaced
+    today = today or utc_today()
+    starts = {
+        'today': today,
+        'week': today - timedelta(days=7),
+        'month': today.replace(day=1),
+    }
+    return starts, today + timedelta(days=1)
+
+
+def _bound(day):
+    # 'YYYY-MM-DD' sorts before any timestamp on that day, as TEXT on
+    # SQLite and as a timestamp literal on PostgreSQL
+    return day.strftime('%Y-%m-%d')
+
+
+def _window_query(measures, table, timestamp, tenant_column, tenant_id, today, extra_where=''):
+    """One SELECT with a CASE column per (window, measure) over the widest window"""
+    starts, end = window_starts(today)
+    columns, params = [], []
+    for name in WINDOWS:
+        for alias, expression in measures:
+            columns.append(f"COALESCE(SUM(CASE WHEN {timestamp} >= ? THEN {expression} ELSE 0 END), 0) "
+                           f"AS {name}_{alias}")
+            params.append(_bound(starts[name]))
+    where = f"{timestamp} >= ? AND {timestamp} < ?{extra_where}"
+    params += [_bound(min(starts.values())), _bound(end)]
+    if tenant_id:
+        where += f" AND {tenant_column} = ?"
+        params.append(tenant_id)
+    return f"SELECT {', '.join(columns)} FROM {table} WHERE {where}", params
+
+
+def bills_query(tenant_id=None, today=None):
+    """Sales and order counts for every window from one pass over bills"""
+    return _window_query((('sales', 'total_amount'), ('orders', '1')), 'bills', 'created_at',
+                         'business_owner_id', tenant_id, today)
+
+
+def payments_query(tenant_id=None, today=None):
+    """Cash revenue for every window from one pass over payments"""
+    return _window_query((('revenue', 'p.amount'),), 'payments p JOIN bills b ON p.bill_id = b.id',
+                         'p.processed_at', 'b.business_owner_id', tenant_id, today,
+                         extra_where=f" AND p.method = '{REVENUE_METHOD}'")
+
+
+def summary_query(tenant_id=None, today=None):
+    """Both passes as one statement - a single round trip"""
+    bills_sql, bills_params = bills_query(tenant_id, today)
+    payments_sql, payments_params = payments_query(tenant_id, today)
+    return (f"SELECT * FROM ({bills_sql}) bills_windows CROSS JOIN ({payments_sql}) payments_windows",
+            bills_params + payments_params)
+
+
+def zero_summary():
+    return {name: {'sales': 0.0, 'revenue': 0.0, 'orders': 0} for name in WINDOWS}
+
+
+def window_summary(conn, tenant_id=None, today=None):
+    """
+    Dashboard tiles - {today, week, month} -> {sales, revenue, orders}.
+    Sales and orders count bills created in the window, revenue sums
+    cash payments processed in it. tenant_id None covers every tenant.
+    """
+    row = conn.execute(*summary_query(tenant_id, today)).fetchone()
+    return {
+        name: {
+            'sales': float(row[f'{name}_sales'] or 0),
+            'revenue': float(row[f'{name}_revenue'] or 0),
+            'orders': int(row[f'{name}_orders'] or 0)
+        }
+        for name in WINDOWS
+    }
+
+
+# ============================================================================
+# BENCHMARK - consolidated summary vs the previous query-per-window code
+# ============================================================================
+
+# The six statements _get_dashboard_summary ran before (SQLite only)
+LEGACY_QUERIES = [
+    """SELECT COALESCE(SUM(total_amount), 0) as today_sales, COUNT(*) as today_orders
+       FROM bills WHERE DATE(created_at) = DATE('now') AND business_owner_id = ?""",
+    """SELECT COALESCE(SUM(p.amount), 0) as today_revenue FROM payments p JOIN bills b ON p.bill_id = b.id
+       WHERE DATE(p.processed_at) = DATE('now') AND p.method = 'Cash' AND business_owner_id = ?""",
+    """SELECT COALESCE(SUM(total_amount), 0) as week_sales, COUNT(*) as week_orders
+       FROM bills WHERE created_at >= date('now', '-7 days') AND business_owner_id = ?""",
+    """SELECT COALESCE(SUM(p.amount), 0) as week_revenue FROM payments p JOIN bills b ON p.bill_id = b.id
+       WHERE p.processed_at >= date('now', '-7 days') AND p.method = 'Cash' AND business_owner_id = ?""",
+    """SELECT COALESCE(SUM(total_amount), 0) as month_sales, COUNT(*) as month_orders
+       FROM bills WHERE strftime('%Y-%m', created_at) = strftime('%Y-%m', 'now') AND business_owner_id = ?""",
+    """SELECT COALESCE(SUM(p.amount), 0) as month_revenue FROM payments p JOIN bills b ON p.bill_id = b.id
+       WHERE strftime('%Y-%m', p.processed_at) = strftime('%Y-%m', 'now')
+       AND p.method = 'Cash' AND business_owner_id = ?""",
+]
+
+_BENCH_INDEXES = ('idx_bills_owner_created', 'idx_payments_bill_processed', 'idx_payments_cash_processed')
+
+
+def _seed(path, bills, tenants, days):
+    """Synthetic bills (one payment each) spread over the last `days` days"""
+    from .index_pack import INDEX_PACK
+
+    raw = sqlite3.connect(path)
+    raw.executescript("""
+        CREATE TABLE bills (id TEXT PRIMARY KEY, business_owner_id TEXT, total_amount REAL,
+                            payment_method TEXT, created_at TIMESTAMP);
+        CREATE TABLE payments (id TEXT PRIMARY KEY, bill_id TEXT, method TEXT, amount REAL,
+                               processed_at TIMESTAMP);
+    """)
+    rng = random.Random(42)
+    now = datetime.now()
+    methods = ('Cash', 'Cash', 'upi', 'card')
+    batch_bills, batch_payments = [], []
+    for i in range(bills):
+        stamp = (now - timedelta(seconds=rng.randrange(days * 86400))).strftime('%Y-%m-%d %H:%M:%S')
+        method = rng.choice(methods)
+        amount = round(rng.uniform(10, 5000), 2)
+        batch_bills.append((f"b{i}", f"tenant-{i % tenants}", amount, method, stamp))
+        batch_payments.append((f"p{i}", f"b{i}", method, amount, stamp))
+        if len(batch_bills) == 50_000:
+            raw.executemany("INSERT INTO bills VALUES (?, ?, ?, ?, ?)", batch_bills)
+            raw.executemany("INSERT INTO payments VALUES (?, ?, ?, ?, ?)", batch_payments)
+            batch_bills, batch_payments = [], []
+    raw.executemany("INSERT INTO bills VALUES (?, ?, ?, ?, ?)", batch_bills)
+    raw.executemany("INSERT INTO payments VALUES (?, ?, ?, ?, ?)", batch_payments)
+    for spec in INDEX_PACK:
+        if spec.name in _BENCH_INDEXES:
+            raw.execute(spec.create_sql('sqlite'))
+    raw.commit()
+    raw.close()
+
+
+def _time(run, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    samples.sort()
+    return {'p50_ms': round(samples[len(samples) // 2], 2),
+            'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+            'max_ms': round(samples[-1], 2)}
+
+
+def bench(bills=1_000_000, tenants=50, days=120, runs=20, path=None):
+    """Time the legacy six-query summary against window_summary on a scratch SQLite file"""
+    from .database import EnterpriseConnectionWrapper
+
+    cleanup = path is None
+    if path is None:
+        handle, path = tempfile.mkstemp(suffix='.db', prefix='summary_bench_')
+        os.close(handle)
+        os.unlink(path)
+    if not os.path.exists(path):
+        started = time.perf_counter()
+        _seed(path, bills, tenants, days)
+        logger.info(f"🔧 Seeded {bills} bills in {time.perf_counter() - started:.1f}s ({path})")
+
+    conn = EnterpriseConnectionWrapper(sqlite3.connect(path), 'sqlite')
+    tenant = 'tenant-0'
+    try:
+        def legacy():
+            for sql in LEGACY_QUERIES:
+                conn.execute(sql, (tenant,)).fetchone()
+
+        consolidated = lambda: window_summary(conn, tenant)
+        legacy(), consolidated()  # warm the page cache for both
+        results = {
+            'bills': bills,
+            'tenants': tenants,
+            'round_trips': {'legacy_six_queries': len(LEGACY_QUERIES), 'window_summary': 1},
+            'legacy_six_queries': _time(legacy, runs),
+            'window_summary': _time(consolidated, runs),
+        }
+        results['speedup_p50'] = round(results['legacy_six_queries']['p50_ms'] /
+                                       max(results['window_summary']['p50_ms'], 0.001), 1)
+        return results
+    finally:
+        conn.close()
+        if cleanup:
+            os.unlink(path)
+
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(prog='python -m modules.shared.dashboard_summary')
+    parser.add_argument('command', choices=['bench'])
+    parser.add_argument('--bills', type=int, default=1_000_000)
+    parser.add_argument('--tenants', type=int, default=50)
+    parser.add_argument('--days', type=int, default=120)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--db', help='reuse/keep the seeded SQLite file at this path')
+    args = parser.parse_args(argv)
+
+    results = bench(args.bills, args.tenants, args.days, args.runs, args.db)
+    for key, value in results.items():
+        print(f"  {key}: {value}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -11,10 +11,18 @@ import os
 import json
 import sqlite3
 from urllib.parse import urlparse
-from sqlalchemy import create_engine, text, event
-from sqlalchemy.pool import NullPool, QueuePool
-from sqlalchemy.engine import Engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as SQLAlchemyTimeoutError
+from flask import g, has_request_context
 import logging
+import time
+
+from .sql_translation import translate_query, PROFILE_CONNECTION, PROFILE_CURSOR
+from .sqlite_pool import get_sqlite_engine_options, attach_sqlite_listeners
+from .pg_pool import get_postgres_engine_options, attach_postgres_listeners
+from .pool_metrics import pool_metrics
+from .query_stats import query_stats
+from . import bulk
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +42,22 @@ DB_PATH = os.path.join(BASE_DIR, 'billing.db')
 _engine = None
 _db_type = None
 
+# Reuse one pooled connection per Flask request (set to false to give
+# every get_db_connection() call its own pooled connection)
+REQUEST_SCOPED_CONNECTIONS = os.environ.get('DB_REQUEST_SCOPED_CONNECTIONS', 'true').lower() in ('1', 'true', 'yes')
+_REQUEST_CONNECTION_KEY = '_db_connection'
+
+# psycopg2.extensions.TRANSACTION_STATUS_INTRANS / _INERROR
+_PG_TRANSACTION_INTRANS = 2
+_PG_TRANSACTION_INERROR = 3
+
+# Statements that never make a handle the owner of the request's transaction
+_NON_WRITING_STATEMENTS = ('SELECT', 'WITH', 'PRAGMA', 'EXPLAIN', 'SHOW', 'SAVEPOINT', 'RELEASE',
+                           'ROLLBACK', 'COMMIT', 'END')
+
+# Rows fetched per round-trip by EnterpriseConnectionWrapper.stream()
+STREAM_BATCH_SIZE = int(os.environ.get('DB_STREAM_BATCH_SIZE', '500'))
+
 def get_database_url():
     """Get DATABASE_URL from environment variables (Supabase PostgreSQL)"""
     db_url = os.environ.get('DATABASE_URL')
@@ -70,19 +94,15 @@ def get_engine():
         # PostgreSQL with connection pooling
         logger.info(f"🔗 Creating PostgreSQL engine")
         
+        # Pool sizing, pre-ping strategy, recycle and checkout timeout
+        # come from DB_POOL_* environment variables (see pg_pool.py)
         _engine = create_engine(
             db_url,
-            poolclass=QueuePool,
-            pool_size=5,
-            max_overflow=10,
-            pool_pre_ping=True,  # Verify connections before using
-            pool_recycle=3600,   # Recycle connections after 1 hour
             echo=False,          # Set to True for SQL debugging
-            connect_args={
-                'sslmode': 'require',
-                'connect_timeout': 10
-            }
+            **get_postgres_engine_options()
         )
+        attach_postgres_listeners(_engine)
+        pool_metrics.attach(_engine)
         
         # Test connection
         try:
@@ -93,47 +113,108 @@ def get_engine():
             logger.error(f"❌ Failed to create PostgreSQL engine: {e}")
             raise
     else:
-        # SQLite fallback
-        logger.warning("⚠️  Using SQLite fallback (local development)")
+        # SQLite mode (local development and on-prem kiosk installs)
+        # Thread-affine pool keeps connections open across requests;
+        # WAL lets readers proceed while a writer holds the lock
+        logger.warning("⚠️  Using SQLite mode (pooled, WAL journal)")
         
         _engine = create_engine(
             f'sqlite:///{DB_PATH}',
-            poolclass=NullPool,  # SQLite doesn't need pooling
-            echo=False
+            echo=False,
+            **get_sqlite_engine_options()
         )
         
-        # Enable foreign keys for SQLite
-        @event.listens_for(Engine, "connect")
-        def set_sqlite_pragma(dbapi_conn, connection_record):
-            if isinstance(dbapi_conn, sqlite3.Connection):
-                cursor = dbapi_conn.cursor()
-                cursor.execute("PRAGMA foreign_keys=ON")
-                cursor.close()
+        # Foreign keys, WAL, synchronous=NORMAL, mmap and busy timeout
+        # are applied once per physical connection
+        attach_sqlite_listeners(_engine)
+        pool_metrics.attach(_engine)
     
     return _engine
 
+def _open_connection():
+    """Borrow a connection from the engine's pool"""
+    engine = get_engine()
+    
+    # Time the checkout so pool exhaustion shows up in the wait histogram
+    started = time.perf_counter()
+    try:
+        raw_conn = engine.raw_connection()
+    except SQLAlchemyTimeoutError:
+        pool_metrics.record_wait(time.perf_counter() - started, timed_out=True)
+        raise
+    pool_metrics.record_wait(time.perf_counter() - started)
+    
+    # Return wrapper for backward compatibility
+    return EnterpriseConnectionWrapper(raw_conn, get_db_type())
+
 def get_db_connection():
     """
     Get database connection - Enterprise-grade with SQLAlchemy
     Returns a wrapper that's compatible with existing code
+    
+    Inside a Flask request the first caller borrows a pooled connection
+    and binds it to flask.g; every later caller in the same request
+    (routes, services, helpers) gets a handle on that same connection.
+    Handles' close() is a no-op for the connection itself, it goes back
+    to the pool in teardown_appcontext (see release_request_connection).
+    
+    The handle whose write opens the transaction owns it: only its
+    commit()/rollback() end it. Other handles run inside a SAVEPOINT, so
+    their commit() keeps their work in the owner's transaction and their
+    rollback() undoes only their own statements.
+    
+    Only request contexts share: a background thread that pushes an app
+    context gets connections of its own.
     """
     try:
-        engine = get_engine()
-        raw_conn = engine.raw_connection()
+        if REQUEST_SCOPED_CONNECTIONS and has_request_context():
+            shared = g.get(_REQUEST_CONNECTION_KEY)
+            if shared is None:
+                shared = _open_connection()
+                setattr(g, _REQUEST_CONNECTION_KEY, shared)
+            return shared.borrow()
         
-        # Return wrapper for backward compatibility
-        return EnterpriseConnectionWrapper(raw_conn, get_db_type())
+        return _open_connection()
     except Exception as e:
         logger.error(f"Failed to establish database connection: {e}")
         raise
 
+def get_dedicated_connection():
+    """
+    Get a pooled connection of its own, even inside a request.
+    For work that must commit independently of the request's
+    transaction (caches, background jobs). The caller closes it.
+    """
+    return _open_connection()
+
+def release_request_connection(exception=None):
+    """Return the request's shared connection to the pool (teardown_appcontext)"""
+    shared = g.pop(_REQUEST_CONNECTION_KEY, None)
+    if shared is None:
+        return
+    
+    # Returning to the pool rolls back uncommitted work, as it did
+    # when each caller closed its own connection
+    shared.close()
+
+def init_app(app):
+    """Register request-scoped connection handling on the Flask app"""
+    app.teardown_appcontext(release_request_connection)
+
+
+def _dict_row_factory(cursor, row):
+    """SQLite rows as plain dicts (no sqlite3.Row -> dict copy)"""
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
 
 class CursorWrapper:
     """Wrapper for cursor to auto-convert queries"""
     
-    def __init__(self, conn, db_type):
+    def __init__(self, conn, db_type, handle=None):
         self.conn = conn
         self.db_type = db_type
+        # Connection handle that opened the cursor (transaction ownership on shared connections)
+        self._handle = handle
         
         # Get actual cursor
         if db_type == 'postgresql':
@@ -145,30 +226,39 @@ class CursorWrapper:
     
     def execute(self, query, params=()):
         """Execute with auto-conversion"""
-        # Convert ? to %s for PostgreSQL
-        if self.db_type == 'postgresql' and '?' in query:
-            converted_query = query.replace('?', '%s')
-        else:
-            converted_query = query
-        
-        # Boolean conversion in WHERE clauses
-        if self.db_type == 'postgresql':
-            import re
-            boolean_columns = [
-                'is_active', 'is_admin', 'is_super_admin', 'is_credit',
-                'low_stock_enabled', 'is_popular', 'used', 'force_password_change'
-            ]
-            for col in boolean_columns:
-                converted_query = re.sub(rf'\b{col}\s*=\s*1\b', f'{col} = TRUE', converted_query, flags=re.IGNORECASE)
-                converted_query = re.sub(rf'\b{col}\s*=\s*0\b', f'{col} = FALSE', converted_query, flags=re.IGNORECASE)
+        # Convert ? to %s and boolean WHERE clauses for PostgreSQL (cached per statement)
+        compiled = translate_query(query, self.db_type, PROFILE_CURSOR)
+        converted_query = compiled.sql
+        if self._handle is not None:
+            self._handle._before_statement(converted_query)
         
         # DO NOT convert params - let psycopg2 handle type inference
         # The automatic 1/0 to True/False conversion was causing numeric columns to receive booleans
         
-        result = self._cursor.execute(converted_query, params)
+        if query_stats.enabled:
+            started = time.perf_counter()
+            self._cursor.execute(converted_query, params)
+            query_stats.record(compiled.fingerprint, time.perf_counter() - started, self._cursor.rowcount)
+        else:
+            self._cursor.execute(converted_query, params)
         # For method chaining, return the cursor itself
         return self._cursor
     
+    def executemany(self, query, params_list):
+        """Execute many with the same cached conversion and timing as execute()"""
+        compiled = translate_query(query, self.db_type, PROFILE_CURSOR)
+        if self._handle is not None:
+            self._handle._before_statement(compiled.sql)
+        
+        if query_stats.enabled:
+            started = time.perf_counter()
+            self._cursor.executemany(compiled.sql, params_list)
+            query_stats.record(compiled.fingerprint, time.perf_counter() - started, self._cursor.rowcount,
+                               executemany=True)
+        else:
+            self._cursor.executemany(compiled.sql, params_list)
+        return self._cursor
+    
     def fetchone(self):
         return self._cursor.fetchone()
     
@@ -189,84 +279,121 @@ class EnterpriseConnectionWrapper:
     - Automatic query conversion (SQLite ? to PostgreSQL %s)
     - Transaction management
     - Connection pooling
+    - Request-scoped sharing (borrowed handles)
     - Error handling
     - Backward compatible with existing code
     """
     
-    def __init__(self, conn, db_type):
+    def __init__(self, conn, db_type, borrowed=False, shared=None):
         self.conn = conn
         self.db_type = db_type
         self._cursor = None
         self._in_transaction = False
+        # Borrowed handles share a request's connection and never close it
+        self._borrowed = borrowed
+        # The request's wrapper a borrowed handle came from, and the
+        # SAVEPOINT the handle works in while another handle owns the transaction
+        self._shared = shared
+        self._savepoint = None
+        # Request's wrapper only: the handle that owns the open transaction,
+        # and the handles holding savepoints inside it
+        self._owner = None
+        self._nested = []
+        self._savepoint_seq = 0
         
         # Disable autocommit for PostgreSQL to enable transactions
         if db_type == 'postgresql':
             try:
-                self.conn.autocommit = False
+                if self.conn.autocommit:
+                    self.conn.autocommit = False
             except Exception as e:
                 logger.warning(f"Could not set autocommit=False: {e}")
     
+    def borrow(self):
+        """Get a handle on this connection for a nested caller"""
+        self._recover_failed_transaction()
+        return EnterpriseConnectionWrapper(self.conn, self.db_type, borrowed=True, shared=self)
+    
+    def _recover_failed_transaction(self):
+        """Roll back a PostgreSQL transaction left aborted by an earlier caller"""
+        if self.db_type != 'postgresql':
+            return
+        try:
+            if self.conn.get_transaction_status() == _PG_TRANSACTION_INERROR:
+                self.conn.rollback()
+                (self._shared or self)._end_transaction()
+                logger.debug("⚠️  Rolled back aborted transaction on shared connection")
+        except Exception as e:
+            logger.warning(f"Could not check transaction status: {e}")
+    
+    def _transaction_open(self):
+        if self.db_type == 'postgresql':
+            return self.conn.get_transaction_status() in (_PG_TRANSACTION_INTRANS, _PG_TRANSACTION_INERROR)
+        return self.conn.in_transaction
+    
+    def _end_transaction(self):
+        """Request's wrapper: the transaction is over, with every savepoint in it"""
+        self._owner = None
+        for handle in self._nested:
+            handle._savepoint = None
+        self._nested = []
+    
+    def _transaction_owner(self):
+        """Handle owning the request's open transaction (None when none is open)"""
+        shared = self._shared
+        if shared._owner is not None and not self._transaction_open():
+            shared._end_transaction()
+        return shared._owner
+    
+    def _before_statement(self, sql):
+        """Borrowed handles: claim the transaction, or enter a savepoint inside another handle's"""
+        if not self._borrowed or self._shared is None:
+            return
+        owner = self._transaction_owner()
+        if owner is None:
+            words = sql.lstrip().split(None, 1)
+            if words and words[0].upper() not in _NON_WRITING_STATEMENTS:
+                self._shared._owner = self
+        elif owner is not self and self._savepoint is None:
+            shared = self._shared
+            shared._savepoint_seq += 1
+            name = f"borrowed_{shared._savepoint_seq}"
+            self._execute_control(f"SAVEPOINT {name}")
+            self._savepoint = name
+            shared._nested.append(self)
+    
+    def _execute_control(self, statement):
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(statement)
+        finally:
+            cursor.close()
+    
+    def _leave_savepoint(self, rollback):
+        """Release (or undo and release) this handle's savepoint"""
+        name, self._savepoint = self._savepoint, None
+        if name is None:
+            return
+        if self._shared is not None and self in self._shared._nested:
+            self._shared._nested.remove(self)
+        if rollback:
+            self._execute_control(f"ROLLBACK TO SAVEPOINT {name}")
+        self._execute_control(f"RELEASE SAVEPOINT {name}")
+    
+    def _nested_in_transaction(self):
+        """Borrowed handle working inside a transaction another handle owns"""
+        if not self._borrowed or self._shared is None:
+            return False
+        owner = self._transaction_owner()
+        return owner is not None and owner is not self
+    
     def execute(self, query, params=()):
         """Execute query with automatic placeholder conversion"""
         try:
-            # Convert SQLite ? placeholders to PostgreSQL %s if needed
-            if self.db_type == 'postgresql' and '?' in query:
-                # Count placeholders
-                placeholder_count = query.count('?')
-                # Replace with %s
-                converted_query = query.replace('?', '%s')
-                logger.debug(f"Converted query: {converted_query[:100]}...")
-            else:
-                converted_query = query
-            
-            # Convert SQLite transaction syntax to PostgreSQL
-            if self.db_type == 'postgresql':
-                if converted_query.strip().upper() == 'BEGIN TRANSACTION':
-                    converted_query = 'BEGIN'
-                
-                # Convert DATE() and TIME() functions to CAST for PostgreSQL
-                import re
-                # Replace DATE(column) with CAST(column AS DATE)
-                converted_query = re.sub(
-                    r'\bDATE\(([^)]+)\)',
-                    r'CAST(\1 AS DATE)',
-                    converted_query,
-                    flags=re.IGNORECASE
-                )
-                # Replace TIME(column) with CAST(column AS TIME)
-                converted_query = re.sub(
-                    r'\bTIME\(([^)]+)\)',
-                    r'CAST(\1 AS TIME)',
-                    converted_query,
-                    flags=re.IGNORECASE
-                )
-            
-            # PostgreSQL boolean fix: Convert = 1 to = TRUE and = 0 to = FALSE
-            if self.db_type == 'postgresql':
-                import re
-                # Replace boolean comparisons (be careful with numbers in other contexts)
-                # Match patterns like "column = 1" or "column = 0" where column is likely boolean
-                boolean_columns = [
-                    'is_active', 'is_admin', 'is_super_admin', 'is_credit', 
-                    'low_stock_enabled', 'is_popular', 'used', 'force_password_change',
-                    'autocommit', 'is_permanent', 'send_daily_report', 'is_system_role'
-                ]
-                
-                for col in boolean_columns:
-                    # Replace "column = 1" with "column = TRUE"
-                    converted_query = re.sub(
-                        rf'\b{col}\s*=\s*1\b', 
-                        f'{col} = TRUE', 
-                        converted_query, 
-                        flags=re.IGNORECASE
-                    )
-                    # Replace "column = 0" with "column = FALSE"
-                    converted_query = re.sub(
-                        rf'\b{col}\s*=\s*0\b', 
-                        f'{col} = FALSE', 
-                        converted_query, 
-                        flags=re.IGNORECASE
-                    )
+            # Translate to the target dialect once per distinct statement:
+            # ? -> %s, BEGIN TRANSACTION, DATE()/TIME() -> CAST, = 1/0 -> TRUE/FALSE
+            compiled = translate_query(query, self.db_type, PROFILE_CONNECTION)
+            converted_query = compiled.sql
             
             # Get cursor
             if self.db_type == 'postgresql':
@@ -277,48 +404,27 @@ class EnterpriseConnectionWrapper:
                 cursor.row_factory = sqlite3.Row
             
             # Smart parameter conversion for PostgreSQL
-            # Only convert 0/1 to True/False if the query contains boolean column names
-            if self.db_type == 'postgresql' and params:
-                # Check if query contains INSERT with boolean columns
-                query_upper = converted_query.upper()
-                has_boolean_columns = any(col.upper() in query_upper for col in [
-                    'IS_ACTIVE', 'IS_ADMIN', 'IS_SUPER_ADMIN', 'IS_CREDIT',
-                    'LOW_STOCK_ENABLED', 'IS_POPULAR', 'FORCE_PASSWORD_CHANGE',
-                    'SEND_DAILY_REPORT', 'IS_PERMANENT'
-                ])
-                
-                if has_boolean_columns and 'INSERT' in query_upper:
-                    # Extract column names from INSERT statement (handle multi-line)
-                    import re
-                    # Remove newlines and extra spaces for easier parsing
-                    clean_query = ' '.join(converted_query.split())
-                    match = re.search(r'INSERT\s+INTO\s+\w+\s*\((.*?)\)\s*VALUES', clean_query, re.IGNORECASE)
-                    if match:
-                        columns = [c.strip().lower() for c in match.group(1).split(',')]
-                        boolean_col_names = [
-                            'is_active', 'is_admin', 'is_super_admin', 'is_credit',
-                            'low_stock_enabled', 'is_popular', 'force_password_change',
-                            'send_daily_report', 'is_permanent', 'used', 'autocommit'
-                        ]
-                        
-                        # Convert params based on column position
-                        converted_params = []
-                        for i, param in enumerate(params):
-                            if i < len(columns) and columns[i] in boolean_col_names:
-                                # This is a boolean column - convert 0/1 to True/False
-                                if param == 1:
-                                    converted_params.append(True)
-                                elif param == 0:
-                                    converted_params.append(False)
-                                else:
-                                    converted_params.append(param)
-                            else:
-                                # Not a boolean column - keep as is
-                                converted_params.append(param)
-                        params = tuple(converted_params)
+            # Only convert 0/1 to True/False for boolean columns of an INSERT
+            # (column positions are resolved once and cached with the query)
+            if params:
+                params = compiled.convert_params(params)
+            
+            self._before_statement(converted_query)
             
-            # Execute query
-            cursor.execute(converted_query, params)
+            # A shared request connection may already be inside a transaction
+            # opened by an earlier caller - SQLite refuses a nested BEGIN
+            if (self._borrowed and self.db_type == 'sqlite' and self.conn.in_transaction
+                    and converted_query.strip().upper() in ('BEGIN', 'BEGIN TRANSACTION')):
+                self._cursor = cursor
+                return cursor
+            
+            # Execute query (timed when query stats are enabled)
+            if query_stats.enabled:
+                started = time.perf_counter()
+                cursor.execute(converted_query, params)
+                query_stats.record(compiled.fingerprint, time.perf_counter() - started, cursor.rowcount)
+            else:
+                cursor.execute(converted_query, params)
             self._cursor = cursor
             
             # Return the cursor for method chaining (fetchone, fetchall)
@@ -334,11 +440,10 @@ class EnterpriseConnectionWrapper:
     def executemany(self, query, params_list):
         """Execute query multiple times with different parameters"""
         try:
-            # Convert SQLite ? placeholders to PostgreSQL %s if needed
-            if self.db_type == 'postgresql' and '?' in query:
-                converted_query = query.replace('?', '%s')
-            else:
-                converted_query = query
+            # Same cached dialect translation as execute()
+            compiled = translate_query(query, self.db_type, PROFILE_CONNECTION)
+            converted_query = compiled.sql
+            self._before_statement(converted_query)
             
             # Get cursor
             if self.db_type == 'postgresql':
@@ -351,8 +456,14 @@ class EnterpriseConnectionWrapper:
             # DON'T convert params automatically - let PostgreSQL handle it
             # PostgreSQL accepts 0/1 for boolean columns automatically
             
-            # Execute many
-            cursor.executemany(converted_query, params_list)
+            # Execute many (timed when query stats are enabled)
+            if query_stats.enabled:
+                started = time.perf_counter()
+                cursor.executemany(converted_query, params_list)
+                query_stats.record(compiled.fingerprint, time.perf_counter() - started,
+                                   cursor.rowcount, executemany=True)
+            else:
+                cursor.executemany(converted_query, params_list)
             self._cursor = cursor
             
             # Return the cursor for method chaining
@@ -362,7 +473,72 @@ class EnterpriseConnectionWrapper:
             logger.error(f"❌ Executemany failed: {e}")
             logger.error(f"   Query: {query[:200]}...")
             raise
-    
+
+    def stream(self, query, params=(), batch_size=None):
+        """
+        Iterate over a large result set without materializing it.
+
+        PostgreSQL uses a named (server-side) cursor, SQLite a chunked
+        fetchmany; at most batch_size rows (DB_STREAM_BATCH_SIZE) are held
+        in memory at a time. Rows are dicts. The cursor is closed when the
+        iteration finishes or the generator is closed.
+        """
+        batch_size = batch_size or STREAM_BATCH_SIZE
+        compiled = translate_query(query, self.db_type, PROFILE_CONNECTION)
+        if params:
+            params = compiled.convert_params(params)
+        self._before_statement(compiled.sql)
+
+        if self.db_type == 'postgresql':
+            from psycopg2.extras import RealDictCursor
+            # Named cursors live inside the current transaction
+            cursor = self.conn.cursor(name=f"stream_{uuid.uuid4().hex}", cursor_factory=RealDictCursor)
+            cursor.itersize = batch_size
+        else:
+            cursor = self.conn.cursor()
+            cursor.row_factory = _dict_row_factory
+
+        started = time.perf_counter()
+        rows = 0
+        try:
+            cursor.execute(compiled.sql, params)
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                rows += len(batch)
+                yield from batch
+        except Exception as e:
+            logger.error(f"❌ Streaming query failed: {e}")
+            logger.error(f"   Query: {query[:200]}...")
+            raise
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+            if query_stats.enabled:
+                query_stats.record(compiled.fingerprint, time.perf_counter() - started, rows)
+
+    def bulk_insert(self, table, rows, columns=None, on_conflict=None, conflict_columns=None,
+                    update_columns=None, chunk_size=None):
+        """Insert many rows as chunked multi-row INSERTs (see modules.shared.bulk)"""
+        try:
+            self._before_statement('INSERT')
+            return bulk.bulk_insert(self.conn, self.db_type, table, rows, columns=columns,
+                                    on_conflict=on_conflict, conflict_columns=conflict_columns,
+                                    update_columns=update_columns, chunk_size=chunk_size)
+        except Exception as e:
+            logger.error(f"❌ Bulk insert into {table} failed: {e}")
+            raise
+
+    def bulk_upsert(self, table, rows, conflict_columns, update_columns=None, columns=None,
+                    chunk_size=None):
+        """Insert rows, updating the ones whose conflict_columns key already exists"""
+        return self.bulk_insert(table, rows, columns=columns, on_conflict='update',
+                                conflict_columns=conflict_columns, update_columns=update_columns,
+                                chunk_size=chunk_size)
+
     def fetchone(self):
         """Fetch one result"""
         if self._cursor:
@@ -378,20 +554,30 @@ class EnterpriseConnectionWrapper:
         return []
     
     def commit(self):
-        """Commit transaction"""
+        """Commit transaction (a nested handle's work stays in the owner's transaction)"""
         try:
+            if self._nested_in_transaction():
+                self._leave_savepoint(rollback=False)
+                return
             self.conn.commit()
             self._in_transaction = False
+            if self._shared is not None:
+                self._shared._end_transaction()
             logger.debug("✅ Transaction committed")
         except Exception as e:
             logger.error(f"❌ Commit failed: {e}")
             raise
     
     def rollback(self):
-        """Rollback transaction"""
+        """Rollback transaction (a nested handle undoes only its own statements)"""
         try:
+            if self._nested_in_transaction():
+                self._leave_savepoint(rollback=True)
+                return
             self.conn.rollback()
             self._in_transaction = False
+            if self._shared is not None:
+                self._shared._end_transaction()
             logger.debug("⚠️  Transaction rolled back")
         except Exception as e:
             logger.error(f"❌ Rollback failed: {e}")
@@ -402,6 +588,17 @@ class EnterpriseConnectionWrapper:
         try:
             if self._cursor:
                 self._cursor.close()
+                self._cursor = None
+            if self._borrowed:
+                # Shared request connection - released in teardown. Work this
+                # handle never committed is discarded, as when it closed its own connection
+                if self._savepoint is not None:
+                    self._leave_savepoint(rollback=True)
+                elif self._shared is not None and self._transaction_owner() is self:
+                    self.conn.rollback()
+                    self._shared._end_transaction()
+                self._recover_failed_transaction()
+                return
             self.conn.close()
             logger.debug("🔒 Connection closed")
         except Exception as e:
@@ -410,7 +607,7 @@ class EnterpriseConnectionWrapper:
     def cursor(self):
         """Get raw cursor for advanced operations - returns wrapped cursor"""
         # Return a cursor wrapper that auto-converts queries
-        return CursorWrapper(self.conn, self.db_type)
+        return CursorWrapper(self.conn, self.db_type, handle=self)
     
     @property
     def autocommit(self):
@@ -436,6 +633,17 @@ class EnterpriseConnectionWrapper:
         self.close()
         return False
 
+def table_columns(conn, db_type, table):
+    """Column names of a table (empty when it does not exist)"""
+    if db_type == 'postgresql':
+        rows = conn.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = ?
+        """, (table,)).fetchall()
+        return {row['column_name'] if hasattr(row, 'keys') else row[0] for row in rows}
+    rows = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    return {row['name'] if hasattr(row, 'keys') else row[1] for row in rows}
+
 def generate_id():
     return str(uuid.uuid4())
 
@@ -0,0 +1,267 @@
+"""
+Earnings summary from the base tables
+Realized revenue, COGS and pending (credit/partial) profit from two plain
+aggregates sent as one statement: one pass over the tenant's bills, one
+over their items. Paid and pending bills are split with CASE inside the
+aggregates instead of a correlated SUM(...) FROM bill_items subquery per
+bill, run once for paid and again for pending bills - no per-row
+subplans, no GROUP BY, and the planner is free to hash-join bill_items
+on PostgreSQL. Costs are the unit_cost snapshotted on each line at sale
+time (see cost_snapshot), so products is not joined at all.
+
+Date filters are half-open ranges on the raw column
+(created_at >= ? AND created_at < ?), not DATE(created_at) = ?, so the
+(business_owner_id, created_at) and (business_owner_id, sale_date)
+indexes apply and the same SQL runs on SQLite and PostgreSQL.
+
+    python -m modules.shared.earnings_summary bench [--bills N] [--tenants N] [--runs N] [--db PATH]
+"""
+
+import os
+import sys
+import time
+import random
+import sqlite3
+import tempfile
+import argparse
+from datetime import date, datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Credit and partial bills only count as profit once they are paid
+CREDIT_METHODS = "('credit', 'partial')"
+
+
+def _paid(alias=''):
+    return f"({alias}payment_method NOT IN {CREDIT_METHODS} OR {alias}payment_method IS NULL)"
+
+
+def _pending(alias=''):
+    return f"({alias}payment_method IN {CREDIT_METHODS} AND {alias}credit_balance > 0)"
+
+
+def date_range(date_filter, today=None):
+    """(first day, exclusive end) for a date_filter; None for an open side"""
+    today = today or date.today()
+    if date_filter == 'today':
+        return today, today + timedelta(days=1)
+    if date_filter == 'yesterday':
+        return today - timedelta(days=1), today
+    if date_filter == 'week':
+        return today - timedelta(days=7), None
+    if date_filter == 'month':
+        return today - timedelta(days=30), None
+    # 'all' and anything unrecognised: no date filter
+    return None, None
+
+
+def _where(owner_column, date_column, tenant_id, date_filter, today):
+    clauses, params = [], []
+    if tenant_id:
+        clauses.append(f"({owner_column} = ? OR {owner_column} IS NULL)")
+        params.append(tenant_id)
+    start, end = date_range(date_filter, today)
+    # 'YYYY-MM-DD' sorts before any timestamp on that day
+    if start:
+        clauses.append(f"{date_column} >= ?")
+        params.append(start.strftime('%Y-%m-%d'))
+    if end:
+        clauses.append(f"{date_column} < ?")
+        params.append(end.strftime('%Y-%m-%d'))
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def summary_query(tenant_id=None, date_filter='all', today=None):
+    """Realized revenue/cost and pending amount/profit - bills pass CROSS JOIN items pass"""
+    where, params = _where('b.business_owner_id', 'b.created_at', tenant_id, date_filter, today)
+    sql = f"""
+        SELECT * FROM (
+            SELECT
+                COUNT(CASE WHEN {_paid('b.')} THEN 1 END) AS transaction_count,
+                COALESCE(SUM(CASE WHEN {_paid('b.')} THEN b.total_amount END), 0) AS total_revenue,
+                COALESCE(SUM(CASE WHEN {_pending('b.')} THEN b.credit_balance END), 0) AS pending_amount
+            FROM bills b
+            {where}
+        ) bill_totals
+        CROSS JOIN (
+            SELECT
+                COALESCE(SUM(CASE WHEN {_paid('b.')} THEN COALESCE(bi.unit_cost, 0) * bi.quantity END), 0)
+                    AS total_cost,
+                COALESCE(SUM(CASE WHEN {_pending('b.')}
+                    THEN (bi.total_price - (COALESCE(bi.unit_cost, 0) * bi.quantity)) * (b.credit_balance / b.total_amount)
+                END), 0) AS pending_profit
+            FROM bills b
+            JOIN bill_items bi ON bi.bill_id = b.id
+            {where}
+        ) item_totals
+    """
+    return sql, params + params
+
+
+def product_earnings_query(tenant_id=None, date_filter='all', today=None):
+    """Per-product sales, cost and profit from sales, most profitable first"""
+    where, params = _where('s.business_owner_id', 's.sale_date', tenant_id, date_filter, today)
+    sql = f"""
+        SELECT
+            p.id as product_id,
+            p.name as product_name,
+            p.price as product_price,
+            p.cost as product_cost,
+            SUM(s.quantity) as total_quantity_sold,
+            COALESCE(SUM(s.total_price), 0) as total_sales,
+            COALESCE(SUM(COALESCE(s.unit_cost, 0) * s.quantity), 0) as total_cost,
+            COALESCE(SUM(s.total_price - (COALESCE(s.unit_cost, 0) * s.quantity)), 0) as total_profit,
+            CASE
+                WHEN SUM(s.total_price) > 0 THEN
+                    (SUM(s.total_price - (COALESCE(s.unit_cost, 0) * s.quantity)) / SUM(s.total_price)) * 100
+                ELSE 0
+            END as profit_margin
+        FROM sales s
+        LEFT JOIN products p ON s.product_id = p.id
+        {where}
+        GROUP BY p.id, p.name, p.price, p.cost
+        HAVING SUM(s.quantity) > 0
+        ORDER BY total_profit DESC
+    """
+    return sql, params
+
+
+# ============================================================================
+# BENCHMARK - summary_query vs the previous correlated subqueries
+# ============================================================================
+
+# The two statements get_earnings_summary ran before, for one tenant
+# ({date_condition} is empty or the old DATE(b.created_at) >= ? filter)
+LEGACY_QUERIES = [
+    """SELECT COUNT(DISTINCT b.id) as transaction_count,
+              COALESCE(SUM(b.total_amount), 0) as total_revenue,
+              COALESCE(SUM(
+                  (SELECT SUM(COALESCE(p.cost, 0) * bi.quantity)
+                   FROM bill_items bi LEFT JOIN products p ON bi.product_id = p.id
+                   WHERE bi.bill_id = b.id)
+              ), 0) as total_cost
+       FROM bills b
+       WHERE (b.business_owner_id = ? OR b.business_owner_id IS NULL){date_condition}
+       AND (b.payment_method NOT IN ('credit', 'partial') OR b.payment_method IS NULL)""",
+    """SELECT COALESCE(SUM(b.credit_balance), 0) as pending_amount,
+              COALESCE(SUM(
+                  (SELECT SUM((bi.total_price - (COALESCE(p.cost, 0) * bi.quantity)) * (b.credit_balance / b.total_amount))
+                   FROM bill_items bi LEFT JOIN products p ON bi.product_id = p.id
+                   WHERE bi.bill_id = b.id)
+              ), 0) as pending_profit
+       FROM bills b
+       WHERE (b.business_owner_id = ? OR b.business_owner_id IS NULL){date_condition}
+       AND b.payment_method IN ('credit', 'partial')
+       AND b.credit_balance > 0""",
+]
+
+_BENCH_INDEXES = ('idx_bills_owner_created', 'idx_bill_items_bill')
+
+
+def _seed(path, bills, tenants, products, days):
+    """Synthetic bills with 1-5 items each (cost snapshotted), a fifth of them on credit"""
+    from .index_pack import INDEX_PACK
+
+    raw = sqlite3.connect(path)
+    raw.executescript("""
+        CREATE TABLE products (id TEXT PRIMARY KEY, cost REAL);
+        CREATE TABLE bills (id TEXT PRIMARY KEY, business_owner_id TEXT, total_amount REAL,
+                            credit_balance REAL, payment_method TEXT, created_at TIMESTAMP);
+        CREATE TABLE bill_items (id TEXT PRIMARY KEY, bill_id TEXT, product_id TEXT,
+                                 quantity INTEGER, total_price REAL, unit_cost REAL);
+    """)
+    rng = random.Random(42)
+    costs = [round(rng.uniform(5, 500), 2) for _ in range(products)]
+    raw.executemany("INSERT INTO products VALUES (?, ?)", [(f"p{i}", cost) for i, cost in enumerate(costs)])
+    now = datetime.now()
+    methods = ('cash', 'cash', 'upi', 'card', 'credit')
+    batch_bills, batch_items = [], []
+    for i in range(bills):
+        stamp = (now - timedelta(seconds=rng.randrange(days * 86400))).strftime('%Y-%m-%d %H:%M:%S')
+        method = rng.choice(methods)
+        total = 0.0
+        for line in range(rng.randint(1, 5)):
+            quantity = rng.randint(1, 4)
+            price = round(rng.uniform(10, 800), 2) * quantity
+            total += price
+            product = rng.randrange(products)
+            batch_items.append((f"i{i}-{line}", f"b{i}", f"p{product}", quantity, price, costs[product]))
+        balance = round(total * rng.uniform(0.1, 1), 2) if method == 'credit' else 0
+        batch_bills.append((f"b{i}", f"tenant-{i % tenants}", round(total, 2), balance, method, stamp))
+        if len(batch_bills) == 50_000:
+            raw.executemany("INSERT INTO bills VALUES (?, ?, ?, ?, ?, ?)", batch_bills)
+            raw.executemany("INSERT INTO bill_items VALUES (?, ?, ?, ?, ?, ?)", batch_items)
+            batch_bills, batch_items = [], []
+    raw.executemany("INSERT INTO bills VALUES (?, ?, ?, ?, ?, ?)", batch_bills)
+    raw.executemany("INSERT INTO bill_items VALUES (?, ?, ?, ?, ?, ?)", batch_items)
+    for spec in INDEX_PACK:
+        if spec.name in _BENCH_INDEXES:
+            raw.execute(spec.create_sql('sqlite'))
+    raw.commit()
+    raw.close()
+
+
+def bench(bills=100_000, tenants=10, products=2_000, days=120, runs=10, path=None):
+    """Time the legacy correlated summary against summary_query on a scratch SQLite file"""
+    from .database import EnterpriseConnectionWrapper
+    from .dashboard_summary import _time
+
+    cleanup = path is None
+    if path is None:
+        handle, path = tempfile.mkstemp(suffix='.db', prefix='earnings_bench_')
+        os.close(handle)
+        os.unlink(path)
+    if not os.path.exists(path):
+        started = time.perf_counter()
+        _seed(path, bills, tenants, products, days)
+        logger.info(f"🔧 Seeded {bills} bills in {time.perf_counter() - started:.1f}s ({path})")
+
+    conn = EnterpriseConnectionWrapper(sqlite3.connect(path), 'sqlite')
+    tenant = 'tenant-0'
+    week_ago = (date.today() - timedelta(days=7)).strftime('%Y-%m-%d')
+    try:
+        results = {'bills': bills, 'tenants': tenants}
+        for date_filter, date_condition, date_params in (('all', '', ()),
+                                                         ('week', ' AND DATE(b.created_at) >= ?', (week_ago,))):
+            def legacy():
+                return [conn.execute(sql.format(date_condition=date_condition), (tenant, *date_params)).fetchone()
+                        for sql in LEGACY_QUERIES]
+
+            grouped = lambda: conn.execute(*summary_query(tenant, date_filter)).fetchone()
+            old, new = legacy(), grouped()  # also warms the page cache for both
+            legacy_ms, grouped_ms = _time(legacy, runs), _time(grouped, runs)
+            results[date_filter] = {
+                'same_totals': all(abs(float(row[column] or 0) - float(new[column] or 0)) < 0.01
+                                   for row in old for column in row.keys()),
+                'legacy_correlated': legacy_ms,
+                'summary_query': grouped_ms,
+                'speedup_p50': round(legacy_ms['p50_ms'] / max(grouped_ms['p50_ms'], 0.001), 1),
+            }
+        return results
+    finally:
+        conn.close()
+        if cleanup:
+            os.unlink(path)
+
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(prog='python -m modules.shared.earnings_summary')
+    parser.add_argument('command', choices=['bench'])
+    parser.add_argument('--bills', type=int, default=100_000)
+    parser.add_argument('--tenants', type=int, default=10)
+    parser.add_argument('--products', type=int, default=2_000)
+    parser.add_argument('--days', type=int, default=120)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--db', help='reuse/keep the seeded SQLite file at this path')
+    args = parser.parse_args(argv)
+
+    results = bench(args.bills, args.tenants, args.products, args.days, args.runs, args.db)
+    for key, value in results.items():
+        print(f"  {key}: {value}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,329 @@
+"""
+Streaming report exports (CSV / XLSX)
+Any registered row source is written straight from the database cursor
+(EnterpriseConnectionWrapper.stream()) to the response, so an export's
+memory is bounded by the DB batch size and the output buffer no matter
+how many rows it has.
+
+    csv   - chunked HTTP response, written row by row as rows arrive
+    xlsx  - openpyxl write-only workbook (rows are not kept in memory),
+            spooled to disk and sent in chunks; needs the openpyxl package
+
+Finished exports are kept in EXPORT_CACHE_DIR under a hash of (tenant,
+export, params, format) plus the tenant's result-cache generation, so a
+write that invalidates the dashboards also retires its exports. A repeat
+request within EXPORT_CACHE_TTL is served from the file, with ETag and
+Range support - an interrupted download resumes instead of re-running
+the query.
+
+    exports.register('credit.bills', rows, columns=[...])
+    return exports.export_response('credit.bills')
+"""
+
+import io
+import os
+import csv
+import json
+import time
+import uuid
+import hashlib
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+from flask import Response, request, jsonify, send_file, stream_with_context
+import logging
+
+from .streaming import primed, OUTPUT_BUFFER_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Tunables (environment overrides)
+EXPORT_CACHE_DIR = os.environ.get('EXPORT_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'bizpulse_exports')
+EXPORT_CACHE_TTL = float(os.environ.get('EXPORT_CACHE_TTL', '300'))  # seconds, 0 = off
+
+KEY_VERSION = 'v1'
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+FORMAT_ALIASES = {'excel': 'xlsx', 'xls': 'xlsx'}
+
+# Query-string arguments that pick the output, not the rows
+_OUTPUT_ARGS = ('format',)
+
+
+class ExportError(ValueError):
+    """An export request that cannot be served (status says why)"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class ExportSpec:
+    """A named row source: rows(conn, tenant_id, params) -> iterable of dicts"""
+
+    def __init__(self, name, rows, columns=None, filename=None):
+        self.name = name
+        self.rows = rows
+        # Output column order; None takes the first row's keys
+        self.columns = list(columns) if columns else None
+        self.filename = filename or name.replace('.', '_')
+
+
+_registry = {}
+
+
+def register(name, rows, columns=None, filename=None):
+    """Make a row source exportable under `name`"""
+    _registry[name] = ExportSpec(name, rows, columns, filename)
+    return rows
+
+
+def get_spec(name):
+    return _registry.get(name)
+
+
+def registered():
+    return sorted(_registry)
+
+
+def normalize_format(value):
+    value = (value or 'csv').strip().lower()
+    value = FORMAT_ALIASES.get(value, value)
+    if value not in FORMATS:
+        raise ExportError(f"Unsupported export format '{value}' (use csv or xlsx)")
+    if value == 'xlsx':
+        try:
+            import openpyxl  # noqa: F401 - optional dependency, only needed for XLSX
+        except ImportError:
+            raise ExportError('XLSX export needs the openpyxl package - use format=csv', status=501)
+    return value
+
+
+def export_key(name, tenant_id, params, fmt, generation=None):
+    """Stable hash of everything that decides an export's bytes"""
+    payload = json.dumps([KEY_VERSION, name, tenant_id or '', sorted(params.items()), fmt, generation],
+                         separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, str) and value[:1] in ('=', '+', '@'):
+        # Keep spreadsheet apps from evaluating user text as a formula
+        return "'" + value
+    return value
+
+
+def iter_csv(rows, columns=None):
+    """Yield UTF-8 CSV bytes (with a BOM, for Excel) one row at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text.encode('utf-8')
+
+    buffer.write('\ufeff')
+    header_written = False
+    for row in rows:
+        if not header_written:
+            columns = columns or list(row.keys())
+            writer.writerow(columns)
+            header_written = True
+        writer.writerow([_cell(row.get(column)) for column in columns])
+        yield flush()
+    if not header_written and columns:
+        writer.writerow(columns)
+    yield flush()
+
+
+def write_xlsx(rows, path, columns=None, title='Export'):
+    """Write rows to an XLSX file through a write-only (streaming) workbook"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title[:31])
+    header_written = False
+    for row in rows:
+        if not header_written:
+            columns = columns or list(row.keys())
+            sheet.append(columns)
+            header_written = True
+        sheet.append([_xlsx_cell(row.get(column)) for column in columns])
+    if not header_written and columns:
+        sheet.append(columns)
+    workbook.save(path)
+
+
+def _xlsx_cell(value):
+    value = _cell(value)
+    if value == '' or isinstance(value, (int, float, datetime, date)):
+        return value
+    return str(value)
+
+
+def _chunks(parts, size=OUTPUT_BUFFER_SIZE):
+    """Regroup small byte parts into chunks of about `size` bytes"""
+    buffer, buffered = [], 0
+    for part in parts:
+        buffer.append(part)
+        buffered += len(part)
+        if buffered >= size:
+            yield b''.join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _cache_path(key, ext):
+    return os.path.join(EXPORT_CACHE_DIR, f"{key}.{ext}")
+
+
+def _cached_file(key, ext):
+    if EXPORT_CACHE_TTL <= 0:
+        return None
+    path = _cache_path(key, ext)
+    try:
+        if time.time() - os.path.getmtime(path) < EXPORT_CACHE_TTL:
+            return path
+    except OSError:
+        pass
+    return None
+
+
+def _spool_path(key, ext):
+    """Private temp file next to the cache entry; replaced into place when done"""
+    os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+    return os.path.join(EXPORT_CACHE_DIR, f"{key}.{uuid.uuid4().hex}.{ext}.part")
+
+
+def purge_expired(now=None):
+    """Delete cached exports older than EXPORT_CACHE_TTL (and stale spool files)"""
+    now = now or time.time()
+    removed = 0
+    try:
+        names = os.listdir(EXPORT_CACHE_DIR)
+    except OSError:
+        return 0
+    for name in names:
+        path = os.path.join(EXPORT_CACHE_DIR, name)
+        try:
+            if now - os.path.getmtime(path) >= max(EXPORT_CACHE_TTL, 3600 if name.endswith('.part') else 0):
+                os.unlink(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def _teed(chunks, key, ext):
+    """Pass chunks through, keeping a copy that becomes the cache entry if the export completes"""
+    if EXPORT_CACHE_TTL <= 0:
+        yield from chunks
+        return
+    try:
+        spool = _spool_path(key, ext)
+        handle = open(spool, 'wb')
+    except OSError as e:
+        logger.warning(f"⚠️ Export cache not writable ({EXPORT_CACHE_DIR}): {e}")
+        yield from chunks
+        return
+    completed = False
+    try:
+        for chunk in chunks:
+            handle.write(chunk)
+            yield chunk
+        completed = True
+    finally:
+        handle.close()
+        if completed:
+            os.replace(spool, _cache_path(key, ext))
+        else:
+            os.unlink(spool)
+
+
+def _download_name(spec, ext):
+    return f"{spec.filename}_{datetime.now().strftime('%Y%m%d')}.{ext}"
+
+
+def _send_cached(path, spec, fmt, key, hit):
+    mimetype, ext = FORMATS[fmt]
+    response = send_file(path, mimetype=mimetype, as_attachment=True,
+                         download_name=_download_name(spec, ext), conditional=True,
+                         etag=key, max_age=0)
+    response.headers['X-Export-Cache'] = 'hit' if hit else 'miss'
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def stream_export(name, fmt='csv', params=None, tenant_id=None):
+    """
+    Response for an export; raises ExportError for unknown exports and
+    formats. The query runs before the response starts, so its errors
+    still raise here.
+    """
+    from . import result_cache
+    from .database import get_db_connection, get_current_client_id
+
+    spec = get_spec(name)
+    if spec is None:
+        raise ExportError(f"Unknown export '{name}'", status=404)
+    fmt = normalize_format(fmt)
+    params = {key: value for key, value in (params or {}).items() if key not in _OUTPUT_ARGS}
+    tenant_id = tenant_id if tenant_id is not None else get_current_client_id()
+    key = export_key(name, tenant_id, params, fmt, result_cache.result_cache.generation(tenant_id))
+    mimetype, ext = FORMATS[fmt]
+
+    cached = _cached_file(key, ext)
+    if cached:
+        return _send_cached(cached, spec, fmt, key, hit=True)
+    purge_expired()
+
+    conn = get_db_connection()
+    rows = primed(spec.rows(conn, tenant_id, params), on_close=conn.close)
+
+    if fmt == 'xlsx':
+        # A zip needs its directory at the end - build the file, then send it
+        spool = _spool_path(key, ext)
+        try:
+            write_xlsx(rows, spool, spec.columns, title=spec.filename)
+        except Exception:
+            if os.path.exists(spool):
+                os.unlink(spool)
+            raise
+        finally:
+            rows.close()
+        path = _cache_path(key, ext)
+        os.replace(spool, path)
+        return _send_cached(path, spec, fmt, key, hit=False)
+
+    body = _teed(_chunks(iter_csv(rows, spec.columns)), key, ext)
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={_download_name(spec, ext)}',
+        'ETag': f'"{key}"',
+        'Cache-Control': 'private, no-cache',
+        'X-Export-Cache': 'miss',
+    })
+
+
+def export_response(name, fmt=None, params=None):
+    """stream_export() for the current request, with errors as JSON"""
+    try:
+        if fmt is None:
+            fmt = request.args.get('format', 'csv')
+        if params is None:
+            params = request.args.to_dict()
+        return stream_export(name, fmt, params)
+    except ExportError as e:
+        return jsonify({'success': False, 'error': str(e)}), e.status
+    except Exception as e:
+        logger.error(f"❌ Export {name} failed: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
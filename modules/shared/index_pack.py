@@ -0,0 +1,387 @@
+"""
+Tenant index pack
+Composite and partial indexes for the multi-tenant hot paths - every
+dashboard, report and stock query filters on business_owner_id / user_id
+first, then a date or status - plus an EXPLAIN check that each of those
+queries is actually answered from an index.
+
+Indexes are only created when every column they need exists, since the
+tables have drifted between init paths (e.g. stock_transactions has no
+business_owner_id on databases created by the baseline migration).
+
+    python -m modules.shared.index_pack status    # which pack indexes exist
+    python -m modules.shared.index_pack apply     # create missing indexes
+    python -m modules.shared.index_pack verify    # EXPLAIN the hot queries
+    python -m modules.shared.index_pack drop      # remove the pack
+"""
+
+import re
+import sys
+import json
+import logging
+
+from .database import get_db_connection, get_db_type, table_columns
+from .sql_translation import translate_query
+from . import dashboard_summary
+
+logger = logging.getLogger(__name__)
+
+
+class IndexSpec:
+    """One managed index; `where` makes it a partial index"""
+
+    def __init__(self, name, table, columns, where=None, where_columns=()):
+        self.name = name
+        self.table = table
+        self.columns = tuple(columns)
+        # SQLite form - translated for PostgreSQL like any other statement
+        self.where = where
+        self.where_columns = tuple(where_columns)
+
+    @property
+    def required_columns(self):
+        return set(self.columns) | set(self.where_columns)
+
+    def create_sql(self, db_type, concurrently=False):
+        sql = (f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS "
+               f"{self.name} ON {self.table} ({', '.join(self.columns)})")
+        if self.where:
+            sql += f" WHERE {self.where}"
+        return translate_query(sql, db_type).sql
+
+    def to_dict(self):
+        return {'name': self.name, 'table': self.table, 'columns': list(self.columns), 'where': self.where}
+
+
+INDEX_PACK = [
+    # Dashboard tiles and daily/customer/payment-method reports
+    IndexSpec('idx_bills_owner_created', 'bills', ('business_owner_id', 'created_at')),
+    IndexSpec('idx_bills_owner_method_created', 'bills', ('business_owner_id', 'payment_method', 'created_at')),
+    # Outstanding credit report - only open credit bills are indexed
+    IndexSpec('idx_bills_owner_open_credit', 'bills', ('business_owner_id', 'credit_balance'),
+              where='is_credit = 1 AND credit_balance > 0', where_columns=('is_credit',)),
+
+    # Inventory lists and stock reports
+    IndexSpec('idx_products_user_active_stock', 'products', ('user_id', 'is_active', 'stock')),
+    IndexSpec('idx_products_owner_stock', 'products', ('business_owner_id', 'stock')),
+
+    # Sales reports
+    IndexSpec('idx_sales_owner_date', 'sales', ('business_owner_id', 'sale_date')),
+    IndexSpec('idx_sales_owner_product', 'sales', ('business_owner_id', 'product_name')),
+
+    # payments has no tenant column - it is reached through bills
+    IndexSpec('idx_payments_bill_processed', 'payments', ('bill_id', 'processed_at')),
+    IndexSpec('idx_payments_cash_processed', 'payments', ('processed_at',),
+              where="method = 'Cash'", where_columns=('method',)),
+
+    # Stock history
+    IndexSpec('idx_stock_tx_owner_product_created', 'stock_transactions',
+              ('business_owner_id', 'product_id', 'created_at'),
+              where='is_active = 1', where_columns=('is_active',)),
+    IndexSpec('idx_stock_tx_owner_created', 'stock_transactions', ('business_owner_id', 'created_at'),
+              where='is_active = 1', where_columns=('is_active',)),
+    IndexSpec('idx_stock_tx_product_created', 'stock_transactions', ('product_id', 'created_at')),
+
+    # Child rows looked up by their bill
+    IndexSpec('idx_bill_items_bill', 'bill_items', ('bill_id',)),
+    IndexSpec('idx_credit_tx_bill_created', 'credit_transactions', ('bill_id', 'created_at')),
+]
+
+
+class HotQuery:
+    """A representative statement from a hot path, in the SQLite dialect the code uses"""
+
+    def __init__(self, name, source, sql, params):
+        self.name = name
+        self.source = source
+        self.sql = sql
+        self.params = tuple(params)
+
+
+_TENANT = 'index-pack-verify'
+
+HOT_QUERIES = [
+    HotQuery('dashboard.summary_bills', 'modules/shared/dashboard_summary.py',
+             *dashboard_summary.bills_query(_TENANT)),
+    HotQuery('dashboard.summary_cash_payments', 'modules/shared/dashboard_summary.py',
+             *dashboard_summary.payments_query(_TENANT)),
+    HotQuery('reports.daily_sales', 'modules/reports/routes.py', """
+        SELECT DATE(created_at) as date, COUNT(*) as total_bills, SUM(total_amount) as total_revenue
+        FROM bills WHERE 1=1 AND (business_owner_id = ? OR business_owner_id IS NULL)
+        GROUP BY DATE(created_at) ORDER BY date DESC LIMIT 30
+    """, [_TENANT]),
+    HotQuery('reports.payment_methods', 'modules/reports/routes.py', """
+        SELECT payment_method, COUNT(*) as transaction_count, SUM(total_amount) as total_amount
+        FROM bills WHERE 1=1 AND (business_owner_id = ? OR business_owner_id IS NULL)
+        GROUP BY payment_method ORDER BY total_amount DESC
+    """, [_TENANT]),
+    HotQuery('reports.product_sales', 'modules/reports/routes.py', """
+        SELECT product_name, SUM(quantity) as total_quantity, SUM(total_price) as total_revenue
+        FROM sales WHERE 1=1 AND (business_owner_id = ? OR business_owner_id IS NULL)
+        GROUP BY product_name ORDER BY total_revenue DESC
+    """, [_TENANT]),
+    HotQuery('reports.out_of_stock', 'modules/reports/routes.py', """
+        SELECT name, category, unit FROM products
+        WHERE stock = 0 AND (business_owner_id = ? OR business_owner_id IS NULL)
+        ORDER BY name
+    """, [_TENANT]),
+    HotQuery('reports.outstanding_credit', 'modules/reports/routes.py', """
+        SELECT bill_number, customer_name, credit_balance as outstanding FROM bills
+        WHERE is_credit = 1 AND credit_balance > 0
+        AND (business_owner_id = ? OR business_owner_id IS NULL)
+        ORDER BY credit_balance DESC
+    """, [_TENANT]),
+    HotQuery('reports.credit_payment_history', 'modules/reports/routes.py', """
+        SELECT b.bill_number, ct.amount as payment_amount, ct.created_at as payment_date
+        FROM bills b
+        LEFT JOIN credit_transactions ct ON b.id = ct.bill_id AND ct.transaction_type = 'payment'
+        WHERE b.is_credit = 1 AND (b.business_owner_id = ? OR b.business_owner_id IS NULL)
+        ORDER BY b.bill_number, ct.created_at ASC
+    """, [_TENANT]),
+    HotQuery('stock.product_history', 'modules/stock/service.py', """
+        SELECT st.*, p.name as product_name
+        FROM stock_transactions st LEFT JOIN products p ON st.product_id = p.id
+        WHERE st.product_id = ? AND st.business_owner_id = ? AND st.is_active = 1
+        ORDER BY st.created_at DESC LIMIT ?
+    """, ['index-pack-product', _TENANT, 50]),
+    HotQuery('stock.history', 'modules/stock/service.py', """
+        SELECT st.*, p.name as product_name
+        FROM stock_transactions st LEFT JOIN products p ON st.product_id = p.id
+        WHERE st.business_owner_id = ? AND st.is_active = 1
+        ORDER BY st.created_at DESC LIMIT ?
+    """, [_TENANT, 50]),
+    HotQuery('stock.active_products', 'modules/stock/service.py', """
+        SELECT p.id, p.name, p.min_stock, p.stock FROM products p
+        WHERE p.user_id = ? AND p.is_active = 1 ORDER BY p.name
+    """, [_TENANT]),
+]
+
+
+def _row_value(row, key, position):
+    return row[key] if hasattr(row, 'keys') else row[position]
+
+
+def _existing_indexes(conn, db_type):
+    if db_type == 'postgresql':
+        rows = conn.execute(
+            "SELECT indexname AS name FROM pg_indexes WHERE schemaname = current_schema()").fetchall()
+    else:
+        rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()
+    return {_row_value(row, 'name', 0) for row in rows}
+
+
+def index_status(conn=None):
+    """State of each pack index: present, missing, or unsupported by this schema"""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    try:
+        db_type = get_db_type()
+        existing = _existing_indexes(conn, db_type)
+        columns = {}
+        status = []
+        for spec in INDEX_PACK:
+            if spec.table not in columns:
+                columns[spec.table] = table_columns(conn, db_type, spec.table)
+            missing = sorted(spec.required_columns - columns[spec.table])
+            if spec.name in existing:
+                state = 'present'
+            elif not columns[spec.table]:
+                state = 'no_table'
+            elif missing:
+                state = 'missing_columns'
+            else:
+                state = 'missing'
+            status.append({**spec.to_dict(), 'state': state, 'missing_columns': missing})
+        return status
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def apply_index_pack(conn=None, concurrently=False):
+    """
+    Create every pack index the schema supports.
+
+    concurrently uses CREATE INDEX CONCURRENTLY on PostgreSQL so a live
+    table is not write-locked while it builds (runs in autocommit).
+    Returns the names of the indexes created.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    db_type = get_db_type()
+    concurrently = concurrently and db_type == 'postgresql'
+    created = []
+    try:
+        if concurrently:
+            conn.commit()
+            conn.autocommit = True
+        for entry in index_status(conn):
+            if entry['state'] != 'missing':
+                if entry['state'] in ('no_table', 'missing_columns'):
+                    logger.info(f"⚠️  Skipping {entry['name']}: {entry['table']} lacks "
+                                f"{', '.join(entry['missing_columns']) or 'the table'}")
+                continue
+            spec = next(s for s in INDEX_PACK if s.name == entry['name'])
+            try:
+                conn.execute(spec.create_sql(db_type, concurrently))
+                if not concurrently:
+                    conn.commit()
+                created.append(spec.name)
+                logger.info(f"✅ Created index {spec.name} on {spec.table}({', '.join(spec.columns)})")
+            except Exception as e:
+                # A column of the wrong type for the partial predicate, etc.
+                if not concurrently:
+                    conn.rollback()
+                logger.warning(f"⚠️  Could not create index {spec.name}: {e}")
+
+        # Fresh statistics so the planner costs the new indexes. Not on
+        # SQLite - stats gathered from a near-empty new database would make
+        # the planner ignore the indexes once real data arrives
+        if db_type == 'postgresql':
+            for table in sorted({s.table for s in INDEX_PACK if s.name in created}):
+                conn.execute(f"ANALYZE {table}")
+        if not concurrently:
+            conn.commit()
+        return created
+    finally:
+        if concurrently:
+            conn.autocommit = False
+        if own_conn:
+            conn.close()
+
+
+def drop_index_pack(conn=None):
+    """Remove every pack index (for benchmarking without them)"""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    try:
+        for spec in INDEX_PACK:
+            conn.execute(f"DROP INDEX IF EXISTS {spec.name}")
+        conn.commit()
+    finally:
+        if own_conn:
+            conn.close()
+
+
+# "SEARCH t USING INDEX i (...)", "SCAN t USING COVERING INDEX i",
+# "SEARCH t USING INTEGER PRIMARY KEY (rowid=?)"
+_SQLITE_INDEX_RE = re.compile(r'USING (?:COVERING )?INDEX (\w+)|USING INTEGER PRIMARY KEY')
+# "SCAN t" - subqueries show up as "SCAN (subquery-1)", constants as "SCAN CONSTANT ROW"
+_SQLITE_SCAN_RE = re.compile(r'^SCAN (?!CONSTANT ROW)(\S+)')
+
+
+def _sqlite_plan(conn, query):
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {query.sql}", query.params).fetchall()
+    details = [_row_value(row, 'detail', 3) for row in rows]
+    full_scans = []
+    indexes = []
+    for detail in details:
+        match = _SQLITE_INDEX_RE.search(detail)
+        if match:
+            indexes.append(match.group(1) or 'PRIMARY KEY')
+            continue
+        match = _SQLITE_SCAN_RE.match(detail)
+        if match and not match.group(1).startswith('('):
+            full_scans.append(match.group(1))
+    return details, full_scans, indexes
+
+
+def _walk_pg_plan(node, full_scans, indexes):
+    node_type = node.get('Node Type', '')
+    if node_type == 'Seq Scan':
+        full_scans.append(node.get('Alias') or node.get('Relation Name'))
+    elif 'Index Name' in node:
+        indexes.append(node['Index Name'])
+    for child in node.get('Plans', []):
+        _walk_pg_plan(child, full_scans, indexes)
+
+
+def _postgres_plan(conn, query):
+    # Discourage sequential scans so a usable index shows up even on the
+    # small tables where a scan would be cheaper
+    conn.execute("SET LOCAL enable_seqscan = off")
+    try:
+        row = conn.execute(f"EXPLAIN (FORMAT JSON) {query.sql}", query.params).fetchone()
+    finally:
+        conn.rollback()
+    plan = _row_value(row, 'QUERY PLAN', 0)
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    full_scans, indexes = [], []
+    _walk_pg_plan(plan[0]['Plan'], full_scans, indexes)
+    return plan, full_scans, indexes
+
+
+def verify_hot_queries(conn=None, queries=None):
+    """
+    EXPLAIN each hot query and report whether it is answered from indexes.
+
+    A query passes when no table in its plan is read with a full scan.
+    Queries against tables or columns this schema lacks are reported as
+    errors rather than failures of the pack.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    db_type = get_db_type()
+    results = []
+    try:
+        for query in queries or HOT_QUERIES:
+            entry = {'name': query.name, 'source': query.source}
+            try:
+                if db_type == 'postgresql':
+                    plan, full_scans, indexes = _postgres_plan(conn, query)
+                else:
+                    plan, full_scans, indexes = _sqlite_plan(conn, query)
+                entry.update({'uses_index': not full_scans, 'full_scans': full_scans,
+                              'indexes': indexes, 'plan': plan})
+            except Exception as e:
+                conn.rollback()
+                entry.update({'uses_index': None, 'error': str(e)})
+            results.append(entry)
+        return results
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    command = argv[0] if argv else 'status'
+
+    if command == 'status':
+        for entry in index_status():
+            print(f"  {entry['state']:16s} {entry['name']} ON {entry['table']}({', '.join(entry['columns'])})")
+        return 0
+
+    if command == 'apply':
+        created = apply_index_pack(concurrently='--concurrently' in argv)
+        print(f"Created indexes: {created or 'none'}")
+        return 0
+
+    if command == 'drop':
+        drop_index_pack()
+        print("Dropped the index pack")
+        return 0
+
+    if command == 'verify':
+        failed = 0
+        for entry in verify_hot_queries():
+            if entry['uses_index'] is None:
+                print(f"  ⚠️  {entry['name']}: {entry['error']}")
+            elif entry['uses_index']:
+                print(f"  ✅ {entry['name']}: {', '.join(entry['indexes'])}")
+            else:
+                failed += 1
+                print(f"  ❌ {entry['name']}: full scan of {', '.join(entry['full_scans'])}")
+        return 1 if failed else 0
+
+    print(__doc__)
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
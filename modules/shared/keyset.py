@@ -0,0 +1,202 @@
+"""
+Keyset (cursor) pagination for report queries
+A report's SELECT is wrapped as a subquery and paged on its sort key:
+each page asks for the rows after the last one the client saw
+(WHERE key > last ORDER BY key LIMIT n), so page N costs the same as
+page 1 and only `limit` rows are held in memory. Totals over the whole
+result come from one aggregate over the same subquery, in SQL.
+
+The cursor is an opaque token (the last row's sort key, base64 JSON).
+The sort key must be unique - end it with an id or the group key.
+Requests without `limit` get every row, as before pagination existed.
+
+    page = KeysetQuery(sql, params,
+                       order=[SortKey('total_revenue', descending=True, null_as=0),
+                              SortKey('product_name')],
+                       totals={'total': 'SUM(total_revenue)'}).fetch(conn, **page_request(request.args))
+"""
+
+import os
+import json
+import base64
+from datetime import date, datetime
+from decimal import Decimal
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = int(os.environ.get('REPORT_MAX_PAGE_SIZE', '1000'))
+
+
+class InvalidCursor(ValueError):
+    """A cursor or limit the client sent cannot be used"""
+
+
+class SortKey:
+    """One ORDER BY column of the wrapped query; NULLs sort as `null_as`"""
+
+    def __init__(self, column, descending=False, null_as=''):
+        self.column = column
+        self.descending = descending
+        self.null_as = null_as
+
+    def sql(self, alias='report'):
+        return f"COALESCE({alias}.{self.column}, {_literal(self.null_as)})"
+
+    def value(self, row):
+        value = row[self.column]
+        if value is None:
+            return self.null_as
+        if isinstance(value, Decimal):
+            return float(value)
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+        return value
+
+
+def _literal(value):
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return repr(value)
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, keys):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw.decode('utf-8'))
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor('Malformed cursor')
+    if (not isinstance(values, list) or len(values) != len(keys)
+            or not all(isinstance(v, (str, int, float)) and not isinstance(v, bool) for v in values)):
+        raise InvalidCursor('Cursor does not match this report')
+    return values
+
+
+def page_request(args):
+    """cursor/limit keyword arguments for fetch() from the query string"""
+    limit = args.get('limit')
+    if limit in (None, ''):
+        if args.get('cursor'):
+            raise InvalidCursor('cursor requires limit')
+        return {'cursor': None, 'limit': None}
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise InvalidCursor('limit must be an integer')
+    if limit < 1:
+        raise InvalidCursor('limit must be at least 1')
+    return {'cursor': args.get('cursor') or None, 'limit': min(limit, MAX_PAGE_SIZE)}
+
+
+def _after_predicate(keys, values):
+    """(k1 > v1) OR (k1 = v1 AND k2 > v2) ..., with < for descending keys"""
+    clauses, params = [], []
+    for index, key in enumerate(keys):
+        parts = []
+        for previous, value in zip(keys[:index], values):
+            parts.append(f"{previous.sql()} = ?")
+            params.append(value)
+        parts.append(f"{key.sql()} {'<' if key.descending else '>'} ?")
+        params.append(values[index])
+        clauses.append('(' + ' AND '.join(parts) + ')')
+    return '(' + ' OR '.join(clauses) + ')', params
+
+
+def _pagination(limit, rows, has_more, keys):
+    return {
+        'limit': limit,
+        'has_more': has_more,
+        'next_cursor': encode_cursor(key.value(rows[-1]) for key in keys) if has_more else None
+    }
+
+
+class KeysetQuery:
+    """A report SELECT (no ORDER BY) paged on `order`"""
+
+    def __init__(self, sql, params=(), order=(), totals=None, hidden=()):
+        self.sql = sql
+        self.params = list(params)
+        self.order = list(order)
+        # name -> aggregate over the wrapped query's columns
+        self.totals = totals or {}
+        # Columns selected only to make the sort key unique
+        self.hidden = tuple(hidden)
+
+    def fetch_totals(self, conn):
+        columns = ['COUNT(*) AS row_count'] + [f"{expression} AS {name}"
+                                               for name, expression in self.totals.items()]
+        row = conn.execute(f"SELECT {', '.join(columns)} FROM ({self.sql}) report",
+                           self.params).fetchone()
+        return {key: (float(value) if isinstance(value, Decimal) else value)
+                for key, value in dict(row).items()}
+
+    def _order_by(self):
+        return " ORDER BY " + ', '.join(f"{key.sql()} {'DESC' if key.descending else 'ASC'}"
+                                        for key in self.order)
+
+    def fetch(self, conn, cursor=None, limit=None, with_totals=None):
+        """
+        One page: {'rows', 'pagination', 'totals'}.
+        Totals are computed for the first page only unless with_totals is
+        set - later pages of the same listing reuse the first page's.
+        """
+        sql = f"SELECT * FROM ({self.sql}) report"
+        params = list(self.params)
+        if cursor:
+            predicate, predicate_params = _after_predicate(self.order, decode_cursor(cursor, self.order))
+            sql += f" WHERE {predicate}"
+            params += predicate_params
+        sql += self._order_by()
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+
+        rows = [dict(row) for row in conn.execute(sql, params).fetchall()]
+        has_more = limit is not None and len(rows) > limit
+        rows = rows[:limit] if has_more else rows
+        pagination = _pagination(limit, rows, has_more, self.order)
+        for row in rows:
+            for column in self.hidden:
+                row.pop(column, None)
+
+        if with_totals is None:
+            with_totals = not cursor
+        return {
+            'rows': rows,
+            'pagination': pagination,
+            'totals': self.fetch_totals(conn) if with_totals else None
+        }
+
+    def stream(self, conn):
+        """Every row in order through conn.stream() (server-side cursor), for exports"""
+        for row in conn.stream(f"SELECT * FROM ({self.sql}) report" + self._order_by(), self.params):
+            for column in self.hidden:
+                row.pop(column, None)
+            yield row
+
+
+def paginate_rows(rows, order, cursor=None, limit=None):
+    """
+    The same cursor/limit contract over rows already in `order`, for
+    reports that are small and bounded by construction (e.g. 30 days).
+    """
+    rows = list(rows)
+    if cursor:
+        values = decode_cursor(cursor, order)
+
+        def after(row):
+            for key, value in zip(order, values):
+                current = key.value(row)
+                if current != value:
+                    return current < value if key.descending else current > value
+            return False
+
+        rows = [row for row in rows if after(row)]
+    has_more = limit is not None and len(rows) > limit
+    rows = rows[:limit] if has_more else rows
+    return {'rows': rows, 'pagination': _pagination(limit, rows, has_more, order)}
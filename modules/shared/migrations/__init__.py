@@ -0,0 +1,205 @@
+"""
+Schema-versioned migration runner
+Replaces the startup DDL storm (init_db, init_*_tables, auto_fix) with
+ordered migration files recorded in a schema_version table. When the
+schema is current, worker startup costs a single version query; pending
+migrations run under an advisory lock so only one worker applies them.
+
+Migration files live in ./versions and are named NNNN_description.py.
+Each defines upgrade(conn, db_type); its docstring is the description.
+"""
+
+import re
+import time
+import pkgutil
+import importlib
+import logging
+
+from modules.shared.database import get_db_connection, get_db_type, DB_PATH
+
+logger = logging.getLogger(__name__)
+
+# Any constant works - it only has to be the same in every worker
+MIGRATION_LOCK_KEY = 724_190_553
+SCHEMA_VERSION_TABLE = 'schema_version'
+
+_VERSION_FILE_RE = re.compile(r'^(\d{4})_\w+$')
+
+try:
+    import fcntl
+except ImportError:
+    # Windows dev machines - single process, no cross-worker lock needed
+    fcntl = None
+
+
+class Migration:
+    """One ordered migration file"""
+
+    def __init__(self, version, name, module):
+        self.version = version
+        self.name = name
+        self.module = module
+        self.description = (module.__doc__ or name).strip().splitlines()[0]
+
+    def upgrade(self, conn, db_type):
+        self.module.upgrade(conn, db_type)
+
+    def __repr__(self):
+        return f"<Migration {self.version:04d} {self.name}>"
+
+
+def discover_migrations():
+    """Load migration modules from ./versions in version order"""
+    from . import versions
+
+    migrations = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        match = _VERSION_FILE_RE.match(module_info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"{versions.__name__}.{module_info.name}")
+        migrations.append(Migration(int(match.group(1)), module_info.name, module))
+
+    migrations.sort(key=lambda m: m.version)
+    versions_seen = [m.version for m in migrations]
+    if len(versions_seen) != len(set(versions_seen)):
+        raise RuntimeError(f"Duplicate migration versions: {versions_seen}")
+    return migrations
+
+
+def latest_version():
+    """Highest migration version shipped with the code"""
+    migrations = discover_migrations()
+    return migrations[-1].version if migrations else 0
+
+
+def _ensure_version_table(conn):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            duration_ms INTEGER
+        )
+    ''')
+    conn.commit()
+
+
+def get_current_version(conn=None):
+    """Version recorded in schema_version (0 for an unversioned database)"""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    try:
+        row = conn.execute(f"SELECT MAX(version) AS version FROM {SCHEMA_VERSION_TABLE}").fetchone()
+        if row is None:
+            return 0
+        version = row['version'] if hasattr(row, 'keys') else row[0]
+        return version or 0
+    except Exception:
+        # Table not created yet
+        conn.rollback()
+        return 0
+    finally:
+        if own_conn:
+            conn.close()
+
+
+class _MigrationLock:
+    """Cross-worker lock: pg_advisory_lock on PostgreSQL, a lock file on SQLite"""
+
+    def __init__(self, conn, db_type):
+        self.conn = conn
+        self.db_type = db_type
+        self._lock_file = None
+
+    def __enter__(self):
+        if self.db_type == 'postgresql':
+            self.conn.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+            self.conn.commit()
+        elif fcntl is not None:
+            self._lock_file = open(f"{DB_PATH}.migrate.lock", 'w')
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.db_type == 'postgresql':
+            try:
+                self.conn.rollback()
+                self.conn.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+                self.conn.commit()
+            except Exception as e:
+                logger.error(f"❌ Failed to release migration lock: {e}")
+        elif self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+        return False
+
+
+def migrate(target=None):
+    """
+    Apply pending migrations up to target (default: latest).
+    Returns the list of versions applied by this call.
+    """
+    db_type = get_db_type()
+    migrations = discover_migrations()
+    if target is None:
+        target = migrations[-1].version if migrations else 0
+
+    conn = get_db_connection()
+    try:
+        # Fast path - one query when the schema is already current
+        if get_current_version(conn) >= target:
+            logger.info(f"✅ Database schema current (version {target})")
+            return []
+
+        applied = []
+        with _MigrationLock(conn, db_type):
+            _ensure_version_table(conn)
+            # Another worker may have migrated while we waited for the lock
+            current = get_current_version(conn)
+
+            for migration in migrations:
+                if migration.version <= current or migration.version > target:
+                    continue
+
+                logger.info(f"🔧 Applying migration {migration.version:04d}: {migration.description}")
+                started = time.perf_counter()
+                migration.upgrade(conn, db_type)
+                conn.commit()
+
+                duration_ms = int((time.perf_counter() - started) * 1000)
+                conn.execute(
+                    f"INSERT INTO {SCHEMA_VERSION_TABLE} (version, name, duration_ms) VALUES (?, ?, ?)",
+                    (migration.version, migration.name, duration_ms)
+                )
+                conn.commit()
+                applied.append(migration.version)
+                logger.info(f"   ✅ Migration {migration.version:04d} applied in {duration_ms}ms")
+
+        return applied
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {e}")
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        conn.close()
+
+
+def migration_status():
+    """Applied and pending migrations, for the CLI and diagnostics"""
+    current = get_current_version()
+    return {
+        'current_version': current,
+        'latest_version': latest_version(),
+        'pending': [
+            {'version': m.version, 'name': m.name, 'description': m.description}
+            for m in discover_migrations() if m.version > current
+        ]
+    }
+
+
+__all__ = ['migrate', 'migration_status', 'get_current_version', 'latest_version', 'discover_migrations']
@@ -0,0 +1,35 @@
+"""
+Migration CLI
+
+    python -m modules.shared.migrations            # apply pending migrations
+    python -m modules.shared.migrations status     # show current / pending
+    python -m modules.shared.migrations upgrade 3  # migrate up to version 3
+"""
+
+import sys
+import json
+import logging
+
+from . import migrate, migration_status
+
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    command = argv[0] if argv else 'upgrade'
+
+    if command == 'status':
+        print(json.dumps(migration_status(), indent=2))
+        return 0
+
+    if command == 'upgrade':
+        target = int(argv[1]) if len(argv) > 1 else None
+        applied = migrate(target)
+        print(f"Applied migrations: {applied or 'none'}")
+        return 0
+
+    print(__doc__)
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
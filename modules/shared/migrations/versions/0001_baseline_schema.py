@@ -0,0 +1,15 @@
+"""Baseline schema - core, inventory, integrated inventory and ERP tables"""
+
+
+def upgrade(conn, db_type):
+    # The historical init functions are idempotent (CREATE ... IF NOT EXISTS),
+    # so this is safe on databases created before schema versioning existed
+    from modules.shared.database import init_db
+    from modules.inventory.database import init_inventory_tables
+    from modules.integrated_inventory.database import init_integrated_inventory_tables
+    from modules.erp_modules.database import init_erp_tables
+
+    init_db()
+    init_inventory_tables()
+    init_integrated_inventory_tables()
+    init_erp_tables()
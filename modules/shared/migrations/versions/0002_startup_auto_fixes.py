@@ -0,0 +1,10 @@
+"""Startup auto-fixes - business_owner_id, customer_phone, user management tables"""
+
+
+def upgrade(conn, db_type):
+    # The auto-fix only targets PostgreSQL deployments
+    if db_type != 'postgresql':
+        return
+
+    from modules.shared.auto_fix import auto_fix_database_on_startup
+    auto_fix_database_on_startup(raise_errors=True)
@@ -0,0 +1,6 @@
+"""Tenant index pack - composite and partial indexes for the hot multi-tenant queries"""
+
+
+def upgrade(conn, db_type):
+    from modules.shared.index_pack import apply_index_pack
+    apply_index_pack(conn)
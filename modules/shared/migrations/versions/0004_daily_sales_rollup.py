@@ -0,0 +1,8 @@
+"""Daily sales rollup - per tenant, day and payment method totals, backfilled from bills"""
+
+
+def upgrade(conn, db_type):
+    from modules.shared.sales_rollup import create_rollup_table, rebuild
+    create_rollup_table(conn, db_type)
+    conn.commit()
+    rebuild(conn=conn)
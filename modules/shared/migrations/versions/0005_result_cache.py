@@ -0,0 +1,6 @@
+"""Result cache table - shared backend for the per-tenant dashboard cache"""
+
+
+def upgrade(conn, db_type):
+    from modules.shared.result_cache import create_table
+    create_table(conn, db_type)
@@ -0,0 +1,6 @@
+"""Report jobs table - persisted background report jobs and their results"""
+
+
+def upgrade(conn, db_type):
+    from modules.shared.report_jobs import create_table
+    create_table(conn, db_type)
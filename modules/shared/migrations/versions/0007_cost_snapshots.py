@@ -0,0 +1,11 @@
+"""Cost snapshots - unit_cost on bill_items/sales and cost_amount on ERP invoices, backfilled"""
+
+
+def upgrade(conn, db_type):
+    from modules.shared.cost_snapshot import add_columns, backfill
+    from modules.shared.sales_rollup import rebuild
+    add_columns(conn, db_type)
+    conn.commit()
+    backfill(conn)
+    # The rollup's items_cost now comes from the snapshots
+    rebuild(conn=conn)
@@ -0,0 +1,8 @@
+"""Stock valuation engine - per-product quantity, average cost and FIFO layers, replayed from stock_transactions"""
+
+
+def upgrade(conn, db_type):
+    from modules.shared.stock_valuation import create_tables, rebuild
+    create_tables(conn, db_type)
+    conn.commit()
+    rebuild(conn=conn)
@@ -0,0 +1,9 @@
+"""Delta sync change log - sync_changes fed by triggers on products/customers/bills/sales, backfilled"""
+
+
+def upgrade(conn, db_type):
+    from modules.shared.sync_changes import create_tables, install_triggers, backfill
+    create_tables(conn, db_type)
+    install_triggers(conn, db_type)
+    conn.commit()
+    backfill(conn)
@@ -0,0 +1,6 @@
+"""Shared sync event store - sync_events (per-user, by version) and sync_sessions (user -> sessions index)"""
+
+
+def upgrade(conn, db_type):
+    from modules.shared.sync_events import create_tables
+    create_tables(conn, db_type)
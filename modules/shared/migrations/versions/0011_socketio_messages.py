@@ -0,0 +1,6 @@
+"""Socket.IO database message queue - socketio_messages (emits shared by every worker)"""
+
+
+def upgrade(conn, db_type):
+    from modules.sync.gateway import create_tables
+    create_tables(conn, db_type)
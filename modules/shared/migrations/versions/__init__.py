@@ -0,0 +1 @@
+"""Ordered migration files - NNNN_description.py, each defining upgrade(conn, db_type)"""
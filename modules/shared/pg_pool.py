@@ -0,0 +1,87 @@
+"""
+PostgreSQL connection pool configuration
+Pool sizing, pre-ping strategy, recycle interval and checkout timeout
+come from the environment so workers can be sized against the Supabase
+pooler's connection limit.
+"""
+
+import os
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tunables (environment overrides)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '30'))     # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', '3600'))     # recycle connections after 1 hour
+DB_CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', '10'))
+
+# Pre-ping strategy:
+#   always - ping on every checkout (one extra round-trip per checkout)
+#   idle   - ping only connections idle longer than DB_POOL_PRE_PING_IDLE_SECONDS
+#   never  - no ping, rely on pool_recycle
+_PRE_PING_ALIASES = {'true': 'always', '1': 'always', 'false': 'never', '0': 'never'}
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'idle').lower()
+DB_POOL_PRE_PING = _PRE_PING_ALIASES.get(DB_POOL_PRE_PING, DB_POOL_PRE_PING)
+DB_POOL_PRE_PING_IDLE_SECONDS = float(os.environ.get('DB_POOL_PRE_PING_IDLE_SECONDS', '60'))
+
+
+def get_pool_config():
+    """Effective pool settings (reported by the admin metrics endpoint)"""
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pre_ping': DB_POOL_PRE_PING,
+        'pre_ping_idle_seconds': DB_POOL_PRE_PING_IDLE_SECONDS,
+        'connect_timeout': DB_CONNECT_TIMEOUT
+    }
+
+
+def get_postgres_engine_options():
+    """Keyword arguments for create_engine() in PostgreSQL mode"""
+    return {
+        'poolclass': QueuePool,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING == 'always',
+        'connect_args': {
+            'sslmode': 'require',
+            'connect_timeout': DB_CONNECT_TIMEOUT
+        }
+    }
+
+
+def _stamp_checkin(dbapi_conn, connection_record):
+    connection_record.info['last_checkin'] = time.monotonic()
+
+
+def _ping_if_idle(dbapi_conn, connection_record, connection_proxy):
+    """Ping a connection only when it sat idle long enough to have gone stale"""
+    last_checkin = connection_record.info.get('last_checkin')
+    if last_checkin is None or time.monotonic() - last_checkin < DB_POOL_PRE_PING_IDLE_SECONDS:
+        return
+
+    try:
+        cursor = dbapi_conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.close()
+        dbapi_conn.rollback()
+    except Exception as e:
+        logger.warning(f"⚠️  Stale pooled connection discarded: {e}")
+        # The pool invalidates this connection and retries with a fresh one
+        raise exc.DisconnectionError()
+
+
+def attach_postgres_listeners(engine):
+    """Register the idle pre-ping strategy on a PostgreSQL engine"""
+    if DB_POOL_PRE_PING == 'idle':
+        event.listen(engine, "checkin", _stamp_checkin)
+        event.listen(engine, "checkout", _ping_if_idle)
@@ -0,0 +1,160 @@
+"""
+Connection pool metrics
+Tracks checkout wait times, who holds each pooled connection and
+per-endpoint checkout counts, for sizing gunicorn workers against the
+database's connection limit.
+"""
+
+import time
+import threading
+from sqlalchemy import event
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the checkout wait histogram buckets; the last
+# bucket collects everything slower
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def current_endpoint():
+    """Flask endpoint of the current request, or a marker outside requests"""
+    try:
+        from flask import has_request_context, request
+        if has_request_context():
+            return request.endpoint or request.path
+    except Exception:
+        pass
+    return f"<thread:{threading.current_thread().name}>"
+
+
+class PoolMetrics:
+    """In-memory pool checkout statistics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked_out = 0
+        # id(connection record) -> (endpoint, checkout time)
+        self._holders = {}
+        self.reset()
+
+    def reset(self):
+        """Clear all counters (connections currently held stay tracked)"""
+        with self._lock:
+            self.wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+            self.wait_count = 0
+            self.wait_total_ms = 0.0
+            self.wait_max_ms = 0.0
+            self.timeouts = 0
+            self.peak_checked_out = self._checked_out
+            # endpoint -> aggregated checkout stats
+            self._endpoints = {}
+
+    def attach(self, engine):
+        """Listen to checkout/checkin events of an engine's pool"""
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+
+    def record_wait(self, seconds, endpoint=None, timed_out=False):
+        """Record how long a caller waited for a connection"""
+        wait_ms = seconds * 1000.0
+        endpoint = endpoint or current_endpoint()
+
+        bucket = len(WAIT_BUCKETS_MS)
+        for i, upper in enumerate(WAIT_BUCKETS_MS):
+            if wait_ms <= upper:
+                bucket = i
+                break
+
+        with self._lock:
+            self.wait_histogram[bucket] += 1
+            self.wait_count += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            stats = self._endpoint_stats(endpoint)
+            stats['wait_ms_total'] += wait_ms
+            stats['wait_ms_max'] = max(stats['wait_ms_max'], wait_ms)
+            if timed_out:
+                self.timeouts += 1
+                stats['timeouts'] += 1
+
+    def _endpoint_stats(self, endpoint):
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = {
+                'checkouts': 0, 'timeouts': 0,
+                'wait_ms_total': 0.0, 'wait_ms_max': 0.0,
+                'held_ms_total': 0.0, 'held_ms_max': 0.0
+            }
+            self._endpoints[endpoint] = stats
+        return stats
+
+    def _on_checkout(self, dbapi_conn, connection_record, connection_proxy):
+        endpoint = current_endpoint()
+        with self._lock:
+            self._holders[id(connection_record)] = (endpoint, time.time())
+            self._checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self._checked_out)
+            self._endpoint_stats(endpoint)['checkouts'] += 1
+
+    def _on_checkin(self, dbapi_conn, connection_record):
+        with self._lock:
+            holder = self._holders.pop(id(connection_record), None)
+            if holder is None:
+                return
+            self._checked_out -= 1
+            endpoint, since = holder
+            held_ms = (time.time() - since) * 1000.0
+            stats = self._endpoint_stats(endpoint)
+            stats['held_ms_total'] += held_ms
+            stats['held_ms_max'] = max(stats['held_ms_max'], held_ms)
+
+    def snapshot(self, pool=None):
+        """JSON-serialisable view of the pool and the collected metrics"""
+        now = time.time()
+        with self._lock:
+            labels = [f"<={upper}ms" for upper in WAIT_BUCKETS_MS] + [f">{WAIT_BUCKETS_MS[-1]}ms"]
+            endpoints = {}
+            for endpoint, stats in self._endpoints.items():
+                checkouts = stats['checkouts'] or 1
+                endpoints[endpoint] = {
+                    'checkouts': stats['checkouts'],
+                    'timeouts': stats['timeouts'],
+                    'wait_ms_avg': round(stats['wait_ms_total'] / checkouts, 3),
+                    'wait_ms_max': round(stats['wait_ms_max'], 3),
+                    'held_ms_avg': round(stats['held_ms_total'] / checkouts, 3),
+                    'held_ms_max': round(stats['held_ms_max'], 3)
+                }
+
+            data = {
+                'checked_out': self._checked_out,
+                'peak_checked_out': self.peak_checked_out,
+                'wait': {
+                    'count': self.wait_count,
+                    'avg_ms': round(self.wait_total_ms / self.wait_count, 3) if self.wait_count else 0.0,
+                    'max_ms': round(self.wait_max_ms, 3),
+                    'timeouts': self.timeouts,
+                    'histogram': dict(zip(labels, self.wait_histogram))
+                },
+                'holders': [
+                    {'endpoint': endpoint, 'held_ms': round((now - since) * 1000.0, 3)}
+                    for endpoint, since in self._holders.values()
+                ],
+                'endpoints': endpoints
+            }
+
+        if pool is not None:
+            data['pool'] = {
+                'class': type(pool).__name__,
+                'size': pool.size() if callable(getattr(pool, 'size', None)) else getattr(pool, 'size', None),
+                'checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else None,
+                'checked_in': pool.checkedin() if hasattr(pool, 'checkedin') else None,
+                # QueuePool.overflow() goes negative while the base pool is not yet full
+                'overflow_in_use': max(0, pool.overflow()) if hasattr(pool, 'overflow') else 0,
+                'status': pool.status()
+            }
+        return data
+
+
+# Process-wide metrics for the shared engine
+pool_metrics = PoolMetrics()
@@ -0,0 +1,202 @@
+"""
+Per-statement timing instrumentation for the shared database layer
+Opt-in (DB_QUERY_STATS=true or enable_query_stats()). Records wall time,
+row count and a normalized statement fingerprint for every execute /
+executemany, aggregated per fingerprint and per Flask endpoint, and
+flags statements slower than DB_SLOW_QUERY_MS.
+"""
+
+import os
+import re
+import json
+import time
+import atexit
+import threading
+from collections import deque
+import logging
+
+from .pool_metrics import current_endpoint
+
+logger = logging.getLogger(__name__)
+
+# Tunables (environment overrides)
+QUERY_STATS_ENABLED = os.environ.get('DB_QUERY_STATS', 'false').lower() in ('1', 'true', 'yes')
+SLOW_QUERY_MS = float(os.environ.get('DB_SLOW_QUERY_MS', '250'))
+SAMPLE_SIZE = int(os.environ.get('DB_QUERY_STATS_SAMPLES', '256'))  # durations kept per series for percentiles
+SLOW_LOG_SIZE = 100  # most recent slow statements kept
+QUERY_STATS_DUMP_PATH = os.environ.get('DB_QUERY_STATS_DUMP')  # write aggregates here on exit
+
+# Fingerprint normalization - literals and placeholders collapse to ?
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|\?')
+_IN_LIST_RE = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(query):
+    """Normalize a statement so calls differing only in literals aggregate together"""
+    normalized = _STRING_RE.sub('?', query)
+    normalized = _NUMBER_RE.sub('?', normalized)
+    normalized = _PLACEHOLDER_RE.sub('?', normalized)
+    normalized = _IN_LIST_RE.sub('IN (?...)', normalized)
+    return _WHITESPACE_RE.sub(' ', normalized).strip()
+
+
+def _percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, int(round(pct / 100.0 * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+class _Series:
+    """Timing aggregate for one fingerprint or endpoint"""
+
+    __slots__ = ('count', 'total_ms', 'max_ms', 'rows', 'slow', 'samples', 'max_per_request')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.slow = 0
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+        self.max_per_request = 0
+
+    def add(self, elapsed_ms, rows, slow):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if rows is not None and rows >= 0:
+            self.rows += rows
+        if slow:
+            self.slow += 1
+        self.samples.append(elapsed_ms)
+
+    def summary(self):
+        samples = sorted(self.samples)
+        return {
+            'calls': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'avg_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'p50_ms': round(_percentile(samples, 50), 3),
+            'p95_ms': round(_percentile(samples, 95), 3),
+            'max_ms': round(self.max_ms, 3),
+            'rows': self.rows,
+            'slow_calls': self.slow,
+            'max_calls_per_request': self.max_per_request
+        }
+
+
+class QueryStats:
+    """In-memory statement timing aggregates"""
+
+    def __init__(self, enabled=QUERY_STATS_ENABLED, slow_query_ms=SLOW_QUERY_MS):
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop all collected statistics"""
+        with self._lock:
+            self._by_fingerprint = {}
+            self._by_endpoint = {}
+            # (endpoint, fingerprint) -> series, to spot N+1 loops per route
+            self._by_endpoint_fingerprint = {}
+            self._slow_log = deque(maxlen=SLOW_LOG_SIZE)
+            self.started_at = time.time()
+
+    def record(self, query_fingerprint, elapsed, rows=None, endpoint=None, executemany=False):
+        """Record one execute/executemany call (elapsed in seconds)"""
+        elapsed_ms = elapsed * 1000.0
+        endpoint = endpoint or current_endpoint()
+        slow = elapsed_ms >= self.slow_query_ms
+        per_request = _count_in_request(query_fingerprint)
+
+        with self._lock:
+            for table, key, per_statement in ((self._by_fingerprint, query_fingerprint, True),
+                                              (self._by_endpoint, endpoint, False),
+                                              (self._by_endpoint_fingerprint, (endpoint, query_fingerprint), True)):
+                series = table.get(key)
+                if series is None:
+                    series = table[key] = _Series()
+                series.add(elapsed_ms, rows, slow)
+                if per_statement:
+                    series.max_per_request = max(series.max_per_request, per_request)
+
+            if slow:
+                self._slow_log.append({
+                    'fingerprint': query_fingerprint,
+                    'endpoint': endpoint,
+                    'elapsed_ms': round(elapsed_ms, 3),
+                    'rows': rows,
+                    'executemany': executemany,
+                    'at': time.time()
+                })
+
+        if slow:
+            logger.warning(f"🐢 Slow query ({elapsed_ms:.1f}ms) in {endpoint}: {query_fingerprint[:200]}")
+
+    def snapshot(self, limit=50, sort='total_ms'):
+        """JSON-serialisable aggregates, top `limit` entries sorted by `sort`"""
+        with self._lock:
+            fingerprints = [dict(fingerprint=key, **series.summary())
+                            for key, series in self._by_fingerprint.items()]
+            endpoints = [dict(endpoint=key, **series.summary())
+                         for key, series in self._by_endpoint.items()]
+            endpoint_statements = [dict(endpoint=key[0], fingerprint=key[1], **series.summary())
+                                   for key, series in self._by_endpoint_fingerprint.items()]
+            slow = list(self._slow_log)
+            started_at = self.started_at
+
+        def top(rows):
+            rows.sort(key=lambda row: row.get(sort, 0), reverse=True)
+            return rows[:limit]
+
+        return {
+            'enabled': self.enabled,
+            'slow_query_ms': self.slow_query_ms,
+            'collecting_since': started_at,
+            'fingerprints': top(fingerprints),
+            'endpoints': top(endpoints),
+            'endpoint_statements': top(endpoint_statements),
+            'slow_queries': slow
+        }
+
+    def dump_json(self, path=None, **kwargs):
+        """Serialize the aggregates to JSON, optionally writing them to a file"""
+        data = json.dumps(self.snapshot(**kwargs), indent=2, default=str)
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(data)
+        return data
+
+
+def _count_in_request(query_fingerprint):
+    """Count executions of a fingerprint within the current Flask request"""
+    try:
+        from flask import g, has_request_context
+        if not has_request_context():
+            return 0
+        counts = g.get('_query_counts')
+        if counts is None:
+            counts = g._query_counts = {}
+        counts[query_fingerprint] = counts.get(query_fingerprint, 0) + 1
+        return counts[query_fingerprint]
+    except Exception:
+        return 0
+
+
+# Process-wide statistics for the shared database layer
+query_stats = QueryStats()
+
+
+def enable_query_stats(enabled=True):
+    """Switch instrumentation on or off at runtime"""
+    query_stats.enabled = enabled
+
+
+if QUERY_STATS_DUMP_PATH:
+    atexit.register(query_stats.dump_json, QUERY_STATS_DUMP_PATH)
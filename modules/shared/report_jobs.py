@@ -0,0 +1,342 @@
+"""
+Background report jobs
+Heavy reports (ERP profit & loss, earnings) can run off the request: a
+client submits a job, gets an id back at once, polls its status and
+fetches the result when it is done, instead of holding a gunicorn worker
+past its timeout.
+
+Jobs run on an in-process thread pool (REPORT_JOB_WORKERS) with at most
+REPORT_JOB_TENANT_CONCURRENCY running per tenant - one tenant's burst of
+year-long reports queues behind itself, not in front of everyone else.
+Every job and its result is persisted in the report_jobs table, so any
+worker process can answer a poll, and a finished result is reused for
+REPORT_JOB_RESULT_TTL seconds by every submit with the same (tenant,
+kind, params) - until a write invalidates the tenant's result cache.
+
+    POST /api/reports/jobs                {"kind": "earnings.products", "params": {...}}
+    GET  /api/reports/jobs/<id>           status
+    GET  /api/reports/jobs/<id>/result    result once done
+"""
+
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tunables (environment overrides)
+WORKERS = int(os.environ.get('REPORT_JOB_WORKERS', '4'))
+TENANT_CONCURRENCY = int(os.environ.get('REPORT_JOB_TENANT_CONCURRENCY', '1'))
+RESULT_TTL = float(os.environ.get('REPORT_JOB_RESULT_TTL', '600'))    # seconds a result is reused
+STALE_AFTER = float(os.environ.get('REPORT_JOB_STALE_AFTER', '1800'))  # unfinished jobs older than this are abandoned
+
+JOBS_TABLE = 'report_jobs'
+KEY_VERSION = 'v1'
+# Delete expired jobs every this many submits
+PURGE_EVERY = 200
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+# ============================================================================
+# JOB KINDS - compute(tenant_id, params) -> JSON-serialisable result
+# ============================================================================
+
+def _erp_profit_loss(tenant_id, params):
+    from modules.erp_modules.service import FinanceReportService
+    return FinanceReportService.profit_loss(tenant_id, params.get('start_date'), params.get('end_date'))
+
+
+def _earnings_summary(tenant_id, params):
+    from modules.earnings.service import EarningsService
+    return EarningsService().get_earnings_summary(params.get('date_filter', 'all'), tenant_id)
+
+
+def _earnings_products(tenant_id, params):
+    from modules.earnings.service import EarningsService
+    return EarningsService().get_product_earnings(params.get('date_filter', 'all'), tenant_id)
+
+
+class JobKind:
+    """A report that may run as a job, and the params it accepts"""
+
+    def __init__(self, name, compute, params=()):
+        self.name = name
+        self.compute = compute
+        self.params = tuple(params)
+
+
+KINDS = OrderedDict((kind.name, kind) for kind in (
+    JobKind('erp.profit_loss', _erp_profit_loss, params=('start_date', 'end_date')),
+    JobKind('earnings.summary', _earnings_summary, params=('date_filter',)),
+    JobKind('earnings.products', _earnings_products, params=('date_filter',)),
+))
+
+
+class JobError(ValueError):
+    """A job request that cannot be accepted"""
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def _encode(value):
+    return json.dumps(value, default=_json_default, separators=(',', ':'))
+
+
+def params_key(kind, tenant_id, params, generation=None):
+    """Hash of everything that decides a job's result"""
+    payload = _encode([KEY_VERSION, kind, tenant_id or '', sorted(params.items()), generation])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def create_table(conn, db_type):
+    """Create the job table (idempotent)"""
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {JOBS_TABLE} (
+            id TEXT PRIMARY KEY,
+            tenant_id TEXT,
+            kind TEXT NOT NULL,
+            params_key TEXT NOT NULL,
+            params TEXT,
+            status TEXT NOT NULL,
+            result TEXT,
+            error TEXT,
+            created_at REAL,
+            started_at REAL,
+            finished_at REAL,
+            expires_at REAL
+        )
+    ''')
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{JOBS_TABLE}_params_key ON {JOBS_TABLE} (params_key, created_at)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{JOBS_TABLE}_expires ON {JOBS_TABLE} (expires_at)")
+
+
+def _public(row, include_result=False):
+    """A job row as the API returns it"""
+    job = {
+        'job_id': row['id'],
+        'kind': row['kind'],
+        'params': json.loads(row['params'] or '{}'),
+        'status': row['status'],
+        'error': row['error'],
+        'created_at': row['created_at'],
+        'started_at': row['started_at'],
+        'finished_at': row['finished_at'],
+    }
+    if row['status'] in (QUEUED, RUNNING) and row['created_at'] and time.time() - row['created_at'] > STALE_AFTER:
+        # Its worker process went away before finishing it
+        job['status'] = FAILED
+        job['error'] = 'Job was abandoned - submit it again'
+    if include_result:
+        job['result'] = json.loads(row['result']) if row['result'] is not None else None
+    return job
+
+
+class ReportJobQueue:
+    """Thread pool with per-tenant concurrency, backed by the report_jobs table"""
+
+    def __init__(self, workers=WORKERS, tenant_concurrency=TENANT_CONCURRENCY, result_ttl=RESULT_TTL):
+        self.workers = workers
+        self.tenant_concurrency = tenant_concurrency
+        self.result_ttl = result_ttl
+        self._lock = threading.Lock()
+        self._executor = None
+        # tenant -> job ids waiting for a tenant slot, in submit order
+        self._waiting = OrderedDict()
+        self._running = {}
+        self._submits = 0
+        self._counters = {'submitted': 0, 'reused': 0, 'completed': 0, 'failed': 0}
+
+    def _connection(self):
+        # Never the request's connection: job rows commit on their own
+        from .database import get_dedicated_connection
+        return get_dedicated_connection()
+
+    def _generation(self, tenant_id):
+        from .result_cache import result_cache
+        return result_cache.generation(tenant_id)
+
+    def _find_reusable(self, conn, key, now):
+        row = conn.execute(f"""
+            SELECT * FROM {JOBS_TABLE}
+            WHERE params_key = ? AND created_at > ?
+            ORDER BY created_at DESC
+            LIMIT 1
+        """, (key, now - STALE_AFTER)).fetchone()
+        if row is None or row['status'] == FAILED:
+            return None
+        if row['status'] == DONE and (row['expires_at'] or 0) <= now:
+            return None
+        return row
+
+    def submit(self, kind, tenant_id, params=None):
+        """
+        Queue a job and return it (a dict with job_id and status). A done
+        or in-flight job with the same tenant, kind and params is returned
+        instead of starting another one.
+        """
+        spec = KINDS.get(kind)
+        if spec is None:
+            raise JobError(f"Unknown report job '{kind}'")
+        params = {name: value for name, value in (params or {}).items()
+                  if name in spec.params and value not in (None, '')}
+        key = params_key(kind, tenant_id, params, self._generation(tenant_id))
+        now = time.time()
+
+        conn = self._connection()
+        try:
+            row = self._find_reusable(conn, key, now)
+            if row is not None:
+                with self._lock:
+                    self._counters['reused'] += 1
+                return {**_public(row), 'reused': True}
+
+            job_id = uuid.uuid4().hex
+            conn.execute(f"""
+                INSERT INTO {JOBS_TABLE} (id, tenant_id, kind, params_key, params, status, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (job_id, tenant_id or '', kind, key, _encode(params), QUEUED, now))
+            with self._lock:
+                self._submits += 1
+                purge = self._submits % PURGE_EVERY == 0
+            if purge:
+                conn.execute(f"DELETE FROM {JOBS_TABLE} WHERE expires_at < ? OR created_at < ?",
+                             (now, now - max(STALE_AFTER, self.result_ttl) * 2))
+            conn.commit()
+            row = conn.execute(f"SELECT * FROM {JOBS_TABLE} WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+
+        with self._lock:
+            self._counters['submitted'] += 1
+            self._waiting.setdefault(tenant_id or '', deque()).append((job_id, spec, tenant_id, params))
+        self._dispatch()
+        return {**_public(row), 'reused': False}
+
+    def _dispatch(self):
+        """Hand waiting jobs to the pool while their tenant has a free slot"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='report-job')
+            for tenant in list(self._waiting):
+                queue = self._waiting[tenant]
+                while queue and self._running.get(tenant, 0) < self.tenant_concurrency:
+                    self._running[tenant] = self._running.get(tenant, 0) + 1
+                    self._executor.submit(self._run, *queue.popleft())
+                if not queue:
+                    del self._waiting[tenant]
+
+    def _run(self, job_id, spec, tenant_id, params):
+        try:
+            self._update(job_id, status=RUNNING, started_at=time.time())
+            try:
+                result = _encode(spec.compute(tenant_id, params))
+            except Exception as e:
+                logger.error(f"❌ Report job {spec.name} ({job_id}) failed: {e}")
+                self._update(job_id, status=FAILED, error=str(e), finished_at=time.time())
+                with self._lock:
+                    self._counters['failed'] += 1
+                return
+            now = time.time()
+            self._update(job_id, status=DONE, result=result, finished_at=now, expires_at=now + self.result_ttl)
+            with self._lock:
+                self._counters['completed'] += 1
+        except Exception as e:
+            logger.error(f"❌ Report job {job_id} could not be recorded: {e}")
+        finally:
+            tenant = tenant_id or ''
+            with self._lock:
+                self._running[tenant] -= 1
+                if not self._running[tenant]:
+                    del self._running[tenant]
+            self._dispatch()
+
+    def _update(self, job_id, **fields):
+        conn = self._connection()
+        try:
+            assignments = ', '.join(f"{name} = ?" for name in fields)
+            conn.execute(f"UPDATE {JOBS_TABLE} SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _row(self, job_id, tenant_id):
+        conn = self._connection()
+        try:
+            # A tenant only ever sees its own jobs
+            return conn.execute(f"SELECT * FROM {JOBS_TABLE} WHERE id = ? AND tenant_id = ?",
+                                (job_id, tenant_id or '')).fetchone()
+        finally:
+            conn.close()
+
+    def get(self, job_id, tenant_id):
+        """The job's status, or None if this tenant has no such job"""
+        row = self._row(job_id, tenant_id)
+        return _public(row) if row is not None else None
+
+    def result(self, job_id, tenant_id):
+        """The job with its decoded result (None until done)"""
+        row = self._row(job_id, tenant_id)
+        return _public(row, include_result=True) if row is not None else None
+
+    def wait(self, job_id, tenant_id, timeout=30.0, interval=0.05):
+        """Poll until the job finishes (scripts and tests)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id, tenant_id)
+            if job is None or job['status'] in (DONE, FAILED) or time.monotonic() >= deadline:
+                return job
+            time.sleep(interval)
+
+    def snapshot(self):
+        """Queue depth and counters for the diagnostics endpoint"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'tenant_concurrency': self.tenant_concurrency,
+                'result_ttl': self.result_ttl,
+                'kinds': list(KINDS),
+                'running': sum(self._running.values()),
+                'waiting': sum(len(queue) for queue in self._waiting.values()),
+                'tenants_waiting': len(self._waiting),
+                **self._counters
+            }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+# Process-wide queue
+report_jobs = ReportJobQueue()
+
+
+def wants_async(args):
+    """True for ?async=1 on a report endpoint that can run as a job"""
+    return str(args.get('async', '')).lower() in ('1', 'true', 'yes')
+
+
+def submit_response(kind, tenant_id, params=None):
+    """202 response for a submitted job, pointing at its status URL"""
+    from flask import jsonify, url_for
+    job = report_jobs.submit(kind, tenant_id, params)
+    response = jsonify({'success': True, 'job': job})
+    response.status_code = 200 if job['status'] == DONE else 202
+    response.headers['Location'] = url_for('reports.report_job_status', job_id=job['job_id'])
+    return response
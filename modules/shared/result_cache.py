@@ -0,0 +1,407 @@
+"""
+Per-tenant result cache for polled read endpoints (dashboard tiles/stats)
+Results are cached for a short TTL under (namespace, tenant, arguments)
+and stamped with the tenant's generation token; writers call
+invalidate(tenant_id) after their commit, which swaps the token so every
+cached result of that tenant misses at once. invalidate() with no tenant
+swaps the global token and drops every tenant's results.
+
+Backends (RESULT_CACHE_BACKEND):
+    memory     - in-process LRU (default, one cache per worker)
+    database   - result_cache table, shared by every worker on the database
+    redis://…  - Redis, shared (needs the redis package)
+    off        - no caching
+
+Every backend stores results as JSON: a hit hands each caller its own
+copy (mutating it cannot corrupt the cached value), and dates come back
+as ISO strings whichever backend is configured.
+Only reads made inside a Flask request are cached; scripts, jobs and
+tests calling the same functions always compute fresh results.
+"""
+
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from functools import wraps
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tunables (environment overrides)
+CACHE_BACKEND = os.environ.get('RESULT_CACHE_BACKEND', 'memory').strip()
+DEFAULT_TTL = float(os.environ.get('RESULT_CACHE_TTL', '15'))        # seconds
+MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', '2048'))  # memory backend LRU size
+
+CACHE_TABLE = 'result_cache'
+KEY_VERSION = 'v1'
+ALL_TENANTS = '*'
+# Drop expired rows from the database backend every this many writes
+PURGE_EVERY = 500
+
+
+def _generation_key(tenant_id):
+    return f"{KEY_VERSION}:gen:{tenant_id}"
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def _encode(value):
+    return json.dumps(value, default=_json_default, separators=(',', ':'))
+
+
+class MemoryBackend:
+    """In-process LRU with per-entry expiry"""
+
+    name = 'memory'
+    shared = False
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        # Generation tokens live outside the LRU - evicting one would
+        # let results stamped before an invalidation match again
+        self._tokens = {}
+        self.evictions = 0
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                if key in self._tokens:
+                    values.append(self._tokens[key])
+                    continue
+                entry = self._entries.get(key)
+                if entry is None:
+                    values.append(None)
+                elif entry[0] is not None and entry[0] <= now:
+                    del self._entries[key]
+                    values.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    values.append(entry[1])
+        return values
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            if ttl is None:
+                self._tokens[key] = value
+                return
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens.clear()
+
+    def info(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'evictions': self.evictions, 'generations': len(self._tokens)}
+
+
+class DatabaseBackend:
+    """result_cache table on the application database (created by migration 0005)"""
+
+    name = 'database'
+    shared = True
+
+    def __init__(self):
+        self._writes = 0
+
+    def _connection(self):
+        # Never the request's connection: cache writes commit on their own
+        from .database import get_dedicated_connection
+        return get_dedicated_connection()
+
+    def get_many(self, keys):
+        conn = self._connection()
+        try:
+            placeholders = ', '.join('?' for _ in keys)
+            rows = conn.execute(f"""
+                SELECT cache_key, payload, expires_at FROM {CACHE_TABLE}
+                WHERE cache_key IN ({placeholders})
+            """, tuple(keys)).fetchall()
+        finally:
+            conn.close()
+        now = time.time()
+        found = {row['cache_key']: row['payload'] for row in rows
+                 if row['expires_at'] is None or row['expires_at'] > now}
+        return [found.get(key) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        conn = self._connection()
+        try:
+            conn.bulk_upsert(CACHE_TABLE, [{
+                'cache_key': key,
+                'payload': value,
+                'expires_at': time.time() + ttl if ttl is not None else None
+            }], conflict_columns=('cache_key',))
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                conn.execute(f"DELETE FROM {CACHE_TABLE} WHERE expires_at < ?", (time.time(),))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def clear(self):
+        conn = self._connection()
+        try:
+            conn.execute(f"DELETE FROM {CACHE_TABLE}")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def info(self):
+        conn = self._connection()
+        try:
+            row = conn.execute(f"""
+                SELECT COUNT(*) AS entries,
+                       SUM(CASE WHEN expires_at < ? THEN 1 ELSE 0 END) AS expired
+                FROM {CACHE_TABLE}
+            """, (time.time(),)).fetchone()
+            return {'entries': row['entries'], 'expired': row['expired'] or 0}
+        finally:
+            conn.close()
+
+
+class RedisBackend:
+    """Redis (RESULT_CACHE_BACKEND=redis://host:port/db)"""
+
+    name = 'redis'
+    shared = True
+    prefix = 'bizpulse:result_cache:'
+
+    def __init__(self, url):
+        import redis  # optional dependency, only needed for this backend
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+
+    def get_many(self, keys):
+        return [value.decode('utf-8') if value is not None else None
+                for value in self.client.mget([self.prefix + key for key in keys])]
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value,
+                        px=int(ttl * 1000) if ttl is not None else None)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*', count=500))
+        if keys:
+            self.client.delete(*keys)
+
+    def info(self):
+        return {'url': CACHE_BACKEND.split('@')[-1]}
+
+
+def create_table(conn, db_type):
+    """Create the database backend's table (idempotent)"""
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {CACHE_TABLE} (
+            cache_key TEXT PRIMARY KEY,
+            payload TEXT,
+            expires_at REAL
+        )
+    ''')
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{CACHE_TABLE}_expires ON {CACHE_TABLE} (expires_at)")
+
+
+def create_backend(spec=CACHE_BACKEND):
+    """Backend for a RESULT_CACHE_BACKEND value (None = caching off)"""
+    spec = (spec or 'memory').strip()
+    if spec.lower() in ('off', 'none', 'false', '0'):
+        return None
+    if spec.lower() == 'memory':
+        return MemoryBackend()
+    if spec.lower() == 'database':
+        return DatabaseBackend()
+    if spec.startswith(('redis://', 'rediss://', 'unix://')):
+        try:
+            return RedisBackend(spec)
+        except ImportError:
+            logger.warning("⚠️ RESULT_CACHE_BACKEND is redis but the redis package is not installed - using the in-process cache")
+            return MemoryBackend()
+    logger.warning(f"⚠️ Unknown RESULT_CACHE_BACKEND '{spec}' - using the in-process cache")
+    return MemoryBackend()
+
+
+class ResultCache:
+    """Generation-stamped TTL cache in front of a backend"""
+
+    def __init__(self, backend=None, default_ttl=DEFAULT_TTL):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def reset_stats(self):
+        with self._lock:
+            self._counters = {'hits': 0, 'misses': 0, 'stale': 0, 'invalidations': 0, 'errors': 0}
+            self._by_namespace = {}
+
+    def _count(self, counter, namespace=None):
+        with self._lock:
+            self._counters[counter] += 1
+            if namespace is not None:
+                series = self._by_namespace.setdefault(namespace, {'hits': 0, 'misses': 0})
+                series['hits' if counter == 'hits' else 'misses'] += 1
+
+    def _tokens(self, tenant_id, values):
+        """Current (tenant, all-tenants) tokens, minting any that are missing"""
+        tokens = []
+        for scope, token in zip((tenant_id, ALL_TENANTS), values):
+            if token is None:
+                token = uuid.uuid4().hex
+                self.backend.set(_generation_key(scope), token)
+            tokens.append(token)
+        return tokens
+
+    def get_or_compute(self, namespace, tenant_id, key_args, compute, ttl=None):
+        """Cached result of compute() for (namespace, tenant, key_args)"""
+        if self.backend is None:
+            return compute()
+        tenant_id = tenant_id or ''
+        digest = hashlib.sha1(_encode(key_args).encode('utf-8')).hexdigest()[:20]
+        key = f"{KEY_VERSION}:{namespace}:{tenant_id}:{digest}"
+
+        try:
+            entry, *token_values = self.backend.get_many(
+                [key, _generation_key(tenant_id), _generation_key(ALL_TENANTS)])
+            tokens = self._tokens(tenant_id, token_values)
+            if entry is not None:
+                entry = json.loads(entry)
+                if entry['g'] == tokens:
+                    self._count('hits', namespace)
+                    return entry['v']
+                self._count('stale')
+        except Exception as e:
+            logger.warning(f"⚠️ Result cache read failed for {namespace}: {e}")
+            self._count('errors')
+            return compute()
+
+        self._count('misses', namespace)
+        value = compute()
+        try:
+            entry = {'g': tokens, 'v': value}
+            self.backend.set(key, _encode(entry), ttl if ttl is not None else self.default_ttl)
+        except Exception as e:
+            logger.warning(f"⚠️ Result cache write failed for {namespace}: {e}")
+            self._count('errors')
+        return value
+
+    def generation(self, tenant_id):
+        """
+        The tenant's current (tenant, all-tenants) tokens - they change on
+        every invalidate() that covers the tenant. None when caching is off.
+        """
+        if self.backend is None:
+            return None
+        tenant_id = tenant_id or ''
+        try:
+            return self._tokens(tenant_id, self.backend.get_many(
+                [_generation_key(tenant_id), _generation_key(ALL_TENANTS)]))
+        except Exception as e:
+            logger.warning(f"⚠️ Result cache generation read failed for tenant {tenant_id}: {e}")
+            self._count('errors')
+            return None
+
+    def invalidate(self, tenant_id=None):
+        """Drop a tenant's cached results (every tenant's when tenant_id is None)"""
+        if self.backend is None:
+            return
+        try:
+            self.backend.set(_generation_key(tenant_id or ALL_TENANTS), uuid.uuid4().hex)
+            self._count('invalidations')
+        except Exception as e:
+            logger.warning(f"⚠️ Result cache invalidation failed for tenant {tenant_id}: {e}")
+            self._count('errors')
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def snapshot(self):
+        """Counters and backend state for the diagnostics endpoint"""
+        with self._lock:
+            counters = dict(self._counters)
+            namespaces = {name: dict(series) for name, series in self._by_namespace.items()}
+        lookups = counters['hits'] + counters['misses']
+        backend = None
+        if self.backend is not None:
+            try:
+                backend = {'name': self.backend.name, 'shared': self.backend.shared,
+                           **self.backend.info()}
+            except Exception as e:
+                backend = {'name': self.backend.name, 'error': str(e)}
+        return {
+            'enabled': self.enabled,
+            'default_ttl': self.default_ttl,
+            'backend': backend,
+            'hit_ratio': round(counters['hits'] / lookups, 4) if lookups else None,
+            **counters,
+            'namespaces': namespaces
+        }
+
+
+# Process-wide cache, configured from the environment
+result_cache = ResultCache(create_backend())
+
+
+def current_tenant():
+    """Tenant of the logged-in session (client_id for employees), None outside a request"""
+    from flask import has_request_context
+    from .database import get_current_client_id
+    if not has_request_context():
+        return None
+    return get_current_client_id()
+
+
+def cached(namespace, ttl=None):
+    """
+    Cache a function's result per tenant for `ttl` seconds.
+    The arguments are part of the key; the wrapped function stays
+    reachable as .uncached.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            from flask import has_request_context
+            if not has_request_context() or not result_cache.enabled:
+                return func(*args, **kwargs)
+            return result_cache.get_or_compute(
+                namespace, current_tenant(), [list(args), sorted(kwargs.items())],
+                lambda: func(*args, **kwargs), ttl)
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+
+def invalidate(tenant_id=None):
+    """
+    Call after committing a write that dashboards read, with the tenant that
+    wrote it. None drops every tenant - for migrations and admin tasks.
+    """
+    result_cache.invalidate(tenant_id)
+    # The same writes are what connected devices sync
+    from .sync_clock import tick
+    tick(tenant_id)
@@ -0,0 +1,441 @@
+"""
+Daily sales rollup
+Per (tenant, day, payment_method) totals of bills, payments, credit
+collections and sold items, so the dashboard tiles and the date-grouped
+reports read one row per day instead of aggregating every bill.
+
+The rollup is kept current by the code that writes bills, payments and
+credit transactions: after its writes, the writer calls refresh_bill()
+(or refresh_keys() with keys captured before a delete) inside the same
+transaction, which recomputes just the touched tenant-days from the base
+tables. Anything that writes those tables behind the services' back can
+be repaired with a rebuild:
+
+    python -m modules.shared.sales_rollup status
+    python -m modules.shared.sales_rollup rebuild [tenant_id]
+"""
+
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+import logging
+
+from .database import get_db_connection, get_db_type, table_columns
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_TABLE = 'daily_sales_rollup'
+
+# Read dashboard tiles and reports from the rollup (false = aggregate the
+# base tables as before; the rollup is maintained either way)
+ROLLUP_READS = os.environ.get('SALES_ROLLUP_READS', 'true').lower() in ('1', 'true', 'yes')
+
+# Ownerless rows (business_owner_id IS NULL) are rolled up under this tenant
+UNOWNED = ''
+
+MEASURES = (
+    'bill_count',        # bills created that day
+    'sales_amount',      # their total_amount
+    'credit_sales',      # total_amount of credit bills
+    'payment_count',     # payments processed that day
+    'payment_amount',
+    'credit_collected',  # credit_transactions payments that day
+    'item_count',        # sales rows (line items) sold that day
+    'items_revenue',
+    'items_cost',
+)
+
+# One grouped query per source table. Each yields (tenant_id, day,
+# payment_method, measures...) for the rows matching {where}; owner and
+# timestamp columns are named so a refresh can narrow to one tenant-day.
+_SOURCES = [
+    {
+        'owner': 'b.business_owner_id',
+        'timestamp': 'b.created_at',
+        'measures': ('bill_count', 'sales_amount', 'credit_sales'),
+        'sql': """
+            SELECT COALESCE(b.business_owner_id, '') AS tenant_id,
+                   DATE(b.created_at) AS day,
+                   COALESCE(b.payment_method, '') AS payment_method,
+                   COUNT(*) AS bill_count,
+                   COALESCE(SUM(b.total_amount), 0) AS sales_amount,
+                   COALESCE(SUM(CASE WHEN b.is_credit = 1 THEN b.total_amount ELSE 0 END), 0) AS credit_sales
+            FROM bills b
+            WHERE {where}
+            GROUP BY 1, 2, 3
+        """,
+    },
+    {
+        'owner': 'b.business_owner_id',
+        'timestamp': 'p.processed_at',
+        'measures': ('payment_count', 'payment_amount'),
+        'sql': """
+            SELECT COALESCE(b.business_owner_id, '') AS tenant_id,
+                   DATE(p.processed_at) AS day,
+                   COALESCE(p.method, '') AS payment_method,
+                   COUNT(*) AS payment_count,
+                   COALESCE(SUM(p.amount), 0) AS payment_amount
+            FROM payments p
+            JOIN bills b ON p.bill_id = b.id
+            WHERE {where}
+            GROUP BY 1, 2, 3
+        """,
+    },
+    {
+        'owner': 'b.business_owner_id',
+        'timestamp': 'ct.created_at',
+        'measures': ('credit_collected',),
+        'sql': """
+            SELECT COALESCE(b.business_owner_id, '') AS tenant_id,
+                   DATE(ct.created_at) AS day,
+                   COALESCE(ct.payment_method, '') AS payment_method,
+                   COALESCE(SUM(ct.amount), 0) AS credit_collected
+            FROM credit_transactions ct
+            JOIN bills b ON ct.bill_id = b.id
+            WHERE ct.transaction_type = 'payment' AND {where}
+            GROUP BY 1, 2, 3
+        """,
+    },
+    {
+        'owner': 's.business_owner_id',
+        'timestamp': 's.sale_date',
+        'measures': ('item_count', 'items_revenue', 'items_cost'),
+        'sql': """
+            SELECT COALESCE(s.business_owner_id, '') AS tenant_id,
+                   DATE(s.sale_date) AS day,
+                   COALESCE(s.payment_method, '') AS payment_method,
+                   COUNT(*) AS item_count,
+                   COALESCE(SUM(s.total_price), 0) AS items_revenue,
+                   COALESCE(SUM(s.quantity * COALESCE(s.unit_cost, 0)), 0) AS items_cost
+            FROM sales s
+            WHERE {where}
+            GROUP BY 1, 2, 3
+        """,
+    },
+]
+
+# Sold items before migration 0007 added sales.unit_cost (the rollup's own
+# migration, 0004, rebuilds first): valued at the product's current cost
+_ITEMS_WITHOUT_COST_SNAPSHOT = dict(_SOURCES[-1], sql="""
+            SELECT COALESCE(s.business_owner_id, '') AS tenant_id,
+                   DATE(s.sale_date) AS day,
+                   COALESCE(s.payment_method, '') AS payment_method,
+                   COUNT(*) AS item_count,
+                   COALESCE(SUM(s.total_price), 0) AS items_revenue,
+                   COALESCE(SUM(s.quantity * COALESCE(p.cost, 0)), 0) AS items_cost
+            FROM sales s
+            LEFT JOIN products p ON s.product_id = p.id
+            WHERE {where}
+            GROUP BY 1, 2, 3
+        """)
+
+
+def create_rollup_table(conn, db_type):
+    """Create the rollup table (idempotent)"""
+    day_type = 'DATE' if db_type == 'postgresql' else 'TEXT'
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+            tenant_id TEXT NOT NULL,
+            day {day_type} NOT NULL,
+            payment_method TEXT NOT NULL,
+            bill_count INTEGER DEFAULT 0,
+            sales_amount REAL DEFAULT 0,
+            credit_sales REAL DEFAULT 0,
+            payment_count INTEGER DEFAULT 0,
+            payment_amount REAL DEFAULT 0,
+            credit_collected REAL DEFAULT 0,
+            item_count INTEGER DEFAULT 0,
+            items_revenue REAL DEFAULT 0,
+            items_cost REAL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (tenant_id, day, payment_method)
+        )
+    ''')
+
+
+def _day(value):
+    """'YYYY-MM-DD' for a date, datetime or timestamp string (None if unparseable)"""
+    if value is None:
+        return None
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m-%d')
+    text = str(value).strip()
+    return text[:10] if len(text) >= 10 else None
+
+
+def utc_today():
+    """Today in UTC - the day DATE('now') gave the queries the rollup replaced"""
+    return datetime.now(timezone.utc).date()
+
+
+def _next_day(day):
+    return (datetime.strptime(day, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+def _owner_filter(column, tenant_id):
+    if tenant_id == UNOWNED:
+        return f"({column} IS NULL OR {column} = '')", []
+    return f"{column} = ?", [tenant_id]
+
+
+def _sources_for_schema(conn):
+    """The source queries the current schema supports (see _ITEMS_WITHOUT_COST_SNAPSHOT)"""
+    if 'unit_cost' in table_columns(conn, conn.db_type, 'sales'):
+        return _SOURCES
+    return _SOURCES[:-1] + [_ITEMS_WITHOUT_COST_SNAPSHOT]
+
+
+def _aggregate(conn, tenant_id=None, day=None, sources=None):
+    """
+    Rollup rows computed from the base tables, as {(tenant, day, method): measures}.
+    With tenant_id and day, only that tenant-day is read (an index range per table).
+    """
+    rows = {}
+    for source in sources or _SOURCES:
+        where, params = '1=1', []
+        if tenant_id is not None:
+            where, params = _owner_filter(source['owner'], tenant_id)
+        if day is not None:
+            where += f" AND {source['timestamp']} >= ? AND {source['timestamp']} < ?"
+            params += [day, _next_day(day)]
+
+        for row in conn.execute(source['sql'].format(where=where), params).fetchall():
+            row_day = _day(row['day'])
+            if row_day is None:
+                continue
+            key = (row['tenant_id'], row_day, row['payment_method'])
+            entry = rows.setdefault(key, dict.fromkeys(MEASURES, 0))
+            for measure in source['measures']:
+                entry[measure] += row[measure] or 0
+    return rows
+
+
+def _write_rows(conn, rows):
+    if not rows:
+        return
+    # Microsecond stamp (CURRENT_TIMESTAMP has whole seconds) - the analytics
+    # snapshot tells refreshed days apart by it
+    updated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+    conn.bulk_insert(ROLLUP_TABLE, [
+        {'tenant_id': tenant, 'day': day, 'payment_method': method, **measures, 'updated_at': updated_at}
+        for (tenant, day, method), measures in rows.items()
+    ])
+
+
+def refresh_keys(conn, keys):
+    """
+    Recompute the rollup rows of each (tenant_id, day) in keys.
+
+    Runs inside the caller's transaction and does not commit. A failure is
+    logged and contained (the caller's own writes still commit) - the
+    rollup is then stale until the next write of that day or a rebuild.
+    """
+    keys = {(tenant or UNOWNED, day) for tenant, day in keys if day}
+    if not keys:
+        return
+    db_type = get_db_type()
+    conn.execute("SAVEPOINT sales_rollup")
+    try:
+        for tenant_id, day in sorted(keys):
+            if db_type == 'postgresql':
+                # Serialise refreshes of a tenant-day so a concurrent writer's
+                # recompute cannot overwrite one that saw more rows
+                conn.execute("SELECT pg_advisory_xact_lock(hashtext(?))",
+                             (f"{ROLLUP_TABLE}:{tenant_id}:{day}",))
+            rows = _aggregate(conn, tenant_id, day)
+            conn.execute(f"DELETE FROM {ROLLUP_TABLE} WHERE tenant_id = ? AND day = ?", (tenant_id, day))
+            _write_rows(conn, rows)
+        conn.execute("RELEASE SAVEPOINT sales_rollup")
+    except Exception as e:
+        conn.execute("ROLLBACK TO SAVEPOINT sales_rollup")
+        conn.execute("RELEASE SAVEPOINT sales_rollup")
+        logger.warning(f"⚠️  Sales rollup refresh failed for {sorted(keys)}: {e}")
+
+
+def bill_keys(conn, bill_id):
+    """Tenant-days whose rollup rows a bill (and its payments, credits, items) contributes to"""
+    bill = conn.execute(
+        "SELECT business_owner_id, created_at FROM bills WHERE id = ?", (bill_id,)).fetchone()
+    if not bill:
+        return set()
+    tenant_id = bill['business_owner_id'] or UNOWNED
+    keys = {(tenant_id, _day(bill['created_at']))}
+    for row in conn.execute("SELECT processed_at AS ts FROM payments WHERE bill_id = ?", (bill_id,)).fetchall():
+        keys.add((tenant_id, _day(row['ts'])))
+    for row in conn.execute(
+            "SELECT created_at AS ts FROM credit_transactions WHERE bill_id = ? AND transaction_type = 'payment'",
+            (bill_id,)).fetchall():
+        keys.add((tenant_id, _day(row['ts'])))
+    for row in conn.execute(
+            "SELECT business_owner_id, sale_date FROM sales WHERE bill_id = ?", (bill_id,)).fetchall():
+        keys.add((row['business_owner_id'] or UNOWNED, _day(row['sale_date'])))
+    return {key for key in keys if key[1]}
+
+
+def refresh_bill(conn, bill_id):
+    """Bring the rollup up to date after writing a bill or one of its payments"""
+    refresh_keys(conn, bill_keys(conn, bill_id))
+
+
+def rebuild(tenant_id=None, conn=None):
+    """
+    Recompute the rollup from the base tables (one tenant, or everything).
+    Commits; returns the number of rollup rows written.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    started = time.perf_counter()
+    try:
+        rows = _aggregate(conn, tenant_id, sources=_sources_for_schema(conn))
+        if tenant_id is None:
+            conn.execute(f"DELETE FROM {ROLLUP_TABLE}")
+        else:
+            conn.execute(f"DELETE FROM {ROLLUP_TABLE} WHERE tenant_id = ?", (tenant_id or UNOWNED,))
+        _write_rows(conn, rows)
+        conn.commit()
+        logger.info(f"✅ Sales rollup rebuilt: {len(rows)} rows in "
+                    f"{(time.perf_counter() - started) * 1000.0:.0f}ms")
+        return len(rows)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def _tenant_where(tenant_id, include_unowned):
+    if tenant_id is None:
+        return '1=1', []
+    if include_unowned:
+        return 'tenant_id IN (?, ?)', [tenant_id, UNOWNED]
+    return 'tenant_id = ?', [tenant_id]
+
+
+def daily_totals(conn, tenant_id=None, since=None, limit=None, include_unowned=False,
+                 by_method=False, nonzero=None):
+    """
+    Rollup totals per day (and per payment method with by_method), newest first.
+
+    tenant_id None reads every tenant; include_unowned adds ownerless rows,
+    matching the reports' "business_owner_id = ? OR IS NULL" filter.
+    nonzero drops groups where that measure sums to 0 (e.g. 'bill_count'
+    for days that only had payments). limit counts days, not rows.
+    """
+    where, params = _tenant_where(tenant_id, include_unowned)
+    if since is not None:
+        where += " AND day >= ?"
+        params.append(_day(since))
+    sums = ', '.join(f"COALESCE(SUM({m}), 0) AS {m}" for m in MEASURES)
+    having = ''
+    if nonzero is not None:
+        if nonzero not in MEASURES:
+            raise ValueError(f"Unknown rollup measure: {nonzero}")
+        having = f" HAVING SUM({nonzero}) <> 0"
+
+    if by_method:
+        query = f"""
+            SELECT day, payment_method, {sums} FROM {ROLLUP_TABLE}
+            WHERE {where} GROUP BY day, payment_method{having} ORDER BY day DESC, payment_method
+        """
+    else:
+        query = f"SELECT day, {sums} FROM {ROLLUP_TABLE} WHERE {where} GROUP BY day{having} ORDER BY day DESC"
+
+    results = []
+    days_seen = []
+    for row in conn.execute(query, params).fetchall():
+        row = dict(row)
+        row['day'] = _day(row['day'])
+        if not days_seen or days_seen[-1] != row['day']:
+            if limit is not None and len(days_seen) >= limit:
+                break
+            days_seen.append(row['day'])
+        results.append(row)
+    return results
+
+
+def window_totals(conn, tenant_id=None, today=None, revenue_method='Cash'):
+    """
+    Today / last-7-days / month-to-date tiles from one rollup read.
+
+    Sales and orders come from bills, revenue from payments made with
+    revenue_method - the same definitions as the dashboard summary.
+    """
+    today = today or utc_today()
+    windows = {
+        'today': today,
+        'week': today - timedelta(days=7),
+        'month': today.replace(day=1),
+    }
+    where, params = _tenant_where(tenant_id, False)
+    columns = []
+    for name, start in windows.items():
+        columns.append(f"COALESCE(SUM(CASE WHEN day >= ? THEN sales_amount ELSE 0 END), 0) AS {name}_sales")
+        columns.append(f"COALESCE(SUM(CASE WHEN day >= ? AND payment_method = ? "
+                       f"THEN payment_amount ELSE 0 END), 0) AS {name}_revenue")
+        columns.append(f"COALESCE(SUM(CASE WHEN day >= ? THEN bill_count ELSE 0 END), 0) AS {name}_orders")
+    column_params = []
+    for start in windows.values():
+        start = start.strftime('%Y-%m-%d')
+        column_params += [start, start, revenue_method, start]
+
+    row = conn.execute(f"""
+        SELECT {', '.join(columns)} FROM {ROLLUP_TABLE}
+        WHERE {where} AND day >= ? AND day <= ?
+    """, column_params + params + [min(windows.values()).strftime('%Y-%m-%d'),
+                                   today.strftime('%Y-%m-%d')]).fetchone()
+    return {
+        name: {
+            'sales': float(row[f'{name}_sales'] or 0),
+            'revenue': float(row[f'{name}_revenue'] or 0),
+            'orders': int(row[f'{name}_orders'] or 0)
+        }
+        for name in windows
+    }
+
+
+def rollup_status(conn=None):
+    """Row count and covered day range, for the CLI and diagnostics"""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    try:
+        row = conn.execute(f"""
+            SELECT COUNT(*) AS row_count, COUNT(DISTINCT tenant_id) AS tenants,
+                   MIN(day) AS first_day, MAX(day) AS last_day
+            FROM {ROLLUP_TABLE}
+        """).fetchone()
+        return {
+            'reads_enabled': ROLLUP_READS,
+            'rows': row['row_count'],
+            'tenants': row['tenants'],
+            'first_day': _day(row['first_day']),
+            'last_day': _day(row['last_day'])
+        }
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    command = argv[0] if argv else 'status'
+
+    if command == 'status':
+        for key, value in rollup_status().items():
+            print(f"  {key}: {value}")
+        return 0
+
+    if command == 'rebuild':
+        written = rebuild(argv[1] if len(argv) > 1 else None)
+        print(f"Rollup rows written: {written}")
+        return 0
+
+    print(__doc__)
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
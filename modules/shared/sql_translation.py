@@ -0,0 +1,220 @@
+"""
+SQL dialect translation with a compiled-query cache
+Translates SQLite-style SQL (? placeholders, DATE()/TIME(), 0/1 booleans)
+into its PostgreSQL form once per distinct statement and keeps the result
+in a bounded LRU keyed by (dialect, profile, raw SQL).
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+
+# Maximum number of distinct statements kept per process
+CACHE_SIZE = int(os.environ.get('SQL_TRANSLATION_CACHE_SIZE', '2048'))
+
+# Translation profiles - the connection wrapper and the cursor wrapper have
+# always rewritten slightly different sets of constructs, keep them apart
+PROFILE_CONNECTION = 'connection'
+PROFILE_CURSOR = 'cursor'
+
+# Boolean columns rewritten from "= 1" / "= 0" to "= TRUE" / "= FALSE"
+CONNECTION_BOOLEAN_COLUMNS = [
+    'is_active', 'is_admin', 'is_super_admin', 'is_credit',
+    'low_stock_enabled', 'is_popular', 'used', 'force_password_change',
+    'autocommit', 'is_permanent', 'send_daily_report', 'is_system_role'
+]
+CURSOR_BOOLEAN_COLUMNS = [
+    'is_active', 'is_admin', 'is_super_admin', 'is_credit',
+    'low_stock_enabled', 'is_popular', 'used', 'force_password_change'
+]
+
+# Columns whose presence in an INSERT triggers 0/1 -> bool param coercion
+INSERT_BOOLEAN_MARKERS = [
+    'IS_ACTIVE', 'IS_ADMIN', 'IS_SUPER_ADMIN', 'IS_CREDIT',
+    'LOW_STOCK_ENABLED', 'IS_POPULAR', 'FORCE_PASSWORD_CHANGE',
+    'SEND_DAILY_REPORT', 'IS_PERMANENT'
+]
+# Columns whose INSERT params are coerced from 0/1 to False/True
+INSERT_BOOLEAN_COLUMNS = frozenset([
+    'is_active', 'is_admin', 'is_super_admin', 'is_credit',
+    'low_stock_enabled', 'is_popular', 'force_password_change',
+    'send_daily_report', 'is_permanent', 'used', 'autocommit'
+])
+
+# Patterns compiled once at import time
+_DATE_RE = re.compile(r'\bDATE\(([^)]+)\)', re.IGNORECASE)
+_TIME_RE = re.compile(r'\bTIME\(([^)]+)\)', re.IGNORECASE)
+_INSERT_COLUMNS_RE = re.compile(r'INSERT\s+INTO\s+\w+\s*\((.*?)\)\s*VALUES', re.IGNORECASE)
+
+
+def _compile_boolean_patterns(columns):
+    return [
+        (re.compile(rf'\b{col}\s*=\s*1\b', re.IGNORECASE), f'{col} = TRUE',
+         re.compile(rf'\b{col}\s*=\s*0\b', re.IGNORECASE), f'{col} = FALSE')
+        for col in columns
+    ]
+
+
+_BOOLEAN_PATTERNS = {
+    PROFILE_CONNECTION: _compile_boolean_patterns(CONNECTION_BOOLEAN_COLUMNS),
+    PROFILE_CURSOR: _compile_boolean_patterns(CURSOR_BOOLEAN_COLUMNS),
+}
+
+
+class CompiledQuery:
+    """A statement translated to its target dialect"""
+
+    __slots__ = ('sql', 'boolean_param_positions', '_fingerprint')
+
+    def __init__(self, sql, boolean_param_positions=()):
+        self.sql = sql
+        # Param indexes (INSERT column positions) that hold boolean columns
+        self.boolean_param_positions = boolean_param_positions
+        self._fingerprint = None
+
+    @property
+    def fingerprint(self):
+        """Normalized statement used for timing aggregation (computed once)"""
+        if self._fingerprint is None:
+            from .query_stats import fingerprint
+            self._fingerprint = fingerprint(self.sql)
+        return self._fingerprint
+
+    def convert_params(self, params):
+        """Coerce 0/1 params to False/True for boolean INSERT columns"""
+        if not self.boolean_param_positions or not isinstance(params, (list, tuple)):
+            return params
+
+        converted_params = list(params)
+        for i in self.boolean_param_positions:
+            if i >= len(converted_params):
+                break
+            param = converted_params[i]
+            if param == 1:
+                converted_params[i] = True
+            elif param == 0:
+                converted_params[i] = False
+        return tuple(converted_params)
+
+
+def _insert_boolean_positions(query):
+    """Map an INSERT's column list to the positions of boolean columns"""
+    query_upper = query.upper()
+    if 'INSERT' not in query_upper:
+        return ()
+    if not any(col in query_upper for col in INSERT_BOOLEAN_MARKERS):
+        return ()
+
+    # Remove newlines and extra spaces for easier parsing
+    clean_query = ' '.join(query.split())
+    match = _INSERT_COLUMNS_RE.search(clean_query)
+    if not match:
+        return ()
+
+    columns = [c.strip().lower() for c in match.group(1).split(',')]
+    return tuple(i for i, col in enumerate(columns) if col in INSERT_BOOLEAN_COLUMNS)
+
+
+def compile_query(query, db_type, profile=PROFILE_CONNECTION):
+    """Translate a single statement without consulting the cache"""
+    if db_type != 'postgresql':
+        return CompiledQuery(query)
+
+    # Convert SQLite ? placeholders to PostgreSQL %s
+    converted_query = query.replace('?', '%s') if '?' in query else query
+
+    if profile == PROFILE_CONNECTION:
+        # Convert SQLite transaction syntax to PostgreSQL
+        if converted_query.strip().upper() == 'BEGIN TRANSACTION':
+            converted_query = 'BEGIN'
+
+        # Replace DATE(column) / TIME(column) with CAST(column AS DATE/TIME)
+        converted_query = _DATE_RE.sub(r'CAST(\1 AS DATE)', converted_query)
+        converted_query = _TIME_RE.sub(r'CAST(\1 AS TIME)', converted_query)
+
+    # Boolean fix: "column = 1" -> "column = TRUE", "column = 0" -> "column = FALSE"
+    for true_re, true_sub, false_re, false_sub in _BOOLEAN_PATTERNS[profile]:
+        converted_query = true_re.sub(true_sub, converted_query)
+        converted_query = false_re.sub(false_sub, converted_query)
+
+    positions = ()
+    if profile == PROFILE_CONNECTION:
+        positions = _insert_boolean_positions(converted_query)
+
+    return CompiledQuery(converted_query, positions)
+
+
+class QueryTranslationCache:
+    """Thread-safe bounded LRU of compiled queries with hit/miss counters"""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, query, db_type, profile=PROFILE_CONNECTION):
+        """Return the compiled form of query, translating it on first use"""
+        key = (db_type, profile, query)
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+
+        # Compile outside the lock - translation is pure, a racing
+        # duplicate compile is harmless
+        compiled = compile_query(query, db_type, profile)
+
+        with self._lock:
+            self._entries[key] = compiled
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return compiled
+
+    def clear(self):
+        """Drop all cached statements and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Cache counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# Process-wide cache shared by every connection and cursor wrapper
+_translation_cache = QueryTranslationCache()
+
+
+def translate_query(query, db_type, profile=PROFILE_CONNECTION):
+    """Get the cached target-dialect form of a statement"""
+    return _translation_cache.get(query, db_type, profile)
+
+
+def get_translation_cache_stats():
+    """Hit/miss counters of the process-wide translation cache"""
+    return _translation_cache.stats()
+
+
+def clear_translation_cache():
+    """Reset the process-wide translation cache"""
+    _translation_cache.clear()
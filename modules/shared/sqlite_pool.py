@@ -0,0 +1,157 @@
+"""
+SQLite connection pooling for on-prem / kiosk installs
+Keeps billing.db connections open across requests in a thread-affine pool
+and configures every new connection once (WAL journal, synchronous=NORMAL,
+mmap, busy timeout, foreign keys).
+"""
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tunables (environment overrides)
+SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', '10'))
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))  # 256MB
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+
+
+class ThreadAffinePool(Pool):
+    """
+    Pool that hands each thread back the connection it used last.
+
+    Idle connections remember the thread that returned them; a checkout
+    prefers that thread's connection (warm page cache, no cross-thread
+    hand-off) and otherwise borrows the least recently used idle one.
+    At most pool_size connections are kept idle, extra ones are closed
+    on return. Unlike SingletonThreadPool, a connection that is checked
+    out is never closed behind its owner's back.
+    """
+
+    def __init__(self, creator, pool_size=SQLITE_POOL_SIZE, **kw):
+        Pool.__init__(self, creator, **kw)
+        self.size = pool_size
+        self._lock = threading.Lock()
+        self._idle = OrderedDict()  # connection record -> owning thread ident, oldest first
+        self._checked_out = 0
+
+    def recreate(self):
+        self.logger.info("Pool recreating")
+        return self.__class__(
+            self._creator,
+            pool_size=self.size,
+            recycle=self._recycle,
+            echo=self.echo,
+            pre_ping=self._pre_ping,
+            logging_name=self._orig_logging_name,
+            reset_on_return=self._reset_on_return,
+            _dispatch=self.dispatch,
+            dialect=self._dialect,
+        )
+
+    def dispose(self):
+        """Close every idle connection"""
+        with self._lock:
+            records = list(self._idle)
+            self._idle.clear()
+        for record in records:
+            try:
+                record.close()
+            except Exception:
+                pass
+
+    def status(self):
+        return "ThreadAffinePool id:%d size: %d idle: %d checked out: %d" % (
+            id(self), self.size, len(self._idle), self._checked_out
+        )
+
+    def checkedin(self):
+        """Number of idle connections"""
+        return len(self._idle)
+
+    def checkedout(self):
+        """Number of connections currently in use"""
+        return self._checked_out
+
+    def _do_get(self):
+        thread_id = threading.get_ident()
+        record = None
+        with self._lock:
+            # Prefer the connection this thread returned most recently
+            for candidate, owner in reversed(self._idle.items()):
+                if owner == thread_id:
+                    record = candidate
+                    break
+            if record is not None:
+                del self._idle[record]
+            elif self._idle:
+                record, _ = self._idle.popitem(last=False)
+            self._checked_out += 1
+
+        if record is not None:
+            return record
+
+        try:
+            return self._create_connection()
+        except Exception:
+            with self._lock:
+                self._checked_out -= 1
+            raise
+
+    def _do_return_conn(self, record):
+        to_close = []
+        with self._lock:
+            self._checked_out -= 1
+            self._idle[record] = threading.get_ident()
+            while len(self._idle) > self.size:
+                oldest, _ = self._idle.popitem(last=False)
+                to_close.append(oldest)
+
+        for oldest in to_close:
+            try:
+                oldest.close()
+            except Exception:
+                pass
+
+
+def configure_sqlite_connection(dbapi_conn, connection_record):
+    """Run the per-connection PRAGMAs - once per physical connection"""
+    if not isinstance(dbapi_conn, sqlite3.Connection):
+        return
+
+    cursor = dbapi_conn.cursor()
+    try:
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    except Exception as e:
+        logger.warning(f"⚠️  Could not apply SQLite PRAGMAs: {e}")
+    finally:
+        cursor.close()
+
+
+def get_sqlite_engine_options():
+    """Keyword arguments for create_engine() in SQLite mode"""
+    return {
+        'poolclass': ThreadAffinePool,
+        'pool_size': SQLITE_POOL_SIZE,
+        'connect_args': {
+            # Connections move between threads through the pool
+            'check_same_thread': False,
+            'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000.0
+        }
+    }
+
+
+def attach_sqlite_listeners(engine):
+    """Register the PRAGMA setup on a SQLite engine"""
+    event.listen(engine, "connect", configure_sqlite_connection)
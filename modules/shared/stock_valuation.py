@@ -0,0 +1,579 @@
+"""
+Stock valuation and ageing engine
+Running quantity, weighted-average cost and open FIFO cost layers per
+(tenant, product), kept current as stock transactions are written. The
+valuation and ageing reports then read one row per product, or its
+open layers, instead of summing every stock transaction on each request.
+
+    stock_valuation     business_owner_id, product_id -> quantity, avg_cost,
+                        fifo_value (value of the open layers), last_transaction_at
+    stock_cost_layers   one row per open receipt: received_on, remaining quantity,
+                        unit_cost - consumed oldest first (lowest seq) by outgoing stock
+
+The code that inserts into stock_transactions calls record() with the
+same values inside its transaction, like the sales rollup's writers -
+or record_many() for a batch of one tenant's transactions, which reads
+and writes every product it touches in a handful of statements. Only
+the layers a transaction adds, uses up or draws down are written.
+Stock received at no cost (adjustments, openings) is valued at the
+current average cost. Issues beyond the stock on hand drive quantity
+negative without a layer; the next receipt fills that gap first.
+
+Layers are consumed in the order transactions are recorded. A
+transaction backdated before the last one recorded for its product, or
+anything written to stock_transactions behind the services' back, is
+only reflected after a rebuild, which replays the history in
+created_at order:
+
+    python -m modules.shared.stock_valuation status
+    python -m modules.shared.stock_valuation rebuild [business_owner_id]
+    python -m modules.shared.stock_valuation bench [--products N] [--transactions N] [--runs N] [--db PATH]
+"""
+
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+from datetime import date, datetime, timedelta
+import logging
+
+from .database import get_db_connection, table_columns
+
+logger = logging.getLogger(__name__)
+
+VALUATION_TABLE = 'stock_valuation'
+LAYERS_TABLE = 'stock_cost_layers'
+
+METHODS = ('fifo', 'average')
+
+# (label, youngest age in days, oldest age in days or None)
+AGE_BUCKETS = (
+    ('0_30', 0, 30),
+    ('31_60', 31, 60),
+    ('61_90', 61, 90),
+    ('90_plus', 91, None),
+)
+
+# Remaining quantities below this are treated as consumed
+EPSILON = 1e-9
+
+_TRANSACTION_COLUMNS = ('product_id', 'transaction_type', 'quantity', 'business_owner_id', 'created_at')
+
+
+def create_tables(conn, db_type):
+    """Create the valuation and layer tables (idempotent)"""
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {VALUATION_TABLE} (
+            business_owner_id TEXT NOT NULL,
+            product_id TEXT NOT NULL,
+            quantity REAL DEFAULT 0,
+            avg_cost REAL DEFAULT 0,
+            fifo_value REAL DEFAULT 0,
+            layer_count INTEGER DEFAULT 0,
+            last_transaction_at TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (business_owner_id, product_id)
+        )
+    ''')
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {LAYERS_TABLE} (
+            business_owner_id TEXT NOT NULL,
+            product_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            received_on TEXT NOT NULL,
+            quantity REAL NOT NULL,
+            unit_cost REAL DEFAULT 0,
+            PRIMARY KEY (business_owner_id, product_id, seq)
+        )
+    ''')
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{LAYERS_TABLE}_owner_received "
+                 f"ON {LAYERS_TABLE} (business_owner_id, received_on)")
+
+
+def signed_quantity(transaction_type, quantity):
+    """
+    Stock movement of a transaction: 'in'/'opening' add, 'out' removes,
+    anything else (e.g. 'ADJUSTMENT') carries its own sign. Both the
+    integrated inventory ('in', positive 'out') and the stock module
+    ('IN', negative 'OUT') conventions are accepted.
+    """
+    quantity = float(quantity or 0)
+    kind = (transaction_type or '').lower()
+    if kind in ('in', 'opening'):
+        return abs(quantity)
+    if kind == 'out':
+        return -abs(quantity)
+    return quantity
+
+
+def _day(value):
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m-%d')
+    return str(value)[:10] if value else date.today().strftime('%Y-%m-%d')
+
+
+class Position:
+    """One product's running quantity, average cost and open FIFO layers"""
+
+    __slots__ = ('quantity', 'avg_cost', 'layers', 'last_transaction_at', 'next_seq')
+
+    def __init__(self, quantity=0.0, avg_cost=0.0, layers=None, last_transaction_at=None):
+        self.quantity = quantity
+        self.avg_cost = avg_cost
+        self.layers = layers if layers is not None else []  # [received_on, remaining, unit_cost, seq], oldest first
+        self.last_transaction_at = last_transaction_at
+        self.next_seq = self.layers[-1][3] + 1 if self.layers else 0
+
+    def apply(self, delta, unit_cost=None, created_at=None):
+        if delta > 0:
+            cost = float(unit_cost) if unit_cost else self.avg_cost
+            on_hand = max(self.quantity, 0.0)
+            self.avg_cost = (on_hand * self.avg_cost + delta * cost) / (on_hand + delta)
+            # An oversold position is filled first - that stock is already gone
+            layer_quantity = delta + min(self.quantity, 0.0)
+            if layer_quantity > EPSILON:
+                self.layers.append([_day(created_at), layer_quantity, cost, self.next_seq])
+                self.next_seq += 1
+        elif delta < 0:
+            remaining = -delta
+            while remaining > EPSILON and self.layers:
+                layer = self.layers[0]
+                taken = min(layer[1], remaining)
+                layer[1] -= taken
+                remaining -= taken
+                if layer[1] <= EPSILON:
+                    self.layers.pop(0)
+        self.quantity += delta
+        if created_at is not None:
+            self.last_transaction_at = str(created_at)
+
+    @property
+    def fifo_value(self):
+        return sum(quantity * unit_cost for _, quantity, unit_cost, _ in self.layers)
+
+
+def _load_many(conn, owner, product_ids, chunk_size):
+    """{product_id: Position} for a tenant's products - valuation and layers in one query per chunk"""
+    rows = {}
+    for start in range(0, len(product_ids), chunk_size):
+        chunk = product_ids[start:start + chunk_size]
+        for row in conn.execute(f"""
+            SELECT v.product_id, v.quantity, v.avg_cost, v.last_transaction_at,
+                   l.seq, l.received_on, l.quantity AS layer_quantity, l.unit_cost
+            FROM {VALUATION_TABLE} v
+            LEFT JOIN {LAYERS_TABLE} l
+                ON l.business_owner_id = v.business_owner_id AND l.product_id = v.product_id
+            WHERE v.business_owner_id = ? AND v.product_id IN ({', '.join(['?'] * len(chunk))})
+            ORDER BY v.product_id, l.seq
+        """, [owner] + chunk).fetchall():
+            valuation, layers = rows.setdefault(row['product_id'], (row, []))
+            if row['seq'] is not None:
+                layers.append([row['received_on'], float(row['layer_quantity']), float(row['unit_cost'] or 0),
+                               int(row['seq'])])
+    positions = {}
+    for product_id in product_ids:
+        if product_id not in rows:
+            positions[product_id] = Position()
+            continue
+        valuation, layers = rows[product_id]
+        positions[product_id] = Position(float(valuation['quantity'] or 0), float(valuation['avg_cost'] or 0),
+                                         layers, valuation['last_transaction_at'])
+    return positions
+
+
+def _valuation_row(owner, product_id, position):
+    return {
+        'business_owner_id': owner,
+        'product_id': product_id,
+        'quantity': position.quantity,
+        'avg_cost': position.avg_cost,
+        'fifo_value': position.fifo_value,
+        'layer_count': len(position.layers),
+        'last_transaction_at': position.last_transaction_at,
+        'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def _layer_rows(owner, product_id, position):
+    return [{'business_owner_id': owner, 'product_id': product_id, 'seq': seq, 'received_on': received_on,
+             'quantity': quantity, 'unit_cost': unit_cost}
+            for received_on, quantity, unit_cost, seq in position.layers]
+
+
+def record(conn, product_id, business_owner_id, transaction_type, quantity, unit_cost=None, created_at=None):
+    """
+    Apply one stock transaction to its product's valuation (zero-quantity
+    transactions, e.g. the opening row of a new product, change nothing).
+
+    Runs inside the caller's transaction and does not commit. A failure is
+    logged and contained (the caller's own writes still commit) - that
+    product's valuation is then stale until a rebuild.
+    """
+    record_many(conn, business_owner_id, [{'product_id': product_id, 'transaction_type': transaction_type,
+                                           'quantity': quantity, 'unit_cost': unit_cost,
+                                           'created_at': created_at}])
+
+
+def record_many(conn, business_owner_id, transactions, chunk_size=500):
+    """
+    Apply a tenant's stock transactions (dicts with product_id,
+    transaction_type, quantity and optional unit_cost and created_at) in
+    the order given. The products they touch are loaded with one query
+    per chunk_size products, moved in memory and written back with one
+    statement per table: a DELETE of the layers used up, an upsert of the
+    layers added or drawn down, and an upsert of the valuations.
+
+    Same transaction and failure handling as record().
+    """
+    owner = business_owner_id or ''
+    moves = [(transaction['product_id'], signed_quantity(transaction['transaction_type'], transaction['quantity']),
+              transaction.get('unit_cost'), transaction.get('created_at')) for transaction in transactions]
+    moves = [move for move in moves if move[1]]
+    if not moves:
+        return
+    product_ids = list(dict.fromkeys(product_id for product_id, _, _, _ in moves))
+
+    conn.execute("SAVEPOINT stock_valuation")
+    try:
+        if conn.db_type == 'postgresql':
+            # Serialise writers of these products so layers are consumed once (in one order: no deadlocks)
+            for start in range(0, len(product_ids), chunk_size):
+                chunk = product_ids[start:start + chunk_size]
+                conn.execute(f"""
+                    SELECT pg_advisory_xact_lock(hashtext(lock_key)) FROM (
+                        SELECT lock_key FROM (VALUES {', '.join(['(?)'] * len(chunk))}) AS lock_keys (lock_key)
+                        ORDER BY hashtext(lock_key) OFFSET 0
+                    ) ordered_keys
+                """, [f"{VALUATION_TABLE}:{owner}:{product_id}" for product_id in chunk])
+        positions = _load_many(conn, owner, product_ids, chunk_size)
+        before = {product_id: {layer[3]: layer[1] for layer in position.layers}
+                  for product_id, position in positions.items()}
+        for product_id, delta, unit_cost, created_at in moves:
+            positions[product_id].apply(delta, unit_cost, created_at)
+
+        # Layers are consumed oldest first, so the used-up ones are those below the oldest left
+        used_up, changed = [], []
+        for product_id, position in positions.items():
+            left = {layer[3] for layer in position.layers}
+            if any(seq not in left for seq in before[product_id]):
+                used_up.append((product_id, position.layers[0][3] if position.layers else position.next_seq))
+            changed += [row for row in _layer_rows(owner, product_id, position)
+                        if before[product_id].get(row['seq']) != row['quantity']]
+        for start in range(0, len(used_up), chunk_size):
+            chunk = used_up[start:start + chunk_size]
+            conn.execute(f"DELETE FROM {LAYERS_TABLE} WHERE business_owner_id = ? AND ("
+                         + ' OR '.join(['(product_id = ? AND seq < ?)'] * len(chunk)) + ")",
+                         [owner] + [value for pair in chunk for value in pair])
+        if changed:
+            conn.bulk_upsert(LAYERS_TABLE, changed, conflict_columns=['business_owner_id', 'product_id', 'seq'])
+        conn.bulk_upsert(VALUATION_TABLE, [_valuation_row(owner, product_id, position)
+                                           for product_id, position in positions.items()],
+                         conflict_columns=['business_owner_id', 'product_id'])
+        conn.execute("RELEASE SAVEPOINT stock_valuation")
+    except Exception as e:
+        conn.execute("ROLLBACK TO SAVEPOINT stock_valuation")
+        conn.execute("RELEASE SAVEPOINT stock_valuation")
+        logger.warning(f"⚠️  Stock valuation update failed for {', '.join(product_ids[:5])}"
+                       f"{'...' if len(product_ids) > 5 else ''}: {e}")
+
+
+def replay(transactions):
+    """{(owner, product_id): Position} from transaction dicts in the order given"""
+    positions = {}
+    for transaction in transactions:
+        delta = signed_quantity(transaction['transaction_type'], transaction['quantity'])
+        if not delta:
+            continue
+        key = (transaction['business_owner_id'] or '', transaction['product_id'])
+        position = positions.get(key)
+        if position is None:
+            position = positions[key] = Position()
+        position.apply(delta, transaction['unit_cost'], transaction['created_at'])
+    return positions
+
+
+def rebuild(business_owner_id=None, conn=None):
+    """
+    Recompute valuations and layers from stock_transactions (one tenant,
+    or everything). Commits; returns the number of products valued.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    started = time.perf_counter()
+    try:
+        columns = table_columns(conn, conn.db_type, 'stock_transactions')
+        missing = set(_TRANSACTION_COLUMNS) - columns
+        if missing:
+            logger.warning(f"⚠️  Stock valuation not rebuilt: stock_transactions lacks {sorted(missing)}")
+            return 0
+        # The stock module's schema has no unit_cost: receipts come in at the running average
+        unit_cost = 'unit_cost' if 'unit_cost' in columns else '0 AS unit_cost'
+
+        where, params = '', []
+        if business_owner_id is not None:
+            where, params = "WHERE business_owner_id = ?", [business_owner_id]
+        positions = replay(conn.stream(f"""
+            SELECT {', '.join(_TRANSACTION_COLUMNS)}, {unit_cost} FROM stock_transactions {where}
+            ORDER BY created_at, id
+        """, params))
+
+        for table in (VALUATION_TABLE, LAYERS_TABLE):
+            conn.execute(f"DELETE FROM {table} {where}", params)
+        valuations = [_valuation_row(owner, product_id, position)
+                      for (owner, product_id), position in positions.items()]
+        layers = [row for (owner, product_id), position in positions.items()
+                  for row in _layer_rows(owner, product_id, position)]
+        if valuations:
+            conn.bulk_insert(VALUATION_TABLE, valuations)
+        if layers:
+            conn.bulk_insert(LAYERS_TABLE, layers)
+        conn.commit()
+        logger.info(f"✅ Stock valuation rebuilt: {len(positions)} products in "
+                    f"{(time.perf_counter() - started) * 1000.0:.0f}ms")
+        return len(positions)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def valuation_rows(conn, user_id, method='fifo'):
+    """
+    Every active product of a tenant with its quantity, cost value (FIFO
+    layers or quantity x average cost) and selling value - one row read
+    per product.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown valuation method: {method}")
+    rows = conn.execute(f"""
+        SELECT p.id AS product_id, p.name, p.category, p.selling_price,
+               COALESCE(v.quantity, 0) AS quantity,
+               COALESCE(v.avg_cost, 0) AS avg_cost,
+               COALESCE(v.fifo_value, 0) AS fifo_value
+        FROM products p
+        LEFT JOIN {VALUATION_TABLE} v ON v.product_id = p.id AND v.business_owner_id = ?
+        WHERE p.user_id = ? AND p.is_active = 1
+    """, (user_id, user_id)).fetchall()
+
+    products = []
+    for row in rows:
+        quantity = float(row['quantity'])
+        if method == 'fifo':
+            cost_value = float(row['fifo_value'])
+        else:
+            cost_value = max(quantity, 0.0) * float(row['avg_cost'])
+        selling_value = quantity * float(row['selling_price'] or 0)
+        products.append({
+            'product_id': row['product_id'],
+            'name': row['name'],
+            'category': row['category'],
+            'quantity': quantity,
+            'avg_cost': float(row['avg_cost']),
+            'cost_value': cost_value,
+            'selling_value': selling_value,
+            'potential_profit': selling_value - cost_value,
+        })
+    return products
+
+
+def ageing_rows(conn, user_id, today=None):
+    """
+    Open stock per active product split into AGE_BUCKETS by receipt date
+    (quantity and FIFO value per bucket), oldest stock first - read from
+    the open layers only.
+    """
+    today = today or date.today()
+    columns, params = [], []
+    for label, youngest, oldest in AGE_BUCKETS:
+        conditions, bounds = [], []
+        if youngest:
+            conditions.append("l.received_on <= ?")
+            bounds.append((today - timedelta(days=youngest)).strftime('%Y-%m-%d'))
+        if oldest is not None:
+            conditions.append("l.received_on >= ?")
+            bounds.append((today - timedelta(days=oldest)).strftime('%Y-%m-%d'))
+        condition = ' AND '.join(conditions)
+        columns.append(f"COALESCE(SUM(CASE WHEN {condition} THEN l.quantity ELSE 0 END), 0) AS qty_{label}")
+        columns.append(f"COALESCE(SUM(CASE WHEN {condition} THEN l.quantity * l.unit_cost ELSE 0 END), 0) "
+                       f"AS value_{label}")
+        params += bounds + bounds
+
+    rows = conn.execute(f"""
+        SELECT l.product_id, p.name, p.category, MIN(l.received_on) AS oldest_received_on,
+               {', '.join(columns)}
+        FROM {LAYERS_TABLE} l
+        JOIN products p ON p.id = l.product_id
+        WHERE l.business_owner_id = ? AND p.user_id = ? AND p.is_active = 1
+        GROUP BY l.product_id, p.name, p.category
+        ORDER BY oldest_received_on, l.product_id
+    """, params + [user_id, user_id]).fetchall()
+
+    products = []
+    for row in rows:
+        oldest = datetime.strptime(str(row['oldest_received_on'])[:10], '%Y-%m-%d').date()
+        products.append({
+            'product_id': row['product_id'],
+            'name': row['name'],
+            'category': row['category'],
+            'oldest_received_on': oldest.strftime('%Y-%m-%d'),
+            'oldest_age_days': (today - oldest).days,
+            'buckets': {label: {'quantity': float(row[f'qty_{label}']), 'value': float(row[f'value_{label}'])}
+                        for label, _, _ in AGE_BUCKETS},
+        })
+    return products
+
+
+def valuation_status(conn=None):
+    """Products valued, open layers and total FIFO value, for the CLI"""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    try:
+        row = conn.execute(f"""
+            SELECT COUNT(*) AS products, COUNT(DISTINCT business_owner_id) AS tenants,
+                   COALESCE(SUM(layer_count), 0) AS layers, COALESCE(SUM(fifo_value), 0) AS fifo_value,
+                   MAX(last_transaction_at) AS last_transaction_at
+            FROM {VALUATION_TABLE}
+        """).fetchone()
+        return dict(row)
+    finally:
+        if own_conn:
+            conn.close()
+
+
+# ---- benchmark ----
+
+# IntegratedInventoryService.get_stock_valuation_report before the engine
+LEGACY_VALUATION_SQL = """
+    SELECT
+        p.category,
+        COUNT(*) as product_count,
+        SUM(COALESCE(s.current_stock, 0)) as total_quantity,
+        SUM(COALESCE(s.current_stock, 0) * p.purchase_price) as purchase_value,
+        SUM(COALESCE(s.current_stock, 0) * p.selling_price) as selling_value
+    FROM products p
+    LEFT JOIN (
+        SELECT
+            product_id,
+            SUM(CASE WHEN transaction_type = 'in' THEN quantity ELSE -quantity END) as current_stock
+        FROM stock_transactions
+        WHERE business_owner_id = ?
+        GROUP BY product_id
+    ) s ON p.id = s.product_id
+    WHERE p.user_id = ? AND p.is_active = 1
+    GROUP BY p.category
+    ORDER BY selling_value DESC
+"""
+
+
+def _seed(path, products, transactions, tenants):
+    raw = sqlite3.connect(path)
+    raw.executescript("""
+        CREATE TABLE products (id TEXT PRIMARY KEY, name TEXT, category TEXT, user_id TEXT,
+                               is_active INTEGER DEFAULT 1, purchase_price REAL, selling_price REAL);
+        CREATE TABLE stock_transactions (id TEXT PRIMARY KEY, product_id TEXT, transaction_type TEXT,
+                                         quantity INTEGER, unit_cost REAL, business_owner_id TEXT,
+                                         created_at TEXT);
+        CREATE INDEX idx_stock_transactions_owner ON stock_transactions (business_owner_id, product_id);
+    """)
+    rng = random.Random(42)
+    catalog = []
+    for i in range(products):
+        cost = round(rng.uniform(5, 500), 2)
+        catalog.append((f"p{i}", f"Product {i}", f"Category {i % 15}", f"tenant-{i % tenants}", 1, cost,
+                        round(cost * 1.3, 2)))
+    raw.executemany("INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?)", catalog)
+
+    started = datetime.now() - timedelta(days=365)
+    batch = []
+    for i in range(transactions):
+        product_id, _, _, owner, _, cost, _ = catalog[rng.randrange(products)]
+        kind = 'in' if rng.random() < 0.45 else 'out'
+        stamp = (started + timedelta(seconds=i * 365 * 86400 // max(transactions, 1))).isoformat()
+        batch.append((f"t{i}", product_id, kind, rng.randint(1, 20),
+                      round(cost * rng.uniform(0.9, 1.1), 2) if kind == 'in' else 0, owner, stamp))
+        if len(batch) == 50_000:
+            raw.executemany("INSERT INTO stock_transactions VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+            batch = []
+    raw.executemany("INSERT INTO stock_transactions VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+    raw.commit()
+    raw.close()
+
+
+def bench(products=5_000, transactions=500_000, tenants=5, runs=10, path=None):
+    """Time the transaction-scanning valuation report against the engine's reads on a scratch SQLite file"""
+    from .database import EnterpriseConnectionWrapper
+    from .dashboard_summary import _time
+
+    cleanup = path is None
+    if path is None:
+        handle, path = tempfile.mkstemp(suffix='.db', prefix='valuation_bench_')
+        os.close(handle)
+        os.unlink(path)
+    if not os.path.exists(path):
+        started = time.perf_counter()
+        _seed(path, products, transactions, tenants)
+        logger.info(f"🔧 Seeded {transactions} stock transactions in {time.perf_counter() - started:.1f}s ({path})")
+
+    conn = EnterpriseConnectionWrapper(sqlite3.connect(path), 'sqlite')
+    tenant = 'tenant-0'
+    try:
+        create_tables(conn, 'sqlite')
+        conn.commit()
+        started = time.perf_counter()
+        rebuild(conn=conn)
+        rebuild_ms = round((time.perf_counter() - started) * 1000.0, 1)
+
+        legacy = lambda: conn.execute(LEGACY_VALUATION_SQL, (tenant, tenant)).fetchall()
+        quantities = {row['category']: float(row['total_quantity'] or 0) for row in legacy()}
+        engine_quantities = {}
+        for row in valuation_rows(conn, tenant):
+            engine_quantities[row['category']] = engine_quantities.get(row['category'], 0.0) + row['quantity']
+        return {
+            'products': products,
+            'transactions': transactions,
+            'rebuild_ms': rebuild_ms,
+            'same_quantities': quantities.keys() == engine_quantities.keys() and all(
+                abs(quantities[key] - engine_quantities[key]) < 1e-6 for key in quantities),
+            'legacy_scan': _time(legacy, runs),
+            'valuation_rows': _time(lambda: valuation_rows(conn, tenant), runs),
+            'ageing_rows': _time(lambda: ageing_rows(conn, tenant), runs),
+        }
+    finally:
+        conn.close()
+        if cleanup:
+            os.unlink(path)
+
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(prog='python -m modules.shared.stock_valuation')
+    parser.add_argument('command', choices=['status', 'rebuild', 'bench'])
+    parser.add_argument('business_owner_id', nargs='?', help='rebuild one tenant only')
+    parser.add_argument('--products', type=int, default=5_000)
+    parser.add_argument('--transactions', type=int, default=500_000)
+    parser.add_argument('--tenants', type=int, default=5)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--db', help='reuse/keep the seeded SQLite file at this path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'rebuild':
+        print(f"Products valued: {rebuild(args.business_owner_id)}")
+        return 0
+    if args.command == 'bench':
+        results = bench(args.products, args.transactions, args.tenants, args.runs, args.db)
+    else:
+        results = valuation_status()
+    for key, value in results.items():
+        print(f"  {key}: {value}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
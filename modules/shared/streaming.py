@@ -0,0 +1,146 @@
+"""
+Streaming JSON responses
+Serializes rows from EnterpriseConnectionWrapper.stream() as they arrive,
+so an endpoint's memory is bounded by the DB batch size and the output
+buffer instead of the size of the table.
+"""
+
+from flask import Response, current_app, stream_with_context
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bytes of serialized JSON gathered before a chunk is sent
+OUTPUT_BUFFER_SIZE = 64 * 1024
+
+_EXHAUSTED = object()
+
+
+def iter_json_array(rows):
+    """Yield the JSON text of an array, one row at a time"""
+    dumps = current_app.json.dumps
+    yield '['
+    first = True
+    for row in rows:
+        if first:
+            first = False
+            yield dumps(row)
+        else:
+            yield ',' + dumps(row)
+    yield ']'
+
+
+def iter_json_object(items):
+    """
+    Yield the JSON text of an object from (key, value) pairs.
+
+    A value that is a list, tuple or dict is serialized as usual; any other
+    iterable (e.g. a row stream) is written as a streamed array.
+    """
+    dumps = current_app.json.dumps
+    yield '{'
+    first = True
+    for key, value in items:
+        yield ('' if first else ',') + dumps(str(key)) + ':'
+        first = False
+        if isinstance(value, (list, tuple, dict, str)) or not hasattr(value, '__iter__'):
+            yield dumps(value)
+        else:
+            yield from iter_json_array(value)
+    yield '}'
+
+
+def iter_json_result(items, key='data'):
+    """
+    Yield {"<key>": {...}, "success": true} from (key, value) pairs, values
+    written as by iter_json_object.
+
+    success comes last: if a value fails part-way (the status line is
+    already sent), the open array and object are closed and the body ends
+    with "success": false, the error and the key that failed - still valid
+    JSON, and never mistaken for a complete result.
+    """
+    dumps = current_app.json.dumps
+    yield '{' + dumps(key) + ':{'
+    first = True
+    current = None
+    # What the output is waiting for when an error stops it
+    open_value = open_array = False
+    try:
+        for name, value in items:
+            current = str(name)
+            yield ('' if first else ',') + dumps(current) + ':'
+            first = False
+            open_value = True
+            if isinstance(value, (list, tuple, dict, str)) or not hasattr(value, '__iter__'):
+                yield dumps(value)
+            else:
+                yield '['
+                open_array = True
+                separator = ''
+                for row in value:
+                    yield separator + dumps(row)
+                    separator = ','
+                open_array = False
+                yield ']'
+            open_value = False
+        yield '},"success":true}'
+    except Exception as e:
+        logger.error(f"❌ Streaming response failed at {current!r}: {e}")
+        closing = ']' if open_array else ('null' if open_value else '')
+        yield (closing + '},"success":false,"error":' + dumps(str(e)) +
+               ',"failed_key":' + dumps(current) + '}')
+
+
+def primed(rows, on_close=None):
+    """
+    Run a row stream's query now and hand back an iterator over its rows.
+
+    Errors in the query surface before the response starts (and can still
+    become a 500); on_close runs once iteration ends, e.g. to close a
+    connection that is not request scoped.
+    """
+    rows = iter(rows)
+    try:
+        first = next(rows, _EXHAUSTED)
+    except Exception:
+        if on_close:
+            on_close()
+        raise
+
+    def _rows():
+        try:
+            if first is not _EXHAUSTED:
+                yield first
+                yield from rows
+        finally:
+            close = getattr(rows, 'close', None)
+            if close:
+                close()
+            if on_close:
+                on_close()
+    return _rows()
+
+
+def _buffered(parts, size=OUTPUT_BUFFER_SIZE):
+    buffer = []
+    buffered = 0
+    try:
+        for part in parts:
+            buffer.append(part)
+            buffered += len(part)
+            if buffered >= size:
+                yield ''.join(buffer)
+                buffer = []
+                buffered = 0
+    except Exception as e:
+        # Headers are already sent - all we can do is stop the body short
+        logger.error(f"❌ Streaming response aborted: {e}")
+        raise
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_json(parts, status=200):
+    """Response that sends JSON text produced by iter_json_array/iter_json_object"""
+    return Response(stream_with_context(_buffered(parts)), status=status, mimetype='application/json')
@@ -0,0 +1,459 @@
+"""
+Delta sync change log
+Database triggers on the synced tables keep one sync_changes row per
+record: its table, id, owner and the last operation (upsert or delete),
+under a sequence number that grows on every write. A device stores one
+cursor - its position in each table - and asks for the changes after it:
+only the records modified since come back, in compact column/row pages,
+and deletes come back as tombstones (ids). A device with no cursor pages
+through the owner's whole data set the same way.
+
+The triggers catch every writer, including raw SQL in the older modules.
+On PostgreSQL the trigger takes a transaction advisory lock per owner,
+so within one owner's stream sequence numbers commit in order and a
+cursor never skips a change that commits late.
+
+Tombstones older than SYNC_TOMBSTONE_DAYS are pruned (/cron/cleanup).
+A cursor from before the last prune gets `reset` for the table: the
+device drops its copy and the page restarts the table from the beginning.
+
+    python -m modules.shared.sync_changes status|backfill|prune|bench
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime, timedelta, timezone
+import logging
+
+from .database import get_db_connection, table_columns
+from .keyset import encode_cursor, decode_cursor, InvalidCursor
+
+logger = logging.getLogger(__name__)
+
+# Tunables (environment overrides)
+TOMBSTONE_DAYS = int(os.environ.get('SYNC_TOMBSTONE_DAYS', '30'))
+DEFAULT_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', '500'))
+MAX_PAGE_SIZE = int(os.environ.get('SYNC_MAX_PAGE_SIZE', '2000'))
+
+CHANGES_TABLE = 'sync_changes'
+META_TABLE = 'sync_meta'
+
+# Synced tables, in cursor order - append only, a cursor is a list of positions
+SYNC_TABLES = ('products', 'customers', 'bills', 'sales')
+
+# Owner columns, first non-NULL wins (rows without an owner sync to nobody)
+OWNER_COLUMNS = ('business_owner_id', 'user_id')
+
+# Ids fetched per IN (...) list
+_FETCH_CHUNK = 500
+
+
+def _utc_now(db_type):
+    """changed_at is UTC on both databases (SQLite's CURRENT_TIMESTAMP already is)"""
+    return "timezone('UTC', now())" if db_type == 'postgresql' else 'CURRENT_TIMESTAMP'
+
+
+def create_tables(conn, db_type):
+    """Create the change log and its metadata table (idempotent)"""
+    seq = 'BIGSERIAL PRIMARY KEY' if db_type == 'postgresql' else 'INTEGER PRIMARY KEY AUTOINCREMENT'
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {CHANGES_TABLE} (
+            seq {seq},
+            table_name TEXT NOT NULL,
+            row_id TEXT NOT NULL,
+            owner_id TEXT NOT NULL DEFAULT '',
+            op TEXT NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (table_name, row_id)
+        )
+    ''')
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{CHANGES_TABLE}_owner_table_seq "
+                 f"ON {CHANGES_TABLE} (owner_id, table_name, seq)")
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {META_TABLE} (
+            name TEXT PRIMARY KEY,
+            value INTEGER
+        )
+    ''')
+
+
+def _owner_expression(columns, ref):
+    present = [f"{ref}.{column}" for column in OWNER_COLUMNS if column in columns]
+    return f"COALESCE({', '.join(present + [repr('')])})"
+
+
+_PG_FUNCTION = f"""
+    CREATE OR REPLACE FUNCTION {CHANGES_TABLE}_record() RETURNS trigger AS $$
+    DECLARE
+        rec RECORD;
+        change TEXT;
+        owner TEXT;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            rec := OLD;
+            change := 'delete';
+        ELSE
+            rec := NEW;
+            change := 'upsert';
+        END IF;
+        owner := COALESCE(to_jsonb(rec)->>'business_owner_id', to_jsonb(rec)->>'user_id', '');
+        PERFORM pg_advisory_xact_lock(hashtext('{CHANGES_TABLE}:' || owner));
+        INSERT INTO {CHANGES_TABLE} (table_name, row_id, owner_id, op, changed_at)
+        VALUES (TG_TABLE_NAME, rec.id::text, owner, change, timezone('UTC', now()))
+        ON CONFLICT (table_name, row_id) DO UPDATE
+            SET seq = nextval(pg_get_serial_sequence('{CHANGES_TABLE}', 'seq')),
+                owner_id = EXCLUDED.owner_id, op = EXCLUDED.op, changed_at = EXCLUDED.changed_at;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+
+def install_triggers(conn, db_type):
+    """Record inserts, updates and deletes of every synced table that exists"""
+    if db_type == 'postgresql':
+        conn.execute(_PG_FUNCTION)
+    for table in SYNC_TABLES:
+        columns = table_columns(conn, db_type, table)
+        if 'id' not in columns:
+            continue
+        if db_type == 'postgresql':
+            conn.execute(f"DROP TRIGGER IF EXISTS {CHANGES_TABLE}_{table} ON {table}")
+            conn.execute(f"""
+                CREATE TRIGGER {CHANGES_TABLE}_{table}
+                AFTER INSERT OR UPDATE OR DELETE ON {table}
+                FOR EACH ROW EXECUTE FUNCTION {CHANGES_TABLE}_record()
+            """)
+            continue
+        # DELETE + INSERT rather than INSERT OR REPLACE: an outer INSERT OR IGNORE
+        # would override the trigger's conflict clause
+        for event, ref, op in (('INSERT', 'NEW', 'upsert'), ('UPDATE', 'NEW', 'upsert'),
+                               ('DELETE', 'OLD', 'delete')):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {CHANGES_TABLE}_{table}_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    DELETE FROM {CHANGES_TABLE} WHERE table_name = '{table}' AND row_id = {ref}.id;
+                    INSERT INTO {CHANGES_TABLE} (table_name, row_id, owner_id, op, changed_at)
+                    VALUES ('{table}', {ref}.id, {_owner_expression(columns, ref)}, '{op}', CURRENT_TIMESTAMP);
+                END
+            """)
+
+
+def backfill(conn):
+    """Log records written before the triggers existed, oldest first. Commits."""
+    logged = 0
+    for table in SYNC_TABLES:
+        columns = table_columns(conn, conn.db_type, table)
+        if 'id' not in columns:
+            continue
+        order = "ORDER BY t.created_at, t.id" if 'created_at' in columns else "ORDER BY t.id"
+        cursor = conn.execute(f"""
+            INSERT INTO {CHANGES_TABLE} (table_name, row_id, owner_id, op, changed_at)
+            SELECT '{table}', CAST(t.id AS TEXT), {_owner_expression(columns, 't')}, 'upsert',
+                   {_utc_now(conn.db_type)}
+            FROM {table} t
+            WHERE NOT EXISTS (SELECT 1 FROM {CHANGES_TABLE} c
+                              WHERE c.table_name = '{table}' AND c.row_id = CAST(t.id AS TEXT))
+            {order}
+        """)
+        logged += max(cursor.rowcount, 0)
+    conn.commit()
+    logger.info(f"✅ Sync change log backfilled ({logged} records)")
+    return logged
+
+
+def _floor(conn):
+    row = conn.execute(f"SELECT value FROM {META_TABLE} WHERE name = 'floor'").fetchone()
+    return int(row['value']) if row and row['value'] is not None else 0
+
+
+# A cursor is the per-table positions plus the floor when it was issued
+_CURSOR_KEYS = SYNC_TABLES + ('floor',)
+
+
+def decode_positions(token):
+    """(per-table positions, floor at issue) of a cursor token (all zero for no cursor)"""
+    if not token:
+        return [0] * len(SYNC_TABLES), 0
+    values = decode_cursor(token, _CURSOR_KEYS)
+    if not all(isinstance(value, int) and value >= 0 for value in values):
+        raise InvalidCursor('Malformed cursor')
+    return values[:-1], values[-1]
+
+
+def encode_positions(positions, floor):
+    return encode_cursor(list(positions) + [floor])
+
+
+def head_cursor(conn, owner_id):
+    """Cursor at the owner's latest change in every table - hand it out with full snapshots"""
+    rows = conn.execute(f"""
+        SELECT table_name, MAX(seq) AS seq FROM {CHANGES_TABLE}
+        WHERE owner_id = ? GROUP BY table_name
+    """, (owner_id or '',)).fetchall()
+    heads = {row['table_name']: int(row['seq']) for row in rows}
+    return encode_positions([heads.get(table, 0) for table in SYNC_TABLES], _floor(conn))
+
+
+def _fetch_rows(conn, table, ids):
+    """(columns, {id: row values}) for the current versions of the given records"""
+    columns, found = None, {}
+    for start in range(0, len(ids), _FETCH_CHUNK):
+        chunk = ids[start:start + _FETCH_CHUNK]
+        placeholders = ', '.join('?' for _ in chunk)
+        for row in conn.execute(f"SELECT * FROM {table} WHERE id IN ({placeholders})", chunk).fetchall():
+            if columns is None:
+                columns = list(row.keys())
+            found[str(row['id'])] = [row[column] for column in columns]
+    return columns or [], found
+
+
+def changes_since(conn, owner_id, cursor=None, limit=DEFAULT_PAGE_SIZE, tables=None):
+    """
+    One page of an owner's changes after `cursor`: per table the
+    modified records (columns + rows) and deleted ids, the cursor to
+    ask with next, and whether more changes are waiting.
+    """
+    positions, issued_floor = decode_positions(cursor)
+    limit = max(1, min(int(limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+    wanted = SYNC_TABLES if not tables else [table for table in SYNC_TABLES if table in tables]
+    owner_id = owner_id or ''
+
+    # Tombstones were pruned after the cursor was issued - tables it had not
+    # read past them restart, requested or not (the new cursor carries the new floor)
+    floor = _floor(conn)
+    reset = []
+    if issued_floor < floor:
+        for index, table in enumerate(SYNC_TABLES):
+            if 0 < positions[index] < floor:
+                reset.append(table)
+                positions[index] = 0
+
+    changes, count, has_more = {}, 0, False
+    for table in wanted:
+        budget = limit - count
+        if budget <= 0:
+            has_more = True
+            break
+        index = SYNC_TABLES.index(table)
+        rows = conn.execute(f"""
+            SELECT seq, row_id, op FROM {CHANGES_TABLE}
+            WHERE owner_id = ? AND table_name = ? AND seq > ?
+            ORDER BY seq
+            LIMIT ?
+        """, (owner_id, table, positions[index], budget + 1)).fetchall()
+        if len(rows) > budget:
+            rows = rows[:budget]
+            has_more = True
+        if not rows:
+            continue
+
+        upserts = [row['row_id'] for row in rows if row['op'] != 'delete']
+        columns, found = _fetch_rows(conn, table, upserts)
+        # A record deleted after its change row was read is a tombstone too
+        deleted = [row['row_id'] for row in rows if row['op'] == 'delete' or row['row_id'] not in found]
+        changes[table] = {
+            'columns': columns,
+            'rows': [found[row_id] for row_id in upserts if row_id in found],
+            'deleted': deleted
+        }
+        positions[index] = int(rows[-1]['seq'])
+        count += len(rows)
+
+    return {
+        'changes': changes,
+        'cursor': encode_positions(positions, floor),
+        'count': count,
+        'has_more': has_more,
+        'reset': reset
+    }
+
+
+def prune(days=TOMBSTONE_DAYS, conn=None):
+    """Drop tombstones older than `days` and raise the cursor floor past them. Commits."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    try:
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+        row = conn.execute(f"""
+            SELECT MAX(seq) AS seq, COUNT(*) AS tombstones FROM {CHANGES_TABLE}
+            WHERE op = 'delete' AND changed_at < ?
+        """, (cutoff,)).fetchone()
+        if not row['tombstones']:
+            return 0
+        conn.execute(f"DELETE FROM {CHANGES_TABLE} WHERE op = 'delete' AND changed_at < ?", (cutoff,))
+        conn.bulk_upsert(META_TABLE, [{'name': 'floor', 'value': max(int(row['seq']), _floor(conn))}],
+                         conflict_columns=('name',))
+        conn.commit()
+        logger.info(f"🧹 Pruned {row['tombstones']} sync tombstones older than {days} days")
+        return row['tombstones']
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def sync_status(conn=None):
+    """Change log size per table and operation, and the cursor floor"""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    try:
+        rows = conn.execute(f"""
+            SELECT table_name, op, COUNT(*) AS records, MAX(seq) AS head
+            FROM {CHANGES_TABLE} GROUP BY table_name, op
+        """).fetchall()
+        tables = {}
+        for row in rows:
+            entry = tables.setdefault(row['table_name'], {'upsert': 0, 'delete': 0, 'head': 0})
+            entry[row['op']] = row['records']
+            entry['head'] = max(entry['head'], int(row['head']))
+        return {'tables': tables, 'floor': _floor(conn), 'tombstone_days': TOMBSTONE_DAYS}
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def _seed(path, products, customers, bills):
+    raw = sqlite3.connect(path)
+    raw.executescript("""
+        CREATE TABLE products (id TEXT PRIMARY KEY, code TEXT, name TEXT, category TEXT, price REAL,
+                               cost REAL, stock INTEGER, min_stock INTEGER, unit TEXT,
+                               business_owner_id TEXT, user_id TEXT, is_active INTEGER DEFAULT 1,
+                               created_at TEXT);
+        CREATE TABLE customers (id TEXT PRIMARY KEY, name TEXT, phone TEXT, email TEXT, address TEXT,
+                                business_owner_id TEXT, user_id TEXT, current_balance REAL,
+                                total_purchases REAL, created_at TEXT);
+        CREATE TABLE bills (id TEXT PRIMARY KEY, bill_number TEXT, customer_id TEXT, customer_name TEXT,
+                            business_owner_id TEXT, subtotal REAL, tax_amount REAL, total_amount REAL,
+                            payment_status TEXT, payment_method TEXT, status TEXT, created_at TEXT);
+        CREATE TABLE sales (id TEXT PRIMARY KEY, bill_id TEXT, product_id TEXT, product_name TEXT,
+                            category TEXT, quantity INTEGER, unit_price REAL, total_price REAL,
+                            business_owner_id TEXT, sale_date TEXT, created_at TEXT);
+    """)
+    rng = random.Random(7)
+    owner = 'tenant-0'
+    stamp = datetime(2026, 1, 1).isoformat()
+    raw.executemany("INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?)", [
+        (f"p{i}", f"SKU{i:06d}", f"Product {i}", f"Category {i % 20}", round(rng.uniform(10, 900), 2),
+         round(rng.uniform(5, 500), 2), rng.randint(0, 200), 5, 'pcs', owner, owner, stamp)
+        for i in range(products)])
+    raw.executemany("INSERT INTO customers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [
+        (f"c{i}", f"Customer {i}", f"98{i:08d}", f"c{i}@example.com", f"{i} Main Road", owner, owner,
+         0, round(rng.uniform(0, 50000), 2), stamp)
+        for i in range(customers)])
+    raw.executemany("INSERT INTO bills VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'paid', 'cash', 'completed', ?)", [
+        (f"b{i}", f"INV-{i:06d}", f"c{i % customers}", f"Customer {i % customers}", owner, 100, 18, 118, stamp)
+        for i in range(bills)])
+    raw.executemany("INSERT INTO sales VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [
+        (f"s{i}", f"b{i // 3}", f"p{i % products}", f"Product {i % products}", f"Category {i % 20}",
+         2, 50, 100, owner, '2026-01-01', stamp)
+        for i in range(bills * 3)])
+    raw.commit()
+    raw.close()
+
+
+def bench(products=5_000, customers=2_000, bills=5_000, edits=40, path=None):
+    """
+    Bytes a reconnecting device downloads: a full snapshot of the owner's
+    data against the delta after `edits` writes (price changes, a new bill,
+    a deleted customer), on a scratch SQLite file.
+    """
+    from .database import EnterpriseConnectionWrapper
+    from .dashboard_summary import _time
+
+    cleanup = path is None
+    if path is None:
+        handle, path = tempfile.mkstemp(suffix='.db', prefix='sync_changes_bench_')
+        os.close(handle)
+        os.unlink(path)
+    if not os.path.exists(path):
+        started = time.perf_counter()
+        _seed(path, products, customers, bills)
+        logger.info(f"🔧 Seeded {products} products, {bills} bills in {time.perf_counter() - started:.1f}s ({path})")
+
+    conn = EnterpriseConnectionWrapper(sqlite3.connect(path), 'sqlite')
+    owner = 'tenant-0'
+    try:
+        create_tables(conn, 'sqlite')
+        install_triggers(conn, 'sqlite')
+        conn.commit()
+        backfill(conn)
+
+        def full_download():
+            page, pages, size = {'cursor': None, 'has_more': True}, 0, 0
+            while page['has_more']:
+                page = changes_since(conn, owner, page['cursor'], MAX_PAGE_SIZE)
+                size += len(json.dumps(page, default=str))
+                pages += 1
+            return page['cursor'], pages, size
+
+        cursor, pages, snapshot_bytes = full_download()
+        rng = random.Random(11)
+        for i in range(edits):
+            conn.execute("UPDATE products SET price = price + 1, stock = stock - 1 WHERE id = ?",
+                         (f"p{rng.randrange(products)}",))
+        conn.execute("INSERT INTO bills (id, bill_number, business_owner_id, total_amount, created_at) "
+                     "VALUES ('bench-bill', 'INV-BENCH', ?, 500, ?)", (owner, datetime.now().isoformat()))
+        conn.execute("DELETE FROM customers WHERE id = 'c0'")
+        conn.commit()
+
+        delta = changes_since(conn, owner, cursor, DEFAULT_PAGE_SIZE)
+        return {
+            'records': products + customers + bills * 4,
+            'snapshot_pages': pages,
+            'snapshot_kb': round(snapshot_bytes / 1024.0, 1),
+            'delta_changes': delta['count'],
+            'delta_kb': round(len(json.dumps(delta, default=str)) / 1024.0, 1),
+            'delta_ms': _time(lambda: changes_since(conn, owner, cursor, DEFAULT_PAGE_SIZE), 20),
+            'idle_ms': _time(lambda: changes_since(conn, owner, delta['cursor'], DEFAULT_PAGE_SIZE), 20),
+        }
+    finally:
+        conn.close()
+        if cleanup:
+            os.unlink(path)
+
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(prog='python -m modules.shared.sync_changes')
+    parser.add_argument('command', choices=['status', 'backfill', 'prune', 'bench'])
+    parser.add_argument('--days', type=int, default=TOMBSTONE_DAYS, help='prune: tombstone age')
+    parser.add_argument('--products', type=int, default=5_000)
+    parser.add_argument('--customers', type=int, default=2_000)
+    parser.add_argument('--bills', type=int, default=5_000)
+    parser.add_argument('--edits', type=int, default=40)
+    parser.add_argument('--db', help='reuse/keep the seeded SQLite file at this path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'backfill':
+        conn = get_db_connection()
+        try:
+            print(f"Records logged: {backfill(conn)}")
+        finally:
+            conn.close()
+        return 0
+    if args.command == 'prune':
+        print(f"Tombstones pruned: {prune(args.days)}")
+        return 0
+    if args.command == 'bench':
+        results = bench(args.products, args.customers, args.bills, args.edits, args.db)
+    else:
+        results = sync_status()
+    for key, value in results.items():
+        print(f"  {key}: {value}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
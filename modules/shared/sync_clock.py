@@ -0,0 +1,286 @@
+"""
+Per-user sync clock
+Each user has a monotonic version that moves forward whenever data their
+devices sync has changed. WebSocket keepalives and sync responses report
+it, so a device can tell it is behind without the server touching the
+database.
+
+Writers tick the clock after they commit. result_cache.invalidate()
+ticks it (with no tenant, every user's version moves), and so does every
+sync event. A version is max(last + 1, wall-clock microseconds), so
+versions keep growing across process restarts and read as the time of
+the change.
+
+Backends (SYNC_CLOCK_BACKEND):
+    memory     - in-process (default, one clock per worker)
+    redis://…  - Redis, shared by every worker (needs the redis package)
+
+Load test: python -m modules.shared.sync_clock bench
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tunables (environment overrides)
+CLOCK_BACKEND = os.environ.get('SYNC_CLOCK_BACKEND', 'memory').strip()
+
+# Scope ticked by writes that do not name a user
+ALL_USERS = '*'
+
+
+def _now_us():
+    return time.time_ns() // 1000
+
+
+def changed_at(version):
+    """ISO time a version was ticked (None for a user never ticked)"""
+    return datetime.fromtimestamp(version / 1_000_000).isoformat() if version else None
+
+
+class MemoryClock:
+    """In-process versions under one lock"""
+
+    name = 'memory'
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = 0
+        self._versions = {}  # scope -> version
+
+    def tick(self, scope):
+        with self._lock:
+            self._last = max(self._last + 1, _now_us())
+            self._versions[scope] = self._last
+            return self._last
+
+    def read(self, scopes):
+        with self._lock:
+            return [self._versions.get(scope, 0) for scope in scopes]
+
+    def clear(self):
+        with self._lock:
+            self._versions.clear()
+
+    def info(self):
+        with self._lock:
+            return {'scopes': len(self._versions)}
+
+
+class RedisClock:
+    """Redis (SYNC_CLOCK_BACKEND=redis://host:port/db)"""
+
+    name = 'redis'
+    shared = True
+    prefix = 'bizpulse:sync_clock:'
+
+    # One round trip: advance the shared sequence to at least now, stamp the scope
+    _TICK = """
+        local version = redis.call('INCR', KEYS[1])
+        if version < tonumber(ARGV[1]) then
+            version = tonumber(ARGV[1])
+            redis.call('SET', KEYS[1], version)
+        end
+        redis.call('SET', KEYS[2], version)
+        return version
+    """
+
+    def __init__(self, url):
+        import redis  # optional dependency, only needed for this backend
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self._tick = self.client.register_script(self._TICK)
+
+    def tick(self, scope):
+        return int(self._tick(keys=[self.prefix + 'seq', self.prefix + scope], args=[_now_us()]))
+
+    def read(self, scopes):
+        return [int(value) if value is not None else 0
+                for value in self.client.mget([self.prefix + scope for scope in scopes])]
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*', count=500))
+        if keys:
+            self.client.delete(*keys)
+
+    def info(self):
+        return {'url': CLOCK_BACKEND.split('@')[-1]}
+
+
+def create_backend(spec=CLOCK_BACKEND):
+    """Backend for a SYNC_CLOCK_BACKEND value"""
+    spec = (spec or 'memory').strip()
+    if spec.startswith(('redis://', 'rediss://', 'unix://')):
+        try:
+            return RedisClock(spec)
+        except ImportError:
+            logger.warning("⚠️ SYNC_CLOCK_BACKEND is redis but the redis package is not installed - using the in-process clock")
+            return MemoryClock()
+    if spec.lower() != 'memory':
+        logger.warning(f"⚠️ Unknown SYNC_CLOCK_BACKEND '{spec}' - using the in-process clock")
+    return MemoryClock()
+
+
+class SyncClock:
+    """Versions per user, with counters for the diagnostics endpoint"""
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else MemoryClock()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self._counters = {'ticks': 0, 'reads': 0, 'errors': 0}
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def tick(self, user_id=None):
+        """Move a user's version forward (every user's when user_id is None); returns it"""
+        try:
+            version = self.backend.tick(user_id or ALL_USERS)
+            self._count('ticks')
+            return version
+        except Exception as e:
+            logger.warning(f"⚠️ Sync clock tick failed for user {user_id}: {e}")
+            self._count('errors')
+            return None
+
+    def version(self, user_id):
+        """The user's current version (0 until something changed)"""
+        try:
+            version = max(self.backend.read([user_id or ALL_USERS, ALL_USERS]))
+            self._count('reads')
+            return version
+        except Exception as e:
+            logger.warning(f"⚠️ Sync clock read failed for user {user_id}: {e}")
+            self._count('errors')
+            return 0
+
+    def stamp(self, user_id):
+        """Version and server time for keepalive and sync responses"""
+        version = self.version(user_id)
+        return {'version': version, 'changed_at': changed_at(version),
+                'timestamp': datetime.now().isoformat()}
+
+    def clear(self):
+        self.backend.clear()
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+        try:
+            backend = {'name': self.backend.name, 'shared': self.backend.shared, **self.backend.info()}
+        except Exception as e:
+            backend = {'name': self.backend.name, 'error': str(e)}
+        return {'backend': backend, **counters}
+
+
+# Process-wide clock, configured from the environment
+sync_clock = SyncClock(create_backend())
+
+
+def tick(user_id=None):
+    """Call after committing a write that users' devices sync (None = every user)"""
+    return sync_clock.tick(user_id)
+
+
+def bench(connections=200, pings=20):
+    """
+    Idle-connection load test: connect WebSocket clients to the sync
+    handlers, send keepalives and sync requests, and count the database
+    statements they cost against the handlers' previous behaviour (one
+    latest-data snapshot per reply). Uses the configured database.
+    """
+    from flask import Flask
+    from flask_socketio import SocketIO
+    from modules.sync.routes import init_socketio_events
+    from modules.sync.service import sync_service
+    from .query_stats import query_stats
+
+    app = Flask(__name__)
+    app.secret_key = 'sync-clock-bench'
+    socketio = SocketIO(app, async_mode='threading')
+    init_socketio_events(socketio)
+
+    def statements():
+        return sum(row['calls'] for row in query_stats.snapshot(limit=10_000)['fingerprints'])
+
+    was_enabled = query_stats.enabled
+    query_stats.enabled = True
+    clients = []
+    try:
+        query_stats.reset()
+        for index in range(connections):
+            # Each device logs in - the handlers only accept session connects
+            flask_client = app.test_client()
+            with flask_client.session_transaction() as sess:
+                sess['user_id'] = f"bench-{index % 50}"
+            clients.append(socketio.test_client(app, flask_test_client=flask_client))
+        connect_statements = statements()
+
+        query_stats.reset()
+        started = time.perf_counter()
+        for _ in range(pings):
+            for client in clients:
+                client.emit('ping')
+                client.emit('request_sync', {})
+                client.get_received()
+        elapsed = time.perf_counter() - started
+        idle_statements = statements()
+        replies = connections * pings * 2
+
+        clock_started = time.perf_counter()
+        for index in range(10_000):
+            sync_clock.stamp(f"bench-{index % 50}")
+        stamp_elapsed = (time.perf_counter() - clock_started) / 10_000
+
+        # The same replies as the handlers used to build them
+        query_stats.reset()
+        legacy_started = time.perf_counter()
+        for index in range(min(connections, 50)):
+            sync_service.get_latest_data_for_user(f"bench-{index % 50}")
+        legacy_elapsed = (time.perf_counter() - legacy_started) / min(connections, 50)
+        legacy_statements = statements() / min(connections, 50)
+    finally:
+        for client in clients:
+            client.disconnect()
+        query_stats.reset()
+        query_stats.enabled = was_enabled
+
+    return {
+        'connections': connections,
+        'replies': replies,
+        'connect_statements_per_connection': round(connect_statements / connections, 2),
+        'idle_statements_per_connection': round(idle_statements / connections, 2),
+        'legacy_idle_statements_per_connection': round(legacy_statements * pings * 2, 2),
+        'clock_us_per_stamp': round(stamp_elapsed * 1_000_000, 2),
+        'handler_us_per_reply': round(elapsed / replies * 1_000_000, 1),
+        'legacy_us_per_reply': round(legacy_elapsed * 1_000_000, 1),
+    }
+
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(prog='python -m modules.shared.sync_clock')
+    parser.add_argument('command', choices=['status', 'bench'])
+    parser.add_argument('--connections', type=int, default=200)
+    parser.add_argument('--pings', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    results = bench(args.connections, args.pings) if args.command == 'bench' else sync_clock.snapshot()
+    for key, value in results.items():
+        print(f"  {key}: {value}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,277 @@
+"""
+Sync event store
+Sync events (one per change broadcast to a user's devices) and the
+user -> WebSocket sessions index live behind one interface, so with a
+shared backend every worker sees the same events and devices.
+
+Backends (SYNC_EVENT_BACKEND):
+    memory     - per-user ring buffers in this process (default, one store per worker)
+    database   - sync_events / sync_sessions tables, shared by every worker on the database
+
+Each user keeps the last SYNC_EVENT_LIMIT events. Appends are O(1): a
+ring buffer drops its oldest event itself, the table is trimmed per user
+every SYNC_EVENT_TRIM_EVERY appends. Reads go straight to one user's
+events (index on user_id, version) and never see more than the limit.
+
+Each worker registers its own sessions on connect and disconnect.
+Keepalives stay in the worker's memory; the periodic session cleanup
+re-stamps the worker's live sessions in one statement and drops rows no
+worker refreshed within SYNC_SESSION_STALE seconds (a worker that died).
+"""
+
+import os
+import json
+import time
+import bisect
+import socket
+import threading
+from collections import deque
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tunables (environment overrides)
+EVENT_BACKEND = os.environ.get('SYNC_EVENT_BACKEND', 'memory').strip()
+EVENT_LIMIT = int(os.environ.get('SYNC_EVENT_LIMIT', '100'))           # events kept per user
+TRIM_EVERY = int(os.environ.get('SYNC_EVENT_TRIM_EVERY', '20'))        # database: appends per user between trims
+SESSION_STALE = float(os.environ.get('SYNC_SESSION_STALE', '180'))    # seconds without a worker heartbeat
+
+EVENTS_TABLE = 'sync_events'
+SESSIONS_TABLE = 'sync_sessions'
+
+# Identifies this worker's rows in the shared session index
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _since(events, since_version=None, since_timestamp=None):
+    """Events after a sync clock version (or ISO timestamp); events are in version order"""
+    if since_version is not None:
+        versions = [event.get('version') or 0 for event in events]
+        return events[bisect.bisect_right(versions, since_version):]
+    if since_timestamp:
+        return [event for event in events if event['timestamp'] > since_timestamp]
+    return events
+
+
+class MemoryEventStore:
+    """Per-user ring buffers and session index in this process"""
+
+    name = 'memory'
+    shared = False
+
+    def __init__(self, limit=EVENT_LIMIT):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._events = {}    # user_id -> deque of events, oldest first
+        self._sessions = {}  # session_id -> user_id
+        self._by_user = {}   # user_id -> {session_id}
+
+    def append(self, event):
+        with self._lock:
+            queue = self._events.get(event['user_id'])
+            if queue is None:
+                queue = self._events[event['user_id']] = deque(maxlen=self.limit)
+            queue.append(event)
+
+    def events_since(self, user_id, since_version=None, since_timestamp=None):
+        with self._lock:
+            events = list(self._events.get(user_id, ()))
+        return _since(events, since_version, since_timestamp)
+
+    def add_session(self, session_id, user_id):
+        with self._lock:
+            self._sessions[session_id] = user_id
+            self._by_user.setdefault(user_id, set()).add(session_id)
+
+    def remove_session(self, session_id):
+        with self._lock:
+            user_id = self._sessions.pop(session_id, None)
+            sessions = self._by_user.get(user_id)
+            if sessions is not None:
+                sessions.discard(session_id)
+                if not sessions:
+                    del self._by_user[user_id]
+
+    def user_sessions(self, user_id):
+        with self._lock:
+            return sorted(self._by_user.get(user_id, ()))
+
+    def heartbeat(self):
+        """Nothing to refresh - the index only ever holds this worker's live sessions"""
+        return 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'events': sum(len(queue) for queue in self._events.values()),
+                'sessions': len(self._sessions),
+                'sessions_by_user': {user_id: len(sessions) for user_id, sessions in self._by_user.items()}
+            }
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+            self._sessions.clear()
+            self._by_user.clear()
+
+
+class DatabaseEventStore:
+    """sync_events / sync_sessions tables on the application database (created by migration 0010)"""
+
+    name = 'database'
+    shared = True
+
+    def __init__(self, limit=EVENT_LIMIT, trim_every=TRIM_EVERY, stale_after=SESSION_STALE):
+        self.limit = limit
+        self.trim_every = trim_every
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._appends = {}  # user_id -> appends since the last trim (this worker)
+
+    def _connection(self):
+        # Never the request's connection: events commit on their own
+        from .database import get_dedicated_connection
+        return get_dedicated_connection()
+
+    def append(self, event):
+        user_id = event['user_id']
+        with self._lock:
+            appends = self._appends.get(user_id, 0) + 1
+            trim = appends >= self.trim_every
+            self._appends[user_id] = 0 if trim else appends
+
+        conn = self._connection()
+        try:
+            conn.execute(f"""
+                INSERT INTO {EVENTS_TABLE} (user_id, version, event_timestamp, payload)
+                VALUES (?, ?, ?, ?)
+            """, (user_id, event.get('version') or 0, event['timestamp'], json.dumps(event, default=str)))
+            if trim:
+                # Everything older than the user's newest `limit` events
+                conn.execute(f"""
+                    DELETE FROM {EVENTS_TABLE}
+                    WHERE user_id = ? AND id <= (SELECT id FROM {EVENTS_TABLE} WHERE user_id = ?
+                                                 ORDER BY id DESC LIMIT 1 OFFSET ?)
+                """, (user_id, user_id, self.limit))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def events_since(self, user_id, since_version=None, since_timestamp=None):
+        conn = self._connection()
+        try:
+            rows = conn.execute(f"""
+                SELECT payload FROM {EVENTS_TABLE}
+                WHERE user_id = ?
+                ORDER BY version DESC, id DESC
+                LIMIT ?
+            """, (user_id, self.limit)).fetchall()
+        finally:
+            conn.close()
+        return _since([json.loads(row['payload']) for row in reversed(rows)], since_version, since_timestamp)
+
+    def add_session(self, session_id, user_id):
+        conn = self._connection()
+        try:
+            conn.bulk_upsert(SESSIONS_TABLE, [{
+                'session_id': session_id,
+                'user_id': user_id,
+                'worker': WORKER_ID,
+                'last_seen': time.time()
+            }], conflict_columns=('session_id',))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def remove_session(self, session_id):
+        conn = self._connection()
+        try:
+            conn.execute(f"DELETE FROM {SESSIONS_TABLE} WHERE session_id = ?", (session_id,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def user_sessions(self, user_id):
+        conn = self._connection()
+        try:
+            rows = conn.execute(f"""
+                SELECT session_id FROM {SESSIONS_TABLE}
+                WHERE user_id = ? AND last_seen > ?
+                ORDER BY session_id
+            """, (user_id, time.time() - self.stale_after)).fetchall()
+            return [row['session_id'] for row in rows]
+        finally:
+            conn.close()
+
+    def heartbeat(self):
+        """Re-stamp this worker's sessions, drop sessions no worker refreshed; returns the number dropped"""
+        now = time.time()
+        conn = self._connection()
+        try:
+            conn.execute(f"UPDATE {SESSIONS_TABLE} SET last_seen = ? WHERE worker = ?", (now, WORKER_ID))
+            dropped = conn.execute(f"DELETE FROM {SESSIONS_TABLE} WHERE last_seen < ?",
+                                   (now - self.stale_after,)).rowcount
+            conn.commit()
+            return max(dropped, 0)
+        finally:
+            conn.close()
+
+    def stats(self):
+        conn = self._connection()
+        try:
+            events = conn.execute(f"SELECT COUNT(*) AS events FROM {EVENTS_TABLE}").fetchone()['events']
+            rows = conn.execute(f"""
+                SELECT user_id, COUNT(*) AS sessions FROM {SESSIONS_TABLE}
+                WHERE last_seen > ? GROUP BY user_id
+            """, (time.time() - self.stale_after,)).fetchall()
+        finally:
+            conn.close()
+        by_user = {row['user_id']: row['sessions'] for row in rows}
+        return {'events': events, 'sessions': sum(by_user.values()), 'sessions_by_user': by_user}
+
+    def clear(self):
+        conn = self._connection()
+        try:
+            conn.execute(f"DELETE FROM {EVENTS_TABLE}")
+            conn.execute(f"DELETE FROM {SESSIONS_TABLE}")
+            conn.commit()
+        finally:
+            conn.close()
+        with self._lock:
+            self._appends.clear()
+
+
+def create_tables(conn, db_type):
+    """Create the database backend's tables (idempotent)"""
+    event_id = 'BIGSERIAL PRIMARY KEY' if db_type == 'postgresql' else 'INTEGER PRIMARY KEY AUTOINCREMENT'
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {EVENTS_TABLE} (
+            id {event_id},
+            user_id TEXT NOT NULL,
+            version BIGINT NOT NULL DEFAULT 0,
+            event_timestamp TEXT,
+            payload TEXT NOT NULL
+        )
+    ''')
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{EVENTS_TABLE}_user_version "
+                 f"ON {EVENTS_TABLE} (user_id, version, id)")
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {SESSIONS_TABLE} (
+            session_id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            worker TEXT,
+            last_seen REAL
+        )
+    ''')
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{SESSIONS_TABLE}_user ON {SESSIONS_TABLE} (user_id)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{SESSIONS_TABLE}_worker ON {SESSIONS_TABLE} (worker)")
+
+
+def create_store(spec=EVENT_BACKEND):
+    """Store for a SYNC_EVENT_BACKEND value"""
+    spec = (spec or 'memory').strip().lower()
+    if spec == 'database':
+        return DatabaseEventStore()
+    if spec != 'memory':
+        logger.warning(f"⚠️ Unknown SYNC_EVENT_BACKEND '{spec}' - using the in-process store")
+    return MemoryEventStore()
@@ -4,6 +4,7 @@ Transaction-based stock tracking system
 """
 
 from modules.shared.database import get_db_connection, generate_id
+from modules.shared import stock_valuation
 from datetime import datetime
 
 def init_stock_tables():
@@ -115,6 +116,7 @@ def migrate_existing_stock_data():
         if current_stock > 0:
             # Create opening stock transaction
             transaction_id = generate_id()
+            created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             cursor.execute("""
                 INSERT INTO stock_transactions (
                     id, product_id, transaction_type, quantity, 
@@ -129,8 +131,9 @@ def migrate_existing_stock_data():
                 f'Opening stock for {product_name}',
                 user_id,
                 user_id,
-                datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                created_at
             ))
+            stock_valuation.record(conn, product_id, user_id, 'IN', current_stock, created_at=created_at)
             
             # Update current_stock table
             cursor.execute("""
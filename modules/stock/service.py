@@ -4,6 +4,7 @@ Handles all stock transactions and movements
 """
 
 from modules.shared.database import get_db_connection, generate_id
+from modules.shared import stock_valuation
 from modules.stock.database import get_current_stock, update_current_stock
 from datetime import datetime
 
@@ -40,6 +41,7 @@ class StockService:
             
             # Create transaction record
             transaction_id = generate_id()
+            created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             conn.execute("""
                 INSERT INTO stock_transactions (
                     id, product_id, transaction_type, quantity, reference_type, 
@@ -55,8 +57,10 @@ class StockService:
                 notes,
                 created_by,
                 business_owner_id,
-                datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                created_at
             ))
+            stock_valuation.record(conn, product_id, business_owner_id, transaction_type, quantity,
+                                   created_at=created_at)
             
             # Update current stock
             new_stock = update_current_stock(product_id, business_owner_id)
@@ -3,9 +3,12 @@ Sync API Routes
 REST endpoints for data synchronization
 """
 
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, current_app
 from modules.sync.service import sync_service
 from modules.shared.auth_decorators import require_auth
+from modules.shared.database import get_db_connection, get_current_client_id
+from modules.shared.keyset import InvalidCursor
+from modules.shared import sync_changes
 import logging
 
 logger = logging.getLogger(__name__)
@@ -46,7 +49,8 @@ def get_latest_data():
         if not user_id:
             return jsonify({'success': False, 'message': 'User not authenticated'}), 401
         
-        latest_data = sync_service.get_latest_data_for_user(user_id)
+        # The snapshot the login prefetch warmed (rebuilt after a write)
+        latest_data = sync_service.get_snapshot(user_id)
         
         return jsonify({
             'success': True,
@@ -58,6 +62,31 @@ def get_latest_data():
         logger.error(f"❌ Latest data error: {e}")
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@sync_api_bp.route('/changes', methods=['GET'])
+@require_auth
+def get_changes():
+    """Records changed since the client's cursor (?cursor=&limit=&tables=products,sales)"""
+    try:
+        tables = [table for table in request.args.get('tables', '').split(',') if table]
+        conn = get_db_connection()
+        try:
+            page = sync_changes.changes_since(
+                conn, get_current_client_id(), request.args.get('cursor') or None,
+                request.args.get('limit', type=int) or sync_changes.DEFAULT_PAGE_SIZE, tables)
+        finally:
+            conn.close()
+        
+        return jsonify({
+            'success': True,
+            'data': page
+        })
+        
+    except InvalidCursor as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"❌ Changes error: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 @sync_api_bp.route('/pending-events', methods=['GET'])
 @require_auth
 def get_pending_events():
@@ -68,7 +97,8 @@ def get_pending_events():
             return jsonify({'success': False, 'message': 'User not authenticated'}), 401
         
         since_timestamp = request.args.get('since')
-        pending_events = sync_service.get_pending_sync_events(user_id, since_timestamp)
+        since_version = request.args.get('since_version', type=int)
+        pending_events = sync_service.get_pending_sync_events(user_id, since_timestamp, since_version)
         
         return jsonify({
             'success': True,
@@ -98,13 +128,16 @@ def force_sync():
         # Get pending events
         pending_events = sync_service.get_pending_sync_events(user_id)
         
-        # Broadcast sync event to all user devices
-        from app import socketio
-        socketio.emit('force_sync', {
-            'latest_data': latest_data,
-            'pending_events': pending_events,
-            'timestamp': latest_data.get('sync_timestamp')
-        }, room=f"user_{user_id}")
+        # Broadcast sync event to all user devices (through the gateway's message queue)
+        socketio = getattr(current_app, 'socketio', None)
+        if socketio:
+            socketio.emit('force_sync', {
+                'latest_data': latest_data,
+                'pending_events': pending_events,
+                'timestamp': latest_data.get('sync_timestamp')
+            }, room=f"user_{user_id}")
+        else:
+            logger.warning("❌ SocketIO not available for broadcasting")
         
         return jsonify({
             'success': True,
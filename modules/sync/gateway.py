@@ -0,0 +1,389 @@
+"""
+Real-time sync gateway
+The process-wide SocketIO server. init_gateway(app) attaches it to the
+Flask app (app.socketio), registers the sync WebSocket handlers and wires
+the message queue, so any worker - or a cron job, or an API request on
+another worker - can emit to a `user_<id>` room and reach every device.
+
+Async mode (SOCKETIO_ASYNC_MODE):
+    auto       - eventlet when the worker is monkey patched (gunicorn -k eventlet), else threading
+    eventlet / threading / gevent - forced
+
+The shipped deploy commands (Procfile, render.yaml, railway.json) run
+gthread workers, so the gateway runs in threading mode there: every
+WebSocket holds one of the worker's threads for as long as it is open.
+That suits a handful of devices per business, not a large fleet; scaling
+past it means an eventlet/gevent worker, which is a deployment change.
+
+Origins (SOCKETIO_CORS_ORIGINS):
+    (empty)    - same origin only
+    comma separated list - the app's own origins, e.g. https://app.example.com
+Connections must carry a logged-in Flask session.
+
+Message queue (SOCKETIO_MESSAGE_QUEUE):
+    (empty)    - single process, emits reach this worker's clients only
+    database   - socketio_messages table on the application database, polled by every worker
+    redis://…, amqp://…, kafka://… - python-socketio's managers (need their client packages)
+
+data_sync frames are coalesced: every event for a room within
+SYNC_EMIT_WINDOW_MS (50) goes out as one frame carrying all of them, so a
+bulk stock adjustment reaches each device once instead of hundreds of
+times. Later events for the same record replace earlier ones in a frame.
+
+Benchmark: python -m modules.sync.gateway bench
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import logging
+
+import socketio as socketio_lib
+from flask_socketio import SocketIO
+
+logger = logging.getLogger(__name__)
+
+# Tunables (environment overrides)
+ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE', 'auto').strip()
+CORS_ORIGINS = os.environ.get('SOCKETIO_CORS_ORIGINS', '').strip()
+MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE', '').strip()
+EMIT_WINDOW = int(os.environ.get('SYNC_EMIT_WINDOW_MS', '50')) / 1000.0
+QUEUE_POLL = int(os.environ.get('SOCKETIO_QUEUE_POLL_MS', '50')) / 1000.0      # database queue
+QUEUE_RETENTION = int(os.environ.get('SOCKETIO_QUEUE_RETENTION', '60'))         # seconds a message is kept
+
+QUEUE_TABLE = 'socketio_messages'
+
+# Process-wide server, attached to the app by init_gateway()
+socketio = SocketIO()
+
+
+def async_mode(spec=ASYNC_MODE):
+    """SocketIO async mode for a SOCKETIO_ASYNC_MODE value"""
+    spec = (spec or 'auto').strip().lower()
+    if spec != 'auto':
+        return spec
+    # Never import eventlet here: only a worker that already patched itself can use it
+    eventlet = sys.modules.get('eventlet')
+    try:
+        if eventlet is not None and eventlet.patcher.is_monkey_patched('socket'):
+            return 'eventlet'
+    except AttributeError:
+        pass
+    return 'threading'
+
+
+class DatabaseQueueManager(socketio_lib.PubSubManager):
+    """
+    Socket.IO pub/sub over the socketio_messages table (migration 0011).
+    Every worker appends the emits it publishes and polls for the rows
+    after the last one it handled, then replays them to its own clients.
+    """
+
+    name = 'database'
+
+    def __init__(self, channel='flask-socketio', write_only=False, logger=None,
+                 poll_interval=QUEUE_POLL, retention=QUEUE_RETENTION):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.closed = False
+
+    def _connection(self):
+        # Never the request's connection: messages commit on their own
+        from modules.shared.database import get_dedicated_connection
+        return get_dedicated_connection()
+
+    def _sleep(self, seconds):
+        if self.server is not None:
+            self.server.sleep(seconds)
+        else:
+            time.sleep(seconds)
+
+    def _publish(self, data):
+        conn = self._connection()
+        try:
+            conn.execute(f"INSERT INTO {QUEUE_TABLE} (channel, payload, created_at) VALUES (?, ?, ?)",
+                         (self.channel, json.dumps(data, default=str), time.time()))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _last_id(self):
+        conn = self._connection()
+        try:
+            row = conn.execute(f"SELECT MAX(id) AS last_id FROM {QUEUE_TABLE}").fetchone()
+            return row['last_id'] or 0
+        finally:
+            conn.close()
+
+    def _fetch(self, after_id):
+        conn = self._connection()
+        try:
+            rows = conn.execute(f"""
+                SELECT id, payload FROM {QUEUE_TABLE}
+                WHERE id > ? AND channel = ?
+                ORDER BY id
+                LIMIT 500
+            """, (after_id, self.channel)).fetchall()
+            return [(row['id'], row['payload']) for row in rows]
+        finally:
+            conn.close()
+
+    def prune(self):
+        """Drop messages every worker has had time to read; returns the number dropped"""
+        conn = self._connection()
+        try:
+            dropped = conn.execute(f"DELETE FROM {QUEUE_TABLE} WHERE created_at < ?",
+                                   (time.time() - self.retention,)).rowcount
+            conn.commit()
+            return max(dropped, 0)
+        finally:
+            conn.close()
+
+    def close(self):
+        """Stop this worker's reader (after its current poll)"""
+        self.closed = True
+
+    def _listen(self):
+        last_id = None
+        next_prune = time.time() + self.retention
+        while not self.closed:
+            try:
+                if last_id is None:
+                    # Only messages published after this worker started
+                    last_id = self._last_id()
+                rows = self._fetch(last_id)
+                for message_id, payload in rows:
+                    last_id = message_id
+                    yield payload
+                if time.time() >= next_prune:
+                    self.prune()
+                    next_prune = time.time() + self.retention
+                if not rows:
+                    self._sleep(self.poll_interval)
+            except Exception as e:
+                self._get_logger().error(f"❌ Socket.IO queue read failed: {e} - retrying in 1s")
+                self._sleep(1)
+
+
+def create_tables(conn, db_type):
+    """Create the database queue's table (idempotent)"""
+    message_id = 'BIGSERIAL PRIMARY KEY' if db_type == 'postgresql' else 'INTEGER PRIMARY KEY AUTOINCREMENT'
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {QUEUE_TABLE} (
+            id {message_id},
+            channel TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    ''')
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{QUEUE_TABLE}_created ON {QUEUE_TABLE} (created_at)")
+
+
+def queue_options(spec=MESSAGE_QUEUE):
+    """SocketIO keyword arguments for a SOCKETIO_MESSAGE_QUEUE value"""
+    spec = (spec or '').strip()
+    if not spec:
+        return {}
+    if spec.lower() == 'database':
+        return {'client_manager': DatabaseQueueManager()}
+    # Built here (as Flask-SocketIO would) so a missing client package surfaces before init_app
+    if spec.startswith(('redis://', 'rediss://')):
+        manager = socketio_lib.RedisManager
+    elif spec.startswith('kafka://'):
+        manager = socketio_lib.KafkaManager
+    elif spec.startswith('zmq'):
+        manager = socketio_lib.ZmqManager
+    else:
+        manager = socketio_lib.KombuManager
+    return {'client_manager': manager(spec, channel='flask-socketio')}
+
+
+class EmitCoalescer:
+    """Buffers data_sync emits per room for one window, then sends one frame per room"""
+
+    def __init__(self, server, window=EMIT_WINDOW):
+        self.server = server
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending = {}  # (room, skip_sid) -> [(sync_event, source_session)]
+        self.frames = 0
+        self.events = 0
+
+    def emit(self, room, sync_event, source_session=None, skip_sid=None):
+        if self.window <= 0:
+            self._send(room, skip_sid, [(sync_event, source_session)])
+            return
+        key = (room, skip_sid)
+        with self._lock:
+            pending = self._pending.get(key)
+            first = pending is None
+            if first:
+                pending = self._pending[key] = []
+            pending.append((sync_event, source_session))
+        if first:
+            self.server.start_background_task(self._flush_later, key)
+
+    def _flush_later(self, key):
+        self.server.sleep(self.window)
+        self._flush(key)
+
+    def _flush(self, key):
+        with self._lock:
+            pending = self._pending.pop(key, None)
+        if pending:
+            self._send(key[0], key[1], pending)
+
+    def flush(self):
+        """Send everything buffered now"""
+        with self._lock:
+            keys = list(self._pending)
+        for key in keys:
+            self._flush(key)
+
+    def _send(self, room, skip_sid, pending):
+        events = _coalesce([sync_event for sync_event, _ in pending])
+        sources = {source_session for _, source_session in pending}
+        frame = {
+            'event': events[-1],
+            'events': events,
+            'count': len(events),
+            'source_session': sources.pop() if len(sources) == 1 else None
+        }
+        try:
+            self.server.emit('data_sync', frame, room=room, skip_sid=skip_sid)
+        except Exception as e:
+            logger.error(f"❌ data_sync emit to {room} failed: {e}")
+            return
+        with self._lock:
+            self.frames += 1
+            self.events += len(pending)
+
+
+def _coalesce(events):
+    """Keep the last event per record (table, record id), in the order of those last events"""
+    latest = {}
+    for index, event in enumerate(events):
+        data = event.get('data') if isinstance(event.get('data'), dict) else {}
+        record = data.get('record') if isinstance(data.get('record'), dict) else {}
+        if data.get('table') and record.get('id') is not None:
+            latest[(data['table'], str(record['id']))] = index
+        else:
+            latest[('', index)] = index
+    return [events[index] for index in sorted(latest.values())]
+
+
+def coalescer(server):
+    """The emit coalescer of a SocketIO server (created on first use)"""
+    instance = getattr(server, 'sync_coalescer', None)
+    if instance is None:
+        instance = server.sync_coalescer = EmitCoalescer(server)
+    return instance
+
+
+def emit_data_sync(server, user_id, sync_event, source_session=None, skip_sid=None):
+    """Queue a sync event for every device in the user's room (one coalesced frame per window)"""
+    coalescer(server).emit(f"user_{user_id}", sync_event, source_session, skip_sid)
+
+
+def cors_origins(spec=CORS_ORIGINS):
+    """Allowed origins for a SOCKETIO_CORS_ORIGINS value (None = same origin only)"""
+    origins = [origin.strip().rstrip('/') for origin in (spec or '').split(',') if origin.strip()]
+    return origins or None
+
+
+def init_gateway(app, **options):
+    """Attach the SocketIO server to the app and register the sync handlers"""
+    from modules.sync.routes import init_socketio_events
+
+    settings = {'async_mode': async_mode(), 'cors_allowed_origins': cors_origins()}
+    try:
+        settings.update(queue_options())
+    except Exception as e:
+        # e.g. a redis:// queue without the redis package
+        logger.warning(f"⚠️ Socket.IO message queue '{MESSAGE_QUEUE}' unavailable ({e}) - emits stay in this worker")
+    settings.update(options)
+
+    socketio.init_app(app, **settings)
+    init_socketio_events(socketio)
+    app.socketio = socketio
+    logger.info(f"✅ Socket.IO gateway ready ({socketio.async_mode}, queue: {status()['queue']})")
+    return socketio
+
+
+def status():
+    manager = getattr(socketio.server, 'manager', None)
+    instance = getattr(socketio, 'sync_coalescer', None)
+    return {
+        'async_mode': getattr(socketio, 'async_mode', None) or async_mode(),
+        'queue': getattr(manager, 'name', None) if isinstance(manager, socketio_lib.PubSubManager) else None,
+        'emit_window_ms': int(EMIT_WINDOW * 1000),
+        'frames': instance.frames if instance else 0,
+        'events': instance.events if instance else 0,
+    }
+
+
+def bench(devices=5, updates=300):
+    """
+    Bulk-update fan-out: connect `devices` WebSocket clients for one user,
+    broadcast `updates` record changes the way a bulk stock adjustment
+    does, and count the data_sync frames each device receives with and
+    without the coalescing window.
+    """
+    from flask import Flask
+    from modules.sync.routes import init_socketio_events
+    from modules.sync.service import sync_service
+
+    results = {'devices': devices, 'updates': updates}
+    for label, window in (('uncoalesced', 0), ('coalesced', EMIT_WINDOW)):
+        app = Flask(__name__)
+        app.secret_key = 'gateway-bench'
+        server = SocketIO(app, async_mode='threading')
+        init_socketio_events(server)
+        server.sync_coalescer = EmitCoalescer(server, window)
+        clients = []
+        for _ in range(devices):
+            flask_client = app.test_client()
+            with flask_client.session_transaction() as sess:
+                sess['user_id'] = 'bench-user'
+            clients.append(server.test_client(app, flask_test_client=flask_client))
+        for client in clients:
+            client.get_received()
+        try:
+            started = time.perf_counter()
+            for index in range(updates):
+                sync_event = sync_service.create_sync_event(
+                    'bench-user', 'update', {'table': 'products', 'record': {'id': f"p{index % 100}", 'stock': index}})
+                emit_data_sync(server, 'bench-user', sync_event)
+            server.sleep(window + 0.05)
+            server.sync_coalescer.flush()
+            elapsed = time.perf_counter() - started
+            frames = [[event for event in client.get_received() if event['name'] == 'data_sync'] for client in clients]
+        finally:
+            for client in clients:
+                client.disconnect()
+        results[f"{label}_frames_per_device"] = len(frames[0])
+        results[f"{label}_events_per_device"] = sum(frame['args'][0]['count'] for frame in frames[0])
+        results[f"{label}_ms"] = round(elapsed * 1000, 1)
+    return results
+
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(prog='python -m modules.sync.gateway')
+    parser.add_argument('command', choices=['status', 'bench'])
+    parser.add_argument('--devices', type=int, default=5)
+    parser.add_argument('--updates', type=int, default=300)
+    args = parser.parse_args(argv)
+
+    results = bench(args.devices, args.updates) if args.command == 'bench' else status()
+    for key, value in results.items():
+        print(f"  {key}: {value}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -6,11 +6,35 @@ Handles WebSocket connections for multi-device sync
 from flask import request, session
 from flask_socketio import SocketIO, emit, join_room, leave_room, disconnect
 from modules.sync.service import sync_service
+from modules.sync.gateway import emit_data_sync
+from modules.shared.sync_clock import sync_clock
+from modules.shared.database import get_db_connection
+from modules.shared.keyset import InvalidCursor
+from modules.shared import sync_changes
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+def _sync_owner(user_id):
+    """
+    Owner whose records a connection syncs (the client's for employee sessions).
+    Writers tick the sync clock for this tenant, so every version a device
+    compares against is read for it too.
+    """
+    if session.get('user_type') == 'employee' and session.get('client_id'):
+        return session.get('client_id')
+    return user_id
+
+def _changes_page(user_id, cursor, limit=None, tables=None):
+    """One delta sync page for a connection"""
+    conn = get_db_connection()
+    try:
+        return sync_changes.changes_since(conn, _sync_owner(user_id), cursor,
+                                          limit or sync_changes.DEFAULT_PAGE_SIZE, tables)
+    finally:
+        conn.close()
+
 def init_socketio_events(socketio: SocketIO):
     """Initialize WebSocket event handlers"""
     
@@ -18,14 +42,10 @@ def init_socketio_events(socketio: SocketIO):
     def handle_connect():
         """Handle client connection"""
         try:
-            # Get user info from session or token
+            # Only a logged-in Flask session may connect - never a user_id the client names
             user_id = session.get('user_id')
             if not user_id:
-                # Try to get from query params (for mobile apps)
-                user_id = request.args.get('user_id')
-            
-            if not user_id:
-                logger.warning("❌ WebSocket connection rejected: No user_id")
+                logger.warning("❌ WebSocket connection rejected: No session")
                 disconnect()
                 return False
             
@@ -44,18 +64,22 @@ def init_socketio_events(socketio: SocketIO):
                 # Join user room for targeted broadcasts
                 join_room(f"user_{user_id}")
                 
-                # Send initial sync data
-                latest_data = sync_service.get_latest_data_for_user(user_id)
-                emit('initial_sync', {
-                    'success': True,
-                    'data': latest_data,
-                    'message': 'Connected and synced'
-                })
+                # Send initial sync data - only the changes when the device brings its cursor
+                cursor = request.args.get('cursor')
+                initial_sync = {'success': True, 'message': 'Connected and synced'}
+                try:
+                    if cursor:
+                        initial_sync['changes'] = _changes_page(user_id, cursor)
+                except InvalidCursor as e:
+                    logger.warning(f"⚠️ Sync cursor rejected for {session_id}: {e}")
+                if 'changes' not in initial_sync:
+                    initial_sync['data'] = sync_service.get_snapshot(_sync_owner(user_id))
+                emit('initial_sync', initial_sync)
                 
                 # Notify other devices about new connection
                 emit('device_connected', {
                     'device_info': device_info,
-                    'timestamp': latest_data.get('sync_timestamp')
+                    'timestamp': sync_clock.stamp(_sync_owner(user_id))['timestamp']
                 }, room=f"user_{user_id}", include_self=False)
                 
                 logger.info(f"✅ WebSocket connected: {session_id} for user {user_id}")
@@ -82,7 +106,7 @@ def init_socketio_events(socketio: SocketIO):
                 # Notify other devices about disconnection
                 emit('device_disconnected', {
                     'session_id': session_id,
-                    'timestamp': sync_service.get_latest_data_for_user(user_id).get('sync_timestamp')
+                    'timestamp': sync_clock.stamp(_sync_owner(user_id))['timestamp']
                 }, room=f"user_{user_id}")
                 
                 logger.info(f"✅ WebSocket disconnected: {session_id}")
@@ -92,12 +116,11 @@ def init_socketio_events(socketio: SocketIO):
     
     @socketio.on('ping')
     def handle_ping():
-        """Handle ping for keepalive"""
+        """Handle ping for keepalive - answered from the sync clock, no database"""
         session_id = request.sid
         sync_service.mark_session_active(session_id)
-        emit('pong', {'timestamp': sync_service.get_latest_data_for_user(
-            sync_service.active_sessions.get(session_id, {}).get('user_id', '')
-        ).get('sync_timestamp')})
+        user_id = sync_service.active_sessions.get(session_id, {}).get('user_id', '')
+        emit('pong', sync_clock.stamp(_sync_owner(user_id)))
     
     @socketio.on('request_sync')
     def handle_sync_request(data):
@@ -112,19 +135,29 @@ def init_socketio_events(socketio: SocketIO):
             since_timestamp = data.get('since_timestamp')
             
             # Get pending sync events
-            pending_events = sync_service.get_pending_sync_events(user_id, since_timestamp)
+            pending_events = sync_service.get_pending_sync_events(
+                user_id, since_timestamp, data.get('since_version'))
             
             # Get latest data if requested
             include_full_data = data.get('include_full_data', False)
             latest_data = None
             if include_full_data:
-                latest_data = sync_service.get_latest_data_for_user(user_id)
+                latest_data = sync_service.get_snapshot(_sync_owner(user_id))
+            
+            # Delta sync: the records changed since the device's cursor ('' = from the start)
+            changes = None
+            if 'cursor' in data:
+                changes = _changes_page(user_id, data.get('cursor') or None, data.get('limit'),
+                                        data.get('tables'))
             
+            stamp = sync_clock.stamp(_sync_owner(user_id))
             emit('sync_response', {
                 'success': True,
                 'pending_events': pending_events,
                 'latest_data': latest_data,
-                'timestamp': sync_service.get_latest_data_for_user(user_id).get('sync_timestamp')
+                'changes': changes,
+                'timestamp': stamp['timestamp'],
+                'version': stamp['version']
             })
             
             sync_service.mark_session_active(session_id)
@@ -152,11 +185,8 @@ def init_socketio_events(socketio: SocketIO):
                 source_session=session_id
             )
             
-            # Broadcast to other devices of the same user
-            emit('data_sync', {
-                'event': sync_event,
-                'source_session': session_id
-            }, room=f"user_{user_id}", include_self=False)
+            # Broadcast to other devices of the same user (coalesced per window)
+            emit_data_sync(socketio, user_id, sync_event, source_session=session_id, skip_sid=session_id)
             
             sync_service.mark_session_active(session_id)
             
@@ -177,11 +207,8 @@ def broadcast_data_change(user_id: str, event_type: str, data: dict, socketio: S
             source_session=source_session
         )
         
-        # Broadcast to all user devices
-        socketio.emit('data_sync', {
-            'event': sync_event,
-            'source_session': source_session
-        }, room=f"user_{user_id}")
+        # Broadcast to all user devices (coalesced per window)
+        emit_data_sync(socketio, user_id, sync_event, source_session=source_session)
         
         logger.info(f"📡 API data change broadcasted for user {user_id}: {event_type}")
         
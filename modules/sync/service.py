@@ -3,19 +3,40 @@ Real-time Data Sync Service
 Handles multi-device synchronization using WebSockets
 """
 
+import os
 import json
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 from modules.shared.database import get_db_connection
+from modules.shared.sync_clock import sync_clock
+from modules.shared.result_cache import result_cache
+from modules.shared import sync_changes
+from modules.shared.sync_events import create_store
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Login-time snapshot: background = warm the cache off the login request, inline = build it
+# during login (the old behaviour), off = build on the first WebSocket connect
+LOGIN_PREFETCH = os.environ.get('SYNC_LOGIN_PREFETCH', 'background').strip().lower()
+PREFETCH_WORKERS = int(os.environ.get('SYNC_PREFETCH_WORKERS', '2'))
+SNAPSHOT_TTL = float(os.environ.get('SYNC_SNAPSHOT_TTL', '120'))  # seconds, on top of write invalidation
+
+class SnapshotUnavailable(Exception):
+    """The snapshot could not be built - never cached"""
+
 class SyncService:
-    def __init__(self):
-        self.active_sessions = {}  # {session_id: {user_id, device_info, last_seen}}
-        self.sync_queue = {}       # {user_id: [sync_events]}
+    def __init__(self, store=None, login_prefetch=LOGIN_PREFETCH):
+        self.active_sessions = {}  # {session_id: {user_id, device_info, last_seen}} - this worker's connections
+        # Sync events and the user -> sessions index (shared across workers with SYNC_EVENT_BACKEND=database)
+        self.store = store if store is not None else create_store()
+        self.login_prefetch = login_prefetch
+        self._prefetch_lock = threading.Lock()
+        self._prefetching = set()   # user_ids with a snapshot build queued or running
+        self._prefetch_pool = None  # started on the first login
         
     def register_session(self, session_id: str, user_id: str, device_info: Dict) -> bool:
         """Register a new device session"""
@@ -26,10 +47,7 @@ class SyncService:
                 'last_seen': time.time(),
                 'connected_at': datetime.now().isoformat()
             }
-            
-            # Initialize sync queue for user if not exists
-            if user_id not in self.sync_queue:
-                self.sync_queue[user_id] = []
+            self.store.add_session(session_id, user_id)
                 
             logger.info(f"✅ Session registered: {session_id} for user {user_id}")
             return True
@@ -42,8 +60,8 @@ class SyncService:
         """Unregister a device session"""
         try:
             if session_id in self.active_sessions:
-                user_id = self.active_sessions[session_id]['user_id']
-                del self.active_sessions[session_id]
+                user_id = self.active_sessions.pop(session_id)['user_id']
+                self.store.remove_session(session_id)
                 logger.info(f"✅ Session unregistered: {session_id} for user {user_id}")
                 return True
             return False
@@ -53,50 +71,34 @@ class SyncService:
             return False
     
     def get_user_sessions(self, user_id: str) -> List[str]:
-        """Get all active sessions for a user"""
-        return [
-            session_id for session_id, data in self.active_sessions.items()
-            if data['user_id'] == user_id
-        ]
+        """Get all active sessions for a user (every worker's, with a shared store)"""
+        return self.store.user_sessions(user_id)
     
     def create_sync_event(self, user_id: str, event_type: str, data: Dict, source_session: str = None) -> Dict:
         """Create a sync event for distribution"""
+        version = sync_clock.tick(user_id)
         sync_event = {
-            'id': f"sync_{int(time.time() * 1000)}",
+            'id': f"sync_{version or int(time.time() * 1000000)}",
             'user_id': user_id,
             'event_type': event_type,  # 'create', 'update', 'delete'
             'data': data,
             'timestamp': datetime.now().isoformat(),
-            'source_session': source_session
+            'source_session': source_session,
+            'version': version
         }
         
-        # Add to sync queue
-        if user_id not in self.sync_queue:
-            self.sync_queue[user_id] = []
-        
-        self.sync_queue[user_id].append(sync_event)
-        
-        # Keep only last 100 events per user
-        if len(self.sync_queue[user_id]) > 100:
-            self.sync_queue[user_id] = self.sync_queue[user_id][-100:]
+        # The store keeps the user's last SYNC_EVENT_LIMIT events
+        try:
+            self.store.append(sync_event)
+        except Exception as e:
+            logger.error(f"❌ Failed to store sync event: {e}")
             
         return sync_event
     
-    def get_pending_sync_events(self, user_id: str, since_timestamp: str = None) -> List[Dict]:
-        """Get pending sync events for a user since timestamp"""
-        if user_id not in self.sync_queue:
-            return []
-        
-        events = self.sync_queue[user_id]
-        
-        if since_timestamp:
-            # Filter events after timestamp
-            events = [
-                event for event in events
-                if event['timestamp'] > since_timestamp
-            ]
-        
-        return events
+    def get_pending_sync_events(self, user_id: str, since_timestamp: str = None,
+                                since_version: int = None) -> List[Dict]:
+        """Get pending sync events for a user since a sync clock version (or timestamp)"""
+        return self.store.events_since(user_id, since_version, since_timestamp)
     
     def mark_session_active(self, session_id: str):
         """Update last seen timestamp for session"""
@@ -107,7 +109,7 @@ class SyncService:
         """Remove inactive sessions"""
         current_time = time.time()
         inactive_sessions = [
-            session_id for session_id, data in self.active_sessions.items()
+            session_id for session_id, data in list(self.active_sessions.items())
             if current_time - data['last_seen'] > timeout_seconds
         ]
         
@@ -116,23 +118,101 @@ class SyncService:
             
         if inactive_sessions:
             logger.info(f"🧹 Cleaned up {len(inactive_sessions)} inactive sessions")
+        
+        # Keep this worker's sessions in the shared index, drop those of workers that died
+        dropped = self.store.heartbeat()
+        if dropped:
+            logger.info(f"🧹 Dropped {dropped} sessions of stopped workers")
     
     def get_sync_stats(self) -> Dict:
         """Get sync system statistics"""
+        stats = self.store.stats()
         return {
-            'active_sessions': len(self.active_sessions),
-            'total_users': len(set(data['user_id'] for data in self.active_sessions.values())),
-            'sync_queue_size': sum(len(events) for events in self.sync_queue.values()),
-            'sessions_by_user': {
-                user_id: len(self.get_user_sessions(user_id))
-                for user_id in set(data['user_id'] for data in self.active_sessions.values())
-            }
+            'active_sessions': stats['sessions'],
+            'worker_sessions': len(self.active_sessions),
+            'total_users': len(stats['sessions_by_user']),
+            'sync_queue_size': stats['events'],
+            'sessions_by_user': stats['sessions_by_user'],
+            'store': self.store.name
         }
     
+    def get_snapshot(self, user_id: str) -> Dict:
+        """
+        Latest data snapshot for a user, shared with the login prefetch.
+        Kept in the result cache under the user and the user's head in the
+        sync_changes log, so any write to the synced tables - whether or not
+        its writer invalidates the cache - and SYNC_SNAPSHOT_TTL expire it.
+        """
+        def build():
+            snapshot = self.get_latest_data_for_user(user_id)
+            if not snapshot:
+                raise SnapshotUnavailable(user_id)
+            return snapshot
+        
+        try:
+            return result_cache.get_or_compute('sync_snapshot', user_id, [self._snapshot_head(user_id)],
+                                               build, SNAPSHOT_TTL)
+        except SnapshotUnavailable:
+            return {}
+    
+    def _snapshot_head(self, user_id: str) -> Optional[str]:
+        """The user's sync_changes head cursor (None when the log can't be read)"""
+        conn = get_db_connection()
+        try:
+            return sync_changes.head_cursor(conn, user_id)
+        except Exception as e:
+            logger.warning(f"Could not read sync head for {user_id}: {e}")
+            return None
+        finally:
+            conn.close()
+    
+    def prefetch_snapshot(self, user_id: str) -> bool:
+        """Warm the user's snapshot for the device about to connect; returns whether one was built or queued"""
+        if self.login_prefetch == 'off' or not result_cache.enabled:
+            return False
+        if self.login_prefetch == 'inline':
+            self.get_snapshot(user_id)
+            return True
+        
+        with self._prefetch_lock:
+            if user_id in self._prefetching:
+                return True
+            self._prefetching.add(user_id)
+            if self._prefetch_pool is None:
+                self._prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS,
+                                                         thread_name_prefix='sync-prefetch')
+        try:
+            self._prefetch_pool.submit(self._prefetch, user_id)
+            return True
+        except RuntimeError as e:
+            # Pool shut down (interpreter exiting)
+            with self._prefetch_lock:
+                self._prefetching.discard(user_id)
+            logger.warning(f"⚠️ Sync prefetch not queued for {user_id}: {e}")
+            return False
+    
+    def _prefetch(self, user_id: str):
+        try:
+            self.get_snapshot(user_id)
+        except Exception as e:
+            logger.error(f"❌ Sync prefetch failed for {user_id}: {e}")
+        finally:
+            with self._prefetch_lock:
+                self._prefetching.discard(user_id)
+    
     def get_latest_data_for_user(self, user_id: str) -> Dict:
         """Get latest data snapshot for user (called on login)"""
+        # Read before the tables: a change made while they are read moves the clock past it
+        sync_version = sync_clock.version(user_id)
         conn = get_db_connection()
         try:
+            # Cursor first too: delta sync resumes from here, re-sending anything changed meanwhile
+            try:
+                sync_cursor = sync_changes.head_cursor(conn, user_id)
+            except Exception as e:
+                logger.error(f"Error reading sync cursor: {e}")
+                sync_cursor = None
+            
             # Get latest data from all relevant tables
             latest_data = {}
             
@@ -186,6 +266,8 @@ class SyncService:
                 latest_data['invoices'] = []
             
             latest_data['sync_timestamp'] = datetime.now().isoformat()
+            latest_data['sync_version'] = sync_version
+            latest_data['sync_cursor'] = sync_cursor
             
             return latest_data
             
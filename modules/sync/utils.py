@@ -57,20 +57,21 @@ def broadcast_data_change(event_type: str, table_name: str, record_data: dict, u
 
 def sync_on_login(user_id: str):
     """
-    Trigger sync when user logs in
+    Warm the user's sync snapshot when they log in, so the device's
+    WebSocket connect finds it ready. The login never waits for it
+    (SYNC_LOGIN_PREFETCH=background); returns whether one was queued.
     """
     try:
         from modules.sync.service import sync_service
         
-        # Get latest data for user
-        latest_data = sync_service.get_latest_data_for_user(user_id)
-        
-        logger.info(f"✅ Sync data prepared for user {user_id} login")
-        return latest_data
+        queued = sync_service.prefetch_snapshot(user_id)
+        if queued:
+            logger.info(f"✅ Sync snapshot prefetch for user {user_id} ({sync_service.login_prefetch})")
+        return queued
         
     except Exception as e:
-        logger.error(f"❌ Failed to prepare sync data on login: {e}")
-        return {}
+        logger.error(f"❌ Failed to queue sync prefetch on login: {e}")
+        return False
 
 def queue_offline_change(event_type: str, table_name: str, record_data: dict):
     """
@@ -86,4 +87,115 @@ def queue_offline_change(event_type: str, table_name: str, record_data: dict):
         
     except Exception as e:
         logger.error(f"❌ Failed to queue offline change: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+def _seed_login(path, users, products, customers, bills):
+    """Scratch database: migrated schema, `users` owners sharing the catalogue sizes"""
+    import sqlite3
+    from modules.shared.database import hash_password
+    
+    raw = sqlite3.connect(path)
+    # The snapshot reads these by user_id (not in the SQLite base schema)
+    for table in ('sales', 'bills'):
+        columns = [row[1] for row in raw.execute(f"PRAGMA table_info({table})")]
+        if 'user_id' not in columns:
+            raw.execute(f"ALTER TABLE {table} ADD COLUMN user_id TEXT")
+    raw.executemany("INSERT INTO users (id, email, password_hash, business_name, business_type, is_active) "
+                    "VALUES (?, ?, ?, ?, 'retail', 1)",
+                    [(f"bench-{u}", f"bench{u}@example.com", hash_password('bench-pass'), f"Shop {u}")
+                     for u in range(users)])
+    for u in range(users):
+        owner = f"bench-{u}"
+        raw.executemany("INSERT INTO products (id, code, name, price, stock, business_owner_id, user_id, created_at) "
+                        "VALUES (?, ?, ?, 10, 5, ?, ?, '2026-01-01')",
+                        [(f"{owner}-p{i}", f"{owner}-SKU{i}", f"Product {i}", owner, owner) for i in range(products)])
+        raw.executemany("INSERT INTO customers (id, name, business_owner_id, user_id, created_at) "
+                        "VALUES (?, ?, ?, ?, '2026-01-01')",
+                        [(f"{owner}-c{i}", f"Customer {i}", owner, owner) for i in range(customers)])
+        raw.executemany("INSERT INTO bills (id, bill_number, business_owner_id, user_id, total_amount, created_at) "
+                        "VALUES (?, ?, ?, ?, 118, '2026-01-01')",
+                        [(f"{owner}-b{i}", f"{owner}-INV{i}", owner, owner) for i in range(bills)])
+        raw.executemany("INSERT INTO sales (id, bill_id, product_id, quantity, total_price, business_owner_id, "
+                        "user_id, created_at) VALUES (?, ?, ?, 1, 100, ?, ?, '2026-01-01')",
+                        [(f"{owner}-s{i}", f"{owner}-b{i}", f"{owner}-p{i % products}", owner, owner)
+                         for i in range(bills)])
+    raw.commit()
+    raw.close()
+
+def bench(logins=100, users=10, products=5_000, customers=2_000, bills=5_000):
+    """
+    Login latency with the sync snapshot built inline (the old behaviour)
+    against the background prefetch, on a scratch SQLite file. Every
+    login is a fresh authentication and follows a write to the user, so
+    each one needs a new snapshot. Also times the WebSocket connect's
+    snapshot read once the prefetch has landed.
+    """
+    import os
+    import time
+    import shutil
+    import tempfile
+    import modules.shared.database as database
+    from modules.shared import migrations
+    from modules.shared.result_cache import result_cache
+    from modules.shared.dashboard_summary import _time
+    from modules.auth.service import AuthService
+    from modules.sync.service import sync_service
+    
+    scratch = tempfile.mkdtemp(prefix='login_bench_')
+    saved = (database.DB_PATH, migrations.DB_PATH, database._engine, database._db_type, sync_service.login_prefetch)
+    database.DB_PATH = migrations.DB_PATH = os.path.join(scratch, 'login.db')
+    database._engine, database._db_type = None, 'sqlite'
+    results = {'logins': logins, 'users': users, 'rows_per_user': products + customers + bills * 2}
+    try:
+        migrations.migrate()
+        _seed_login(database.DB_PATH, users, products, customers, bills)
+        auth_service = AuthService()
+        counter = iter(range(10 ** 9))
+        
+        def login():
+            user = next(counter) % users
+            # A write since the last login: the user's snapshot is stale
+            result_cache.invalidate(f"bench-{user}")
+            auth_service.auth_cache.clear()
+            assert auth_service.authenticate_user(f"bench{user}@example.com", 'bench-pass')['success']
+        
+        for mode in ('inline', 'background'):
+            sync_service.login_prefetch = mode
+            timing = _time(login, logins)
+            results[f"{mode}_login_p50_ms"] = timing['p50_ms']
+            results[f"{mode}_login_p95_ms"] = timing['p95_ms']
+        
+        # Connect after the prefetch landed: the snapshot comes from the cache
+        deadline = time.time() + 30
+        while sync_service._prefetching and time.time() < deadline:
+            time.sleep(0.01)
+        result_cache.invalidate('bench-0')
+        cold = _time(lambda: (result_cache.invalidate('bench-0'), sync_service.get_snapshot('bench-0')), 20)
+        sync_service.get_snapshot('bench-0')
+        warm = _time(lambda: sync_service.get_snapshot('bench-0'), 20)
+        results['connect_snapshot_cold_p95_ms'] = cold['p95_ms']
+        results['connect_snapshot_prefetched_p95_ms'] = warm['p95_ms']
+    finally:
+        database.get_engine().dispose()
+        database.DB_PATH, migrations.DB_PATH, database._engine, database._db_type, sync_service.login_prefetch = saved
+        shutil.rmtree(scratch, ignore_errors=True)
+    return results
+
+def main(argv):
+    import argparse
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    parser = argparse.ArgumentParser(prog='python -m modules.sync.utils')
+    parser.add_argument('command', choices=['bench'])
+    parser.add_argument('--logins', type=int, default=100)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--products', type=int, default=5_000)
+    args = parser.parse_args(argv)
+    
+    for key, value in bench(args.logins, args.users, args.products).items():
+        print(f"  {key}: {value}")
+    return 0
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main(sys.argv[1:]))
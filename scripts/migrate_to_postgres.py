@@ -11,6 +11,10 @@ import os
 from urllib.parse import urlparse
 from datetime import datetime
 
+# Project root on the path for the shared bulk insert helper
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.shared.bulk import bulk_insert
+
 # Load .env file
 env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
 if os.path.exists(env_path):
@@ -125,29 +129,36 @@ def migrate_table_data(sqlite_conn, postgres_conn, table_name):
         
         print(f"   📊 Found {total_records} records")
         
-        # Prepare INSERT statement
+        # Prepare single-row INSERT for isolating failed rows
         placeholders = ', '.join(['%s'] * len(column_names))
         columns = ', '.join(column_names)
         insert_sql = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
         
-        # Migrate records in batches
-        batch_size = 100
+        # Migrate records in batches - one multi-row INSERT per batch
+        batch_size = 1000
         for i in range(0, len(rows), batch_size):
-            batch = rows[i:i+batch_size]
+            batch = [tuple(row) for row in rows[i:i+batch_size]]
             
-            for row in batch:
-                try:
-                    # Convert SQLite Row to tuple
-                    values = tuple(row)
-                    postgres_cursor.execute(insert_sql, values)
-                    migrated_records += 1
-                except Exception as e:
-                    print(f"   ⚠️  Failed to migrate record: {e}")
-                    failed_records += 1
-                    # Continue with next record
+            try:
+                bulk_insert(postgres_conn, 'postgresql', table_name, batch,
+                            columns=column_names, chunk_size=batch_size)
+                postgres_conn.commit()
+                migrated_records += len(batch)
+            except Exception as e:
+                # Retry the batch row by row to find the records that fail
+                postgres_conn.rollback()
+                print(f"   ⚠️  Batch failed ({e}), retrying row by row")
+                for values in batch:
+                    try:
+                        postgres_cursor.execute(insert_sql, values)
+                        postgres_conn.commit()
+                        migrated_records += 1
+                    except Exception as e:
+                        postgres_conn.rollback()
+                        print(f"   ⚠️  Failed to migrate record: {e}")
+                        failed_records += 1
+                        # Continue with next record
             
-            # Commit batch
-            postgres_conn.commit()
             print(f"   ✅ Migrated {migrated_records}/{total_records} records", end='\r')
         
         print(f"   ✅ Migrated {migrated_records}/{total_records} records")
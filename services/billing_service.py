@@ -8,6 +8,9 @@ from datetime import datetime
 import uuid
 from typing import Dict, List, Optional, Tuple
 from modules.shared.database import get_db_connection
+from modules.shared import sales_rollup
+from modules.shared import result_cache
+from modules.shared.cost_snapshot import product_costs
 
 
 class BillingService:
@@ -123,13 +126,17 @@ class BillingService:
             else:
                 bill_status = 'completed'
             
+            # Owned by the caller's tenant, so tenant-scoped reports and the
+            # rollup count it; without one (scripts) it stays unowned
+            business_owner_id = data.get('business_owner_id') or result_cache.current_tenant()
+            
             conn.execute('''
                 INSERT INTO bills (
                     id, bill_number, customer_id, business_type, 
                     subtotal, tax_amount, discount_amount, total_amount, 
-                    status, created_at
+                    status, business_owner_id, created_at
                 )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 bill_id,
                 bill_number,
@@ -140,6 +147,7 @@ class BillingService:
                 data.get('discount_amount', 0),
                 data['total_amount'],
                 bill_status,
+                business_owner_id,
                 current_time
             ))
             
@@ -152,6 +160,9 @@ class BillingService:
                 ).fetchone()
                 customer_name = customer['name'] if customer else None
             
+            # Snapshot each product's cost now - profit reports read it from the line
+            unit_costs = product_costs(conn, (item['product_id'] for item in data['items']))
+            
             # Process each bill item
             for item in data['items']:
                 item_id = self._generate_id()
@@ -159,18 +170,19 @@ class BillingService:
                 quantity = item['quantity']
                 unit_price = item['unit_price']
                 total_price = quantity * unit_price
+                unit_cost = unit_costs.get(product_id, 0.0)
                 
                 # Insert bill item
                 conn.execute('''
                     INSERT INTO bill_items (
                         id, bill_id, product_id, product_name, 
-                        quantity, unit_price, total_price
+                        quantity, unit_price, total_price, unit_cost
                     )
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     item_id, bill_id, product_id, 
                     item.get('product_name', 'Unknown Product'),
-                    quantity, unit_price, total_price
+                    quantity, unit_price, total_price, unit_cost
                 ))
                 
                 # Reduce inventory stock
@@ -182,7 +194,7 @@ class BillingService:
                 
                 # Get product details for sales entry
                 product = conn.execute(
-                    'SELECT category, cost FROM products WHERE id = ?',
+                    'SELECT category FROM products WHERE id = ?',
                     (product_id,)
                 ).fetchone()
                 
@@ -201,17 +213,17 @@ class BillingService:
                     INSERT INTO sales (
                         id, bill_id, bill_number, customer_id, customer_name,
                         product_id, product_name, category, quantity, unit_price,
-                        total_price, tax_amount, discount_amount, payment_method,
-                        sale_date, sale_time, created_at
+                        unit_cost, total_price, tax_amount, discount_amount, payment_method,
+                        sale_date, sale_time, business_owner_id, created_at
                     )
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     sale_id, bill_id, bill_number, data.get('customer_id'), customer_name,
                     product_id, item.get('product_name', 'Unknown Product'),
                     product['category'] if product else 'General',
-                    quantity, unit_price, total_price,
+                    quantity, unit_price, unit_cost, total_price,
                     item_tax, item_discount, data.get('payment_method', 'cash'),
-                    sale_date, sale_time, current_time
+                    sale_date, sale_time, business_owner_id, current_time
                 ))
             
             # Add payment record if payment method specified
@@ -222,8 +234,12 @@ class BillingService:
                     VALUES (?, ?, ?, ?, ?)
                 ''', (payment_id, bill_id, data['payment_method'], data['total_amount'], current_time))
             
+            # Keep the daily sales rollup in step, in the same transaction
+            sales_rollup.refresh_bill(conn, bill_id)
+            
             # Commit transaction
             conn.commit()
+            result_cache.invalidate(business_owner_id)
             
             return True, {
                 "bill_id": bill_id,
@@ -351,6 +367,9 @@ class BillingService:
             if not bill:
                 return False, {"error": "Bill not found"}
             
+            # Rollup days this bill contributes to - looked up before its rows go
+            rollup_keys = sales_rollup.bill_keys(conn, bill_id)
+            
             # Get all bill items to revert stock
             bill_items = conn.execute('''
                 SELECT product_id, quantity FROM bill_items WHERE bill_id = ?
@@ -367,9 +386,11 @@ class BillingService:
             conn.execute('DELETE FROM sales WHERE bill_id = ?', (bill_id,))
             conn.execute('DELETE FROM bill_items WHERE bill_id = ?', (bill_id,))
             conn.execute('DELETE FROM bills WHERE id = ?', (bill_id,))
+            sales_rollup.refresh_keys(conn, rollup_keys)
             
             # Commit transaction
             conn.commit()
+            result_cache.invalidate(result_cache.current_tenant())
             
             return True, {
                 "message": f"Bill {bill['bill_number']} deleted successfully",
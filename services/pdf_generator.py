@@ -5,7 +5,6 @@ Generates professional PDF reports using HTML templates and WeasyPrint
 
 import os
 from datetime import datetime, date
-from weasyprint import HTML, CSS
 from jinja2 import Template
 import tempfile
 import logging
@@ -44,7 +43,8 @@ class PDFGenerator:
             pdf_filename = f"DAILY_REPORT_{company_data['business_name'].replace(' ', '_').upper()}_{report_date.strftime('%Y-%m-%d')}.pdf"
             pdf_path = os.path.join(self.temp_dir, pdf_filename)
             
-            # Generate PDF using WeasyPrint
+            # Generate PDF using WeasyPrint (imported here - it is slow to load)
+            from weasyprint import HTML, CSS
             HTML(string=html_content).write_pdf(
                 pdf_path,
                 stylesheets=[CSS(string=self._get_css_styles())]
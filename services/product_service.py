@@ -5,6 +5,7 @@ Clean product management with proper validation
 
 from datetime import datetime
 from modules.shared.database import get_db_connection
+from modules.shared import result_cache
 import uuid
 from typing import Dict, List, Optional, Tuple
 
@@ -215,6 +216,7 @@ class ProductService:
             ))
             
             conn.commit()
+            result_cache.invalidate(result_cache.current_tenant())
             
             return True, {
                 "success": True,
@@ -279,6 +281,7 @@ class ProductService:
             ))
             
             conn.commit()
+            result_cache.invalidate(result_cache.current_tenant())
             
             return True, {
                 "success": True,
@@ -321,6 +324,7 @@ class ProductService:
             )
             
             conn.commit()
+            result_cache.invalidate(result_cache.current_tenant())
             
             return True, {
                 "success": True,
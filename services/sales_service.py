@@ -5,7 +5,11 @@ Clean sales data management and reporting
 
 from datetime import datetime, timedelta
 from modules.shared.database import get_db_connection
+from modules.shared.analytics_snapshot import analytics_snapshot
 from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class SalesService:
@@ -73,8 +77,8 @@ class SalesService:
                     c.phone as customer_phone,
                     p.name as product_name,
                     p.category as product_category,
-                    p.cost as product_cost,
-                    (s.total_price - (p.cost * s.quantity)) as profit
+                    s.unit_cost as product_cost,
+                    (s.total_price - (s.unit_cost * s.quantity)) as profit
                 FROM sales s
                 LEFT JOIN bills b ON s.bill_id = b.id
                 LEFT JOIN customers c ON s.customer_id = c.id
@@ -96,14 +100,13 @@ class SalesService:
                     END), 0) as total_sales,
                     COALESCE(SUM(s.quantity), 0) as total_quantity,
                     COALESCE(AVG(s.unit_price), 0) as avg_unit_price,
-                    COALESCE(SUM(s.total_price - (p.cost * s.quantity)), 0) as net_profit,
+                    COALESCE(SUM(s.total_price - (s.unit_cost * s.quantity)), 0) as net_profit,
                     COALESCE(SUM(CASE 
                         WHEN b.is_credit = 1 AND b.credit_balance > 0 THEN b.credit_balance
                         ELSE 0
                     END), 0) as receivable_profit
                 FROM sales s
                 LEFT JOIN bills b ON s.bill_id = b.id
-                LEFT JOIN products p ON s.product_id = p.id
                 WHERE {date_condition}
             ''', params).fetchone()
             
@@ -206,6 +209,17 @@ class SalesService:
             date_from = filters.get('from', datetime.now().strftime('%Y-%m-%d')) if filters else datetime.now().strftime('%Y-%m-%d')
             date_to = filters.get('to', datetime.now().strftime('%Y-%m-%d')) if filters else datetime.now().strftime('%Y-%m-%d')
             
+            # Long ranges are aggregated from the columnar snapshot
+            if analytics_snapshot.serves(date_from, date_to):
+                try:
+                    return True, {
+                        "success": True,
+                        "product_sales": analytics_snapshot.sales_by_product(conn, date_from, date_to),
+                        "date_range": {"from": date_from, "to": date_to}
+                    }
+                except Exception as e:
+                    logger.warning(f"⚠️  Analytics snapshot read failed, scanning sales: {e}")
+            
             product_sales = conn.execute('''
                 SELECT 
                     s.product_id,
@@ -251,6 +265,17 @@ class SalesService:
             date_from = filters.get('from', datetime.now().strftime('%Y-%m-%d')) if filters else datetime.now().strftime('%Y-%m-%d')
             date_to = filters.get('to', datetime.now().strftime('%Y-%m-%d')) if filters else datetime.now().strftime('%Y-%m-%d')
             
+            # Long ranges are aggregated from the columnar snapshot
+            if analytics_snapshot.serves(date_from, date_to):
+                try:
+                    return True, {
+                        "success": True,
+                        "category_sales": analytics_snapshot.sales_by_category(conn, date_from, date_to),
+                        "date_range": {"from": date_from, "to": date_to}
+                    }
+                except Exception as e:
+                    logger.warning(f"⚠️  Analytics snapshot read failed, scanning sales: {e}")
+            
             category_sales = conn.execute('''
                 SELECT 
                     s.category,
@@ -0,0 +1,245 @@
+"""
+Test for the Columnar Analytics Snapshot
+
+Feature: database-performance
+Property: Long-range breakdowns read from the snapshot equal the same breakdowns scanned from sales
+
+This test validates that product and category breakdowns aggregated from
+the monthly partitions match the SalesService SQL for any date range,
+that a sync re-exports only the months whose rollup fingerprint changed
+(and drops months whose sales are gone) without holding the lock while
+it exports, that SalesService reads the snapshot only for long ranges
+when reads are on and falls back to SQL when it fails, and that
+partitions round-trip NULLs and text.
+"""
+
+import pytest
+import os
+import sys
+import math
+from datetime import date, timedelta
+from hypothesis import given, settings, strategies as st, HealthCheck
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.shared.database as database
+from modules.shared import migrations
+from modules.shared import sales_rollup
+from modules.shared import analytics_snapshot as analytics_module
+from modules.shared.analytics_snapshot import analytics_snapshot, write_partition, read_partition
+from services.sales_service import SalesService
+from services.billing_service import BillingService
+
+
+@pytest.fixture
+def analytics_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'analytics.db'))
+    monkeypatch.setattr(migrations, 'DB_PATH', str(tmp_path / 'analytics.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    monkeypatch.setattr(analytics_snapshot, 'root', str(tmp_path / 'analytics'))
+    monkeypatch.setattr(analytics_module, 'ANALYTICS_SYNC_INTERVAL', 0)
+    analytics_snapshot.reset()
+    migrations.migrate()
+    yield
+    analytics_snapshot.reset()
+    database.get_engine().dispose()
+
+
+PRODUCTS = {'ap1': 'Grocery', 'ap2': 'Grocery', 'ap3': 'Dairy', 'ap4': None}
+TODAY = date.today()
+
+
+def _reset(conn):
+    for table in ('sales', 'bill_items', 'payments', 'bills', sales_rollup.ROLLUP_TABLE):
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute("DELETE FROM products WHERE id LIKE 'ap%'")
+    conn.bulk_insert('products', [{'id': product_id, 'code': product_id, 'name': product_id, 'price': 20,
+                                   'cost': 5, 'stock': 40, 'min_stock': 3, 'category': category}
+                                  for product_id, category in PRODUCTS.items()])
+
+
+def _by_key(rows, *key):
+    return {tuple(row[column] for column in key): row for row in rows}
+
+
+def _assert_same(actual, expected, key):
+    actual, expected = _by_key(actual, *key), _by_key(expected, *key)
+    assert actual.keys() == expected.keys()
+    for group, row in expected.items():
+        for column, value in row.items():
+            if isinstance(value, float):
+                assert actual[group][column] == pytest.approx(value, abs=1e-6), (group, column)
+            else:
+                assert actual[group][column] == value, (group, column)
+
+
+_bill = st.fixed_dictionaries({
+    'owner': st.sampled_from(['t1', 't2', None]),
+    'days_ago': st.integers(min_value=0, max_value=200),
+    'lines': st.lists(st.tuples(st.sampled_from(sorted(PRODUCTS)), st.integers(1, 5),
+                                st.sampled_from([None, 5.0, 12.5])), min_size=1, max_size=4),
+})
+
+
+@settings(max_examples=30, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(bills=st.lists(_bill, max_size=15),
+       start=st.integers(min_value=0, max_value=210), length=st.integers(min_value=0, max_value=210))
+def test_breakdowns_match_the_sales_scan(analytics_db, monkeypatch, bills, start, length):
+    conn = database.get_db_connection()
+    _reset(conn)
+    for index, bill in enumerate(bills):
+        sale_date = (TODAY - timedelta(days=bill['days_ago'])).strftime('%Y-%m-%d')
+        conn.execute("INSERT INTO bills (id, bill_number, business_owner_id, total_amount) VALUES (?, ?, ?, 10)",
+                     (f"ab{index}", f"AB-{index}", bill['owner']))
+        for line, (product_id, quantity, price) in enumerate(bill['lines']):
+            conn.execute("""
+                INSERT INTO sales (id, bill_id, business_owner_id, product_id, product_name, category,
+                                   quantity, unit_price, total_price, sale_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (f"ab{index}-{line}", f"ab{index}", bill['owner'], product_id, product_id.upper(),
+                  PRODUCTS[product_id], quantity, price, None if price is None else price * quantity, sale_date))
+    conn.commit()
+    conn.close()
+    sales_rollup.rebuild()
+
+    date_from = (TODAY - timedelta(days=start)).strftime('%Y-%m-%d')
+    date_to = (TODAY - timedelta(days=max(start - length, 0))).strftime('%Y-%m-%d')
+    filters = {'from': date_from, 'to': date_to}
+    service = SalesService()
+    monkeypatch.setattr(analytics_module, 'ANALYTICS_READS', False)
+    expected_products = service.get_sales_by_product(filters)[1]['product_sales']
+    expected_categories = service.get_sales_by_category(filters)[1]['category_sales']
+
+    conn = database.get_db_connection()
+    try:
+        _assert_same(analytics_snapshot.sales_by_product(conn, date_from, date_to), expected_products,
+                     ('product_id', 'product_name', 'category'))
+        _assert_same(analytics_snapshot.sales_by_category(conn, date_from, date_to), expected_categories,
+                     ('category',))
+    finally:
+        conn.close()
+
+
+def _bill_now(product_id, quantity):
+    ok, result = BillingService().create_bill({
+        'items': [{'product_id': product_id, 'product_name': product_id, 'quantity': quantity, 'unit_price': 20}],
+        'total_amount': 20 * quantity,
+        'payment_method': 'cash',
+    })
+    assert ok, result
+    return result['bill_id']
+
+
+def test_sync_exports_only_changed_months(analytics_db):
+    conn = database.get_db_connection()
+    _reset(conn)
+    old_day = (TODAY.replace(day=1) - timedelta(days=40)).strftime('%Y-%m-%d')
+    conn.execute("INSERT INTO bills (id, bill_number, total_amount) VALUES ('old', 'OLD-1', 40)")
+    conn.execute("""
+        INSERT INTO sales (id, bill_id, product_id, product_name, category, quantity, unit_price, total_price, sale_date)
+        VALUES ('old-1', 'old', 'ap1', 'AP1', 'Grocery', 2, 20, 40, ?)
+    """, (old_day,))
+    conn.commit()
+    conn.close()
+    sales_rollup.rebuild()
+
+    first, last = old_day[:7], TODAY.strftime('%Y-%m')
+    conn = database.get_db_connection()
+    assert analytics_snapshot.sync(conn, first, last)['exported'] == 1
+    assert analytics_snapshot.sync(conn, first, last)['exported'] == 0
+    conn.close()
+
+    # A new bill refreshes today's rollup row: only the current month is exported again
+    bill_id = _bill_now('ap3', 3)
+    conn = database.get_db_connection()
+    assert analytics_snapshot.sync(conn, first, last) == {'checked': len(analytics_module._months(first, last)),
+                                                          'exported': 1, 'removed': 0}
+    categories = _by_key(analytics_snapshot.sales_by_category(conn, old_day, TODAY.strftime('%Y-%m-%d')),
+                         'category')
+    assert categories[('Dairy',)]['total_quantity'] == 3
+    assert categories[('Grocery',)]['total_sales'] == 40
+    conn.close()
+
+    ok, _ = BillingService().delete_bill(bill_id)
+    assert ok
+    conn = database.get_db_connection()
+    assert analytics_snapshot.sync(conn, first, last)['removed'] == 1
+    assert [row['category'] for row in analytics_snapshot.sales_by_category(
+        conn, old_day, TODAY.strftime('%Y-%m-%d'))] == ['Grocery']
+    conn.close()
+
+
+def test_exports_run_outside_the_lock(analytics_db, monkeypatch):
+    conn = database.get_db_connection()
+    _reset(conn)
+    conn.commit()
+    conn.close()
+    _bill_now('ap1', 2)
+    month = TODAY.strftime('%Y-%m')
+
+    export = analytics_snapshot._export
+    during = []
+
+    def watched(*args):
+        # Other tenants' reads and syncs can take the lock, and this month is not exported twice
+        assert analytics_snapshot._lock.acquire(blocking=False)
+        analytics_snapshot._lock.release()
+        during.append(analytics_snapshot.sync(args[0], month, month, force=True))
+        return export(*args)
+
+    monkeypatch.setattr(analytics_snapshot, '_export', watched)
+    conn = database.get_db_connection()
+    assert analytics_snapshot.sync(conn, month, month, force=True)['exported'] == 1
+    assert during == [{'checked': 0, 'exported': 0, 'removed': 0}]
+    assert analytics_snapshot._syncing == set()
+    conn.close()
+
+
+def test_service_reads_the_snapshot_for_long_ranges_only(analytics_db, monkeypatch):
+    monkeypatch.setattr(analytics_module, 'ANALYTICS_READS', True)
+    conn = database.get_db_connection()
+    _reset(conn)
+    conn.commit()
+    conn.close()
+    _bill_now('ap2', 4)
+    long_range = {'from': (TODAY - timedelta(days=400)).strftime('%Y-%m-%d'), 'to': TODAY.strftime('%Y-%m-%d')}
+    short_range = {'from': TODAY.strftime('%Y-%m-%d'), 'to': TODAY.strftime('%Y-%m-%d')}
+
+    calls = []
+    original = analytics_snapshot.sales_by_product
+    monkeypatch.setattr(analytics_snapshot, 'sales_by_product',
+                        lambda *args, **kwargs: calls.append(args[1:]) or original(*args, **kwargs))
+    service = SalesService()
+    ok, result = service.get_sales_by_product(long_range)
+    assert ok and calls == [(long_range['from'], long_range['to'])]
+    product = result['product_sales'][0]
+    assert (product['product_id'], product['total_quantity'], product['transactions']) == ('ap2', 4, 1)
+    assert (product['current_stock'], product['min_stock']) == (36, 3)
+
+    ok, result = service.get_sales_by_product(short_range)
+    assert ok and len(calls) == 1 and result['product_sales'][0]['total_quantity'] == 4
+
+    # A broken snapshot falls back to scanning sales
+    def broken(*args, **kwargs):
+        raise OSError('disk gone')
+
+    monkeypatch.setattr(analytics_snapshot, 'sales_by_category', broken)
+    ok, result = service.get_sales_by_category(long_range)
+    assert ok and result['category_sales'][0]['total_quantity'] == 4
+
+
+def test_partition_round_trip(tmp_path):
+    path = str(tmp_path / 't-x' / '2026-01.bpcol')
+    rows = [(1, 'b1', 'p1', 'Chai – masala', None, 2, 40.0, 20.0),
+            (31, None, None, None, 'Misc', None, None, None)]
+    header = write_partition(path, {'month': '2026-01', 'fingerprint': [1]}, rows)
+    assert header['rows'] == 2
+
+    header, columns, bills, lines = read_partition(path)
+    assert header['fingerprint'] == [1]
+    assert list(columns['day']) == [1, 31] and list(columns['quantity']) == [2, 0]
+    assert bills == ['b1', None]
+    assert lines == [('p1', 'Chai – masala', None), (None, None, 'Misc')]
+    assert columns['total_price'][0] == 40.0 and math.isnan(columns['unit_price'][1])
@@ -0,0 +1,202 @@
+"""
+Test for Bulk Insert / Upsert
+
+Feature: database-performance
+Property: Bulk writes use one statement per chunk and report conflicts per row
+
+This test validates that bulk_insert writes rows as chunked multi-row
+INSERTs, that 'ignore' and 'update' report which input rows conflicted,
+were inserted or were updated (the last duplicate of a key winning
+however the rows are chunked), and that the product bulk import skips
+existing SKUs without a per-row existence check, naming the barcode
+when that is the constraint a row collided with.
+"""
+
+import pytest
+import sqlite3
+import os
+import sys
+from hypothesis import given, settings, strategies as st
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.shared.database as database
+from modules.shared import bulk
+from modules.shared.bulk import bulk_insert, bulk_upsert
+
+
+def _memory_db():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE items (sku TEXT, owner TEXT, qty INTEGER, UNIQUE (sku, owner))")
+    return conn
+
+
+def test_rows_are_written_in_chunks():
+    conn = _memory_db()
+    statements = []
+    conn.set_trace_callback(statements.append)
+
+    rows = [{'sku': f"S{i}", 'owner': 'u1', 'qty': i} for i in range(25)]
+    result = bulk_insert(conn, 'sqlite', 'items', rows, chunk_size=10)
+
+    assert result.inserted == 25
+    assert result.chunks == 3
+    assert len([s for s in statements if s.startswith('INSERT')]) == 3
+    assert conn.execute("SELECT COUNT(*), SUM(qty) FROM items").fetchone() == (25, sum(range(25)))
+
+
+def test_ignore_reports_conflicting_rows():
+    conn = _memory_db()
+    conn.execute("INSERT INTO items VALUES ('A', 'u1', 1)")
+
+    rows = [('A', 'u1', 5), ('B', 'u1', 2), ('B', 'u1', 3), ('A', 'u2', 4)]
+    result = bulk_insert(conn, 'sqlite', 'items', rows, columns=['sku', 'owner', 'qty'],
+                         on_conflict='ignore', conflict_columns=['sku', 'owner'], chunk_size=2)
+
+    assert result.inserted_rows == [1, 3]
+    assert result.conflict_rows == [0, 2]
+    assert conn.execute("SELECT qty FROM items WHERE sku = 'A' AND owner = 'u1'").fetchone() == (1,)
+
+
+def test_upsert_reports_inserted_and_updated_rows():
+    conn = _memory_db()
+    conn.execute("INSERT INTO items VALUES ('A', 'u1', 1)")
+
+    rows = [{'sku': 'A', 'owner': 'u1', 'qty': 10}, {'sku': 'C', 'owner': 'u1', 'qty': 7}]
+    result = bulk_upsert(conn, 'sqlite', 'items', rows, conflict_columns=['sku', 'owner'])
+
+    assert result.updated_rows == [0]
+    assert result.inserted_rows == [1]
+    assert dict(conn.execute("SELECT sku, qty FROM items").fetchall()) == {'A': 10, 'C': 7}
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 500])
+def test_upsert_keeps_the_last_duplicate_whatever_the_chunking(chunk_size):
+    conn = _memory_db()
+    rows = [('A', 'u1', 1), ('B', 'u1', 2), ('A', 'u1', 3)]
+    result = bulk_upsert(conn, 'sqlite', 'items', rows, columns=['sku', 'owner', 'qty'],
+                         conflict_columns=['sku', 'owner'], chunk_size=chunk_size)
+
+    assert result.conflict_rows == [0]
+    assert result.inserted_rows == [1, 2]
+    assert dict(conn.execute("SELECT sku, qty FROM items").fetchall()) == {'A': 3, 'B': 2}
+
+
+def test_invalid_identifiers_are_rejected():
+    conn = _memory_db()
+    with pytest.raises(ValueError):
+        bulk_insert(conn, 'sqlite', 'items; DROP TABLE items', [{'sku': 'A'}])
+    with pytest.raises(ValueError):
+        bulk_insert(conn, 'sqlite', 'items', [{'sku': 'A'}], on_conflict='ignore')
+
+
+@settings(max_examples=50, deadline=None)
+@given(st.lists(st.tuples(st.sampled_from('ABCDEF'), st.sampled_from(['u1', 'u2'])), max_size=30),
+       st.integers(min_value=1, max_value=8))
+def test_every_row_is_accounted_for(keys, chunk_size):
+    """Property: each input row is either inserted or reported as a conflict"""
+    conn = _memory_db()
+    conn.execute("INSERT INTO items VALUES ('A', 'u1', 0)")
+    rows = [(sku, owner, i) for i, (sku, owner) in enumerate(keys)]
+
+    result = bulk_insert(conn, 'sqlite', 'items', rows, columns=['sku', 'owner', 'qty'],
+                         on_conflict='ignore', conflict_columns=['sku', 'owner'], chunk_size=chunk_size)
+
+    assert sorted(result.inserted_rows + result.conflict_rows) == list(range(len(rows)))
+    assert result.inserted == len(set(keys) - {('A', 'u1')})
+
+
+@pytest.fixture
+def inventory_db(tmp_path, monkeypatch):
+    path = str(tmp_path / 'bulk.db')
+    monkeypatch.setattr(database, 'DB_PATH', path)
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE products (
+            id TEXT PRIMARY KEY, name TEXT NOT NULL, description TEXT, category TEXT,
+            price REAL, stock INTEGER, unit TEXT, sku TEXT, barcode_data TEXT UNIQUE,
+            is_active BOOLEAN, user_id TEXT, created_at TEXT, updated_at TEXT,
+            min_stock INTEGER, max_stock INTEGER, hsn_code TEXT, gst_rate REAL,
+            mrp REAL, purchase_price REAL, selling_price REAL
+        );
+        CREATE TABLE stock_transactions (
+            id TEXT PRIMARY KEY, product_id TEXT, transaction_type TEXT, quantity REAL,
+            unit_cost REAL, total_cost REAL, reference_type TEXT, reference_id TEXT,
+            notes TEXT, created_by TEXT, business_owner_id TEXT, created_at TEXT
+        );
+        INSERT INTO products (id, name, sku, barcode_data, user_id) VALUES ('p0', 'Existing', 'SKU-1', '890', 'u1');
+    """)
+    conn.close()
+    yield path
+    database.get_engine().dispose()
+
+
+def test_bulk_import_products_skips_existing_skus(inventory_db):
+    from modules.integrated_inventory.service import IntegratedInventoryService
+
+    products = [{'name': f"Item {i}", 'sku': f"SKU-{i}", 'purchase_price': 5} for i in range(1, 6)]
+    products.append({'sku': 'SKU-X'})  # missing name
+    if bulk.SQLITE_HAS_RETURNING:
+        # Only RETURNING tells a barcode clash from a written row
+        products.append({'name': 'Relabelled', 'sku': 'SKU-7', 'barcode': '890'})
+
+    result = IntegratedInventoryService().bulk_import_products(products, 'u1')
+
+    assert result['success'] is True
+    assert result['imported_count'] == 4
+    expected = ['Row 1: SKU SKU-1 already exists', 'Row 6: Product name is required']
+    if bulk.SQLITE_HAS_RETURNING:
+        expected.append('Row 7: Barcode 890 already exists')
+    assert sorted(result['errors']) == expected
+
+    conn = sqlite3.connect(inventory_db)
+    assert conn.execute("SELECT COUNT(*) FROM products WHERE user_id = 'u1'").fetchone() == (5,)
+    assert conn.execute("SELECT COUNT(*) FROM stock_transactions").fetchone() == (4,)
+
+
+def test_bulk_stock_adjustment_is_tenant_scoped(tmp_path, monkeypatch):
+    from flask import Flask
+    from modules.erp_modules.routes import erp_bp
+
+    path = str(tmp_path / 'adjust.db')
+    monkeypatch.setattr(database, 'DB_PATH', path)
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE products (id TEXT PRIMARY KEY, name TEXT, stock INTEGER, business_owner_id TEXT);
+        CREATE TABLE stock_transactions (
+            id TEXT PRIMARY KEY, product_id TEXT, transaction_type TEXT, quantity REAL,
+            reference_type TEXT, notes TEXT, created_by TEXT, business_owner_id TEXT NOT NULL, created_at TEXT
+        );
+        INSERT INTO products VALUES ('mine', 'Mine', 10, 'u1'), ('theirs', 'Theirs', 10, 'u2');
+    """)
+    conn.close()
+
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.register_blueprint(erp_bp)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 'u1'
+    try:
+        response = client.post('/api/erp/stock/adjustment/bulk', json={'adjustments': [
+            {'product_id': 'mine', 'adjustment': 3, 'reason': 'count'},
+            {'product_id': 'theirs', 'adjustment': 5},
+            {'product_id': 'mine', 'adjustment': -1},
+        ]})
+        body = response.get_json()
+        assert body['success'] is True, body
+        assert body['adjusted_products'] == 1 and body['skipped_products'] == ['theirs']
+
+        conn = sqlite3.connect(path)
+        assert conn.execute("SELECT id, stock FROM products ORDER BY id").fetchall() == [('mine', 12), ('theirs', 10)]
+        assert conn.execute("SELECT product_id, quantity, notes, business_owner_id FROM stock_transactions "
+                            "ORDER BY quantity").fetchall() == [('mine', -1, '', 'u1'), ('mine', 3, 'count', 'u1')]
+        conn.close()
+    finally:
+        database.get_engine().dispose()
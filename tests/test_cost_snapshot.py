@@ -0,0 +1,196 @@
+"""
+Test for Unit Cost Snapshots
+
+Feature: database-performance
+Property: Profit reports use the cost a line was sold at, whatever the product costs today
+
+This test validates that BillingService.create_bill stores each line's
+unit cost on bill_items and sales, that a later cost update leaves the
+earnings summary, product earnings, P&L report and daily rollup
+unchanged, that ERP invoice lines are stamped from cost_price with the
+invoice's cost_amount, and that the migration backfills rows written
+before snapshots existed - after the rollup's own migration has already
+valued them at the product cost.
+"""
+
+import pytest
+import os
+import sys
+import json
+from flask import Flask
+from hypothesis import given, settings, strategies as st, HealthCheck
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.shared.database as database
+from modules.shared import migrations
+from modules.shared import sales_rollup
+from modules.shared import cost_snapshot
+from modules.earnings.service import EarningsService
+from services.billing_service import BillingService
+
+
+@pytest.fixture
+def snapshot_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'snapshot.db'))
+    monkeypatch.setattr(migrations, 'DB_PATH', str(tmp_path / 'snapshot.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    migrations.migrate()
+    yield
+    database.get_engine().dispose()
+
+
+def _add_product(product_id, cost, stock=100):
+    conn = database.get_db_connection()
+    conn.execute("""
+        INSERT INTO products (id, code, name, price, cost, stock, is_active)
+        VALUES (?, ?, ?, 50, ?, ?, 1)
+    """, (product_id, product_id, f"Product {product_id}", cost, stock))
+    conn.commit()
+    conn.close()
+
+
+def _set_cost(product_id, cost):
+    conn = database.get_db_connection()
+    conn.execute("UPDATE products SET cost = ? WHERE id = ?", (cost, product_id))
+    conn.commit()
+    conn.close()
+
+
+def _bill(*lines):
+    ok, result = BillingService().create_bill({
+        'items': [{'product_id': product_id, 'product_name': product_id, 'quantity': quantity, 'unit_price': 50}
+                  for product_id, quantity in lines],
+        'total_amount': sum(50 * quantity for _, quantity in lines),
+        'payment_method': 'cash',
+    })
+    assert ok, result
+    return result['bill_id']
+
+
+def test_create_bill_snapshots_line_costs(snapshot_db):
+    _add_product('cp1', 20)
+    _add_product('cp2', 35.5)
+    bill_id = _bill(('cp1', 2), ('cp2', 1))
+
+    conn = database.get_db_connection()
+    items = {row['product_id']: row['unit_cost'] for row in
+             conn.execute("SELECT product_id, unit_cost FROM bill_items WHERE bill_id = ?", (bill_id,)).fetchall()}
+    sales = {row['product_id']: row['unit_cost'] for row in
+             conn.execute("SELECT product_id, unit_cost FROM sales WHERE bill_id = ?", (bill_id,)).fetchall()}
+    conn.close()
+    assert items == sales == {'cp1': 20, 'cp2': 35.5}
+
+
+def test_cost_updates_do_not_rewrite_past_profit(snapshot_db, monkeypatch):
+    from modules.reports.routes import reports_bp
+    _add_product('cp1', 20)
+    _bill(('cp1', 3))
+
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.register_blueprint(reports_bp)
+    client = app.test_client()
+
+    def reports():
+        service = EarningsService()
+        monkeypatch.setattr(sales_rollup, 'ROLLUP_READS', False)
+        base = client.get('/api/reports/profit_loss').get_json()['report_data']
+        monkeypatch.setattr(sales_rollup, 'ROLLUP_READS', True)
+        rolled = client.get('/api/reports/profit_loss').get_json()['report_data']
+        return (service.get_earnings_summary('all', None)['total_cost'],
+                service.get_product_earnings('all', None)[0]['total_cost'],
+                base[0]['cost'], rolled[0]['cost'])
+
+    assert reports() == (60, 60, 60, 60)
+    _set_cost('cp1', 45)
+    assert reports() == (60, 60, 60, 60)
+
+    # New sales are costed at the new price
+    _bill(('cp1', 1))
+    assert reports() == (105, 105, 105, 105)
+
+
+@settings(max_examples=20, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(lines=st.lists(st.tuples(st.sampled_from(['ep1', 'ep2', 'missing', None]),
+                                st.integers(min_value=0, max_value=9)), max_size=6))
+def test_invoice_items_are_stamped_from_cost_price(snapshot_db, lines):
+    conn = database.get_db_connection()
+    conn.execute("DELETE FROM erp_products")
+    for product_id, cost, owner in (('ep1', 7.5, 'u1'), ('ep2', 3, 'u1'), ('ep1-other', 99, 'u2')):
+        conn.execute("""
+            INSERT INTO erp_products (id, user_id, product_code, product_name, cost_price, selling_price)
+            VALUES (?, ?, ?, ?, ?, 10)
+        """, (product_id, owner, product_id, product_id, cost))
+    conn.commit()
+    items = [{'product_id': product_id, 'quantity': quantity, 'unit_cost': 1000} for product_id, quantity in lines]
+
+    cursor = conn.cursor()
+    cost_amount = cost_snapshot.snapshot_invoice_items(cursor, 'u1', items)
+    conn.close()
+
+    costs = {'ep1': 7.5, 'ep2': 3}
+    assert [item['unit_cost'] for item in items] == [costs.get(product_id, 0) for product_id, _ in lines]
+    assert cost_amount == pytest.approx(sum(costs.get(product_id, 0) * quantity for product_id, quantity in lines))
+
+
+def test_backfill_snapshots_rows_written_before(snapshot_db):
+    _add_product('cp1', 12)
+    conn = database.get_db_connection()
+    conn.execute("INSERT INTO bills (id, bill_number, total_amount) VALUES ('old', 'OLD-1', 100)")
+    conn.execute("INSERT INTO bill_items (id, bill_id, product_id, quantity, total_price) VALUES ('oi', 'old', 'cp1', 2, 100)")
+    conn.execute("INSERT INTO sales (id, bill_id, product_id, quantity, total_price) VALUES ('os', 'old', 'cp1', 2, 100)")
+    conn.execute("INSERT INTO sales (id, bill_id, product_id, quantity, total_price) VALUES ('gone', 'old', NULL, 1, 5)")
+    conn.execute("""
+        INSERT INTO erp_products (id, user_id, product_code, product_name, cost_price, selling_price)
+        VALUES ('ep1', 'u1', 'EP1', 'ERP Product', 4, 10)
+    """)
+    conn.execute("""
+        INSERT INTO erp_invoices (id, user_id, invoice_number, customer_name, invoice_date, subtotal,
+                                  total_amount, items)
+        VALUES ('inv1', 'u1', 'INV00001', 'Customer', '2026-01-01', 30, 30, ?)
+    """, (json.dumps([{'product_id': 'ep1', 'quantity': 3}, {'product_id': 'unknown', 'quantity': 2}]),))
+    conn.commit()
+
+    cost_snapshot.backfill(conn)
+    conn.commit()
+    assert conn.execute("SELECT unit_cost FROM bill_items WHERE id = 'oi'").fetchone()['unit_cost'] == 12
+    costs = {row['id']: row['unit_cost'] for row in conn.execute("SELECT id, unit_cost FROM sales").fetchall()}
+    assert costs == {'os': 12, 'gone': 0}
+    assert conn.execute("SELECT cost_amount FROM erp_invoices WHERE id = 'inv1'").fetchone()['cost_amount'] == 12
+    conn.close()
+
+
+def test_rollup_migration_runs_before_the_snapshot_columns_exist(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'history.db'))
+    monkeypatch.setattr(migrations, 'DB_PATH', str(tmp_path / 'history.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    try:
+        migrations.migrate(target=3)
+        _add_product('cp1', 12)
+        conn = database.get_db_connection()
+        conn.execute("INSERT INTO bills (id, bill_number, total_amount, created_at) "
+                     "VALUES ('old', 'OLD-1', 100, '2026-01-05 10:00:00')")
+        conn.execute("INSERT INTO sales (id, bill_id, product_id, quantity, total_price, sale_date) "
+                     "VALUES ('os', 'old', 'cp1', 2, 100, '2026-01-05')")
+        conn.commit()
+        conn.close()
+
+        # 0004 rolls up sales that have no unit_cost column yet
+        migrations.migrate(target=6)
+        conn = database.get_db_connection()
+        assert 'unit_cost' not in {row['name'] for row in conn.execute("PRAGMA table_info(sales)").fetchall()}
+        assert [row['items_cost'] for row in sales_rollup.daily_totals(conn)] == [24]
+        conn.close()
+
+        # 0007 snapshots the cost and rebuilds the rollup from it
+        migrations.migrate()
+        conn = database.get_db_connection()
+        assert conn.execute("SELECT unit_cost FROM sales WHERE id = 'os'").fetchone()['unit_cost'] == 12
+        assert [row['items_cost'] for row in sales_rollup.daily_totals(conn)] == [24]
+        conn.close()
+    finally:
+        database.get_engine().dispose()
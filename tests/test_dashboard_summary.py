@@ -0,0 +1,111 @@
+"""
+Test for the Consolidated Dashboard Summary
+
+Feature: database-performance
+Property: One conditional-aggregation pass gives the same tiles as per-window queries
+
+This test validates that window_summary's today / week / month sales,
+orders and cash revenue match a direct per-window computation and the
+daily rollup's window_totals, and that its SQL avoids DATE()/strftime()
+on the filtered columns so it stays index-friendly and portable.
+"""
+
+import pytest
+import os
+import sys
+from datetime import date, datetime, timedelta
+from hypothesis import given, settings, strategies as st, HealthCheck
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.shared.database as database
+from modules.shared import migrations
+from modules.shared import sales_rollup
+from modules.shared import dashboard_summary
+
+TODAY = date(2024, 3, 12)
+
+
+@pytest.fixture
+def summary_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'summary.db'))
+    monkeypatch.setattr(migrations, 'DB_PATH', str(tmp_path / 'summary.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    migrations.migrate()
+    yield
+    database.get_engine().dispose()
+
+
+def _expected(bills, tenant):
+    starts, end = dashboard_summary.window_starts(TODAY)
+    result = {}
+    for name, start in starts.items():
+        chosen = [b for b in bills if tenant in (None, b['owner']) and start <= b['created'].date() < end]
+        paid = [b for b in bills if tenant in (None, b['owner']) and b['paid'] is not None
+                and b['method'] == 'Cash' and start <= b['paid'].date() < end]
+        result[name] = {
+            'sales': round(sum(b['total'] for b in chosen), 2),
+            'revenue': round(sum(b['total'] for b in paid), 2),
+            'orders': len(chosen)
+        }
+    return result
+
+
+def _rounded(summary):
+    return {name: {k: round(v, 2) for k, v in tiles.items()} for name, tiles in summary.items()}
+
+
+def test_summary_sql_is_sargable_and_single_statement():
+    sql, params = dashboard_summary.summary_query('tenant-a', TODAY)
+    upper = sql.upper()
+    assert 'DATE(' not in upper and 'STRFTIME' not in upper
+    assert 'created_at >= ? AND created_at < ?' in sql
+    assert 'p.processed_at >= ? AND p.processed_at < ?' in sql
+    assert sql.count('?') == len(params)
+    assert params[-1] == 'tenant-a'
+
+
+_bill = st.tuples(
+    st.sampled_from(['tenant-a', 'tenant-b', None]),
+    st.integers(min_value=-45, max_value=0),                # created, days from TODAY
+    st.integers(min_value=0, max_value=86399),              # second of the day
+    st.sampled_from(['Cash', 'upi', 'cash']),
+    st.floats(min_value=1, max_value=5_000, allow_nan=False).map(lambda v: round(v, 2)),
+    st.one_of(st.none(), st.integers(min_value=0, max_value=10)),  # paid this many days later
+)
+
+
+@settings(max_examples=25, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(rows=st.lists(_bill, max_size=15), tenant=st.sampled_from(['tenant-a', None]))
+def test_window_summary_matches_per_window_and_rollup(summary_db, rows, tenant):
+    conn = database.get_db_connection()
+    try:
+        conn.execute(f"DELETE FROM {sales_rollup.ROLLUP_TABLE}")
+        for table in ('payments', 'sales', 'bills'):
+            conn.execute(f"DELETE FROM {table}")
+        bills = []
+        for index, (owner, offset, second, method, total, paid_after) in enumerate(rows):
+            created = datetime.combine(TODAY + timedelta(days=offset), datetime.min.time()) + timedelta(seconds=second)
+            paid = created + timedelta(days=paid_after) if paid_after is not None else None
+            if paid is not None and paid.date() > TODAY:
+                paid = None
+            bills.append({'owner': owner, 'created': created, 'method': method, 'total': total, 'paid': paid})
+            conn.execute("""
+                INSERT INTO bills (id, bill_number, business_owner_id, total_amount, payment_method, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (f"d{index}", f"D-{index}", owner, total, method, created.strftime('%Y-%m-%d %H:%M:%S')))
+            if paid is not None:
+                conn.execute("""
+                    INSERT INTO payments (id, bill_id, method, amount, processed_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (f"dp{index}", f"d{index}", method, total, paid.strftime('%Y-%m-%d %H:%M:%S')))
+            sales_rollup.refresh_bill(conn, f"d{index}")
+        conn.commit()
+
+        summary = _rounded(dashboard_summary.window_summary(conn, tenant, today=TODAY))
+        assert summary == _expected(bills, tenant)
+        assert summary == _rounded(sales_rollup.window_totals(conn, tenant, today=TODAY))
+    finally:
+        conn.close()
@@ -0,0 +1,158 @@
+"""
+Test for the Earnings Summary Query
+
+Feature: database-performance
+Property: The single-statement earnings summary equals the old correlated-subquery totals
+
+This test validates that revenue, cost, transaction count and pending
+amount/profit from summary_query match the per-bill correlated
+subqueries it replaced for every tenant and date filter, that product
+earnings honour the date filter, and that the benchmark's two variants
+agree on a seeded database.
+"""
+
+import pytest
+import os
+import sys
+from datetime import date, datetime, timedelta
+from hypothesis import given, settings, strategies as st, HealthCheck
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.shared.database as database
+from modules.shared import migrations
+from modules.shared import earnings_summary
+from modules.earnings.service import EarningsService
+
+
+@pytest.fixture
+def earnings_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'earnings.db'))
+    monkeypatch.setattr(migrations, 'DB_PATH', str(tmp_path / 'earnings.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    migrations.migrate()
+    yield
+    database.get_engine().dispose()
+
+
+PRODUCT_COSTS = {'ep1': 4.0, 'ep2': 12.5, 'ep3': None}
+
+
+def _reset(conn):
+    for table in ('sales', 'bill_items', 'payments', 'credit_transactions', 'bills'):
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute("DELETE FROM products WHERE id IN ('ep1', 'ep2', 'ep3')")
+    conn.bulk_insert('products', [{'id': product_id, 'code': product_id, 'name': product_id, 'price': 20, 'cost': cost}
+                                  for product_id, cost in PRODUCT_COSTS.items()])
+
+
+def _legacy_summary(conn, tenant_id, date_filter):
+    """The totals the old correlated queries returned"""
+    date_condition, params = '', [tenant_id]
+    start, end = earnings_summary.date_range(date_filter)
+    if start:
+        date_condition += " AND DATE(b.created_at) >= ?"
+        params.append(start.strftime('%Y-%m-%d'))
+    if end:
+        date_condition += " AND DATE(b.created_at) < ?"
+        params.append(end.strftime('%Y-%m-%d'))
+    totals = {}
+    for sql in earnings_summary.LEGACY_QUERIES:
+        totals.update(dict(conn.execute(sql.format(date_condition=date_condition), params).fetchone()))
+    return totals
+
+
+_bill = st.fixed_dictionaries({
+    'owner': st.sampled_from(['t1', 't2', None]),
+    'method': st.sampled_from(['cash', 'upi', 'credit', 'partial', None]),
+    'days_ago': st.integers(min_value=0, max_value=40),
+    'balance_share': st.sampled_from([0, 0.25, 1]),
+    'items': st.lists(st.tuples(st.sampled_from(sorted(PRODUCT_COSTS)), st.integers(1, 5),
+                                st.integers(1, 200)), max_size=4),
+})
+
+
+@settings(max_examples=40, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(bills=st.lists(_bill, max_size=12),
+       date_filter=st.sampled_from(['all', 'today', 'yesterday', 'week', 'month']),
+       tenant=st.sampled_from(['t1', 't2']))
+def test_summary_matches_the_correlated_queries(earnings_db, bills, date_filter, tenant):
+    conn = database.get_db_connection()
+    _reset(conn)
+    now = datetime.now()
+    for index, bill in enumerate(bills):
+        total = sum(quantity * price for _, quantity, price in bill['items']) or 10
+        created_at = (now - timedelta(days=bill['days_ago'])).strftime('%Y-%m-%d %H:%M:%S')
+        conn.execute("""
+            INSERT INTO bills (id, bill_number, business_owner_id, total_amount, credit_balance,
+                               payment_method, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (f"eb{index}", f"EB-{index}", bill['owner'], total, total * bill['balance_share'],
+              bill['method'], created_at))
+        for line, (product_id, quantity, price) in enumerate(bill['items']):
+            conn.execute("""
+                INSERT INTO bill_items (id, bill_id, product_id, quantity, unit_price, total_price, unit_cost)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (f"eb{index}-{line}", f"eb{index}", product_id, quantity, price, quantity * price,
+                  PRODUCT_COSTS[product_id] or 0))
+    conn.commit()
+
+    expected = _legacy_summary(conn, tenant, date_filter)
+    actual = dict(conn.execute(*earnings_summary.summary_query(tenant, date_filter)).fetchone())
+    conn.close()
+
+    assert actual['transaction_count'] == expected['transaction_count']
+    for column in ('total_revenue', 'total_cost', 'pending_amount', 'pending_profit'):
+        assert actual[column] == pytest.approx(expected[column], abs=1e-6), column
+
+
+def test_service_summary_without_tenant_or_dates(earnings_db):
+    # The old SQL had no WHERE to append to here and failed
+    conn = database.get_db_connection()
+    _reset(conn)
+    conn.execute("""
+        INSERT INTO bills (id, bill_number, total_amount, credit_balance, payment_method)
+        VALUES ('eb1', 'EB-1', 100, 0, 'cash'), ('eb2', 'EB-2', 50, 50, 'credit')
+    """)
+    conn.execute("""
+        INSERT INTO bill_items (id, bill_id, product_id, quantity, total_price, unit_cost)
+        VALUES ('i1', 'eb1', 'ep1', 5, 100, 4), ('i2', 'eb2', 'ep2', 2, 50, 12.5)
+    """)
+    conn.commit()
+    conn.close()
+
+    summary = EarningsService().get_earnings_summary('all', None)
+    assert summary['transaction_count'] == 1
+    assert summary['total_revenue'] == 100 and summary['total_cost'] == 20
+    assert summary['pending_amount'] == 50 and summary['pending_profit'] == 25
+
+
+def test_product_earnings_honour_the_date_filter(earnings_db):
+    conn = database.get_db_connection()
+    _reset(conn)
+    today = date.today()
+    for index, sale_day in enumerate((today, today, today - timedelta(days=1), today - timedelta(days=20))):
+        conn.execute("INSERT INTO bills (id, bill_number, business_owner_id, total_amount) VALUES (?, ?, 't1', 30)",
+                     (f"pb{index}", f"PB-{index}"))
+        conn.execute("""
+            INSERT INTO sales (id, bill_id, business_owner_id, product_id, quantity, total_price, unit_cost, sale_date)
+            VALUES (?, ?, 't1', 'ep2', 2, 30, 12.5, ?)
+        """, (f"ps{index}", f"pb{index}", sale_day.strftime('%Y-%m-%d')))
+    conn.commit()
+    conn.close()
+
+    service = EarningsService()
+    quantities = {date_filter: sum(product['quantity_sold'] for product in service.get_product_earnings(date_filter, 't1'))
+                  for date_filter in ('today', 'yesterday', 'week', 'all')}
+    assert quantities == {'today': 4, 'yesterday': 2, 'week': 6, 'all': 8}
+    product = service.get_product_earnings('all', 't1')[0]
+    assert product['total_sales'] == 120 and product['total_cost'] == 100
+
+
+def test_bench_variants_agree(tmp_path):
+    results = earnings_summary.bench(bills=2_000, tenants=4, products=50, runs=2,
+                                     path=str(tmp_path / 'bench.db'))
+    assert results['all']['same_totals'] and results['week']['same_totals']
+    assert results['all']['summary_query']['p50_ms'] > 0
@@ -0,0 +1,89 @@
+"""
+Test for the Tenant Index Pack
+
+Feature: database-performance
+Property: Every tenant-filtered hot query is answered from an index
+
+This test validates that the index pack is created by the migrations, skips
+indexes whose columns a drifted table lacks, and that EXPLAIN shows the
+dashboard, report and stock hot queries using indexes instead of full scans.
+"""
+
+import pytest
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.shared.database as database
+from modules.shared import migrations
+from modules.shared import index_pack
+
+
+@pytest.fixture
+def migrated_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'index_pack.db'))
+    monkeypatch.setattr(migrations, 'DB_PATH', str(tmp_path / 'index_pack.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    migrations.migrate()
+    yield
+    database.get_engine().dispose()
+
+
+def _stock_module_schema():
+    """stock_transactions as modules/stock creates it (tenant + soft delete columns)"""
+    conn = database.get_db_connection()
+    try:
+        conn.execute("DROP TABLE IF EXISTS stock_transactions")
+        conn.execute('''
+            CREATE TABLE stock_transactions (
+                id TEXT PRIMARY KEY,
+                product_id TEXT NOT NULL,
+                transaction_type TEXT NOT NULL,
+                quantity REAL NOT NULL,
+                business_owner_id TEXT NOT NULL,
+                is_active INTEGER DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_pack_names_are_unique():
+    names = [spec.name for spec in index_pack.INDEX_PACK]
+    assert len(names) == len(set(names))
+
+
+def test_migration_creates_supported_indexes(migrated_db):
+    status = {entry['name']: entry for entry in index_pack.index_status()}
+    assert status['idx_bills_owner_created']['state'] == 'present'
+    assert status['idx_products_user_active_stock']['state'] == 'present'
+    # The baseline stock_transactions has no tenant column - skipped, not failed
+    assert status['idx_stock_tx_owner_product_created']['state'] == 'missing_columns'
+    assert 'business_owner_id' in status['idx_stock_tx_owner_product_created']['missing_columns']
+
+
+def test_hot_queries_use_indexes(migrated_db):
+    _stock_module_schema()
+    assert 'idx_stock_tx_owner_product_created' in index_pack.apply_index_pack()
+
+    results = index_pack.verify_hot_queries()
+    assert len(results) == len(index_pack.HOT_QUERIES)
+    for entry in results:
+        assert entry.get('error') is None, entry
+        assert entry['uses_index'], f"{entry['name']} scans {entry['full_scans']}: {entry['plan']}"
+
+
+def test_verify_reports_full_scans(migrated_db):
+    index_pack.drop_index_pack()
+    results = {entry['name']: entry for entry in index_pack.verify_hot_queries()}
+    assert results['reports.out_of_stock']['uses_index'] is False
+    assert results['reports.out_of_stock']['full_scans'] == ['products']
+
+    # Re-applying restores the pack and is idempotent
+    assert index_pack.apply_index_pack()
+    assert index_pack.apply_index_pack() == []
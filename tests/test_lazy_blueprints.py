@@ -0,0 +1,85 @@
+"""
+Test for Lazy Blueprint Loading
+
+Feature: database-performance
+Property: A lazily loaded blueprint serves the same URL map as an eager one
+
+This test validates that the route scanner reads the ERP blueprint's rules
+without importing it, that the stand-in views resolve to the real view
+functions on first use, and that unsupported modules fall back to a
+normal import.
+"""
+
+import pytest
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+import modules.shared.blueprint_loader as blueprint_loader
+from modules.shared.blueprint_loader import BlueprintSpec, register_blueprints, scan_routes
+
+
+ERP_SPEC = BlueprintSpec('modules.erp_modules.routes', 'erp_bp', lazy=True)
+
+
+def _rules(app):
+    return sorted((rule.rule, rule.endpoint, tuple(sorted(rule.methods)))
+                  for rule in app.url_map.iter_rules())
+
+
+def test_scan_routes_reads_rules_and_prefix():
+    source = '''
+items_bp = Blueprint('items', __name__, url_prefix='/api/items')
+
+@items_bp.route('/', methods=['GET', 'POST'])
+@require_auth
+def list_items():
+    pass
+
+@items_bp.route('/<int:item_id>')
+@items_bp.route('/by-id/<int:item_id>', methods=["GET"])
+def get_item(item_id):
+    pass
+'''
+    name, prefix, routes = scan_routes(source, 'items_bp')
+    assert name == 'items'
+    assert prefix == '/api/items'
+    assert routes == [
+        ('/', 'list_items', ['GET', 'POST']),
+        ('/<int:item_id>', 'get_item', None),
+        ('/by-id/<int:item_id>', 'get_item', ['GET']),
+    ]
+
+
+@pytest.mark.parametrize('hook', [
+    "@items_bp.before_request\ndef check():\n    pass\n",
+    "@items_bp.route('/x', strict_slashes=False)\ndef x():\n    pass\n",
+    "items_bp.add_url_rule('/y', view_func=y)\n",
+])
+def test_scan_routes_rejects_unsupported_modules(hook):
+    source = "items_bp = Blueprint('items', __name__)\n\n" + hook
+    assert scan_routes(source, 'items_bp') is None
+
+
+def test_lazy_erp_blueprint_matches_eager(monkeypatch):
+    eager = Flask('eager')
+    monkeypatch.setattr(blueprint_loader, 'LAZY_BLUEPRINTS', 'false')
+    register_blueprints(eager, [ERP_SPEC])
+
+    lazy = Flask('lazy')
+    monkeypatch.setattr(blueprint_loader, 'LAZY_BLUEPRINTS', 'erp')
+    register_blueprints(lazy, [ERP_SPEC])
+
+    assert _rules(lazy) == _rules(eager)
+
+    # The stand-in view resolves to the function Flask registered eagerly
+    stand_in = lazy.view_functions['erp.erp_dashboard']
+    assert isinstance(stand_in, blueprint_loader._LazyView)
+    assert stand_in.loader.view('erp_dashboard') is eager.view_functions['erp.erp_dashboard']
+
+    report = blueprint_loader.import_report.snapshot()
+    erp = next(entry for entry in report['blueprints'] if entry['blueprint'] == 'erp')
+    assert erp['lazy'] and erp['deferred'] and erp['loaded']
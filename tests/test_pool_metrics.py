@@ -0,0 +1,103 @@
+"""
+Test for Connection Pool Metrics
+
+Feature: database-performance
+Property: Pool checkouts are observable per endpoint
+
+This test validates that checkout waits land in the histogram, that the
+endpoint holding each connection is tracked and that the admin metrics
+endpoint is only served to administrators.
+"""
+
+import pytest
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import create_engine
+import modules.shared.database as database
+from modules.shared.pool_metrics import PoolMetrics, WAIT_BUCKETS_MS
+from modules.shared.sqlite_pool import get_sqlite_engine_options
+from modules.diagnostics.routes import diagnostics_bp
+
+
+@pytest.fixture
+def metered_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'metrics.db'}", **get_sqlite_engine_options())
+    metrics = PoolMetrics()
+    metrics.attach(engine)
+    yield engine, metrics
+    engine.dispose()
+
+
+def test_wait_histogram_buckets():
+    metrics = PoolMetrics()
+    metrics.record_wait(0.0005, endpoint='fast')
+    metrics.record_wait(0.2, endpoint='slow')
+    metrics.record_wait(60, endpoint='slow', timed_out=True)
+
+    snapshot = metrics.snapshot()
+    histogram = snapshot['wait']['histogram']
+    assert histogram['<=1ms'] == 1
+    assert histogram['<=250ms'] == 1
+    assert histogram[f'>{WAIT_BUCKETS_MS[-1]}ms'] == 1
+    assert snapshot['wait']['timeouts'] == 1
+    assert snapshot['endpoints']['slow']['timeouts'] == 1
+
+
+def test_holders_are_tracked_per_endpoint(metered_engine):
+    engine, metrics = metered_engine
+    app = Flask(__name__)
+
+    @app.route('/reports/sales')
+    def sales_report():
+        return 'ok'
+
+    with app.test_request_context('/reports/sales'):
+        conn = engine.raw_connection()
+        snapshot = metrics.snapshot(engine.pool)
+        assert snapshot['checked_out'] == 1
+        assert len(snapshot['holders']) == 1
+        conn.close()
+
+    snapshot = metrics.snapshot(engine.pool)
+    assert snapshot['checked_out'] == 0
+    assert snapshot['holders'] == []
+    assert snapshot['pool']['class'] == 'ThreadAffinePool'
+    assert sum(stats['checkouts'] for stats in snapshot['endpoints'].values()) == 1
+
+
+def test_reset_keeps_connections_in_use(metered_engine):
+    engine, metrics = metered_engine
+    conn = engine.raw_connection()
+    metrics.reset()
+    assert metrics.snapshot()['checked_out'] == 1
+    conn.close()
+    assert metrics.snapshot()['checked_out'] == 0
+
+
+def test_admin_endpoint_requires_admin(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'admin.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'test'
+    app.register_blueprint(diagnostics_bp)
+    client = app.test_client()
+
+    assert client.get('/api/admin/db/pool').status_code == 401
+
+    with client.session_transaction() as sess:
+        sess['cms_admin_id'] = 'admin-1'
+    response = client.get('/api/admin/db/pool')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['success'] is True
+    assert 'histogram' in data['metrics']['wait']
+    assert 'pool' in data['metrics']
+
+    database.get_engine().dispose()
@@ -0,0 +1,86 @@
+"""
+Test for Query Timing Instrumentation
+
+Feature: database-performance
+Property: Statement timings aggregate per fingerprint and per endpoint
+
+This test validates statement fingerprinting, percentile aggregation,
+slow-query flagging and the wrapper hook that feeds them.
+"""
+
+import pytest
+import os
+import sys
+import json
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+import modules.shared.database as database
+from modules.shared.query_stats import QueryStats, fingerprint, query_stats
+
+
+def test_fingerprint_collapses_literals_and_placeholders():
+    assert fingerprint("SELECT * FROM bills WHERE id = 'abc' AND total > 10.5") == \
+        fingerprint("SELECT *  FROM bills\n WHERE id = ? AND total > %s")
+    assert fingerprint("SELECT * FROM products WHERE id IN (?, ?, ?)") == \
+        "SELECT * FROM products WHERE id IN (?...)"
+
+
+def test_percentiles_and_slow_flags():
+    stats = QueryStats(enabled=True, slow_query_ms=50)
+    for ms in range(1, 101):
+        stats.record('SELECT ?', ms / 1000.0, rows=1, endpoint='reports.sales')
+
+    snapshot = stats.snapshot()
+    row = snapshot['fingerprints'][0]
+    assert row['calls'] == 100
+    assert row['p50_ms'] == pytest.approx(50, abs=1)
+    assert row['p95_ms'] == pytest.approx(95, abs=1)
+    assert row['max_ms'] == pytest.approx(100, abs=0.01)
+    assert row['rows'] == 100
+    assert row['slow_calls'] == 51
+    assert snapshot['endpoints'][0]['endpoint'] == 'reports.sales'
+    assert len(snapshot['slow_queries']) == 51
+    assert json.loads(stats.dump_json())['fingerprints'][0]['calls'] == 100
+
+
+def test_calls_per_request_expose_n_plus_one():
+    stats = QueryStats(enabled=True)
+    app = Flask(__name__)
+    with app.test_request_context('/api/products'):
+        for _ in range(25):
+            stats.record('SELECT stock FROM products WHERE id = ?', 0.001, endpoint='products.list')
+    with app.test_request_context('/api/products'):
+        for _ in range(3):
+            stats.record('SELECT stock FROM products WHERE id = ?', 0.001, endpoint='products.list')
+
+    row = stats.snapshot()['endpoint_statements'][0]
+    assert row['calls'] == 28
+    assert row['max_calls_per_request'] == 25
+
+
+def test_wrapper_records_statements_when_enabled(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'stats.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    monkeypatch.setattr(query_stats, 'enabled', True)
+    query_stats.reset()
+
+    conn = database.get_db_connection()
+    try:
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.executemany("INSERT INTO items (name) VALUES (?)", [('a',), ('b',)])
+        conn.execute("UPDATE items SET name = ? WHERE id = ?", ('c', 1))
+        # Raw cursors go through the same translation and timing
+        conn.cursor().executemany("INSERT INTO items (name) VALUES (?)", [('d',), ('e',), ('f',)])
+        conn.commit()
+    finally:
+        conn.close()
+        database.get_engine().dispose()
+
+    fingerprints = {row['fingerprint']: row for row in query_stats.snapshot()['fingerprints']}
+    assert fingerprints['INSERT INTO items (name) VALUES (?)']['rows'] == 5
+    assert fingerprints['UPDATE items SET name = ? WHERE id = ?']['calls'] == 1
+    query_stats.reset()
@@ -0,0 +1,210 @@
+"""
+Test for the Streaming Export Engine
+
+Feature: database-performance
+Property: An export holds a bounded number of rows in memory and its bytes match the report
+
+This test validates that report exports stream the same rows the report
+endpoint returns as CSV and XLSX, that memory stays flat while a large export is
+sent, that finished exports are served again from the (tenant, report,
+params) cache with Range support until a write invalidates them, that
+the credit export keeps its JSON shape, and that any text survives the
+CSV round trip.
+"""
+
+import pytest
+import io
+import os
+import csv
+import sys
+import uuid
+import tracemalloc
+from flask import Flask
+from hypothesis import given, settings, strategies as st, HealthCheck
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.shared.database as database
+from modules.shared import migrations
+from modules.shared import sales_rollup
+from modules.shared import result_cache
+from modules.shared import exports
+
+
+@pytest.fixture
+def export_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'exports.db'))
+    monkeypatch.setattr(migrations, 'DB_PATH', str(tmp_path / 'exports.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    monkeypatch.setattr(exports, 'EXPORT_CACHE_DIR', str(tmp_path / 'exports'))
+    monkeypatch.setattr(result_cache.result_cache, 'backend', result_cache.MemoryBackend())
+    migrations.migrate()
+    yield
+    database.get_engine().dispose()
+
+
+@pytest.fixture
+def client(export_db, monkeypatch):
+    from modules.reports.routes import reports_bp
+    from modules.credit import credit_bp
+    monkeypatch.setattr(sales_rollup, 'ROLLUP_READS', False)
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.register_blueprint(reports_bp)
+    app.register_blueprint(credit_bp)
+    return app.test_client()
+
+
+def _seed_products(count):
+    conn = database.get_db_connection()
+    conn.execute("DELETE FROM products")
+    conn.bulk_insert('products', [{
+        'id': str(uuid.uuid4()), 'code': f'EXP{index}', 'name': f'Export, "Product" {index}',
+        'category': 'General', 'price': 10 + index % 7, 'cost': 5, 'stock': index % 11,
+        'min_stock': 5, 'unit': 'pcs'
+    } for index in range(count)])
+    conn.commit()
+    conn.close()
+
+
+def _csv_rows(data):
+    assert data.startswith(b'\xef\xbb\xbf')
+    return list(csv.DictReader(io.StringIO(data.decode('utf-8-sig'))))
+
+
+def test_csv_export_matches_the_report(client):
+    _seed_products(40)
+    report = client.get('/api/reports/stock_summary').get_json()['report_data']
+
+    response = client.get('/api/reports/stock_summary/export?format=csv')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert 'attachment; filename=stock_summary_' in response.headers['Content-Disposition']
+    assert response.headers['X-Export-Cache'] == 'miss'
+
+    rows = _csv_rows(response.data)
+    assert [row['product_code'] for row in rows] == [row['product_code'] for row in report]
+    assert [float(row['stock_value']) for row in rows] == [row['stock_value'] for row in report]
+    assert 'row_id' not in rows[0]
+
+
+def test_xlsx_export_matches_the_report(client):
+    from openpyxl import load_workbook
+    _seed_products(30)
+    report = client.get('/api/reports/stock_summary').get_json()['report_data']
+
+    response = client.get('/api/reports/stock_summary/export?format=excel')
+    assert response.status_code == 200
+    assert response.mimetype == exports.FORMATS['xlsx'][0]
+    assert '.xlsx' in response.headers['Content-Disposition']
+
+    sheet = load_workbook(io.BytesIO(response.data), read_only=True).active
+    header, *rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+    rows = [dict(zip(header, row)) for row in rows]
+    assert [row['product_code'] for row in rows] == [row['product_code'] for row in report]
+    assert [row['stock_value'] for row in rows] == [row['stock_value'] for row in report]
+    assert rows[0]['product_name'].startswith('Export, "Product"')
+
+
+def test_bad_requests(client, monkeypatch):
+    assert client.get('/api/reports/stock_summary/export?format=pdf').status_code == 400
+    assert client.get('/api/reports/no_such_report/export').status_code == 404
+    # A deployment without openpyxl answers XLSX requests with 501
+    monkeypatch.setitem(sys.modules, 'openpyxl', None)
+    assert client.get('/api/reports/stock_summary/export?format=excel').status_code == 501
+
+
+def test_exports_are_cached_resumable_and_invalidated(client):
+    _seed_products(25)
+    first = client.get('/api/reports/stock_summary/export')
+    etag = first.headers['ETag'].strip('"')
+    assert len(_csv_rows(first.data)) == 25  # sent in full, so now cached
+
+    again = client.get('/api/reports/stock_summary/export')
+    assert again.headers['X-Export-Cache'] == 'hit'
+    assert again.data == first.data
+    assert again.headers['ETag'].strip('"') == etag
+
+    partial = client.get('/api/reports/stock_summary/export', headers={'Range': 'bytes=10-'})
+    assert partial.status_code == 206
+    assert partial.data == first.data[10:]
+
+    other = client.get('/api/reports/stock_summary/export?since=2026-01-01')
+    assert other.headers['X-Export-Cache'] == 'miss'
+    assert other.headers['ETag'] != first.headers['ETag']
+
+    _seed_products(26)
+    result_cache.invalidate()
+    fresh = client.get('/api/reports/stock_summary/export')
+    assert fresh.headers['X-Export-Cache'] == 'miss'
+    assert len(_csv_rows(fresh.data)) == 26
+
+
+def test_large_export_streams_with_flat_memory(client):
+    _seed_products(30000)
+    tracemalloc.start()
+    try:
+        response = client.get('/api/reports/stock_summary/export', buffered=False)
+        assert response.is_streamed
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        sent, chunks = 0, 0
+        for chunk in response.response:
+            sent += len(chunk)
+            chunks += 1
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        response.close()
+    finally:
+        tracemalloc.stop()
+
+    assert chunks > 10
+    assert sent > 1_500_000
+    assert peak < sent / 4
+
+
+def test_credit_export_keeps_json_and_streams_csv(client):
+    conn = database.get_db_connection()
+    conn.execute("INSERT OR IGNORE INTO customers (id, name) VALUES ('c1', 'Credit Customer')")
+    conn.execute("""
+        INSERT INTO bills (id, bill_number, customer_id, customer_name, total_amount,
+                           is_credit, credit_paid_amount, credit_balance)
+        VALUES ('cb1', 'CR-1', 'c1', NULL, 500, 1, 200, 300)
+    """)
+    conn.commit()
+    conn.close()
+
+    body = client.get('/api/credit/export').get_json()
+    assert body['success'] is True
+    assert body['data'][0]['customer_name'] == 'Walk-in Customer'
+    assert body['data'][0]['remaining_amount'] == 300.0
+
+    rows = _csv_rows(client.get('/api/credit/export?format=csv').data)
+    assert list(rows[0].keys()) == exports.get_spec('credit.bills').columns
+    assert rows[0]['bill_number'] == 'CR-1' and float(rows[0]['paid_amount']) == 200
+
+
+def test_export_key_ignores_parameter_order():
+    key = exports.export_key('reports.x', 't1', {'a': '1', 'b': '2'}, 'csv')
+    assert key == exports.export_key('reports.x', 't1', {'b': '2', 'a': '1'}, 'csv')
+    assert key != exports.export_key('reports.x', 't2', {'a': '1', 'b': '2'}, 'csv')
+    assert key != exports.export_key('reports.x', 't1', {'a': '1', 'b': '2'}, 'csv', ['g2', 'g1'])
+
+
+_text = st.text(alphabet=st.characters(blacklist_categories=('Cs',), blacklist_characters='\x00\r'), max_size=20)
+
+
+@settings(max_examples=50, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(values=st.lists(st.tuples(_text, st.one_of(st.none(), st.integers(), _text)), max_size=10))
+def test_csv_round_trips_any_text(values):
+    rows = [{'name': name, 'value': value} for name, value in values]
+    data = b''.join(exports.iter_csv(iter(rows), ['name', 'value']))
+    parsed = list(csv.reader(io.StringIO(data.decode('utf-8-sig'), newline='')))
+    assert parsed[0] == ['name', 'value']
+
+    def expected(value):
+        value = '' if value is None else str(value)
+        return "'" + value if value[:1] in ('=', '+', '@') else value
+
+    assert parsed[1:] == [[expected(name), expected(value)] for name, value in values]
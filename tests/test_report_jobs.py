@@ -0,0 +1,190 @@
+"""
+Test for the Background Report Job Queue
+
+Feature: database-performance
+Property: A report job returns the same result as the synchronous report, at most N per tenant at once
+
+This test validates that a submitted job can be polled and its result
+fetched, that it equals the synchronous endpoint's answer, that repeat
+submits with the same params reuse the job until a write invalidates the
+tenant's results, that tenants never see each other's jobs, and that no
+tenant ever has more jobs running than its concurrency limit.
+"""
+
+import pytest
+import os
+import sys
+import time
+import threading
+from flask import Flask
+from hypothesis import given, settings, strategies as st, HealthCheck
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.shared.database as database
+from modules.shared import migrations
+from modules.shared import result_cache
+from modules.shared import report_jobs as report_jobs_module
+from modules.shared.report_jobs import ReportJobQueue, JobKind, report_jobs
+
+
+@pytest.fixture
+def jobs_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'jobs.db'))
+    monkeypatch.setattr(migrations, 'DB_PATH', str(tmp_path / 'jobs.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    monkeypatch.setattr(result_cache.result_cache, 'backend', result_cache.MemoryBackend())
+    migrations.migrate()
+    yield
+    report_jobs.shutdown()
+    database.get_engine().dispose()
+
+
+@pytest.fixture
+def client(jobs_db):
+    from modules.reports.routes import reports_bp
+    from modules.earnings.routes import earnings_bp
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.register_blueprint(reports_bp)
+    app.register_blueprint(earnings_bp)
+    return app.test_client()
+
+
+def _login(client, user_id):
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['user_type'] = 'client'
+
+
+def _seed_sales(owner, count, price=20):
+    conn = database.get_db_connection()
+    conn.execute("INSERT OR IGNORE INTO products (id, code, name, price, cost, stock) VALUES ('jp1', 'JP1', 'Job Product', 20, 12, 100)")
+    for index in range(count):
+        bill_id = f"{owner}-b{index}"
+        conn.execute("""
+            INSERT INTO bills (id, bill_number, business_owner_id, total_amount, payment_method)
+            VALUES (?, ?, ?, ?, 'cash')
+        """, (bill_id, f"JB-{bill_id}", owner, price))
+        conn.execute("""
+            INSERT INTO sales (id, bill_id, business_owner_id, product_id, quantity, total_price,
+                               payment_method, sale_date)
+            VALUES (?, ?, ?, 'jp1', 1, ?, 'cash', DATE('now'))
+        """, (f"s-{bill_id}", bill_id, owner, price))
+    conn.commit()
+    conn.close()
+
+
+def _finish(client, job):
+    deadline = time.monotonic() + 10
+    while True:
+        status = client.get(f"/api/reports/jobs/{job['job_id']}").get_json()['job']
+        if status['status'] in ('done', 'failed') or time.monotonic() > deadline:
+            return status
+        time.sleep(0.02)
+
+
+def test_submit_poll_and_fetch_matches_the_synchronous_report(client):
+    _seed_sales('owner-a', 3)
+    _login(client, 'owner-a')
+    expected = client.get('/api/earnings/products').get_json()['products']
+
+    submitted = client.get('/api/earnings/products?async=1')
+    assert submitted.status_code == 202
+    job = submitted.get_json()['job']
+    assert submitted.headers['Location'].endswith(f"/api/reports/jobs/{job['job_id']}")
+    assert job['kind'] == 'earnings.products' and job['params'] == {'date_filter': 'all'}
+
+    assert _finish(client, job)['status'] == 'done'
+    result = client.get(f"/api/reports/jobs/{job['job_id']}/result").get_json()
+    assert result['success'] is True
+    assert result['data'] == expected
+    assert result['data'][0]['quantity_sold'] == 3
+
+
+def test_repeat_submits_reuse_the_job_until_a_write(client):
+    _seed_sales('owner-a', 2)
+    _login(client, 'owner-a')
+    first = client.post('/api/reports/jobs', json={'kind': 'earnings.summary', 'params': {'date_filter': 'all'}})
+    job = first.get_json()['job']
+    _finish(client, job)
+
+    again = client.post('/api/reports/jobs', json={'kind': 'earnings.summary', 'params': {'date_filter': 'all'}})
+    assert again.status_code == 200
+    assert again.get_json()['job']['job_id'] == job['job_id']
+    assert again.get_json()['job']['reused'] is True
+
+    other = client.post('/api/reports/jobs', json={'kind': 'earnings.summary', 'params': {'date_filter': 'week'}})
+    assert other.get_json()['job']['job_id'] != job['job_id']
+
+    _seed_sales('owner-b', 1)
+    result_cache.invalidate('owner-a')
+    fresh = client.post('/api/reports/jobs', json={'kind': 'earnings.summary', 'params': {'date_filter': 'all'}})
+    assert fresh.get_json()['job']['job_id'] != job['job_id']
+
+
+def test_jobs_are_private_to_their_tenant(client):
+    _login(client, 'owner-a')
+    job = client.post('/api/reports/jobs', json={'kind': 'earnings.products'}).get_json()['job']
+    _finish(client, job)
+
+    _login(client, 'owner-b')
+    assert client.get(f"/api/reports/jobs/{job['job_id']}").status_code == 404
+    assert client.get(f"/api/reports/jobs/{job['job_id']}/result").status_code == 404
+
+
+def test_bad_submits(client):
+    _login(client, 'owner-a')
+    assert client.post('/api/reports/jobs', json={'kind': 'no.such.report'}).status_code == 400
+    assert client.post('/api/reports/jobs', json={'kind': 'earnings.products', 'params': [1]}).status_code == 400
+    assert client.get('/api/reports/jobs/missing').status_code == 404
+
+
+def test_failed_jobs_report_their_error(jobs_db, monkeypatch):
+    def broken(tenant_id, params):
+        raise RuntimeError('report exploded')
+
+    monkeypatch.setitem(report_jobs_module.KINDS, 'test.broken', JobKind('test.broken', broken))
+    queue = ReportJobQueue(workers=1)
+    try:
+        job = queue.submit('test.broken', 't1')
+        finished = queue.wait(job['job_id'], 't1')
+        assert finished['status'] == 'failed'
+        assert 'report exploded' in finished['error']
+        # A failed job is not reused
+        assert queue.submit('test.broken', 't1')['job_id'] != job['job_id']
+    finally:
+        queue.shutdown()
+
+
+@settings(max_examples=5, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(jobs=st.lists(st.sampled_from(['t1', 't2', 't3']), min_size=1, max_size=12),
+       limit=st.integers(min_value=1, max_value=2))
+def test_tenant_concurrency_is_bounded(jobs_db, monkeypatch, jobs, limit):
+    lock = threading.Lock()
+    running, peak = {}, {}
+
+    def slow(tenant_id, params):
+        with lock:
+            running[tenant_id] = running.get(tenant_id, 0) + 1
+            peak[tenant_id] = max(peak.get(tenant_id, 0), running[tenant_id])
+        time.sleep(0.01)
+        with lock:
+            running[tenant_id] -= 1
+        return {'tenant': tenant_id, 'n': params['n']}
+
+    monkeypatch.setitem(report_jobs_module.KINDS, 'test.slow', JobKind('test.slow', slow, params=('n',)))
+    queue = ReportJobQueue(workers=4, tenant_concurrency=limit)
+    try:
+        submitted = [(tenant, queue.submit('test.slow', tenant, {'n': str(index)}))
+                     for index, tenant in enumerate(jobs)]
+        for index, (tenant, job) in enumerate(submitted):
+            assert queue.wait(job['job_id'], tenant)['status'] == 'done'
+            assert queue.result(job['job_id'], tenant)['result'] == {'tenant': tenant, 'n': str(index)}
+    finally:
+        queue.shutdown()
+
+    assert all(count <= limit for count in peak.values())
+    assert queue.snapshot()['running'] == 0 and queue.snapshot()['waiting'] == 0
@@ -0,0 +1,181 @@
+"""
+Test for Keyset Report Pagination
+
+Feature: database-performance
+Property: Concatenated report pages equal the unpaged report, and SQL totals match it
+
+This test validates that every page size walks a report's rows exactly
+once in the unpaged order (ties included), that totals computed in SQL
+equal the sums over the full report, that the flattened credit payment
+history keeps its one-row-per-payment shape, and that bad cursors and
+limits are rejected with a 400.
+"""
+
+import pytest
+import os
+import sys
+import uuid
+from flask import Flask
+from hypothesis import given, settings, strategies as st, HealthCheck
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.shared.database as database
+from modules.shared import migrations
+from modules.shared import sales_rollup
+from modules.shared.keyset import KeysetQuery, SortKey, InvalidCursor, paginate_rows, page_request
+
+
+@pytest.fixture
+def report_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'reports.db'))
+    monkeypatch.setattr(migrations, 'DB_PATH', str(tmp_path / 'reports.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    migrations.migrate()
+    yield
+    database.get_engine().dispose()
+
+
+@pytest.fixture
+def client(report_db, monkeypatch):
+    from modules.reports.routes import reports_bp
+    monkeypatch.setattr(sales_rollup, 'ROLLUP_READS', False)
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.register_blueprint(reports_bp)
+    return app.test_client()
+
+
+def _walk(client, report, limit):
+    """Every row of a report, fetched `limit` at a time"""
+    rows, cursor, summary = [], None, None
+    while True:
+        url = f'/api/reports/{report}?limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url).get_json()
+        assert body['success'], body
+        if cursor is None:
+            summary = body['summary']
+        else:
+            assert body['summary'] is None
+        assert len(body['report_data']) <= limit
+        rows += body['report_data']
+        cursor = body['pagination']['next_cursor']
+        if not body['pagination']['has_more']:
+            assert cursor is None
+            return rows, summary
+
+
+def _seed_products(stocks):
+    conn = database.get_db_connection()
+    conn.execute("DELETE FROM products")
+    for index, (stock, price) in enumerate(stocks):
+        conn.execute("""
+            INSERT INTO products (id, code, name, category, price, cost, stock, min_stock, unit)
+            VALUES (?, ?, ?, 'General', ?, ?, ?, 5, 'pcs')
+        """, (str(uuid.uuid4()), f'P{index}', f'Product {index % 3}', price, price / 2, stock))
+    conn.commit()
+    conn.close()
+
+
+def test_keyset_query_pages_partition_the_rows(report_db):
+    conn = database.get_db_connection()
+    conn.execute("CREATE TABLE scores (id TEXT PRIMARY KEY, score REAL)")
+    for index, score in enumerate([5, 3, None, 5, 1, 3, 3, None, 9]):
+        conn.execute("INSERT INTO scores VALUES (?, ?)", (f's{index}', score))
+    report = KeysetQuery("SELECT id, score FROM scores", order=[
+        SortKey('score', descending=True, null_as=0), SortKey('id')], totals={'total': 'SUM(score)'})
+
+    full = report.fetch(conn)
+    assert full['totals'] == {'row_count': 9, 'total': 29.0}
+    assert full['pagination'] == {'limit': None, 'has_more': False, 'next_cursor': None}
+
+    rows, cursor = [], None
+    while True:
+        page = report.fetch(conn, cursor=cursor, limit=2)
+        assert (page['totals'] is None) == (cursor is not None)
+        rows += page['rows']
+        cursor = page['pagination']['next_cursor']
+        if cursor is None:
+            break
+    assert rows == full['rows']
+    assert [row['score'] for row in rows] == [9, 5, 5, 3, 3, 3, 1, None, None]
+    conn.close()
+
+
+def test_cursor_and_limit_validation():
+    keys = [SortKey('date', descending=True)]
+    assert page_request({}) == {'cursor': None, 'limit': None}
+    assert page_request({'limit': '100000'})['limit'] == 1000
+    for args in ({'limit': 'ten'}, {'limit': '0'}, {'cursor': 'abc'}):
+        with pytest.raises(InvalidCursor):
+            page_request(args)
+    for cursor in ('%%%', 'bm90IGpzb24', 'WzEsMl0'):
+        with pytest.raises(InvalidCursor):
+            paginate_rows([], keys, cursor=cursor, limit=5)
+
+
+def test_bad_cursor_is_a_400(client):
+    response = client.get('/api/reports/stock_summary?limit=5&cursor=not-a-cursor')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+    assert client.get('/api/reports/daily_sales?limit=-1').status_code == 400
+
+
+def test_credit_payment_history_is_flattened_in_sql(client):
+    conn = database.get_db_connection()
+    conn.execute("INSERT OR IGNORE INTO customers (id, name) VALUES ('c1', 'Credit Customer')")
+    for number, amount, paid in (('B-2', 300, 250), ('B-1', 100, 0)):
+        conn.execute("""
+            INSERT INTO bills (id, bill_number, customer_id, customer_name, total_amount,
+                               is_credit, credit_paid_amount, credit_balance)
+            VALUES (?, ?, 'c1', NULL, ?, 1, ?, ?)
+        """, (number.lower(), number, amount, paid, amount - paid))
+    for index, amount in enumerate([100, 150]):
+        conn.execute("""
+            INSERT INTO credit_transactions (id, bill_id, customer_id, transaction_type, amount,
+                                             payment_method, created_at)
+            VALUES (?, 'b-2', 'c1', 'payment', ?, NULL, ?)
+        """, (f'ct{index}', amount, f'2026-01-0{index + 1} 10:00:00'))
+    conn.execute("""
+        INSERT INTO credit_transactions (id, bill_id, customer_id, transaction_type, amount)
+        VALUES ('issued', 'b-2', 'c1', 'credit_issued', 300)
+    """)
+    conn.commit()
+    conn.close()
+
+    body = client.get('/api/reports/credit_payment_history').get_json()
+    assert [(row['bill_number'], row['payment_no'], row['payment_amount'], row['payment_method'])
+            for row in body['report_data']] == [
+        ('B-1', 'No Payment', 0, '-'),
+        ('B-2', 'Payment 1', 100, 'CASH'),
+        ('B-2', 'Payment 2', 150, 'CASH'),
+    ]
+    assert body['report_data'][0]['customer_name'] == 'Walk-in Customer'
+    assert 'bill_id' not in body['report_data'][0]
+    assert body['summary'] == {'total': 250, 'total_bills': 700, 'rows': 3}
+
+    rows, summary = _walk(client, 'credit_payment_history', 1)
+    assert rows == body['report_data'] and summary == body['summary']
+
+
+_stock = st.tuples(st.integers(min_value=0, max_value=4), st.sampled_from([1.0, 2.5, 10.0]))
+
+
+@settings(max_examples=25, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(stocks=st.lists(_stock, max_size=15), limit=st.integers(min_value=1, max_value=6))
+def test_pages_concatenate_to_the_full_report(client, stocks, limit):
+    _seed_products(stocks)
+    for report in ('stock_summary', 'out_of_stock', 'low_stock', 'stock_valuation'):
+        full = client.get(f'/api/reports/{report}').get_json()
+        assert full['pagination']['has_more'] is False
+        rows, summary = _walk(client, report, limit)
+        assert rows == full['report_data']
+        assert summary == full['summary']
+
+    stock_rows = client.get('/api/reports/stock_summary').get_json()
+    assert stock_rows['summary']['total'] == pytest.approx(sum(row['stock_value'] for row in stock_rows['report_data']))
+    assert stock_rows['summary']['rows'] == len(stocks)
+    assert [row['stock_value'] for row in stock_rows['report_data']] == sorted(
+        (stock * price for stock, price in stocks), reverse=True)
@@ -0,0 +1,165 @@
+"""
+Test for Request-Scoped Database Connections
+
+Feature: database-performance
+Property: One request holds at most one pooled connection
+
+This test validates that nested get_db_connection() callers inside a
+Flask request share the first caller's connection and that it goes back
+to the pool on teardown, that only the handle owning the transaction
+ends it (a nested commit or rollback only settles the nested handle's
+savepoint), and that app contexts without a request keep their own
+connections.
+"""
+
+import pytest
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+import modules.shared.database as database
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """Point the shared database layer at a throwaway SQLite file"""
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'request.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    monkeypatch.setattr(database, 'REQUEST_SCOPED_CONNECTIONS', True)
+
+    conn = database.get_db_connection()
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.commit()
+    conn.close()
+
+    yield database.get_engine()
+    database.get_engine().dispose()
+
+
+@pytest.fixture
+def flask_app(sqlite_db):
+    app = Flask(__name__)
+    database.init_app(app)
+    return app
+
+
+def test_nested_callers_share_one_connection(flask_app, sqlite_db):
+    with flask_app.test_request_context():
+        outer = database.get_db_connection()
+        inner = database.get_db_connection()
+
+        assert outer.conn is inner.conn
+        assert sqlite_db.pool.checkedout() == 1
+
+        inner.close()  # nested close keeps the shared connection open
+        outer.execute("INSERT INTO items (name) VALUES (?)", ('a',))
+        outer.commit()
+        outer.close()
+
+        assert sqlite_db.pool.checkedout() == 1
+
+    # Released on teardown_appcontext
+    assert sqlite_db.pool.checkedout() == 0
+
+
+def test_nested_caller_sees_uncommitted_writes(flask_app):
+    with flask_app.test_request_context():
+        writer = database.get_db_connection()
+        writer.execute('BEGIN TRANSACTION')
+        writer.execute("INSERT INTO items (name) VALUES (?)", ('b',))
+
+        reader = database.get_db_connection()
+        reader.execute('BEGIN TRANSACTION')  # tolerated on the shared connection
+        count = reader.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        assert count == 1
+        writer.commit()
+
+
+def test_uncommitted_work_is_discarded_on_teardown(flask_app):
+    with flask_app.test_request_context():
+        conn = database.get_db_connection()
+        conn.execute("INSERT INTO items (name) VALUES (?)", ('c',))
+        conn.close()
+
+    conn = database.get_db_connection()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+def test_connections_outside_requests_are_independent(sqlite_db):
+    first = database.get_db_connection()
+    second = database.get_db_connection()
+    try:
+        assert first.conn is not second.conn
+    finally:
+        first.close()
+        second.close()
+
+
+def _names(conn):
+    return [row[0] for row in conn.execute("SELECT name FROM items ORDER BY id").fetchall()]
+
+
+def test_nested_commit_does_not_end_the_owners_transaction(flask_app):
+    with flask_app.test_request_context():
+        owner = database.get_db_connection()
+        owner.execute("INSERT INTO items (name) VALUES (?)", ('owner',))
+
+        nested = database.get_db_connection()
+        nested.execute("INSERT INTO items (name) VALUES (?)", ('nested',))
+        nested.commit()
+        nested.close()
+
+        # The owner still decides: its rollback undoes the nested work too
+        owner.rollback()
+        assert _names(owner) == []
+
+        owner.execute("INSERT INTO items (name) VALUES (?)", ('kept',))
+        owner.commit()
+
+    conn = database.get_db_connection()
+    try:
+        assert _names(conn) == ['kept']
+    finally:
+        conn.close()
+
+
+def test_nested_rollback_undoes_only_its_own_statements(flask_app):
+    with flask_app.test_request_context():
+        owner = database.get_db_connection()
+        owner.execute("INSERT INTO items (name) VALUES (?)", ('owner',))
+
+        nested = database.get_db_connection()
+        nested.execute("INSERT INTO items (name) VALUES (?)", ('nested',))
+        nested.rollback()
+        assert _names(owner) == ['owner']
+
+        # A nested handle closed without committing is rolled back as well
+        abandoned = database.get_db_connection()
+        abandoned.cursor().execute("INSERT INTO items (name) VALUES (?)", ('abandoned',))
+        abandoned.close()
+        owner.commit()
+
+    conn = database.get_db_connection()
+    try:
+        assert _names(conn) == ['owner']
+    finally:
+        conn.close()
+
+
+def test_app_context_without_request_gets_its_own_connection(flask_app, sqlite_db):
+    with flask_app.app_context():
+        first = database.get_db_connection()
+        second = database.get_db_connection()
+        try:
+            assert first.conn is not second.conn
+            assert sqlite_db.pool.checkedout() == 2
+        finally:
+            first.close()
+            second.close()
@@ -0,0 +1,206 @@
+"""
+Test for the Per-Tenant Result Cache
+
+Feature: database-performance
+Property: A cached read never returns a result computed before the last invalidation
+
+This test validates that results are kept per tenant, that tenant and
+global invalidation drop exactly the results they should, that the LRU
+and TTL bounds hold, that every backend hands out copies (a caller
+mutating a hit cannot change what the next caller gets), that the database backend shares hits and
+invalidations between workers, and that service writes invalidate the
+cached dashboard stats of the tenant that wrote, not everyone's.
+"""
+
+import pytest
+import os
+import sys
+from datetime import date
+from flask import Flask, session as flask_session
+from hypothesis import given, settings, strategies as st, HealthCheck
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.shared.database as database
+from modules.shared import migrations
+from modules.shared import result_cache
+from modules.shared.result_cache import ResultCache, MemoryBackend, DatabaseBackend
+
+
+@pytest.fixture
+def cache_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'cache.db'))
+    monkeypatch.setattr(migrations, 'DB_PATH', str(tmp_path / 'cache.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    migrations.migrate()
+    yield
+    database.get_engine().dispose()
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    return app
+
+
+class Source:
+    """Per-tenant counter standing in for a dashboard query"""
+
+    def __init__(self):
+        self.values = {}
+        self.calls = 0
+
+    def read(self, tenant):
+        self.calls += 1
+        return {'tenant': tenant, 'value': self.values.get(tenant, 0)}
+
+
+def test_results_are_per_tenant_and_invalidated_by_scope():
+    cache = ResultCache(MemoryBackend())
+    source = Source()
+    read = lambda tenant: cache.get_or_compute('stats', tenant, [], lambda: source.read(tenant), ttl=60)
+
+    assert read('a') == {'tenant': 'a', 'value': 0}
+    assert read('b') == {'tenant': 'b', 'value': 0}
+    read('a'), read('b')
+    assert source.calls == 2
+
+    source.values['a'] = 5
+    cache.invalidate('a')
+    assert read('a')['value'] == 5
+    assert read('b')['value'] == 0
+    assert source.calls == 3
+
+    source.values['b'] = 7
+    cache.invalidate()
+    assert read('a')['value'] == 5 and read('b')['value'] == 7
+    assert source.calls == 5
+    assert cache.snapshot()['namespaces']['stats'] == {'hits': 3, 'misses': 5}
+
+
+@pytest.mark.parametrize('backend', ['memory', 'database'])
+def test_hits_are_copies_whatever_the_backend(backend, request):
+    if backend == 'database':
+        request.getfixturevalue('cache_db')
+    cache = ResultCache(MemoryBackend() if backend == 'memory' else DatabaseBackend())
+    cache.clear()
+    read = lambda: cache.get_or_compute('stats', 'a', [], lambda: {'rows': [1, 2], 'day': date(2026, 1, 2)},
+                                        ttl=60)
+
+    first = read()
+    assert first['day'] == date(2026, 1, 2)
+    hit = read()
+    assert hit == {'rows': [1, 2], 'day': '2026-01-02'}
+    hit['rows'].append(3)
+    first['rows'].append(4)
+    assert read() == {'rows': [1, 2], 'day': '2026-01-02'}
+
+
+def test_ttl_expiry_and_lru_bound(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(result_cache.time, 'monotonic', lambda: clock[0])
+    backend = MemoryBackend(max_entries=2)
+    cache = ResultCache(backend)
+    source = Source()
+    read = lambda tenant: cache.get_or_compute('stats', tenant, [], lambda: source.read(tenant), ttl=10)
+
+    read('a')
+    clock[0] += 9
+    read('a')
+    assert source.calls == 1
+    clock[0] += 2
+    read('a')
+    assert source.calls == 2
+
+    read('b'), read('c')
+    assert backend.info()['entries'] == 2
+    read('a')
+    assert source.calls == 5
+    assert backend.info()['evictions'] >= 1
+
+
+def test_database_backend_shares_hits_and_invalidations(cache_db):
+    worker_1 = ResultCache(DatabaseBackend())
+    worker_2 = ResultCache(DatabaseBackend())
+    source = Source()
+
+    assert worker_1.get_or_compute('stats', 'a', [30], lambda: source.read('a'), ttl=60)['value'] == 0
+    assert worker_2.get_or_compute('stats', 'a', [30], lambda: source.read('a'), ttl=60)['value'] == 0
+    assert source.calls == 1
+
+    source.values['a'] = 3
+    worker_2.invalidate('a')
+    assert worker_1.get_or_compute('stats', 'a', [30], lambda: source.read('a'), ttl=60)['value'] == 3
+    assert source.calls == 2
+
+
+def _as_tenant(app, tenant):
+    context = app.test_request_context('/api/dashboard/stats/customers')
+    context.push()
+    flask_session['user_id'] = tenant
+    return context
+
+
+def test_service_writes_invalidate_the_writing_tenant(cache_db, app, monkeypatch):
+    from modules.dashboard.models import DashboardStats
+    from modules.customers.service import CustomersService
+    from services.product_service import ProductService
+
+    monkeypatch.setattr(result_cache.result_cache, 'backend', MemoryBackend())
+    result_cache.result_cache.reset_stats()
+
+    context = _as_tenant(app, 'tenant-a')
+    customers = DashboardStats.get_customer_stats()['total_customers']
+    products = DashboardStats.get_inventory_stats()['total_products']
+    assert DashboardStats.get_customer_stats()['total_customers'] == customers
+    assert result_cache.result_cache.snapshot()['hits'] == 1
+    context.pop()
+    context = _as_tenant(app, 'tenant-b')
+    assert DashboardStats.get_customer_stats()['total_customers'] == customers
+    context.pop()
+
+    CustomersService().add_customer({'name': 'Cached Customer', 'phone': '99999', 'user_id': 'tenant-a'})
+    context = _as_tenant(app, 'tenant-a')
+    ok, _ = ProductService().create_product({'name': 'Cached Product', 'price': 10})
+    assert ok
+    assert DashboardStats.get_customer_stats()['total_customers'] == customers + 1
+    assert DashboardStats.get_inventory_stats()['total_products'] == products + 1
+    context.pop()
+
+    # Another tenant's cached results are left alone
+    context = _as_tenant(app, 'tenant-b')
+    hits = result_cache.result_cache.snapshot()['hits']
+    assert DashboardStats.get_customer_stats()['total_customers'] == customers
+    assert result_cache.result_cache.snapshot()['hits'] == hits + 1
+    context.pop()
+
+    # Outside a request nothing is cached
+    assert DashboardStats.get_customer_stats()['total_customers'] == customers + 1
+
+
+_op = st.one_of(
+    st.tuples(st.just('read'), st.sampled_from(['a', 'b', ''])),
+    st.tuples(st.just('write'), st.sampled_from(['a', 'b', ''])),
+    st.tuples(st.just('write_all'), st.none()),
+)
+
+
+@settings(max_examples=50, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(ops=st.lists(_op, min_size=1, max_size=40))
+def test_cached_reads_are_never_older_than_invalidation(ops):
+    cache = ResultCache(MemoryBackend(max_entries=2))
+    source = Source()
+    for kind, tenant in ops:
+        if kind == 'read':
+            got = cache.get_or_compute('stats', tenant, [], lambda: source.read(tenant), ttl=60)
+            assert got == {'tenant': tenant, 'value': source.values.get(tenant, 0)}
+        elif kind == 'write':
+            source.values[tenant] = source.values.get(tenant, 0) + 1
+            cache.invalidate(tenant or None)
+        else:
+            for key in list(source.values):
+                source.values[key] += 1
+            cache.invalidate()
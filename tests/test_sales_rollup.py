@@ -0,0 +1,204 @@
+"""
+Test for the Daily Sales Rollup
+
+Feature: database-performance
+Property: The incrementally maintained rollup always equals a full rebuild
+
+This test validates that bill, payment and credit writes refresh the touched
+tenant-days, that deletes remove their contribution, and that the dashboard
+windows and report readers return the same totals as the base tables,
+with "today" taken in UTC like the DATE('now') queries they replaced, and
+that bills created by the billing service are owned by the caller's tenant.
+"""
+
+import pytest
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+from flask import Flask, session
+from hypothesis import given, settings, strategies as st, HealthCheck
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.shared.database as database
+from modules.shared import migrations
+from modules.shared import sales_rollup
+
+
+@pytest.fixture
+def rollup_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'rollup.db'))
+    monkeypatch.setattr(migrations, 'DB_PATH', str(tmp_path / 'rollup.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    migrations.migrate()
+    yield
+    database.get_engine().dispose()
+
+
+def _snapshot(conn):
+    rows = conn.execute(f"""
+        SELECT * FROM {sales_rollup.ROLLUP_TABLE} ORDER BY tenant_id, day, payment_method
+    """).fetchall()
+    return [
+        (row['tenant_id'], row['day'], row['payment_method'],
+         *(round(row[m], 6) for m in sales_rollup.MEASURES))
+        for row in rows
+    ]
+
+
+def _add_bill(conn, bill_id, owner, created_at, total, method, is_credit=0, payment_at=None):
+    conn.execute("""
+        INSERT INTO bills (id, bill_number, business_owner_id, total_amount, payment_method,
+                           is_credit, credit_balance, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (bill_id, f"B-{bill_id}", owner, total, method, is_credit,
+          total if is_credit else 0, created_at))
+    conn.execute("""
+        INSERT INTO sales (id, bill_id, business_owner_id, product_id, quantity, total_price,
+                           payment_method, sale_date, created_at)
+        VALUES (?, ?, ?, 'prod-1', 1, ?, ?, ?, ?)
+    """, (f"s-{bill_id}", bill_id, owner, total, method, created_at[:10], created_at))
+    if payment_at:
+        conn.execute("""
+            INSERT INTO payments (id, bill_id, method, amount, processed_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (f"p-{bill_id}", bill_id, method, total, payment_at))
+    sales_rollup.refresh_bill(conn, bill_id)
+
+
+def test_refresh_matches_rebuild_after_writes_and_delete(rollup_db):
+    conn = database.get_db_connection()
+    try:
+        _add_bill(conn, 'b1', 'tenant-a', '2024-03-01 10:00:00', 100.0, 'Cash', payment_at='2024-03-01 10:00:00')
+        _add_bill(conn, 'b2', 'tenant-a', '2024-03-01 18:30:00', 50.0, 'upi', payment_at='2024-03-02 09:00:00')
+        _add_bill(conn, 'b3', None, '2024-03-01 12:00:00', 20.0, 'cash', is_credit=1)
+        conn.commit()
+        incremental = _snapshot(conn)
+
+        sales_rollup.rebuild(conn=conn)
+        assert _snapshot(conn) == incremental
+
+        # Delete b2 the way BillingService.delete_bill does
+        keys = sales_rollup.bill_keys(conn, 'b2')
+        assert ('tenant-a', '2024-03-02') in keys
+        for table, column in (('payments', 'bill_id'), ('sales', 'bill_id'), ('bills', 'id')):
+            conn.execute(f"DELETE FROM {table} WHERE {column} = ?", ('b2',))
+        sales_rollup.refresh_keys(conn, keys)
+        conn.commit()
+
+        days = sales_rollup.daily_totals(conn, 'tenant-a')
+        assert [(d['day'], d['bill_count'], d['sales_amount']) for d in days] == [('2024-03-01', 1, 100.0)]
+        incremental = _snapshot(conn)
+        sales_rollup.rebuild(conn=conn)
+        assert _snapshot(conn) == incremental
+    finally:
+        conn.close()
+
+
+def test_credit_payment_moves_bill_between_methods(rollup_db):
+    conn = database.get_db_connection()
+    try:
+        _add_bill(conn, 'c1', 'tenant-a', '2024-03-01 10:00:00', 80.0, 'credit', is_credit=1)
+        # A later credit payment changes the bill's method and adds a collection
+        conn.execute("INSERT OR IGNORE INTO customers (id, name) VALUES ('cust-1', 'Credit Customer')")
+        conn.execute("UPDATE bills SET payment_method = 'cash' WHERE id = 'c1'")
+        conn.execute("""
+            INSERT INTO credit_transactions (id, bill_id, customer_id, transaction_type, amount,
+                                             payment_method, created_at)
+            VALUES ('ct1', 'c1', 'cust-1', 'payment', 30, 'cash', '2024-03-05 11:00:00')
+        """)
+        sales_rollup.refresh_bill(conn, 'c1')
+        conn.commit()
+
+        rows = {(r['day'], r['payment_method']): r
+                for r in sales_rollup.daily_totals(conn, 'tenant-a', by_method=True)}
+        assert rows[('2024-03-01', 'cash')]['bill_count'] == 1
+        assert ('2024-03-01', 'credit') not in rows or rows[('2024-03-01', 'credit')]['bill_count'] == 0
+        assert rows[('2024-03-05', 'cash')]['credit_collected'] == 30
+    finally:
+        conn.close()
+
+
+def test_window_totals_match_dashboard_definitions(rollup_db):
+    today = date.today()
+    stamp = lambda d: f"{d.isoformat()} 12:00:00"
+    conn = database.get_db_connection()
+    try:
+        _add_bill(conn, 'w1', 'tenant-w', stamp(today), 10.0, 'Cash', payment_at=stamp(today))
+        _add_bill(conn, 'w2', 'tenant-w', stamp(today - timedelta(days=3)), 20.0, 'upi',
+                  payment_at=stamp(today - timedelta(days=3)))
+        _add_bill(conn, 'w3', 'tenant-w', stamp(today - timedelta(days=40)), 40.0, 'Cash')
+        _add_bill(conn, 'w4', 'tenant-other', stamp(today), 99.0, 'Cash', payment_at=stamp(today))
+        conn.commit()
+
+        windows = sales_rollup.window_totals(conn, 'tenant-w', today=today)
+        assert windows['today'] == {'sales': 10.0, 'revenue': 10.0, 'orders': 1}
+        assert windows['week'] == {'sales': 30.0, 'revenue': 10.0, 'orders': 2}
+        month_bills = [b for b in ((today, 10.0), (today - timedelta(days=3), 20.0)) if b[0].month == today.month]
+        assert windows['month']['sales'] == sum(total for _, total in month_bills)
+    finally:
+        conn.close()
+
+
+_bill = st.tuples(
+    st.sampled_from(['tenant-a', 'tenant-b', None]),
+    st.integers(min_value=0, max_value=5),                  # day offset
+    st.sampled_from(['cash', 'Cash', 'upi', 'card']),
+    st.floats(min_value=1, max_value=10_000, allow_nan=False).map(lambda v: round(v, 2)),
+    st.booleans(),                                          # paid now
+)
+
+
+@settings(max_examples=15, deadline=None,
+          suppress_health_check=[HealthCheck.function_scoped_fixture, HealthCheck.data_too_large])
+@given(bills=st.lists(_bill, min_size=1, max_size=12))
+def test_incremental_rollup_equals_rebuild(rollup_db, bills):
+    conn = database.get_db_connection()
+    try:
+        conn.execute(f"DELETE FROM {sales_rollup.ROLLUP_TABLE}")
+        for table in ('payments', 'sales', 'bills'):
+            conn.execute(f"DELETE FROM {table}")
+        base = datetime(2024, 1, 10, 9, 0, 0)
+        for index, (owner, offset, method, total, paid) in enumerate(bills):
+            created = (base + timedelta(days=offset, minutes=index)).strftime('%Y-%m-%d %H:%M:%S')
+            _add_bill(conn, f"h{index}", owner, created, total, method, payment_at=created if paid else None)
+        conn.commit()
+
+        incremental = _snapshot(conn)
+        sales_rollup.rebuild(conn=conn)
+        assert _snapshot(conn) == incremental
+        assert sum(row[3] for row in incremental) == len(bills)
+    finally:
+        conn.close()
+
+
+def test_billing_service_bills_belong_to_the_callers_tenant(rollup_db):
+    from services.billing_service import BillingService
+    conn = database.get_db_connection()
+    conn.execute("INSERT INTO products (id, code, name, price, stock) VALUES ('bp1', 'BP1', 'One', 50, 10)")
+    conn.commit()
+    conn.close()
+
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    with app.test_request_context('/api/billing'):
+        session['user_id'] = 'tenant-x'
+        ok, result = BillingService().create_bill({
+            'items': [{'product_id': 'bp1', 'product_name': 'One', 'quantity': 2, 'unit_price': 50}],
+            'total_amount': 100, 'payment_method': 'cash'})
+    assert ok, result
+
+    conn = database.get_db_connection()
+    try:
+        assert conn.execute("SELECT business_owner_id FROM bills WHERE id = ?",
+                            (result['bill_id'],)).fetchone()[0] == 'tenant-x'
+        assert {row[0] for row in _snapshot(conn)} == {'tenant-x'}
+
+        # The windows end on the UTC day, as DATE('now') did
+        assert sales_rollup.utc_today() == datetime.now(timezone.utc).date()
+        assert sales_rollup.window_totals(conn, 'tenant-x') == \
+            sales_rollup.window_totals(conn, 'tenant-x', today=sales_rollup.utc_today())
+    finally:
+        conn.close()
@@ -0,0 +1,62 @@
+"""
+Test for Schema-Versioned Migrations
+
+Feature: database-performance
+Property: Startup applies each migration once, then only checks the version
+
+This test validates that migrations are discovered in order, recorded in
+schema_version and skipped once the schema is current.
+"""
+
+import pytest
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.shared.database as database
+from modules.shared import migrations
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'migrate.db'))
+    monkeypatch.setattr(migrations, 'DB_PATH', str(tmp_path / 'migrate.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    yield
+    database.get_engine().dispose()
+
+
+def test_migrations_are_ordered_and_unique():
+    found = migrations.discover_migrations()
+    versions = [m.version for m in found]
+    assert versions == sorted(versions)
+    assert len(versions) == len(set(versions))
+    assert found[0].version == 1
+
+
+def test_migrate_applies_pending_once(fresh_db):
+    latest = migrations.latest_version()
+    assert migrations.get_current_version() == 0
+
+    applied = migrations.migrate()
+    assert applied == [m.version for m in migrations.discover_migrations()]
+    assert migrations.get_current_version() == latest
+
+    # Second startup is a single version check
+    assert migrations.migrate() == []
+    assert migrations.migration_status()['pending'] == []
+
+
+def test_baseline_creates_core_tables(fresh_db):
+    migrations.migrate(target=1)
+    conn = database.get_db_connection()
+    try:
+        tables = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()}
+    finally:
+        conn.close()
+    assert {'products', 'bills', 'customers', 'schema_version'} <= tables
+    assert migrations.get_current_version() == 1
@@ -0,0 +1,91 @@
+"""
+Property-Based Test for SQL Dialect Translation Cache
+
+Feature: database-performance
+Property: Each distinct statement is translated once and reused
+
+This test validates that the compiled-query cache produces the same
+PostgreSQL form as the original per-call rewrite and that repeated
+statements are served from the cache.
+"""
+
+import pytest
+from hypothesis import given, strategies as st, settings, HealthCheck
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.shared.sql_translation import (
+    QueryTranslationCache, compile_query, PROFILE_CONNECTION, PROFILE_CURSOR
+)
+
+
+def test_placeholders_dates_and_booleans_are_translated():
+    """Connection profile rewrites placeholders, DATE()/TIME() and boolean filters"""
+    compiled = compile_query(
+        "SELECT * FROM bills WHERE DATE(created_at) = ? AND is_active = 1 AND is_credit = 0",
+        'postgresql'
+    )
+    assert compiled.sql == (
+        "SELECT * FROM bills WHERE CAST(created_at AS DATE) = %s "
+        "AND is_active = TRUE AND is_credit = FALSE"
+    )
+
+
+def test_cursor_profile_keeps_date_functions():
+    """Cursor profile only rewrites placeholders and boolean filters"""
+    compiled = compile_query("SELECT DATE(created_at) FROM bills WHERE is_active = 1 AND id = ?",
+                             'postgresql', PROFILE_CURSOR)
+    assert compiled.sql == "SELECT DATE(created_at) FROM bills WHERE is_active = TRUE AND id = %s"
+
+
+def test_sqlite_queries_are_untouched():
+    """SQLite statements pass through unchanged"""
+    query = "SELECT * FROM products WHERE is_active = 1 AND id = ?"
+    assert compile_query(query, 'sqlite').sql == query
+
+
+def test_insert_boolean_params_are_coerced():
+    """0/1 params for boolean INSERT columns become False/True, others stay numeric"""
+    compiled = compile_query(
+        "INSERT INTO products (id, stock, is_active, min_stock) VALUES (?, ?, ?, ?)",
+        'postgresql'
+    )
+    assert compiled.boolean_param_positions == (2,)
+    assert compiled.convert_params(('p1', 1, 1, 0)) == ('p1', 1, True, 0)
+
+
+def test_cache_counts_hits_and_misses():
+    """Repeated statements hit the cache"""
+    cache = QueryTranslationCache(maxsize=10)
+    first = cache.get("SELECT * FROM users WHERE id = ?", 'postgresql')
+    second = cache.get("SELECT * FROM users WHERE id = ?", 'postgresql')
+
+    assert first is second
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+
+def test_cache_is_keyed_by_dialect():
+    """The same SQL compiles separately per dialect"""
+    cache = QueryTranslationCache(maxsize=10)
+    pg = cache.get("SELECT * FROM users WHERE id = ?", 'postgresql')
+    lite = cache.get("SELECT * FROM users WHERE id = ?", 'sqlite')
+
+    assert pg.sql.endswith('%s')
+    assert lite.sql.endswith('?')
+    assert cache.stats()['misses'] == 2
+
+
+@settings(max_examples=50, deadline=None, suppress_health_check=[HealthCheck.too_slow])
+@given(table_ids=st.lists(st.integers(min_value=0, max_value=200), min_size=1, max_size=100))
+def test_cache_stays_bounded(table_ids):
+    """The LRU never grows past maxsize and cached results match a fresh compile"""
+    cache = QueryTranslationCache(maxsize=16)
+    for table_id in table_ids:
+        query = f"SELECT * FROM t{table_id} WHERE is_active = 1 AND id = ?"
+        assert cache.get(query, 'postgresql').sql == compile_query(query, 'postgresql').sql
+        assert cache.stats()['size'] <= 16
@@ -0,0 +1,94 @@
+"""
+Test for SQLite Pooled Connections
+
+Feature: database-performance
+Property: SQLite connections are reused per thread and configured once
+
+This test validates that SQLite mode keeps connections open in a
+thread-affine pool and that every physical connection runs in WAL mode.
+"""
+
+import pytest
+import os
+import sys
+import threading
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from modules.shared.sqlite_pool import (
+    get_sqlite_engine_options, attach_sqlite_listeners, ThreadAffinePool
+)
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", **get_sqlite_engine_options())
+    attach_sqlite_listeners(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_engine_uses_thread_affine_pool(sqlite_engine):
+    assert isinstance(sqlite_engine.pool, ThreadAffinePool)
+
+
+def test_connections_are_configured_for_wal(sqlite_engine):
+    conn = sqlite_engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        assert cursor.execute("PRAGMA journal_mode").fetchone()[0].lower() == 'wal'
+        assert cursor.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert cursor.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        assert cursor.execute("PRAGMA busy_timeout").fetchone()[0] > 0
+    finally:
+        conn.close()
+
+
+def test_same_thread_gets_its_connection_back(sqlite_engine):
+    first = sqlite_engine.raw_connection()
+    first_dbapi = first.dbapi_connection
+    first.close()
+
+    second = sqlite_engine.raw_connection()
+    assert second.dbapi_connection is first_dbapi
+    second.close()
+
+
+def test_idle_connections_are_bounded(sqlite_engine):
+    pool = sqlite_engine.pool
+    conns = [sqlite_engine.raw_connection() for _ in range(pool.size + 3)]
+    assert pool.checkedout() == pool.size + 3
+    for conn in conns:
+        conn.close()
+    assert pool.checkedout() == 0
+    assert pool.checkedin() == pool.size
+
+
+def test_readers_proceed_while_writer_holds_transaction(sqlite_engine):
+    setup = sqlite_engine.raw_connection()
+    setup.cursor().execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    setup.cursor().execute("INSERT INTO items (name) VALUES ('a')")
+    setup.commit()
+    setup.close()
+
+    writer = sqlite_engine.raw_connection()
+    writer.cursor().execute("INSERT INTO items (name) VALUES ('b')")  # open write transaction
+
+    results = []
+
+    def read():
+        conn = sqlite_engine.raw_connection()
+        try:
+            results.append(conn.cursor().execute("SELECT COUNT(*) FROM items").fetchone()[0])
+        finally:
+            conn.close()
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    reader.join(timeout=5)
+
+    writer.rollback()
+    writer.close()
+    assert results == [1]
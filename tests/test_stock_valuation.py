@@ -0,0 +1,303 @@
+"""
+Test for the Stock Valuation Engine
+
+Feature: database-performance
+Property: Incrementally maintained valuations equal a full replay of the stock transactions
+
+This test validates that recording stock transactions one at a time
+leaves the same quantity, average cost and FIFO layers as a rebuild from
+stock_transactions and as recording them in batches (whose statement
+count does not grow with the batch), that drawing a layer down leaves
+the other layers untouched, that the FIFO value matches a unit-by-unit
+reference, that purchases and adjustments through the integrated
+inventory service and the ERP stock adjustment endpoints feed the
+valuation report and its endpoints, and that open stock is bucketed by
+age since receipt.
+"""
+
+import pytest
+import os
+import sys
+from collections import deque
+from datetime import date, datetime, timedelta
+from flask import Flask
+from hypothesis import given, settings, strategies as st, HealthCheck
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.shared.database as database
+from modules.shared import migrations
+from modules.shared import stock_valuation
+from modules.integrated_inventory.database import init_integrated_inventory_tables
+from modules.integrated_inventory.service import IntegratedInventoryService
+
+
+@pytest.fixture
+def valuation_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'valuation.db'))
+    monkeypatch.setattr(migrations, 'DB_PATH', str(tmp_path / 'valuation.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    migrations.migrate()
+    # The integrated inventory ledger (unit_cost, business_owner_id) in place of the base schema's
+    conn = database.get_db_connection()
+    conn.execute("DROP TABLE stock_transactions")
+    conn.execute("ALTER TABLE products ADD COLUMN updated_at TEXT")
+    conn.commit()
+    conn.close()
+    init_integrated_inventory_tables()
+    yield
+    database.get_engine().dispose()
+
+
+def _add_products(conn, owner, *products):
+    for product_id, category, selling_price in products:
+        conn.execute("""
+            INSERT INTO products (id, code, name, category, price, selling_price, purchase_price,
+                                  stock, is_active, user_id)
+            VALUES (?, ?, ?, ?, ?, ?, 0, 0, 1, ?)
+        """, (product_id, product_id, product_id.upper(), category, selling_price, selling_price, owner))
+
+
+def _state(conn):
+    valuations = {row['product_id']: (round(row['quantity'], 6), round(row['avg_cost'], 6),
+                                      round(row['fifo_value'], 6))
+                  for row in conn.execute(f"SELECT * FROM {stock_valuation.VALUATION_TABLE}").fetchall()}
+    # Layer order, not seq values: layers keep their seq when they are drawn down
+    layers = [(row['product_id'], row['received_on'], round(row['quantity'], 6), row['unit_cost'])
+              for row in conn.execute(f"SELECT * FROM {stock_valuation.LAYERS_TABLE} "
+                                      f"ORDER BY product_id, seq").fetchall()]
+    return valuations, layers
+
+
+_transaction = st.tuples(
+    st.sampled_from(['sv1', 'sv2']),
+    st.sampled_from(['in', 'out', 'adjustment']),
+    st.integers(min_value=-5, max_value=20),
+    st.sampled_from([0, 4.0, 7.5, 12.0]),
+)
+
+
+@settings(max_examples=40, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(transactions=st.lists(_transaction, max_size=25))
+def test_incremental_valuation_equals_replay(valuation_db, transactions):
+    conn = database.get_db_connection()
+    for table in ('stock_transactions', stock_valuation.VALUATION_TABLE, stock_valuation.LAYERS_TABLE):
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute("DELETE FROM products WHERE id IN ('sv1', 'sv2')")
+    _add_products(conn, 'owner-1', ('sv1', 'A', 10), ('sv2', 'B', 20))
+    conn.commit()
+
+    started = datetime(2026, 1, 1)
+    units = {'sv1': deque(), 'sv2': deque()}  # one unit cost per unit on hand, oldest first
+    for index, (product_id, kind, quantity, unit_cost) in enumerate(transactions):
+        if kind != 'adjustment':
+            quantity = abs(quantity)
+        created_at = (started + timedelta(days=index)).isoformat()
+        conn.execute("""
+            INSERT INTO stock_transactions (id, product_id, transaction_type, quantity, unit_cost,
+                                            created_by, business_owner_id, created_at)
+            VALUES (?, ?, ?, ?, ?, 'owner-1', 'owner-1', ?)
+        """, (f"st{index}", product_id, kind, quantity, unit_cost, created_at))
+        stock_valuation.record(conn, product_id, 'owner-1', kind, quantity, unit_cost, created_at)
+    conn.commit()
+    incremental = _state(conn)
+
+    assert stock_valuation.rebuild(conn=conn) == len(incremental[0])
+    assert _state(conn) == incremental
+    conn.close()
+
+    # FIFO value against a unit-by-unit reference (integral quantities)
+    quantities = {'sv1': 0, 'sv2': 0}
+    averages = {'sv1': 0.0, 'sv2': 0.0}
+    for product_id, kind, quantity, unit_cost in transactions:
+        delta = stock_valuation.signed_quantity(kind, quantity)
+        if delta > 0:
+            cost = unit_cost or averages[product_id]
+            on_hand = max(quantities[product_id], 0)
+            averages[product_id] = (on_hand * averages[product_id] + delta * cost) / (on_hand + delta)
+            units[product_id].extend([cost] * int(delta + min(quantities[product_id], 0)))
+        else:
+            for _ in range(min(int(-delta), len(units[product_id]))):
+                units[product_id].popleft()
+        quantities[product_id] += delta
+    for product_id, (quantity, _, fifo_value) in incremental[0].items():
+        assert quantity == quantities[product_id]
+        assert fifo_value == pytest.approx(sum(units[product_id]), abs=1e-6)
+
+
+@settings(max_examples=30, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(transactions=st.lists(_transaction, min_size=1, max_size=25), split=st.integers(min_value=0, max_value=25))
+def test_batched_valuation_equals_one_at_a_time(valuation_db, transactions, split):
+    conn = database.get_db_connection()
+    started = datetime(2026, 1, 1)
+    batch = [{'product_id': product_id, 'transaction_type': kind,
+              'quantity': quantity if kind == 'adjustment' else abs(quantity), 'unit_cost': unit_cost,
+              'created_at': (started + timedelta(days=index)).isoformat()}
+             for index, (product_id, kind, quantity, unit_cost) in enumerate(transactions)]
+
+    states = []
+    for owner_batches in ([[item] for item in batch], [batch[:split], batch[split:]]):
+        for table in (stock_valuation.VALUATION_TABLE, stock_valuation.LAYERS_TABLE):
+            conn.execute(f"DELETE FROM {table}")
+        for items in owner_batches:
+            stock_valuation.record_many(conn, 'owner-1', items)
+        states.append(_state(conn))
+    conn.rollback()
+    conn.close()
+    assert states[0] == states[1]
+    replayed = stock_valuation.replay([dict(item, business_owner_id='owner-1') for item in batch])
+    assert states[0][0] == {product_id: (round(position.quantity, 6), round(position.avg_cost, 6),
+                                         round(position.fifo_value, 6))
+                            for (_, product_id), position in replayed.items()}
+
+
+def test_batches_cost_the_same_statements_whatever_their_size(valuation_db):
+    from modules.shared.query_stats import query_stats
+
+    def statements(items):
+        query_stats.reset()
+        query_stats.enabled = True
+        try:
+            stock_valuation.record_many(conn, 'owner-1', items)
+        finally:
+            query_stats.enabled = False
+        return sum(row['calls'] for row in query_stats.snapshot(limit=1_000)['fingerprints'])
+
+    conn = database.get_db_connection()
+    receipts = [{'product_id': f"bp{index}", 'transaction_type': 'in', 'quantity': 5, 'unit_cost': 2}
+                for index in range(40)]
+    assert statements(receipts[:2]) == statements(receipts[2:])
+    issues = [{'product_id': f"bp{index}", 'transaction_type': 'out', 'quantity': 7} for index in range(40)]
+    assert statements(issues[:2]) == statements(issues[2:])
+    conn.rollback()
+    conn.close()
+
+
+def test_drawing_down_a_layer_leaves_the_others_in_place(valuation_db):
+    conn = database.get_db_connection()
+    for cost in (1.0, 2.0, 3.0):
+        stock_valuation.record(conn, 'lp1', 'owner-1', 'in', 5, cost, '2026-01-01')
+
+    def layers():
+        return [(row['seq'], row['quantity']) for row in conn.execute(
+            f"SELECT seq, quantity FROM {stock_valuation.LAYERS_TABLE} ORDER BY seq").fetchall()]
+
+    stock_valuation.record(conn, 'lp1', 'owner-1', 'out', 2)
+    assert layers() == [(0, 3), (1, 5), (2, 5)]
+    stock_valuation.record(conn, 'lp1', 'owner-1', 'out', 4)
+    assert layers() == [(1, 4), (2, 5)]
+    stock_valuation.record(conn, 'lp1', 'owner-1', 'in', 1, 4.0, '2026-01-02')
+    assert layers() == [(1, 4), (2, 5), (3, 1)]
+    stock_valuation.record(conn, 'lp1', 'owner-1', 'out', 10)
+    assert layers() == []
+    conn.rollback()
+    conn.close()
+
+
+@pytest.fixture
+def inventory_client(valuation_db):
+    from modules.integrated_inventory.routes import integrated_inventory_bp
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.register_blueprint(integrated_inventory_bp)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'owner-1'
+        sess['user_type'] = 'client'
+    return client
+
+
+def test_purchases_and_adjustments_feed_the_valuation_report(inventory_client):
+    conn = database.get_db_connection()
+    _add_products(conn, 'owner-1', ('iv1', 'Grocery', 15), ('iv2', 'Dairy', 9))
+    _add_products(conn, 'owner-2', ('iv3', 'Grocery', 99))
+    conn.commit()
+    conn.close()
+
+    service = IntegratedInventoryService()
+    assert service.create_purchase_entry({'items': [{'product_id': 'iv1', 'quantity': 10, 'unit_cost': 5}]},
+                                         'owner-1')['success']
+    assert service.create_purchase_entry({'items': [{'product_id': 'iv1', 'quantity': 10, 'unit_cost': 8},
+                                                    {'product_id': 'iv2', 'quantity': 4, 'unit_cost': 3}]},
+                                         'owner-1')['success']
+    assert service.create_purchase_entry({'items': [{'product_id': 'iv3', 'quantity': 1, 'unit_cost': 50}]},
+                                         'owner-2')['success']
+    # 12 out: the 10 units at 5 and 2 at 8 leave 8 x 8 under FIFO
+    assert service.record_stock_adjustment({'product_id': 'iv1', 'quantity_change': -12, 'reason': 'damage'},
+                                           'owner-1')['success']
+
+    fifo = service.get_stock_valuation_report('owner-1')
+    grocery = next(category for category in fifo['categories'] if category['category'] == 'Grocery')
+    assert (grocery['product_count'], grocery['total_quantity'], grocery['purchase_value']) == (1, 8, 64)
+    assert grocery['selling_value'] == 120 and grocery['potential_profit'] == 56
+    assert fifo['summary']['total_purchase_value'] == 64 + 12
+
+    average = service.get_stock_valuation_report('owner-1', method='average')
+    grocery = next(category for category in average['categories'] if category['category'] == 'Grocery')
+    assert grocery['purchase_value'] == pytest.approx(8 * 6.5)
+
+    response = inventory_client.get('/inventory/api/stock-valuation?method=fifo').get_json()
+    assert [(product['product_id'], product['cost_value']) for product in response['products']] == \
+        [('iv1', 64), ('iv2', 12)]
+    assert inventory_client.get('/inventory/api/stock-valuation?method=lifo').status_code == 400
+
+
+def test_ageing_buckets_open_layers_by_receipt_date(inventory_client):
+    conn = database.get_db_connection()
+    _add_products(conn, 'owner-1', ('ag1', 'Grocery', 10))
+    conn.commit()
+    today = date.today()
+    for days_ago, quantity, cost in ((100, 5, 2.0), (45, 3, 4.0), (2, 1, 6.0)):
+        stock_valuation.record(conn, 'ag1', 'owner-1', 'in', quantity, cost,
+                               (today - timedelta(days=days_ago)).isoformat())
+    # Consumes the oldest receipt first
+    stock_valuation.record(conn, 'ag1', 'owner-1', 'out', 4, 0, today.isoformat())
+    conn.commit()
+    conn.close()
+
+    response = inventory_client.get('/inventory/api/stock-ageing').get_json()
+    assert response['buckets'] == ['0_30', '31_60', '61_90', '90_plus']
+    product = response['products'][0]
+    assert product['oldest_age_days'] == 100
+    assert product['buckets'] == {
+        '0_30': {'quantity': 1, 'value': 6},
+        '31_60': {'quantity': 3, 'value': 12},
+        '61_90': {'quantity': 0, 'value': 0},
+        '90_plus': {'quantity': 1, 'value': 2},
+    }
+    assert response['summary']['90_plus'] == {'quantity': 1, 'value': 2}
+
+
+def test_erp_adjustments_are_valued_with_the_stock_change(valuation_db):
+    from modules.erp_modules.routes import erp_bp
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.register_blueprint(erp_bp)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'owner-1'
+
+    conn = database.get_db_connection()
+    _add_products(conn, 'owner-1', ('ea1', 'Grocery', 10), ('ea2', 'Grocery', 10))
+    conn.execute("UPDATE products SET business_owner_id = user_id")
+    conn.commit()
+    conn.close()
+    assert IntegratedInventoryService().create_purchase_entry(
+        {'items': [{'product_id': 'ea1', 'quantity': 10, 'unit_cost': 4}]}, 'owner-1')['success']
+
+    assert client.post('/api/erp/stock/adjustment',
+                       json={'product_id': 'ea1', 'adjustment': -3, 'reason': 'damage'}).get_json()['success']
+    assert client.post('/api/erp/stock/adjustment/bulk', json={'adjustments': [
+        {'product_id': 'ea1', 'adjustment': -2}, {'product_id': 'ea2', 'adjustment': 6}]}).get_json()['success']
+    assert client.post('/api/erp/stock/adjustment',
+                       json={'product_id': 'missing', 'adjustment': 1}).status_code == 404
+
+    conn = database.get_db_connection()
+    incremental = _state(conn)
+    stock_valuation.rebuild('owner-1', conn=conn)
+    assert _state(conn) == incremental
+    assert incremental[0]['ea1'] == (5, 4.0, 20.0)
+    assert incremental[0]['ea2'][0] == 6
+    conn.close()
@@ -0,0 +1,207 @@
+"""
+Test for Streaming Result Sets
+
+Feature: database-performance
+Property: Streamed rows match fetchall() while fetching in bounded batches
+
+This test validates that EnterpriseConnectionWrapper.stream() yields every
+row as a dict in batches of the configured size, releases its cursor when
+closed early, that streamed JSON responses match the eager output, and
+that a backup failing after the response started ends as valid JSON
+with "success": false instead of a truncated body.
+"""
+
+import pytest
+import json
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+import modules.shared.database as database
+from modules.shared.streaming import stream_json, iter_json_array, iter_json_object, iter_json_result, primed
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """Throwaway SQLite file with 1,000 rows"""
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'stream.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+
+    conn = database.get_db_connection()
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, qty INTEGER)")
+    conn.executemany("INSERT INTO items (id, name, qty) VALUES (?, ?, ?)",
+                     [(i, f"item {i}", i % 7) for i in range(1000)])
+    conn.commit()
+    conn.close()
+
+    yield
+    database.get_engine().dispose()
+
+
+class _CountingCursor:
+    """Records fetchmany sizes of the cursor stream() uses"""
+
+    def __init__(self, cursor, sizes):
+        self._cursor = cursor
+        self._sizes = sizes
+
+    def fetchmany(self, size):
+        rows = self._cursor.fetchmany(size)
+        self._sizes.append(len(rows))
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._cursor, name, value)
+
+
+def test_stream_yields_all_rows_in_batches(sqlite_db):
+    conn = database.get_db_connection()
+    eager = [dict(row) for row in conn.execute("SELECT * FROM items WHERE qty > ?", (2,)).fetchall()]
+
+    sizes = []
+    raw = conn.conn
+    conn.conn = type('Conn', (), {'cursor': lambda self: _CountingCursor(raw.cursor(), sizes)})()
+    streamed = list(conn.stream("SELECT * FROM items WHERE qty > ?", (2,), batch_size=100))
+    conn.conn = raw
+    conn.close()
+
+    assert streamed == eager
+    assert all(type(row) is dict for row in streamed)
+    assert max(sizes) == 100
+    assert sizes[-1] == 0
+
+
+def test_closing_a_stream_early_releases_the_cursor(sqlite_db):
+    conn = database.get_db_connection()
+    rows = conn.stream("SELECT * FROM items", batch_size=10)
+    assert next(rows)['id'] == 0
+    rows.close()
+
+    # The connection is immediately usable for writes again
+    conn.execute("UPDATE items SET qty = 0")
+    conn.commit()
+    conn.close()
+
+
+def test_streamed_json_matches_eager_response(sqlite_db):
+    app = Flask(__name__)
+    database.init_app(app)
+
+    @app.route('/items')
+    def items():
+        conn = database.get_db_connection()
+        return stream_json(iter_json_array(primed(conn.stream("SELECT * FROM items", batch_size=64),
+                                                  on_close=conn.close)))
+
+    @app.route('/backup')
+    def backup():
+        conn = database.get_db_connection()
+        return stream_json(iter_json_object([
+            ('items', conn.stream("SELECT id FROM items WHERE qty = 0")),
+            ('_metadata', {'version': '1.0'})
+        ]))
+
+    @app.route('/broken')
+    def broken():
+        conn = database.get_db_connection()
+        try:
+            return stream_json(iter_json_array(primed(conn.stream("SELECT * FROM missing_table"))))
+        except Exception as e:
+            return {'success': False, 'error': str(e)}, 500
+
+    client = app.test_client()
+    body = client.get('/items').get_json()
+    assert len(body) == 1000
+    assert body[10] == {'id': 10, 'name': 'item 10', 'qty': 3}
+
+    backup = client.get('/backup').get_json()
+    assert backup['_metadata'] == {'version': '1.0'}
+    assert [row['id'] for row in backup['items']] == [i for i in range(1000) if i % 7 == 0]
+
+    assert client.get('/broken').status_code == 500
+
+
+def test_mid_stream_failures_end_with_an_error_marker(sqlite_db):
+    app = Flask(__name__)
+
+    def rows_then_failure():
+        yield {'id': 1}
+        raise RuntimeError('connection lost')
+
+    @app.route('/result/<case>')
+    def result(case):
+        items = {
+            'ok': [('items', iter([{'id': 1}])), ('_metadata', {'version': '1.0'})],
+            'array': [('items', iter([{'id': 0}])), ('more', rows_then_failure())],
+            'value': [('items', []), ('bad', {'blob': object()})],
+        }[case]
+        return stream_json(iter_json_result(items))
+
+    client = app.test_client()
+    assert client.get('/result/ok').get_json() == {
+        'data': {'items': [{'id': 1}], '_metadata': {'version': '1.0'}}, 'success': True}
+
+    response = client.get('/result/array')
+    assert response.status_code == 200
+    assert response.get_json() == {'data': {'items': [{'id': 0}], 'more': [{'id': 1}]}, 'success': False,
+                                   'error': 'connection lost', 'failed_key': 'more'}
+    body = client.get('/result/value').get_json()
+    assert body['data'] == {'items': [], 'bad': None} and body['success'] is False
+
+
+ERP_BACKUP_TABLES = (
+    'erp_products', 'erp_customers', 'erp_vendors', 'erp_invoices', 'erp_invoice_items',
+    'erp_purchase_orders', 'erp_purchase_order_items', 'erp_transactions', 'erp_staff', 'erp_leads',
+    'erp_batches', 'erp_stock', 'erp_grn', 'erp_grn_items', 'erp_companies'
+)
+
+
+def test_backup_export_reports_a_failure_part_way(sqlite_db):
+    from modules.erp_modules.routes import erp_bp
+    conn = database.get_db_connection()
+    for table in ERP_BACKUP_TABLES:
+        conn.execute(f"CREATE TABLE {table} (id TEXT, user_id TEXT, company_id TEXT, note)")
+        conn.execute(f"INSERT INTO {table} VALUES ('{table}-1', 'u1', NULL, 'ok')")
+    conn.commit()
+    conn.close()
+
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.register_blueprint(erp_bp)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 'u1'
+
+    body = client.get('/api/erp/backup/export').get_json()
+    assert body['success'] is True
+    assert [row['id'] for row in body['data']['erp_stock']] == ['erp_stock-1']
+    assert body['data']['_metadata']['user_id'] == 'u1'
+
+    # A row that cannot be serialized stops the stream after earlier tables were sent
+    conn = database.get_db_connection()
+    conn.execute("INSERT INTO erp_stock VALUES ('erp_stock-2', 'u1', NULL, ?)", (b'\x00binary',))
+    conn.commit()
+    conn.close()
+    response = client.get('/api/erp/backup/export')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['success'] is False and body['failed_key'] == 'erp_stock'
+    assert [row['id'] for row in body['data']['erp_products']] == ['erp_products-1']
+    assert '_metadata' not in body['data']
+
+    # A table that cannot be read fails before the response starts
+    conn = database.get_db_connection()
+    conn.execute("DROP TABLE erp_grn")
+    conn.commit()
+    conn.close()
+    assert client.get('/api/erp/backup/export').status_code == 500
@@ -0,0 +1,190 @@
+"""
+Test for the Delta Sync Change Log
+
+Feature: database-performance
+Property: A device that applies every change page after its cursor holds exactly the owner's current records
+
+This test validates that a replica kept in step only through
+changes_since() pages - for any interleaving of inserts, updates and
+deletes with pulls of any page size - ends up equal to the owner's rows
+in the database and never sees another owner's records, that pruned
+tombstones make a stale cursor restart the table, and that the REST
+endpoint and the WebSocket connect serve deltas to devices holding a
+cursor.
+"""
+
+import pytest
+import os
+import sys
+from flask import Flask
+from flask_socketio import SocketIO
+from hypothesis import given, settings, strategies as st, HealthCheck
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.shared.database as database
+from modules.shared import migrations
+from modules.shared import sync_changes
+from modules.shared.keyset import encode_cursor
+
+
+@pytest.fixture
+def changes_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'changes.db'))
+    monkeypatch.setattr(migrations, 'DB_PATH', str(tmp_path / 'changes.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    migrations.migrate()
+    yield
+    database.get_engine().dispose()
+
+
+def _reset(conn):
+    for table in ('sales', 'bills', 'customers', 'products', sync_changes.CHANGES_TABLE, sync_changes.META_TABLE):
+        conn.execute(f"DELETE FROM {table}")
+
+
+def _apply(replica, page):
+    for table in page['reset']:
+        replica[table] = {}
+    for table, change in page['changes'].items():
+        records = replica.setdefault(table, {})
+        for values in change['rows']:
+            row = dict(zip(change['columns'], values))
+            records[row['id']] = row
+        for row_id in change['deleted']:
+            records.pop(row_id, None)
+
+
+def _pull(conn, replica, cursor, limit):
+    while True:
+        page = sync_changes.changes_since(conn, 'o1', cursor, limit)
+        _apply(replica, page)
+        cursor = page['cursor']
+        if not page['has_more']:
+            return cursor
+
+
+def _owned(conn, table, owner_column):
+    return {row['id']: dict(row) for row in conn.execute(
+        f"SELECT * FROM {table} WHERE {owner_column} = 'o1'").fetchall()}
+
+
+_operation = st.one_of(
+    st.tuples(st.just('product'), st.integers(0, 5), st.sampled_from(['o1', 'o2']), st.integers(1, 99)),
+    st.tuples(st.just('price'), st.integers(0, 5), st.integers(1, 99)),
+    st.tuples(st.just('delete'), st.sampled_from(['products', 'customers']), st.integers(0, 5)),
+    st.tuples(st.just('customer'), st.integers(0, 5), st.sampled_from(['o1', 'o2'])),
+    st.tuples(st.just('pull'), st.integers(1, 4)),
+)
+
+
+@settings(max_examples=40, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(operations=st.lists(_operation, max_size=40), final_limit=st.integers(1, 5))
+def test_replica_follows_the_change_log(changes_db, operations, final_limit):
+    conn = database.get_db_connection()
+    _reset(conn)
+    conn.commit()
+    replica, cursor = {}, None
+    for operation in operations:
+        kind = operation[0]
+        if kind == 'product':
+            _, index, owner, price = operation
+            conn.execute("""
+                INSERT INTO products (id, code, name, price, stock, business_owner_id)
+                VALUES (?, ?, ?, ?, 10, ?)
+                ON CONFLICT (id) DO UPDATE SET price = excluded.price
+            """, (f"p{index}", f"P{index}", f"Product {index}", price, owner))
+        elif kind == 'price':
+            conn.execute("UPDATE products SET price = ? WHERE id = ?", (operation[2], f"p{operation[1]}"))
+        elif kind == 'customer':
+            _, index, owner = operation
+            conn.execute("INSERT OR IGNORE INTO customers (id, name, user_id) VALUES (?, ?, ?)",
+                         (f"c{index}", f"Customer {index}", owner))
+        elif kind == 'delete':
+            prefix = 'p' if operation[1] == 'products' else 'c'
+            conn.execute(f"DELETE FROM {operation[1]} WHERE id = ?", (f"{prefix}{operation[2]}",))
+        else:
+            conn.commit()
+            cursor = _pull(conn, replica, cursor, operation[1])
+    conn.commit()
+    _pull(conn, replica, cursor, final_limit)
+
+    assert replica.get('products', {}) == _owned(conn, 'products', 'business_owner_id')
+    assert replica.get('customers', {}) == _owned(conn, 'customers', 'user_id')
+    conn.close()
+
+
+def test_pruned_tombstones_restart_a_stale_cursor(changes_db):
+    conn = database.get_db_connection()
+    _reset(conn)
+    conn.execute("INSERT INTO products (id, code, name, price, business_owner_id) VALUES ('p1', 'P1', 'One', 5, 'o1')")
+    conn.execute("INSERT INTO products (id, code, name, price, business_owner_id) VALUES ('p2', 'P2', 'Two', 6, 'o1')")
+    conn.commit()
+    replica = {}
+    stale = _pull(conn, replica, None, 10)
+    assert set(replica['products']) == {'p1', 'p2'}
+
+    conn.execute("DELETE FROM products WHERE id = 'p1'")
+    conn.commit()
+    # Backdate the tombstone past the retention window
+    conn.execute(f"UPDATE {sync_changes.CHANGES_TABLE} SET changed_at = '2000-01-01 00:00:00' WHERE op = 'delete'")
+    conn.commit()
+    assert sync_changes.prune(days=1, conn=conn) == 1
+
+    page = sync_changes.changes_since(conn, 'o1', stale, 10)
+    assert page['reset'] == ['products']
+    _apply(replica, page)
+    assert set(replica['products']) == {'p2'}
+    # The new cursor is past the floor
+    assert sync_changes.changes_since(conn, 'o1', page['cursor'], 10)['count'] == 0
+    conn.close()
+
+
+def test_endpoint_and_socket_serve_deltas(changes_db):
+    from modules.sync.api_routes import sync_api_bp
+    from modules.sync.routes import init_socketio_events
+    from modules.sync.service import sync_service
+
+    conn = database.get_db_connection()
+    _reset(conn)
+    for index in range(3):
+        conn.execute("INSERT INTO products (id, code, name, price, business_owner_id) VALUES (?, ?, ?, 1, 'o1')",
+                     (f"p{index}", f"P{index}", f"Product {index}"))
+    conn.commit()
+    head = sync_changes.head_cursor(conn, 'o1')
+    conn.execute("UPDATE products SET price = 2 WHERE id = 'p1'")
+    conn.commit()
+    conn.close()
+
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.register_blueprint(sync_api_bp)
+    socketio = SocketIO(app, async_mode='threading')
+    init_socketio_events(socketio)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'o1'
+        sess['user_type'] = 'client'
+
+    data = client.get(f"/api/sync/changes?cursor={head}").get_json()['data']
+    assert data['count'] == 1 and not data['has_more']
+    changed = data['changes']['products']
+    assert [dict(zip(changed['columns'], row))['price'] for row in changed['rows']] == [2]
+
+    data = client.get('/api/sync/changes?limit=2&tables=products').get_json()['data']
+    assert data['count'] == 2 and data['has_more']
+    assert client.get('/api/sync/changes?cursor=bogus').status_code == 400
+    assert client.get(f"/api/sync/changes?cursor={encode_cursor([1, 2])}").status_code == 400
+
+    socket = socketio.test_client(app, flask_test_client=client, query_string=f"cursor={head}")
+    initial = next(event for event in socket.get_received() if event['name'] == 'initial_sync')['args'][0]
+    assert 'data' not in initial and initial['changes']['count'] == 1
+
+    socket.emit('request_sync', {'cursor': initial['changes']['cursor']})
+    response = next(event for event in socket.get_received() if event['name'] == 'sync_response')['args'][0]
+    assert response['changes']['count'] == 0 and response['changes']['changes'] == {}
+    socket.disconnect()
+    for session_id in list(sync_service.active_sessions):
+        sync_service.unregister_session(session_id)
@@ -0,0 +1,160 @@
+"""
+Test for the Per-user Sync Clock
+
+Feature: database-performance
+Property: A user's sync version only moves forward, and moves on every write that covers the user
+
+This test validates that clock versions are strictly increasing and that
+a user's version changes exactly when a tick names the user or all
+users, and that WebSocket keepalives and sync requests are answered from
+the clock without a single database statement while writes committed
+through result_cache.invalidate() and sync events still move the version
+the devices see - for employee devices, the version of the owner they
+work for. The idle-connection bench runs against logged-in devices.
+"""
+
+import pytest
+import os
+import sys
+from flask import Flask
+from flask_socketio import SocketIO
+from hypothesis import given, settings, strategies as st
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.shared.database as database
+from modules.shared import migrations
+from modules.shared import result_cache
+from modules.shared.query_stats import query_stats
+from modules.shared.sync_clock import SyncClock, MemoryClock, sync_clock, changed_at
+from modules.sync.routes import init_socketio_events
+from modules.sync.gateway import EmitCoalescer
+from modules.sync.service import sync_service
+
+
+@settings(max_examples=100, deadline=None)
+@given(ticks=st.lists(st.sampled_from(['u1', 'u2', 'u3', None]), max_size=40))
+def test_versions_move_forward_on_covering_ticks(ticks):
+    clock = SyncClock(MemoryClock())
+    users = ['u1', 'u2', 'u3', 'u4']
+    issued = []
+    for scope in ticks:
+        before = {user: clock.version(user) for user in users}
+        issued.append(clock.tick(scope))
+        for user in users:
+            if scope is None or scope == user:
+                assert clock.version(user) == issued[-1] > before[user]
+            else:
+                assert clock.version(user) == before[user]
+    assert issued == sorted(set(issued))
+    assert clock.version('u4') == max([version for version, scope in zip(issued, ticks) if scope is None],
+                                      default=0)
+    assert changed_at(0) is None and changed_at(issued[-1] if issued else 1)
+
+
+@pytest.fixture
+def sync_app(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'sync.db'))
+    monkeypatch.setattr(migrations, 'DB_PATH', str(tmp_path / 'sync.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    migrations.migrate()
+    sync_clock.clear()
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    socketio = SocketIO(app, async_mode='threading')
+    init_socketio_events(socketio)
+    # Send data_sync frames as they happen (no coalescing window)
+    socketio.sync_coalescer = EmitCoalescer(socketio, window=0)
+    yield app, socketio
+    for session_id in list(sync_service.active_sessions):
+        sync_service.unregister_session(session_id)
+    query_stats.enabled = False
+    query_stats.reset()
+    database.get_engine().dispose()
+
+
+def _connect(app, socketio, user_id):
+    """Socket.IO client carrying a logged-in Flask session for user_id"""
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+    return socketio.test_client(app, flask_test_client=client)
+
+
+def _reply(client, name):
+    events = [event for event in client.get_received() if event['name'] == name]
+    assert len(events) == 1
+    return events[0]['args'][0]
+
+
+def test_idle_connections_never_query_the_database(sync_app):
+    app, socketio = sync_app
+    clients = [_connect(app, socketio, f"user-{index % 2}") for index in range(6)]
+    initial = _reply(clients[0], 'initial_sync')['data']
+    for client in clients[1:]:
+        client.get_received()
+
+    query_stats.reset()
+    query_stats.enabled = True
+    for _ in range(5):
+        for client in clients:
+            client.emit('ping')
+            assert _reply(client, 'pong')['version'] == initial['sync_version']
+            client.emit('request_sync', {})
+            assert _reply(client, 'sync_response')['version'] == initial['sync_version']
+    assert query_stats.snapshot()['fingerprints'] == []
+
+    # A committed write moves every device's version (the writer names no tenant)
+    result_cache.invalidate()
+    clients[0].emit('ping')
+    after_write = _reply(clients[0], 'pong')
+    assert after_write['version'] > initial['sync_version']
+    assert after_write['changed_at'] is not None
+
+    # A sync event moves only its user's version
+    clients[1].emit('data_changed', {'event_type': 'update', 'data': {'table': 'products'}})
+    clients[1].get_received()
+    event = _reply(clients[3], 'data_sync')['event']
+    assert event['version'] > after_write['version']
+    clients[3].emit('ping')
+    assert _reply(clients[3], 'pong')['version'] == event['version']
+    clients[0].emit('ping')
+    assert _reply(clients[0], 'pong')['version'] == after_write['version']
+    assert query_stats.snapshot()['fingerprints'] == []
+
+    for client in clients:
+        client.disconnect()
+
+
+def test_employee_devices_follow_their_owners_version(sync_app):
+    app, socketio = sync_app
+    flask_client = app.test_client()
+    with flask_client.session_transaction() as sess:
+        sess['user_id'] = 'employee-1'
+        sess['user_type'] = 'employee'
+        sess['client_id'] = 'owner-1'
+    client = socketio.test_client(app, flask_test_client=flask_client)
+    initial = _reply(client, 'initial_sync')['data']
+    assert initial['sync_version'] == sync_clock.version('owner-1')
+
+    # Writers tick the tenant - the owner - never the employee's own id
+    query_stats.reset()
+    query_stats.enabled = True
+    result_cache.invalidate('owner-1')
+    client.emit('ping')
+    pong = _reply(client, 'pong')
+    assert pong['version'] > initial['sync_version']
+    client.emit('request_sync', {})
+    assert _reply(client, 'sync_response')['version'] == pong['version']
+    assert query_stats.snapshot()['fingerprints'] == []
+    client.disconnect()
+
+
+def test_bench_connects_every_device(sync_app):
+    from modules.shared.sync_clock import bench
+    results = bench(connections=4, pings=2)
+    assert results['connections'] == 4 and results['replies'] == 16
+    assert results['idle_statements_per_connection'] == 0
+    assert sync_service.active_sessions == {}
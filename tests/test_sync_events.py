@@ -0,0 +1,113 @@
+"""
+Test for the Sync Event Store
+
+Feature: database-performance
+Property: Every store returns a user's last N events after a version, in order, whatever the interleaving
+
+This test validates that the in-memory ring buffers and the shared
+database table answer per-user event lookups identically to a plain
+list reference (bounded to the newest SYNC_EVENT_LIMIT events), and
+that two SyncService instances sharing the database store - two gunicorn
+workers - see each other's events and sessions, with sessions of a
+worker that stopped heartbeating dropped.
+"""
+
+import pytest
+import os
+import sys
+from hypothesis import given, settings, strategies as st, HealthCheck
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.shared.database as database
+from modules.shared import migrations
+from modules.shared import sync_events
+from modules.shared.sync_events import MemoryEventStore, DatabaseEventStore
+from modules.sync.service import SyncService
+
+
+@pytest.fixture
+def events_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'events.db'))
+    monkeypatch.setattr(migrations, 'DB_PATH', str(tmp_path / 'events.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    migrations.migrate()
+    yield
+    database.get_engine().dispose()
+
+
+_step = st.one_of(
+    st.tuples(st.just('append'), st.sampled_from(['u1', 'u2'])),
+    st.tuples(st.just('read'), st.sampled_from(['u1', 'u2', 'u3']), st.integers(0, 30)),
+)
+
+
+@settings(max_examples=30, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(steps=st.lists(_step, max_size=60), limit=st.integers(1, 6), trim_every=st.integers(1, 4))
+def test_stores_match_the_reference(events_db, steps, limit, trim_every):
+    stores = [MemoryEventStore(limit), DatabaseEventStore(limit, trim_every)]
+    stores[1].clear()
+    reference = {}
+    for version, step in enumerate(steps, start=1):
+        if step[0] == 'append':
+            event = {'id': f"sync_{version}", 'user_id': step[1], 'event_type': 'update', 'data': {'n': version},
+                     'timestamp': f"2026-01-01T00:00:{version:02d}", 'source_session': None, 'version': version}
+            reference.setdefault(step[1], []).append(event)
+            for store in stores:
+                store.append(event)
+        else:
+            _, user_id, since = step
+            expected = [event for event in reference.get(user_id, [])[-limit:] if event['version'] > since]
+            for store in stores:
+                assert store.events_since(user_id, since_version=since) == expected, store.name
+                assert store.events_since(user_id) == reference.get(user_id, [])[-limit:], store.name
+
+    # Trimming keeps the table bounded per user
+    conn = database.get_db_connection()
+    for user_id, events in reference.items():
+        stored = conn.execute(f"SELECT COUNT(*) AS n FROM {sync_events.EVENTS_TABLE} WHERE user_id = ?",
+                              (user_id,)).fetchone()['n']
+        assert min(len(events), limit) <= stored < limit + trim_every
+    conn.close()
+
+
+def test_memory_session_index():
+    store = MemoryEventStore()
+    store.add_session('s1', 'u1')
+    store.add_session('s2', 'u1')
+    store.add_session('s3', 'u2')
+    store.remove_session('s1')
+    store.remove_session('missing')
+    assert store.user_sessions('u1') == ['s2'] and store.user_sessions('u3') == []
+    assert store.stats()['sessions_by_user'] == {'u1': 1, 'u2': 1}
+
+
+def test_workers_share_events_and_sessions(events_db, monkeypatch):
+    worker_a = SyncService(DatabaseEventStore())
+    worker_b = SyncService(DatabaseEventStore())
+    worker_a.store.clear()
+
+    assert worker_a.register_session('sa', 'u1', {'platform': 'web'})
+    monkeypatch.setattr(sync_events, 'WORKER_ID', 'host:2')
+    assert worker_b.register_session('sb', 'u1', {'platform': 'android'})
+    assert worker_a.get_user_sessions('u1') == worker_b.get_user_sessions('u1') == ['sa', 'sb']
+
+    event = worker_a.create_sync_event('u1', 'update', {'table': 'products'}, 'sa')
+    pending = worker_b.get_pending_sync_events('u1')
+    assert [item['id'] for item in pending] == [event['id']]
+    assert worker_b.get_pending_sync_events('u1', since_version=event['version']) == []
+    assert worker_b.get_sync_stats()['sessions_by_user'] == {'u1': 2}
+
+    # Worker A stops heartbeating: B's cleanup keeps its own session and drops A's
+    conn = database.get_db_connection()
+    conn.execute(f"UPDATE {sync_events.SESSIONS_TABLE} SET last_seen = 0")
+    conn.commit()
+    conn.close()
+    assert worker_b.get_user_sessions('u1') == []
+    worker_b.cleanup_inactive_sessions()
+    assert worker_b.get_user_sessions('u1') == ['sb']
+
+    assert worker_b.unregister_session('sb')
+    assert worker_a.get_user_sessions('u1') == []
@@ -0,0 +1,190 @@
+"""
+Test for the Real-time Sync Gateway
+
+Feature: database-performance
+Property: A coalesced data_sync frame leaves a device in the same state as every event it replaces
+
+This test validates that coalescing keeps exactly the last event per
+record in order (a replica applying the frame ends where applying every
+event would), that a burst of broadcasts reaches each device as one
+frame that skips the device it came from, that only a logged-in
+session from an allowed origin may connect, and that with the database
+message queue an emit made on one worker is replayed by another to its
+devices' room.
+"""
+
+import pytest
+import os
+import sys
+import time
+from flask import Flask
+from flask_socketio import SocketIO
+import socketio as socketio_lib
+from hypothesis import given, settings, strategies as st
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.shared.database as database
+from modules.shared import migrations
+from modules.sync.gateway import EmitCoalescer, DatabaseQueueManager, coalescer, cors_origins, _coalesce
+from modules.sync.routes import init_socketio_events, broadcast_data_change
+from modules.sync.service import sync_service
+
+
+def _apply(replica, events):
+    for event in events:
+        data = event['data']
+        key = (data['table'], data['record']['id'])
+        if event['event_type'] == 'delete':
+            replica.pop(key, None)
+        else:
+            replica[key] = data['record']['value']
+    return replica
+
+
+_event = st.builds(
+    lambda event_type, table, record_id, value: {
+        'event_type': event_type,
+        'data': {'table': table, 'record': {'id': record_id, 'value': value}}
+    },
+    st.sampled_from(['create', 'update', 'delete']),
+    st.sampled_from(['products', 'customers']),
+    st.integers(0, 4),
+    st.integers(0, 99),
+)
+
+
+@settings(max_examples=200, deadline=None)
+@given(events=st.lists(_event, max_size=40))
+def test_coalesced_frame_matches_every_event(events):
+    frame = _coalesce(events)
+    assert _apply({}, frame) == _apply({}, events)
+    keys = [(event['data']['table'], event['data']['record']['id']) for event in frame]
+    assert len(keys) == len(set(keys))
+    # Order of the surviving events is preserved
+    positions = [max(index for index, event in enumerate(events) if event is kept) for kept in frame]
+    assert positions == sorted(positions)
+
+
+@pytest.fixture
+def gateway_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'gateway.db'))
+    monkeypatch.setattr(migrations, 'DB_PATH', str(tmp_path / 'gateway.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    migrations.migrate()
+    yield
+    for session_id in list(sync_service.active_sessions):
+        sync_service.unregister_session(session_id)
+    database.get_engine().dispose()
+
+
+def _server(**options):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    server = SocketIO(app, async_mode='threading', **options)
+    init_socketio_events(server)
+    return app, server
+
+
+def _connect(app, server, user_id):
+    """Socket.IO client carrying a logged-in Flask session for user_id"""
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+    return server.test_client(app, flask_test_client=client)
+
+
+def _frames(client):
+    return [event['args'][0] for event in client.get_received() if event['name'] == 'data_sync']
+
+
+def test_bursts_reach_each_device_as_one_frame(gateway_db):
+    app, server = _server()
+    devices = [_connect(app, server, 'u1') for _ in range(3)]
+    other = _connect(app, server, 'u2')
+    for client in devices + [other]:
+        client.get_received()
+
+    for index in range(60):
+        broadcast_data_change('u1', 'update', {'table': 'products', 'record': {'id': f"p{index % 10}"}}, server)
+    coalescer(server).flush()
+    for client in devices:
+        frames = _frames(client)
+        assert len(frames) == 1 and frames[0]['count'] == 10
+        assert [event['data']['record']['id'] for event in frames[0]['events']] == [f"p{index}" for index in range(10)]
+    assert _frames(other) == []
+
+    # A device's own changes come back to the others only
+    devices[0].emit('data_changed', {'event_type': 'update', 'data': {'table': 'products', 'record': {'id': 'p1'}}})
+    devices[0].emit('data_changed', {'event_type': 'update', 'data': {'table': 'products', 'record': {'id': 'p2'}}})
+    coalescer(server).flush()
+    assert _frames(devices[0]) == []
+    frames = _frames(devices[1])
+    assert len(frames) == 1 and frames[0]['count'] == 2 and frames[0]['source_session'] is not None
+
+    # The window flushes on its own
+    devices[2].get_received()
+    broadcast_data_change('u1', 'delete', {'table': 'products', 'record': {'id': 'p3'}}, server)
+    assert _frames(devices[2]) == []
+    deadline = time.time() + 2
+    frames = []
+    while not frames and time.time() < deadline:
+        time.sleep(0.02)
+        frames = _frames(devices[2])
+    assert len(frames) == 1 and frames[0]['event']['event_type'] == 'delete'
+
+    for client in devices + [other]:
+        client.disconnect()
+
+
+def test_connects_need_a_session_and_an_allowed_origin(gateway_db):
+    app, server = _server(cors_allowed_origins=cors_origins('https://shop.example.com/'))
+    # A user_id in the query string is not a login
+    assert not server.test_client(app, query_string='user_id=u1').is_connected()
+    assert sync_service.active_sessions == {}
+    assert _connect(app, server, 'u1').is_connected()
+
+    assert cors_origins('') is None
+    assert cors_origins(' https://a.example.com , https://b.example.com/') == ['https://a.example.com',
+                                                                              'https://b.example.com']
+    # Only the configured origin, never every origin
+    environ = {'HTTP_ORIGIN': 'https://evil.example.com'}
+    assert server.server.eio._cors_allowed_origins(environ) == ['https://shop.example.com']
+
+
+def test_database_queue_reaches_other_workers(gateway_db):
+    # Worker A publishes through its SocketIO server; worker B's reader replays to its own clients
+    manager_a, manager_b = DatabaseQueueManager(), DatabaseQueueManager(poll_interval=0.01)
+    app_a, worker_a = _server(client_manager=manager_a)
+    worker_a.sync_coalescer = EmitCoalescer(worker_a, window=0)
+    worker_b = socketio_lib.Server(client_manager=manager_b, async_mode='threading')
+    replayed = []
+    manager_b._handle_emit = replayed.append
+    manager_b.initialize()
+    try:
+        time.sleep(0.2)  # the reader starts at the queue's current end
+        broadcast_data_change('u1', 'update', {'table': 'products', 'record': {'id': 'p1'}}, worker_a)
+        deadline = time.time() + 3
+        while not replayed and time.time() < deadline:
+            time.sleep(0.02)
+        assert len(replayed) == 1
+        message = replayed[0]
+        assert message['event'] == 'data_sync' and message['room'] == 'user_u1'
+        assert message['data']['event']['data']['record']['id'] == 'p1'
+        assert message['host_id'] == manager_a.host_id
+
+        manager_b.retention = 0
+        assert manager_b.prune() == 1
+    finally:
+        manager_a.close()
+        manager_b.close()
+        time.sleep(0.05)
+
+
+def test_bench_connects_every_device(gateway_db):
+    from modules.sync.gateway import bench
+    results = bench(devices=2, updates=20)
+    assert results['uncoalesced_frames_per_device'] == 20
+    assert results['coalesced_frames_per_device'] == 1 and results['coalesced_events_per_device'] == 20
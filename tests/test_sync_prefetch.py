@@ -0,0 +1,146 @@
+"""
+Test for the Login-time Sync Snapshot Prefetch
+
+Feature: database-performance
+Property: A device never receives a snapshot older than the last write that covers its user
+
+This test validates that the sync snapshot shared by the login prefetch
+and the WebSocket connect is rebuilt after every write that invalidates
+the user (or everyone) and is reused otherwise, that a write which skips invalidation still
+moves the snapshot on through the sync_changes log, that a login returns
+without waiting for the snapshot, and that the connect handler serves
+the snapshot the login warmed.
+"""
+
+import pytest
+import os
+import sys
+import threading
+from flask import Flask
+from flask_socketio import SocketIO
+from hypothesis import given, settings, strategies as st
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.shared.database as database
+from modules.shared import migrations
+from modules.shared import result_cache
+from modules.shared.database import hash_password
+from modules.auth.service import AuthService
+from modules.sync.routes import init_socketio_events
+from modules.sync.service import SyncService, sync_service
+
+
+@settings(max_examples=100, deadline=None)
+@given(operations=st.lists(st.sampled_from(['login', 'write', 'write_all', 'other_write', 'connect']),
+                           max_size=30))
+def test_snapshot_is_never_older_than_the_last_write(operations):
+    result_cache.result_cache.clear()
+    service = SyncService(login_prefetch='inline')
+    writes = {'count': 0}
+    builds = []
+
+    def build(user_id):
+        builds.append(user_id)
+        return {'writes': writes['count']}
+
+    service.get_latest_data_for_user = build
+    service._snapshot_head = lambda user_id: None
+    cached = False
+    for operation in operations:
+        if operation == 'login':
+            service.prefetch_snapshot('u1')
+            cached = True
+        elif operation in ('write', 'write_all'):
+            writes['count'] += 1
+            result_cache.invalidate('u1' if operation == 'write' else None)
+            cached = False
+        elif operation == 'other_write':
+            result_cache.invalidate('u2')
+        else:
+            before = len(builds)
+            assert service.get_snapshot('u1') == {'writes': writes['count']}
+            assert len(builds) == before + (0 if cached else 1)
+            cached = True
+
+
+@pytest.fixture
+def login_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'login.db'))
+    monkeypatch.setattr(migrations, 'DB_PATH', str(tmp_path / 'login.db'))
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_db_type', 'sqlite')
+    migrations.migrate()
+    conn = database.get_db_connection()
+    conn.execute("INSERT INTO users (id, email, password_hash, business_name, business_type, is_active) "
+                 "VALUES ('owner-1', 'owner@example.com', ?, 'Shop', 'retail', 1)", (hash_password('secret'),))
+    conn.execute("INSERT INTO products (id, code, name, price, user_id) VALUES ('p1', 'P1', 'One', 5, 'owner-1')")
+    conn.commit()
+    conn.close()
+    result_cache.result_cache.clear()
+    yield
+    for session_id in list(sync_service.active_sessions):
+        sync_service.unregister_session(session_id)
+    monkeypatch.setattr(sync_service, 'login_prefetch', 'background')
+    database.get_engine().dispose()
+
+
+def test_login_does_not_wait_and_connect_reuses_the_prefetch(login_db, monkeypatch):
+    release, builds = threading.Event(), []
+    build = sync_service.get_latest_data_for_user
+
+    def slow_build(user_id):
+        release.wait(5)
+        builds.append(threading.current_thread().name)
+        return build(user_id)
+
+    monkeypatch.setattr(sync_service, 'get_latest_data_for_user', slow_build)
+    monkeypatch.setattr(sync_service, 'login_prefetch', 'background')
+
+    # The snapshot build is blocked, yet the login completes
+    assert AuthService().authenticate_user('owner@example.com', 'secret')['success']
+    assert builds == []
+    release.set()
+    for _ in range(500):
+        if not sync_service._prefetching:
+            break
+        threading.Event().wait(0.01)
+    assert len(builds) == 1 and builds[0].startswith('sync-prefetch')
+
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    socketio = SocketIO(app, async_mode='threading')
+    init_socketio_events(socketio)
+    flask_client = app.test_client()
+    with flask_client.session_transaction() as sess:
+        sess['user_id'] = 'owner-1'
+    client = socketio.test_client(app, flask_test_client=flask_client)
+    initial = next(event for event in client.get_received() if event['name'] == 'initial_sync')['args'][0]
+    assert [product['id'] for product in initial['data']['products']] == ['p1']
+    assert len(builds) == 1
+    client.disconnect()
+
+    # After a write the next connect rebuilds
+    result_cache.invalidate('owner-1')
+    assert sync_service.get_snapshot('owner-1')['products'][0]['id'] == 'p1'
+    assert len(builds) == 2
+
+
+def test_failed_snapshots_are_not_cached(login_db, monkeypatch):
+    service = SyncService(login_prefetch='off')
+    assert service.prefetch_snapshot('owner-1') is False
+    monkeypatch.setattr(service, 'get_latest_data_for_user', lambda user_id: {})
+    assert service.get_snapshot('owner-1') == {}
+    monkeypatch.setattr(service, 'get_latest_data_for_user', lambda user_id: {'products': []})
+    assert service.get_snapshot('owner-1') == {'products': []}
+
+
+def test_writes_that_skip_invalidation_still_refresh_the_snapshot(login_db):
+    assert [product['stock'] for product in sync_service.get_snapshot('owner-1')['products']] == [0]
+    conn = database.get_db_connection()
+    conn.execute("UPDATE products SET stock = 7 WHERE id = 'p1'")
+    conn.commit()
+    conn.close()
+    # No result_cache.invalidate(): the change log's head moved instead
+    assert [product['stock'] for product in sync_service.get_snapshot('owner-1')['products']] == [7]